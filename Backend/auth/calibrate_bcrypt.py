@@ -0,0 +1,98 @@
+"""
+bcrypt cost calibration
+
+Measures how long one bcrypt hash takes on this host for a range of cost
+factors and recommends the highest cost that fits a latency budget.
+
+Usage:
+    python -m auth.calibrate_bcrypt --target-ms 250
+    python -m auth.calibrate_bcrypt --target-ms 250 --write-env
+
+The chosen value goes into BCRYPT_ROUNDS (see config.py). Existing hashes
+are upgraded transparently on each user's next successful login.
+"""
+import argparse
+import os
+import statistics
+import time
+
+from passlib.hash import bcrypt
+
+# OWASP floor - never recommend anything cheaper than this
+MIN_SAFE_ROUNDS = 10
+
+ENV_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".env")
+
+
+def measure_hash_ms(rounds: int, samples: int) -> float:
+    """
+    Median time of a single bcrypt hash at the given cost
+    
+    Args:
+        rounds: bcrypt cost factor (log2 of iterations)
+        samples: Number of hashes to time
+        
+    Returns:
+        Median milliseconds per hash
+    """
+    hasher = bcrypt.using(rounds=rounds)
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        hasher.hash("calibration-Passw0rd")
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def recommend_rounds(results: dict, target_ms: float) -> int:
+    """Highest measured cost whose hash time fits the budget (never below the safe floor)"""
+    within_budget = [rounds for rounds, ms in results.items() if ms <= target_ms]
+    return max(max(within_budget, default=MIN_SAFE_ROUNDS), MIN_SAFE_ROUNDS)
+
+
+def write_env_setting(rounds: int, env_file: str = ENV_FILE) -> None:
+    """Set BCRYPT_ROUNDS in the .env file, replacing any existing value"""
+    lines = []
+    if os.path.exists(env_file):
+        with open(env_file, "r", encoding="utf-8") as f:
+            lines = [line for line in f.read().splitlines() if not line.startswith("BCRYPT_ROUNDS=")]
+    lines.append(f"BCRYPT_ROUNDS={rounds}")
+    with open(env_file, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate the bcrypt cost factor for this host")
+    parser.add_argument("--target-ms", type=float, default=250.0, help="Latency budget for one hash (ms)")
+    parser.add_argument("--min-rounds", type=int, default=MIN_SAFE_ROUNDS)
+    parser.add_argument("--max-rounds", type=int, default=15)
+    parser.add_argument("--samples", type=int, default=5, help="Hashes timed per cost level")
+    parser.add_argument("--write-env", action="store_true", help=f"Store the result in {ENV_FILE}")
+    args = parser.parse_args()
+
+    print(f"\n🔐 bcrypt calibration (target {args.target_ms:.0f} ms per hash)\n")
+    print(f"{'rounds':>6}  {'ms/hash':>10}  {'logins/s/core':>14}")
+    print("-" * 34)
+
+    results = {}
+    for rounds in range(args.min_rounds, args.max_rounds + 1):
+        ms = measure_hash_ms(rounds, args.samples)
+        results[rounds] = ms
+        print(f"{rounds:>6}  {ms:>10.1f}  {1000 / ms:>14.1f}")
+        # Each extra round doubles the cost - stop once we are well past the budget
+        if ms > args.target_ms * 2:
+            break
+
+    recommended = recommend_rounds(results, args.target_ms)
+    print(f"\n✓ Recommended: BCRYPT_ROUNDS={recommended} "
+          f"({results.get(recommended, 0):.1f} ms, {1000 / results.get(recommended, 1):.1f} logins/s/core)")
+
+    if args.write_env:
+        write_env_setting(recommended)
+        print(f"✓ Written to {ENV_FILE}")
+    else:
+        print("  Add it to your .env file, or re-run with --write-env")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,23 @@
 """
 Password hashing utilities using bcrypt
 """
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
 from passlib.context import CryptContext
 
+from config import settings
+
 # Create password context with bcrypt
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# min/max pinned to the configured cost so needs_update() flags hashes made
+# with any other cost - both weaker and needlessly slow ones
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS
+)
 
 
 def hash_password(password: str) -> str:
@@ -20,6 +33,19 @@ def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def needs_rehash(hashed_password: str) -> bool:
+    """
+    Check whether a stored hash uses a different cost than BCRYPT_ROUNDS
+    
+    Args:
+        hashed_password: Hashed password from database
+        
+    Returns:
+        True if the hash should be replaced on next successful login
+    """
+    return pwd_context.needs_update(hashed_password)
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verify a plain text password against a hashed password
@@ -32,3 +58,92 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         True if password matches, False otherwise
     """
     return pwd_context.verify(plain_password, hashed_password)
+
+
+class HashingQueueFull(Exception):
+    """Raised when the password hashing executor already has too much work queued"""
+
+
+class PasswordHashingExecutor:
+    """
+    Runs bcrypt on a dedicated thread pool with a cap on outstanding work
+    
+    bcrypt releases the GIL, so the event loop keeps serving other requests
+    while a hash is computed. Once `max_pending` operations are running or
+    queued, new ones are rejected immediately instead of waiting behind them.
+    
+    The counters are only touched from the event loop thread.
+    """
+    
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+    
+    async def run(self, func, *args):
+        """
+        Run a hashing function in the executor
+        
+        Raises:
+            HashingQueueFull: If max_pending operations are already outstanding
+        """
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HashingQueueFull()
+        
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+    
+    def stats(self) -> dict:
+        """Queue depth and counters"""
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "in_flight": min(self.pending, self.workers),
+            "queued": max(self.pending - self.workers, 0),
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+    
+    def shutdown(self) -> None:
+        """Stop the worker threads (a later run() starts a fresh pool)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+password_hasher = PasswordHashingExecutor(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING
+)
+
+
+async def hash_password_async(password: str) -> str:
+    """
+    Hash a password without blocking the event loop
+    
+    Raises:
+        HashingQueueFull: If the hashing executor is saturated
+    """
+    return await password_hasher.run(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify a password without blocking the event loop
+    
+    Raises:
+        HashingQueueFull: If the hashing executor is saturated
+    """
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
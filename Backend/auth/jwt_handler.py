@@ -1,13 +1,27 @@
 """
 JWT token generation and validation
 """
+import hashlib
+import uuid
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Optional, Tuple
 from jose import JWTError, jwt
 from fastapi import HTTPException, status
 
 from config import settings
 from schemas import TokenData
+from utils.cache import TTLCache, MISSING
+from auth.revocation import revocation_list, to_precise_timestamp
+from utils.metrics import JWT_VERIFY_SECONDS, JWT_VERIFICATIONS
+
+# Tokens that already passed signature verification, keyed by SHA-256 of the
+# token and evicted at the token's own exp. Clients reuse an access token for
+# hours, so most requests skip the HMAC check and model construction.
+verified_tokens = TTLCache(maxsize=settings.VERIFIED_TOKEN_CACHE_SIZE, ttl=0)
+
+JWT_CACHED = JWT_VERIFICATIONS.labels("cached")
+JWT_VERIFIED = JWT_VERIFICATIONS.labels("verified")
+JWT_REJECTED = JWT_VERIFICATIONS.labels("rejected")
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -28,7 +42,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(hours=settings.ACCESS_TOKEN_EXPIRE_HOURS)
     
-    to_encode.update({"exp": expire, "type": "access"})
+    # Fractional iat: compared with logout-everywhere cut-offs to the microsecond
+    to_encode.update({"exp": expire, "iat": to_precise_timestamp(datetime.utcnow()), "jti": uuid.uuid4().hex, "type": "access"})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
@@ -45,7 +60,7 @@ def create_refresh_token(data: dict) -> str:
     """
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire, "type": "refresh"})
+    to_encode.update({"exp": expire, "iat": to_precise_timestamp(datetime.utcnow()), "jti": uuid.uuid4().hex, "type": "refresh"})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
@@ -64,6 +79,25 @@ def verify_token(token: str, credentials_exception: HTTPException) -> TokenData:
     Raises:
         credentials_exception: If token is invalid or expired
     """
+    with JWT_VERIFY_SECONDS.time():
+        try:
+            token_data, result = _verify_token(token, credentials_exception)
+        except HTTPException:
+            JWT_REJECTED.inc()
+            raise
+    result.inc()
+    return token_data
+
+
+def _verify_token(token: str, credentials_exception: HTTPException) -> Tuple[TokenData, Any]:
+    """verify_token without the metrics; also returns the result counter to bump"""
+    token_key = hashlib.sha256(token.encode()).digest()
+    token_data = verified_tokens.get(token_key)
+    if token_data is not MISSING:
+        if revocation_list.is_revoked(token_data.user_id, token_data.jti, token_data.issued_at):
+            raise credentials_exception
+        return token_data, JWT_CACHED
+    
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         user_id: int = payload.get("user_id")
@@ -72,8 +106,22 @@ def verify_token(token: str, credentials_exception: HTTPException) -> TokenData:
         if user_id is None or username is None:
             raise credentials_exception
             
-        token_data = TokenData(user_id=user_id, username=username)
-        return token_data
+        token_data = TokenData(
+            user_id=user_id,
+            username=username,
+            jti=payload.get("jti"),
+            issued_at=payload.get("iat"),
+            expires_at=payload.get("exp")
+        )
         
     except JWTError:
         raise credentials_exception
+    
+    if revocation_list.is_revoked(token_data.user_id, token_data.jti, token_data.issued_at):
+        raise credentials_exception
+    
+    # jwt.decode has already rejected tokens without a valid future exp
+    if payload.get("exp") is not None:
+        verified_tokens.set(token_key, token_data, expires_at=payload["exp"])
+    
+    return token_data, JWT_VERIFIED
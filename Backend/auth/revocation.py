@@ -0,0 +1,249 @@
+"""
+Token revocation
+
+Revocations are stored in the revoked_tokens table and mirrored in memory,
+so the check inside verify_token never touches the database:
+
+- A Bloom filter over revoked jti values answers "definitely not revoked"
+  for almost every token without consulting the exact set
+- An exact set confirms Bloom hits, so false positives never log anyone out
+- A per-user cut-off timestamp handles "log out everywhere"; it and the
+  iat claim have microsecond precision, so a token issued in the same
+  second after the cut-off stays valid
+
+Revocations made by this worker apply immediately. Other workers pick them
+up on the next periodic sync, which also prunes expired entries.
+"""
+import asyncio
+import calendar
+import hashlib
+import logging
+import math
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import select, delete
+
+from config import settings
+from models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+
+def to_timestamp(value: datetime) -> int:
+    """Naive UTC datetime -> Unix timestamp"""
+    return calendar.timegm(value.utctimetuple())
+
+
+def to_precise_timestamp(value: datetime) -> float:
+    """Naive UTC datetime -> Unix timestamp keeping the microseconds"""
+    return calendar.timegm(value.utctimetuple()) + value.microsecond / 1_000_000
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter for jti strings
+
+    jti values are random UUID4 hex strings, so their bits are already
+    uniformly distributed and double hashing can use them directly instead
+    of running a hash function on every lookup.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(error_rate) / (math.log(2) ** 2)), 64)
+        self.hash_count = max(int(round(self.size / capacity * math.log(2))), 1)
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        try:
+            value = int(item, 16)
+        except ValueError:
+            value = int.from_bytes(hashlib.blake2b(item.encode(), digest_size=16).digest(), "big")
+        h1 = value & 0xFFFFFFFFFFFFFFFF
+        h2 = (value >> 64) | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        for position in self._positions(item):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+class RevocationList:
+    """
+    In-memory view of revoked_tokens
+
+    Lookups read whole objects that are swapped in atomically by sync(), so
+    no lock is needed on the hot path.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._jtis: Dict[str, int] = {}                  # jti -> expiry timestamp
+        self._user_cutoffs: Dict[int, Tuple[float, int]] = {}  # user_id -> (cut-off, expiry)
+        self._bloom = BloomFilter(capacity)
+        self._sync_task: Optional[asyncio.Task] = None
+
+    def is_revoked(self, user_id: int, jti: Optional[str], issued_at: Optional[float]) -> bool:
+        """
+        O(1) revocation check for a verified token
+
+        Args:
+            user_id: Token subject
+            jti: Token ID (None for tokens issued before jti existed)
+            issued_at: Token iat claim (fractional; whole seconds in older tokens)
+        """
+        if jti is not None and jti in self._bloom and jti in self._jtis:
+            return True
+
+        cutoff = self._user_cutoffs.get(user_id)
+        if cutoff is not None:
+            # Tokens without iat predate revocation support, so they are older than any cut-off.
+            # A whole-second iat is rounded down, so an older token is still below the cut-off.
+            return issued_at is None or issued_at < cutoff[0]
+
+        return False
+
+    def add_jti(self, jti: str, expires_at: int) -> None:
+        """Revoke one token locally (the caller persists it)"""
+        self._jtis[jti] = expires_at
+        self._bloom.add(jti)
+
+    def add_user_cutoff(self, user_id: int, cutoff: float, expires_at: int) -> None:
+        """Revoke all of a user's tokens issued before cutoff"""
+        current = self._user_cutoffs.get(user_id)
+        if current is None or current[0] < cutoff:
+            self._user_cutoffs[user_id] = (cutoff, expires_at)
+
+    def replace(self, jtis: Dict[str, int], user_cutoffs: Dict[int, Tuple[float, int]]) -> None:
+        """Swap in a freshly loaded revocation set"""
+        bloom = BloomFilter(max(self.capacity, len(jtis) * 2))
+        for jti in jtis:
+            bloom.add(jti)
+        # Publish the filter before the set it guards, so a reader never misses a revocation
+        self._bloom = bloom
+        self._jtis = jtis
+        self._user_cutoffs = user_cutoffs
+
+    def _merge_local(self, rows: Iterable[RevokedToken], now: int):
+        jtis: Dict[str, int] = {}
+        user_cutoffs: Dict[int, Tuple[float, int]] = {}
+
+        for row in rows:
+            expires_at = to_timestamp(row.expires_at)
+            if row.jti is not None:
+                jtis[row.jti] = expires_at
+            else:
+                cutoff = to_precise_timestamp(row.revoked_at)
+                current = user_cutoffs.get(row.user_id)
+                if current is None or current[0] < cutoff:
+                    user_cutoffs[row.user_id] = (cutoff, expires_at)
+
+        # Keep local revocations whose rows may have been committed after the query ran
+        for jti, expires_at in self._jtis.items():
+            if expires_at > now:
+                jtis.setdefault(jti, expires_at)
+        for user_id, (cutoff, expires_at) in self._user_cutoffs.items():
+            if expires_at > now and (user_id not in user_cutoffs or user_cutoffs[user_id][0] < cutoff):
+                user_cutoffs[user_id] = (cutoff, expires_at)
+
+        return jtis, user_cutoffs
+
+    async def sync(self, session_factory) -> None:
+        """
+        Reload revocations from the database and prune expired rows
+
+        Args:
+            session_factory: Async session factory (database.AsyncSessionLocal)
+        """
+        now = datetime.utcnow()
+        async with session_factory() as db:
+            await db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= now))
+            await db.commit()
+            result = await db.execute(select(RevokedToken).where(RevokedToken.expires_at > now))
+            rows = result.scalars().all()
+
+        self.replace(*self._merge_local(rows, to_timestamp(now)))
+
+    async def _sync_forever(self, session_factory, interval: float) -> None:
+        while True:
+            try:
+                await self.sync(session_factory)
+            except Exception as e:
+                logger.warning("Token revocation sync failed: %s", e)
+            await asyncio.sleep(interval)
+
+    def start_sync(self, session_factory, interval: float) -> None:
+        """Start the periodic sync task on the running event loop"""
+        if self._sync_task is None:
+            self._sync_task = asyncio.create_task(self._sync_forever(session_factory, interval))
+
+    async def stop_sync(self) -> None:
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            try:
+                await self._sync_task
+            except asyncio.CancelledError:
+                pass
+            self._sync_task = None
+
+
+revocation_list = RevocationList(capacity=settings.REVOCATION_BLOOM_CAPACITY)
+
+
+async def revoke_token(db, user_id: int, jti: Optional[str], expires_at: Optional[int]) -> None:
+    """
+    Revoke a single token
+
+    Args:
+        db: Async database session (committed by this function)
+        user_id: Token subject
+        jti: Token ID; tokens without one cannot be revoked individually
+        expires_at: Token exp claim
+    """
+    if jti is None:
+        return
+
+    if expires_at is None:
+        expires_at = to_timestamp(datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS))
+
+    existing = await db.scalar(select(RevokedToken.id).where(RevokedToken.jti == jti))
+    if existing is None:
+        db.add(RevokedToken(
+            user_id=user_id,
+            jti=jti,
+            revoked_at=datetime.utcnow(),
+            expires_at=datetime.utcfromtimestamp(expires_at)
+        ))
+        await db.commit()
+
+    revocation_list.add_jti(jti, expires_at)
+
+
+async def revoke_all_user_tokens(db, user_id: int) -> None:
+    """
+    Revoke every token issued to a user so far
+
+    Args:
+        db: Async database session (committed by this function)
+        user_id: User whose tokens are revoked
+    """
+    now = datetime.utcnow()
+    # No token issued now can outlive the longest token lifetime
+    expires_at = now + max(
+        timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+        timedelta(hours=settings.ACCESS_TOKEN_EXPIRE_HOURS)
+    )
+
+    db.add(RevokedToken(user_id=user_id, jti=None, revoked_at=now, expires_at=expires_at))
+    await db.commit()
+
+    revocation_list.add_user_cutoff(user_id, to_precise_timestamp(now), to_timestamp(expires_at))
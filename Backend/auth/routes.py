@@ -2,22 +2,38 @@
 Authentication routes for user registration, login, and dashboard
 """
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
+from typing import Optional
 
 from database import get_db
-from models import User
-from schemas import UserSignup, UserLogin, UserResponse, TokenResponse, DashboardResponse
-from auth.hashing import hash_password, verify_password
-from auth.jwt_handler import create_access_token, create_refresh_token
-from utils.dependencies import get_current_user
+from models import User, UserStats
+from schemas import (
+    UserSignup, UserLogin, UserResponse, TokenResponse, DashboardResponse, TokenData, LogoutRequest,
+    APIResponse, GenericResponse
+)
+from auth.hashing import hash_password_async, verify_password_async, needs_rehash, HashingQueueFull
+from auth.jwt_handler import create_access_token, create_refresh_token, verify_token
+from auth.revocation import revoke_token, revoke_all_user_tokens
+from utils.dependencies import get_current_user, get_current_token
 from utils.responses import success_response, error_response
+from utils.user_stats import get_dashboard_stats
 
 router = APIRouter()
 
 
-@router.post("/signup", response_model=dict, status_code=status.HTTP_201_CREATED)
-async def signup(user_data: UserSignup, db: Session = Depends(get_db)):
+def hashing_busy_exception() -> HTTPException:
+    """Fast rejection when the password hashing queue is full"""
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Server is busy, please try again shortly",
+        headers={"Retry-After": "1"}
+    )
+
+
+@router.post("/signup", response_model=GenericResponse, status_code=status.HTTP_201_CREATED)
+async def signup(user_data: UserSignup, db: AsyncSession = Depends(get_db)):
     """
     Register a new user
     
@@ -26,7 +42,7 @@ async def signup(user_data: UserSignup, db: Session = Depends(get_db)):
     - **password**: Strong password (min 8 chars, uppercase, lowercase, digit)
     """
     # Check if username already exists
-    existing_user = db.query(User).filter(User.username == user_data.username).first()
+    existing_user = await db.scalar(select(User).where(User.username == user_data.username))
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -34,7 +50,7 @@ async def signup(user_data: UserSignup, db: Session = Depends(get_db)):
         )
     
     # Check if email already exists
-    existing_email = db.query(User).filter(User.email == user_data.email).first()
+    existing_email = await db.scalar(select(User).where(User.email == user_data.email))
     if existing_email:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -42,7 +58,11 @@ async def signup(user_data: UserSignup, db: Session = Depends(get_db)):
         )
     
     # Create new user with hashed password
-    hashed_pwd = hash_password(user_data.password)
+    try:
+        hashed_pwd = await hash_password_async(user_data.password)
+    except HashingQueueFull:
+        raise hashing_busy_exception()
+    
     new_user = User(
         username=user_data.username,
         email=user_data.email,
@@ -50,8 +70,10 @@ async def signup(user_data: UserSignup, db: Session = Depends(get_db)):
     )
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.flush()
+    db.add(UserStats(user_id=new_user.id))
+    await db.commit()
+    await db.refresh(new_user)
     
     return success_response(
         message="User registered successfully",
@@ -59,12 +81,13 @@ async def signup(user_data: UserSignup, db: Session = Depends(get_db)):
             "id": new_user.id,
             "username": new_user.username,
             "email": new_user.email
-        }
+        },
+        status_code=status.HTTP_201_CREATED
     )
 
 
-@router.post("/login", response_model=dict)
-async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
+@router.post("/login", response_model=GenericResponse)
+async def login(user_credentials: UserLogin, db: AsyncSession = Depends(get_db)):
     """
     Authenticate user and return JWT tokens
     
@@ -74,10 +97,12 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     Returns access_token and refresh_token
     """
     # Find user by username or email
-    user = db.query(User).filter(
-        (User.username == user_credentials.username) | 
-        (User.email == user_credentials.username)
-    ).first()
+    user = await db.scalar(
+        select(User).where(
+            (User.username == user_credentials.username) | 
+            (User.email == user_credentials.username)
+        ).limit(1)
+    )
     
     if not user:
         raise HTTPException(
@@ -86,7 +111,12 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
         )
     
     # Verify password
-    if not verify_password(user_credentials.password, user.hashed_password):
+    try:
+        password_valid = await verify_password_async(user_credentials.password, user.hashed_password)
+    except HashingQueueFull:
+        raise hashing_busy_exception()
+    
+    if not password_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
@@ -99,6 +129,14 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
             detail="Account is deactivated"
         )
     
+    # Upgrade hashes made with a different bcrypt cost while we have the password
+    if needs_rehash(user.hashed_password):
+        try:
+            user.hashed_password = await hash_password_async(user_credentials.password)
+            await db.commit()
+        except HashingQueueFull:
+            pass  # Keep the old hash; it is upgraded on a later login
+    
     # Create access and refresh tokens
     token_data = {"user_id": user.id, "username": user.username}
     access_token = create_access_token(data=token_data)
@@ -120,7 +158,7 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     )
 
 
-@router.get("/me", response_model=dict)
+@router.get("/me", response_model=APIResponse[UserResponse])
 async def get_current_user_info(current_user: User = Depends(get_current_user)):
     """
     Get current authenticated user information
@@ -139,13 +177,19 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
     )
 
 
-@router.get("/dashboard", response_model=dict)
-async def dashboard(current_user: User = Depends(get_current_user)):
+@router.get("/dashboard", response_model=GenericResponse)
+async def dashboard(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
     """
     Protected dashboard endpoint
     
     Returns personalized dashboard data for authenticated user
     Requires valid JWT token in Authorization header
+    
+    Counts and last-activity times come from the user's stats row (one
+    primary-key read), cached per worker for DASHBOARD_CACHE_TTL_SECONDS.
     """
     return success_response(
         message=f"Welcome to your dashboard, {current_user.username}!",
@@ -158,17 +202,13 @@ async def dashboard(current_user: User = Depends(get_current_user)):
                 "created_at": current_user.created_at.isoformat() if current_user.created_at else None
             },
             "timestamp": datetime.utcnow().isoformat(),
-            "dashboard_stats": {
-                "total_consultations": 0,
-                "pending_appointments": 0,
-                "health_records": 0
-            }
+            "dashboard_stats": await get_dashboard_stats(db, current_user.id)
         }
     )
 
 
-@router.post("/refresh", response_model=dict)
-async def refresh_access_token(refresh_token: str, db: Session = Depends(get_db)):
+@router.post("/refresh", response_model=GenericResponse)
+async def refresh_access_token(refresh_token: str, db: AsyncSession = Depends(get_db)):
     """
     Refresh access token using refresh token
     
@@ -176,8 +216,6 @@ async def refresh_access_token(refresh_token: str, db: Session = Depends(get_db)
     
     Returns new access_token
     """
-    from auth.jwt_handler import verify_token
-    
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Invalid or expired refresh token",
@@ -188,7 +226,7 @@ async def refresh_access_token(refresh_token: str, db: Session = Depends(get_db)
     token_data = verify_token(refresh_token, credentials_exception)
     
     # Get user from database
-    user = db.query(User).filter(User.id == token_data.user_id).first()
+    user = await db.get(User, token_data.user_id)
     
     if not user or not user.is_active:
         raise credentials_exception
@@ -205,3 +243,48 @@ async def refresh_access_token(refresh_token: str, db: Session = Depends(get_db)
             "expires_in": 18000  # 5 hours in seconds
         }
     )
+
+
+@router.post("/logout", response_model=GenericResponse)
+async def logout(
+    body: Optional[LogoutRequest] = None,
+    token_data: TokenData = Depends(get_current_token),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Log out the current session
+    
+    Revokes the access token used for this request and, if supplied, the
+    matching refresh token.
+    
+    - **refresh_token**: Optional refresh token to revoke as well
+    """
+    await revoke_token(db, token_data.user_id, token_data.jti, token_data.expires_at)
+    
+    if body and body.refresh_token:
+        refresh_exception = HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid refresh token"
+        )
+        refresh_data = verify_token(body.refresh_token, refresh_exception)
+        if refresh_data.user_id != token_data.user_id:
+            raise refresh_exception
+        await revoke_token(db, refresh_data.user_id, refresh_data.jti, refresh_data.expires_at)
+    
+    return success_response(message="Logged out successfully")
+
+
+@router.post("/logout-all", response_model=GenericResponse)
+async def logout_all(
+    token_data: TokenData = Depends(get_current_token),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Log out from every device
+    
+    Revokes all access and refresh tokens issued to the user so far,
+    including the one used for this request.
+    """
+    await revoke_all_user_tokens(db, token_data.user_id)
+    
+    return success_response(message="Logged out from all devices")
@@ -0,0 +1,82 @@
+"""
+Shared pytest fixtures
+
+The tests run against a throwaway SQLite database with foreign keys
+enforced (as MySQL does), so ON DELETE CASCADE behaves like production.
+Background jobs are disabled; tests call them directly.
+"""
+
+import os
+import sys
+import tempfile
+import uuid
+
+_TEST_DIR = tempfile.mkdtemp(prefix="cura_test_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TEST_DIR, 'cura.db')}"
+os.environ["BLOB_STORE_ROOT"] = os.path.join(_TEST_DIR, "blobs")
+os.environ["MAINTENANCE_INTERVAL_SECONDS"] = "0"
+os.environ["REMINDER_INTERVAL_SECONDS"] = "0"
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["LOG_LEVEL"] = "WARNING"
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from sqlalchemy import event
+
+from database import engine, async_engine
+
+
+@event.listens_for(engine, "connect")
+@event.listens_for(async_engine.sync_engine, "connect")
+def _enforce_foreign_keys(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def make_pdf(lines) -> bytes:
+    """A one-page PDF with each line as text (read by PyPDF2 like an upload)"""
+    content = "BT /F1 12 Tf 50 750 Td 14 TL " + " ".join(f"({line}) Tj T*" for line in lines) + " ET"
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        "/Resources << /Font << /F1 5 0 R >> >> >>",
+        f"<< /Length {len(content)} >>\nstream\n{content}\nendstream",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode()
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return out
+
+
+@pytest.fixture(scope="session")
+def client():
+    """Test client for the app (lifespan runs once for the session)"""
+    from fastapi.testclient import TestClient
+    from main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def auth_headers(client):
+    """Authorization header of a newly registered user"""
+    username = f"user_{uuid.uuid4().hex[:12]}"
+    password = "Passw0rd!"
+    response = client.post("/api/auth/signup", json={
+        "username": username, "email": f"{username}@example.com",
+        "password": password, "full_name": "Test User"
+    })
+    assert response.status_code == 201, response.text
+    token = client.post("/api/auth/login", json={"username": username, "password": password}).json()["data"]["access_token"]
+    return {"Authorization": f"Bearer {token}"}
@@ -1,39 +1,127 @@
 """
 Database configuration and session management
+
+Request handlers use the async engine (aiomysql for MySQL, aiosqlite for
+local SQLite runs) so a query never blocks the event loop. The synchronous
+engine is kept for command-line scripts and diagnostics.
 """
+import logging
+import time
+
+import orjson
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from config import settings
+from utils.db_telemetry import pool_telemetry
+
+logger = logging.getLogger(__name__)
+
+# Sync driver -> async driver for the same database
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "mysql+mysqldb": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+
+def get_async_database_url(database_url: str) -> str:
+    """
+    Derive the async driver URL from a sync DATABASE_URL
+
+    Args:
+        database_url: SQLAlchemy URL using a sync driver (e.g. mysql+pymysql)
+
+    Returns:
+        Same URL with the matching async driver (e.g. mysql+aiomysql)
+    """
+    url = make_url(database_url)
+    async_driver = ASYNC_DRIVERS.get(url.drivername, url.drivername)
+    return url.set(drivername=async_driver).render_as_string(hide_password=False)
+
+
+def json_serializer(value) -> str:
+    """Compact JSON for JSON columns (no indentation or spaces after separators)"""
+    return orjson.dumps(value).decode("utf-8")
 
-# Create database engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=3600,
-    echo=settings.DEBUG
-)
 
-# Create session factory
+def get_engine_options(database_url: str) -> dict:
+    """
+    Engine keyword arguments from settings
+
+    SQLite engines use NullPool/SingletonThreadPool, which reject the
+    queue sizing arguments, so those are only passed to server databases.
+    """
+    options = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "echo": settings.DEBUG,
+        "json_serializer": json_serializer,
+        "json_deserializer": orjson.loads,
+    }
+    if make_url(database_url).get_backend_name() != "sqlite":
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+    return options
+
+
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or get_async_database_url(settings.DATABASE_URL)
+
+# Create database engine (scripts and diagnostics)
+engine = create_engine(settings.DATABASE_URL, **get_engine_options(settings.DATABASE_URL))
+
+# Create async database engine (request handlers)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **get_engine_options(ASYNC_DATABASE_URL))
+pool_telemetry.attach(async_engine.sync_engine)
+
+# Create session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# expire_on_commit=False: attributes stay loaded after commit, so handlers never
+# trigger an implicit (and, under asyncio, illegal) lazy load
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Create base class for models
 Base = declarative_base()
 
 
-def get_db():
+async def get_db():
     """
     Dependency function to get database session
-    Yields database session and ensures it's closed after use
+    Yields async database session and ensures it's closed after use
+    
+    The connection is checked out up front so the time spent waiting on the
+    pool is measured separately from query time.
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
+        started = time.perf_counter()
+        await db.connection()
+        pool_telemetry.record_checkout_wait(time.perf_counter() - started)
         yield db
-    finally:
-        db.close()
 
 
-def create_tables():
+async def create_tables():
     """Create all tables in the database"""
-    Base.metadata.create_all(bind=engine)
-    print("✓ Database tables created successfully")
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    logger.info("Database tables created")
+
+
+async def dispose_engines():
+    """Close all pooled connections on shutdown"""
+    await async_engine.dispose()
+    engine.dispose()
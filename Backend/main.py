@@ -2,28 +2,91 @@
 Main FastAPI application for Cura AI
 Your Personal Healthcare Interpreter and Guide
 """
-from fastapi import FastAPI
+import logging
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response
 from contextlib import asynccontextmanager
 
 from config import settings
-from database import create_tables
+from utils.logging_setup import configure_logging, start_request, dropped_records
+from database import create_tables, dispose_engines, AsyncSessionLocal
+from utils.db_telemetry import pool_telemetry, start_request_trace
+from auth.hashing import password_hasher
+from auth.revocation import revocation_list
+from utils.maintenance import maintenance
 from auth.routes import router as auth_router
 from prescription.routes import router as prescription_router
 from symptoms.routes import router as symptoms_router
+from reports.routes import router as reports_router
+from search.routes import router as search_router
+from search.indexer import search_indexer
+from prescription.reminders import reminder_engine
+from utils.metrics import callback_gauge, callback_counter, render_metrics, CONTENT_TYPE
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+
+# Gauges read from their source on each scrape, so nothing is recorded on the hot path
+callback_gauge(
+    "cura_db_pool_connections", "Database connections checked out (in_use) and idle in the pool",
+    lambda: {(state,): pool_telemetry.snapshot()[state] for state in ("in_use", "idle")}, ["state"]
+)
+callback_gauge("cura_db_pool_size", "Configured pool size", lambda: pool_telemetry.snapshot()["size"])
+callback_gauge("cura_db_pool_overflow", "Connections open beyond the pool size",
+               lambda: pool_telemetry.snapshot()["overflow"])
+callback_counter(
+    "cura_db_pool_events_total", "Pool checkouts, new connections and invalidations",
+    lambda: {(name,): pool_telemetry.snapshot()[name] for name in ("checkouts", "connects", "invalidations")},
+    ["event"]
+)
+callback_gauge(
+    "cura_queue_depth", "Work waiting in background queues",
+    lambda: {
+        ("password_hashing",): password_hasher.stats()["queued"],
+        ("search_index",): search_indexer.stats()["queued"],
+    },
+    ["queue"]
+)
+callback_gauge("cura_password_hashing_in_flight", "Password hashes being computed",
+               lambda: password_hasher.stats()["in_flight"])
+callback_counter("cura_search_indexed_total", "Records written to the search index",
+                 lambda: search_indexer.indexed)
+callback_counter("cura_reminders_fired_total", "Dose reminders delivered",
+                 lambda: reminder_engine.fired)
+callback_counter("cura_reminders_skipped_late_total", "Dose reminders skipped as too late",
+                 lambda: reminder_engine.skipped_late)
+callback_gauge("cura_reminder_last_tick_seconds", "Duration of the last reminder tick",
+               lambda: reminder_engine.last_tick_seconds)
+callback_counter("cura_log_records_dropped_total", "Log records dropped because the log queue was full",
+                 dropped_records)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Lifecycle manager for FastAPI application
-    Creates database tables on startup
+    Creates database tables and starts the token revocation sync, the
+    maintenance scheduler, the search indexer and the dose reminder engine
+    (once a delivery handler is registered) on startup
     """
-    print(f"🚀 Starting {settings.APP_NAME} v{settings.APP_VERSION}")
-    create_tables()
-    print("✓ Application started successfully")
+    logger.info("Starting %s v%s", settings.APP_NAME, settings.APP_VERSION)
+    await create_tables()
+    revocation_list.start_sync(AsyncSessionLocal, settings.REVOCATION_SYNC_SECONDS)
+    maintenance.start(AsyncSessionLocal, settings.MAINTENANCE_INTERVAL_SECONDS)
+    search_indexer.start(AsyncSessionLocal)
+    reminder_engine.start(AsyncSessionLocal, settings.REMINDER_INTERVAL_SECONDS)
+    logger.info("Application started")
     yield
-    print("⏹ Shutting down application")
+    logger.info("Shutting down application")
+    await revocation_list.stop_sync()
+    await maintenance.stop()
+    await search_indexer.stop()
+    await reminder_engine.stop()
+    await dispose_engines()
+    password_hasher.shutdown()
 
 
 # Create FastAPI application
@@ -31,7 +94,9 @@ app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
     description="Backend API for Cura AI - Your Personal Healthcare Interpreter and Guide",
-    lifespan=lifespan
+    lifespan=lifespan,
+    # orjson for every route that returns plain data (routers return finished responses)
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
@@ -43,10 +108,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    """
+    Tag the request's log records with a request ID (returned as X-Request-ID)
+    and report its connection wait and query time as a Server-Timing header
+    """
+    request_id = start_request(request.headers.get("X-Request-ID"))
+    trace = start_request_trace()
+    response = await call_next(request)
+    response.headers["X-Request-ID"] = request_id
+    if trace.query_count:
+        response.headers["Server-Timing"] = trace.server_timing()
+    return response
+
+
 # Include routers
 app.include_router(auth_router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(prescription_router, prefix="/api/prescription", tags=["Prescriptions"])
 app.include_router(symptoms_router, prefix="/api/symptoms", tags=["Symptom Checker"])
+app.include_router(reports_router, prefix="/api/reports", tags=["Medical Reports"])
+app.include_router(search_router, prefix="/api/search", tags=["Search"])
 
 
 @app.get("/", tags=["Root"])
@@ -70,6 +153,45 @@ async def health_check():
     }
 
 
+
+@app.get("/health/db", tags=["Health"])
+async def database_health():
+    """Connection pool usage and counters"""
+    return {
+        "status": "healthy",
+        "pool": pool_telemetry.snapshot()
+    }
+
+
+
+@app.get("/health/auth", tags=["Health"])
+async def auth_health():
+    """Password hashing queue depth and rejections"""
+    return {
+        "status": "healthy",
+        "password_hashing": password_hasher.stats()
+    }
+
+
+
+@app.get("/health/maintenance", tags=["Health"])
+async def maintenance_health():
+    """Result of the last maintenance pass (purge, orphan sweep, retention)"""
+    report = maintenance.last_report
+    return {
+        "status": "healthy" if report is None or not report.errors else "degraded",
+        "last_run": report.to_dict() if report else None
+    }
+
+
+@app.get("/metrics", tags=["Health"], include_in_schema=settings.METRICS_ENABLED)
+async def metrics():
+    """Stage timings, OCR outcomes, queue depths and pool usage in the Prometheus text format"""
+    if not settings.METRICS_ENABLED:
+        return Response(status_code=404)
+    return Response(render_metrics(), headers={"Content-Type": CONTENT_TYPE})
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -0,0 +1,37 @@
+-- ============================================
+-- Cura AI - Migration 001
+-- Keyset pagination indexes and per-user counters
+-- ============================================
+-- New installs get all of this from create_tables() at startup.
+-- Existing databases: run once, e.g. mysql -u root -p < migrations/001_keyset_pagination.sql
+
+USE cura_ai;
+
+-- Composite indexes backing ORDER BY created_at DESC, id DESC per user
+CREATE INDEX ix_prescriptions_user_created_id
+    ON prescriptions (user_id, created_at, id);
+
+CREATE INDEX ix_symptom_interactions_user_created_id
+    ON symptom_interactions (user_id, created_at, id);
+
+-- Per-user counters (kept up to date by the API in the same transaction as each insert/delete)
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id INT PRIMARY KEY,
+    prescription_count INT NOT NULL DEFAULT 0,
+    symptom_check_count INT NOT NULL DEFAULT 0,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT fk_user_stats_user FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Backfill counters for existing users (rows missing here are also seeded lazily by the API)
+INSERT INTO user_stats (user_id, prescription_count, symptom_check_count)
+SELECT
+    u.id,
+    (SELECT COUNT(*) FROM prescriptions p WHERE p.user_id = u.id),
+    (SELECT COUNT(*) FROM symptom_interactions s WHERE s.user_id = u.id)
+FROM users u
+ON DUPLICATE KEY UPDATE
+    prescription_count = VALUES(prescription_count),
+    symptom_check_count = VALUES(symptom_check_count);
+
+SELECT '✓ Migration 001 applied' AS Status;
@@ -0,0 +1,24 @@
+-- ============================================
+-- Cura AI - Migration 002
+-- Compressed storage for large text columns
+-- ============================================
+-- New installs get these column types from create_tables() at startup.
+-- Existing databases:
+--   1. mysql -u root -p < migrations/002_compressed_text.sql
+--   2. python -m utils.compress_text_columns migrate
+--   3. python -m utils.compress_text_columns report
+--
+-- TEXT -> MEDIUMBLOB keeps the stored UTF-8 bytes as they are. The API reads
+-- those legacy rows as plain text until step 2 compresses them.
+
+USE cura_ai;
+
+ALTER TABLE prescriptions
+    MODIFY extracted_text MEDIUMBLOB NULL,
+    MODIFY simplified_explanation MEDIUMBLOB NULL;
+
+ALTER TABLE medical_reports
+    MODIFY extracted_text MEDIUMBLOB NULL,
+    MODIFY ai_summary MEDIUMBLOB NULL;
+
+SELECT '✓ Migration 002 applied - now run: python -m utils.compress_text_columns migrate' AS Status;
@@ -0,0 +1,16 @@
+-- ============================================
+-- Cura AI - Migration 003
+-- Prescription explanations are rendered on read
+-- ============================================
+-- The API now builds the explanation from prescriptions.medicines each time a
+-- prescription is read (prescription/explanation.py, versioned by
+-- EXPLANATION_VERSION). The stored copies are no longer read or written and
+-- can be dropped - every one of them can be regenerated from medicines.
+--
+-- Run after migration 002: mysql -u root -p < migrations/003_drop_stored_explanations.sql
+
+USE cura_ai;
+
+ALTER TABLE prescriptions DROP COLUMN simplified_explanation;
+
+SELECT '✓ Migration 003 applied' AS Status;
@@ -0,0 +1,50 @@
+-- ============================================
+-- Cura AI - Migration 004
+-- Interned advice texts for symptom interactions
+-- ============================================
+-- New installs get the table and columns from create_tables() at startup.
+-- Existing databases: mysql -u root -p < migrations/004_advice_templates.sql
+--
+-- Moves every distinct advice text into advice_templates (addressed by its
+-- SHA-256, as computed by utils/advice_templates.py) and replaces the
+-- per-row copies with template IDs.
+
+USE cura_ai;
+
+CREATE TABLE IF NOT EXISTS advice_templates (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    content_hash VARCHAR(64) NOT NULL,
+    body TEXT NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_advice_templates_content_hash (content_hash)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+ALTER TABLE symptom_interactions
+    ADD COLUMN home_care_advice_id INT NULL,
+    ADD COLUMN when_to_see_doctor_id INT NULL,
+    ADD CONSTRAINT fk_symptom_interactions_home_care_advice
+        FOREIGN KEY (home_care_advice_id) REFERENCES advice_templates (id),
+    ADD CONSTRAINT fk_symptom_interactions_when_to_see_doctor
+        FOREIGN KEY (when_to_see_doctor_id) REFERENCES advice_templates (id);
+
+-- Intern the existing texts
+INSERT IGNORE INTO advice_templates (content_hash, body)
+SELECT DISTINCT SHA2(home_care_advice, 256), home_care_advice
+FROM symptom_interactions WHERE home_care_advice IS NOT NULL;
+
+INSERT IGNORE INTO advice_templates (content_hash, body)
+SELECT DISTINCT SHA2(when_to_see_doctor, 256), when_to_see_doctor
+FROM symptom_interactions WHERE when_to_see_doctor IS NOT NULL;
+
+-- Point rows at their templates and drop the per-row copies
+UPDATE symptom_interactions s
+JOIN advice_templates t ON t.content_hash = SHA2(s.home_care_advice, 256)
+SET s.home_care_advice_id = t.id, s.home_care_advice = NULL
+WHERE s.home_care_advice IS NOT NULL;
+
+UPDATE symptom_interactions s
+JOIN advice_templates t ON t.content_hash = SHA2(s.when_to_see_doctor, 256)
+SET s.when_to_see_doctor_id = t.id, s.when_to_see_doctor = NULL
+WHERE s.when_to_see_doctor IS NOT NULL;
+
+SELECT '✓ Migration 004 applied' AS Status;
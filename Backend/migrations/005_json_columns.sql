@@ -0,0 +1,33 @@
+-- ============================================
+-- Cura AI - Migration 005
+-- Native JSON columns
+-- ============================================
+-- New installs get JSON columns from create_tables() at startup.
+-- Existing databases (MySQL 8.0.17+): mysql -u root -p < migrations/005_json_columns.sql
+--
+-- MySQL parses the existing JSON text (indented or not) into its binary JSON
+-- format during the ALTER; a row holding invalid JSON makes the ALTER fail
+-- without changing anything. New values are written compactly by the API.
+
+USE cura_ai;
+
+ALTER TABLE prescriptions
+    MODIFY medicines JSON NULL;
+
+ALTER TABLE symptom_interactions
+    MODIFY detected_symptoms JSON NULL,
+    MODIFY possible_conditions JSON NULL;
+
+ALTER TABLE medical_reports
+    MODIFY detected_values JSON NULL,
+    MODIFY abnormalities_detected JSON NULL;
+
+-- Multi-valued index over medicine names, for queries such as
+--   SELECT id FROM prescriptions
+--   WHERE 'Augmentin' MEMBER OF (medicines->'$[*].medicine_name');
+-- Names are stored at most 255 characters long (MAX_MEDICINE_NAME_LENGTH);
+-- a longer value would make the insert fail.
+CREATE INDEX ix_prescriptions_medicine_names
+    ON prescriptions ((CAST(medicines->'$[*].medicine_name' AS CHAR(255) ARRAY)));
+
+SELECT '✓ Migration 005 applied' AS Status;
@@ -0,0 +1,17 @@
+-- ============================================
+-- Cura AI - Migration 006
+-- Uploaded files live in the content-addressed blob store
+-- ============================================
+-- prescriptions.file_path now holds a blob key ("ab/cd/<sha256>") instead of
+-- a path under uploads/prescriptions. Identical uploads share one blob, so
+-- deleting a prescription first checks whether any other row still uses the
+-- key - this index keeps that check cheap.
+--
+-- Run after migration 005: mysql -u root -p < migrations/006_blob_store.sql
+-- Then move existing files: python -m utils.migrate_uploads
+
+USE cura_ai;
+
+CREATE INDEX ix_prescriptions_file_path ON prescriptions (file_path);
+
+SELECT '✓ Migration 006 applied' AS Status;
@@ -0,0 +1,16 @@
+-- ============================================
+-- Cura AI - Migration 007
+-- Soft-deleted prescriptions, purged in the background
+-- ============================================
+-- Deleting a prescription now only sets deleted_at. The maintenance task
+-- (utils/maintenance.py) removes the row and - once nothing else references
+-- it - the stored file. The index lets it find pending rows without a scan.
+--
+-- Run after migration 006: mysql -u root -p < migrations/007_soft_delete.sql
+
+USE cura_ai;
+
+ALTER TABLE prescriptions ADD COLUMN deleted_at DATETIME NULL;
+CREATE INDEX ix_prescriptions_deleted_at ON prescriptions (deleted_at);
+
+SELECT '✓ Migration 007 applied' AS Status;
@@ -0,0 +1,21 @@
+-- ============================================
+-- Cura AI - Migration 008
+-- Medical report analysis (/api/reports)
+-- ============================================
+-- Reports are listed newest first with keyset pagination, and their total
+-- comes from the per-user counters like prescriptions and symptom checks.
+--
+-- Run after migration 007: mysql -u root -p < migrations/008_medical_reports.sql
+
+USE cura_ai;
+
+CREATE INDEX ix_medical_reports_user_created_id
+    ON medical_reports (user_id, created_at, id);
+
+ALTER TABLE user_stats ADD COLUMN report_count INT NOT NULL DEFAULT 0;
+
+-- Backfill the new counter for existing users
+UPDATE user_stats us
+SET us.report_count = (SELECT COUNT(*) FROM medical_reports r WHERE r.user_id = us.user_id);
+
+SELECT '✓ Migration 008 applied' AS Status;
@@ -0,0 +1,37 @@
+-- ============================================
+-- Cura AI - Migration 009
+-- Dashboard counters in user_stats
+-- ============================================
+-- The dashboard reads urgent/emergency symptom-check counts and last-activity
+-- times from the per-user stats row. The API keeps them current; the
+-- maintenance task recounts them every STATS_RECONCILE_INTERVAL_SECONDS.
+--
+-- Run after migration 008: mysql -u root -p < migrations/009_dashboard_stats.sql
+
+USE cura_ai;
+
+ALTER TABLE user_stats
+    ADD COLUMN urgent_check_count INT NOT NULL DEFAULT 0,
+    ADD COLUMN emergency_check_count INT NOT NULL DEFAULT 0,
+    ADD COLUMN last_prescription_at DATETIME NULL,
+    ADD COLUMN last_report_at DATETIME NULL,
+    ADD COLUMN last_symptom_check_at DATETIME NULL,
+    ADD COLUMN last_activity_at DATETIME NULL;
+
+-- Backfill for existing users
+UPDATE user_stats us
+SET
+    us.urgent_check_count = (SELECT COUNT(*) FROM symptom_interactions s WHERE s.user_id = us.user_id AND s.urgency_level = 'urgent'),
+    us.emergency_check_count = (SELECT COUNT(*) FROM symptom_interactions s WHERE s.user_id = us.user_id AND s.urgency_level = 'emergency'),
+    us.last_prescription_at = (SELECT MAX(p.created_at) FROM prescriptions p WHERE p.user_id = us.user_id),
+    us.last_report_at = (SELECT MAX(r.created_at) FROM medical_reports r WHERE r.user_id = us.user_id),
+    us.last_symptom_check_at = (SELECT MAX(s.created_at) FROM symptom_interactions s WHERE s.user_id = us.user_id);
+
+UPDATE user_stats
+SET last_activity_at = NULLIF(GREATEST(
+    COALESCE(last_prescription_at, '1000-01-01'),
+    COALESCE(last_report_at, '1000-01-01'),
+    COALESCE(last_symptom_check_at, '1000-01-01')
+), '1000-01-01');
+
+SELECT '✓ Migration 009 applied' AS Status;
@@ -0,0 +1,15 @@
+-- ============================================
+-- Cura AI - Migration 010
+-- Index the blob key of medical reports
+-- ============================================
+-- The maintenance purge and orphan sweep check every batch of blob keys
+-- against prescriptions.file_path and medical_reports.file_path. Without
+-- this index the medical_reports side of that check scans the table.
+--
+-- Run after migration 009: mysql -u root -p < migrations/010_report_file_path_index.sql
+
+USE cura_ai;
+
+CREATE INDEX ix_medical_reports_file_path ON medical_reports (file_path);
+
+SELECT '✓ Migration 010 applied' AS Status;
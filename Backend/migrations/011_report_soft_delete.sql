@@ -0,0 +1,16 @@
+-- ============================================
+-- Cura AI - Migration 011
+-- Soft-deleted medical reports, purged in the background
+-- ============================================
+-- Deleting a report now only sets deleted_at (its lab values leave the
+-- trends at once). The maintenance task removes the row and - once nothing
+-- else references it - the stored file, as it does for prescriptions.
+--
+-- Run after migration 010: mysql -u root -p < migrations/011_report_soft_delete.sql
+
+USE cura_ai;
+
+ALTER TABLE medical_reports ADD COLUMN deleted_at DATETIME NULL;
+CREATE INDEX ix_medical_reports_deleted_at ON medical_reports (deleted_at);
+
+SELECT '✓ Migration 011 applied' AS Status;
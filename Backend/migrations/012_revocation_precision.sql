@@ -0,0 +1,15 @@
+-- ============================================
+-- Cura AI - Migration 012
+-- Microsecond precision for token revocation cut-offs
+-- ============================================
+-- "Log out everywhere" rejects tokens issued before revoked_at. Tokens now
+-- carry a fractional iat; with a whole-second revoked_at a token issued in
+-- the same second right after the cut-off would still be rejected.
+--
+-- Run after migration 011: mysql -u root -p < migrations/012_revocation_precision.sql
+
+USE cura_ai;
+
+ALTER TABLE revoked_tokens MODIFY revoked_at DATETIME(6) NOT NULL;
+
+SELECT '✓ Migration 012 applied' AS Status;
@@ -0,0 +1,19 @@
+-- ============================================
+-- Cura AI - Migration 013
+-- Medicine name index for names up to 255 characters
+-- ============================================
+-- Migration 005 originally indexed medicine names as CHAR(100), so saving a
+-- prescription with a longer parsed name failed on MySQL. Names are stored
+-- up to 255 characters (MAX_MEDICINE_NAME_LENGTH); the index now matches.
+-- Databases that ran the current 005 already have this index and can skip it.
+--
+-- Run after migration 012: mysql -u root -p < migrations/013_medicine_names_index.sql
+
+USE cura_ai;
+
+DROP INDEX ix_prescriptions_medicine_names ON prescriptions;
+
+CREATE INDEX ix_prescriptions_medicine_names
+    ON prescriptions ((CAST(medicines->'$[*].medicine_name' AS CHAR(255) ARRAY)));
+
+SELECT '✓ Migration 013 applied' AS Status;
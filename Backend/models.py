@@ -1,10 +1,28 @@
 """
 Database models for Cura AI
 """
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Float, Double, Index, JSON, DDL, event
+from sqlalchemy.dialects import mysql, sqlite
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from database import Base
+from utils.text_compression import CompressedText
+
+# Deferred group for large TEXT columns. List endpoints never read them; detail
+# views load them with .options(undefer_group(CONTENT_GROUP)). raiseload turns an
+# accidental lazy load (which asyncio cannot do) into a clear error.
+CONTENT_GROUP = "content"
+
+# Timestamp used as a keyset pagination key. SQLite stores datetimes as text and
+# CURRENT_TIMESTAMP has no fractional seconds, so cursor values must be written
+# the same way or string comparison puts equal timestamps out of order.
+PaginatedTimestamp = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(truncate_microseconds=True), "sqlite"
+)
+
+# Timestamp compared with the fractional iat of tokens. MySQL DATETIME drops
+# fractional seconds unless a precision is given.
+PreciseTimestamp = DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql")
 
 
 class User(Base):
@@ -47,34 +65,148 @@ class Prescription(Base):
     
     # File information
     original_filename = Column(String(255), nullable=False)
-    file_path = Column(String(500), nullable=False)  # Where file is stored on server
+    # Blob store key (utils/blob_store.py); identical uploads share a key, and the
+    # index serves the "is this blob still referenced" check on delete
+    file_path = Column(String(500), nullable=False, index=True)
     file_type = Column(String(50), nullable=False)  # jpg, png, pdf
     file_size = Column(Integer, nullable=True)  # Size in bytes
     
     # OCR extracted data
-    extracted_text = Column(Text, nullable=True)  # Raw OCR output
+    extracted_text = deferred(Column(CompressedText(), nullable=True), group=CONTENT_GROUP, raiseload=True)  # Raw OCR output
     
-    # Parsed medicine information (stored as JSON or text)
-    medicines = Column(Text, nullable=True)  # JSON array of medicine objects
+    # Parsed medicine information
+    medicines = deferred(Column(JSON, nullable=True), group=CONTENT_GROUP, raiseload=True)  # Array of medicine objects
     
-    # AI-generated explanation
-    simplified_explanation = Column(Text, nullable=True)  # User-friendly explanation
+    # The user-friendly explanation is rendered from medicines on read
+    # (prescription/explanation.py) and no longer stored
     
     # Processing status
     processing_status = Column(String(50), default="pending")  # pending, processing, completed, failed
     error_message = Column(Text, nullable=True)  # Error if processing failed
     
     # Timestamps
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(PaginatedTimestamp, server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Set by the delete endpoint; the row and its file are purged in the background
+    deleted_at = Column(DateTime, nullable=True, index=True)
     
     # Relationship to User
     user = relationship("User", back_populates="prescriptions")
     
+    __table_args__ = (
+        # Keyset pagination: WHERE user_id = ? AND (created_at, id) < cursor ORDER BY created_at DESC, id DESC
+        Index("ix_prescriptions_user_created_id", "user_id", "created_at", "id"),
+    )
+    
     def __repr__(self):
         return f"<Prescription(id={self.id}, user_id={self.user_id}, status='{self.processing_status}')>"
 
 
+# Multi-valued index over medicine names (MySQL only - a functional index no
+# other dialect supports, so it is created here rather than in __table_args__).
+# Names are stored at most MAX_MEDICINE_NAME_LENGTH (255) characters long.
+event.listen(
+    Prescription.__table__,
+    "after_create",
+    DDL(
+        "CREATE INDEX ix_prescriptions_medicine_names ON prescriptions "
+        "((CAST(medicines->'$[*].medicine_name' AS CHAR(255) ARRAY)))"
+    ).execute_if(dialect="mysql")
+)
+
+
+class PrescribedMedication(Base):
+    """
+    Model for the per-user medication index
+    
+    This table stores:
+    - One row per drug of a prescription, under its normalized drug key
+    - When it was prescribed and until when it counts as active
+    
+    Rows are rewritten whenever Prescription.medicines is written and
+    removed when the prescription is deleted.
+    """
+    
+    __tablename__ = "prescribed_medications"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    prescription_id = Column(Integer, ForeignKey("prescriptions.id", ondelete="CASCADE"), nullable=False, index=True)
+    drug_key = Column(String(64), nullable=False)  # prescription.drug_lexicon key, e.g. "amoxicillin"
+    medicine_name = Column(String(255), nullable=False)  # As parsed, e.g. "Augmentin"
+    prescribed_at = Column(DateTime, nullable=False)  # UTC
+    active_until = Column(DateTime, nullable=False)  # UTC
+    
+    __table_args__ = (
+        # One user's history of one drug
+        Index("ix_prescribed_medications_user_drug_time", "user_id", "drug_key", "prescribed_at"),
+        # One user's active medications
+        Index("ix_prescribed_medications_user_active", "user_id", "active_until"),
+    )
+    
+    def __repr__(self):
+        return f"<PrescribedMedication(user_id={self.user_id}, drug='{self.drug_key}', prescription_id={self.prescription_id})>"
+
+
+class DoseSchedule(Base):
+    """
+    Model for the structured dose schedule of one prescribed medicine
+    
+    This table stores:
+    - Doses per time of day, parsed from e.g. "1-0-1" or "BD"
+    - Whether to take it before or after meals
+    - The course (start and end)
+    
+    Written with Prescription.medicines; a medicine without a frequency has
+    no schedule.
+    """
+    
+    __tablename__ = "dose_schedules"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    prescription_id = Column(Integer, ForeignKey("prescriptions.id", ondelete="CASCADE"), nullable=False, index=True)
+    medicine_name = Column(String(255), nullable=False)
+    morning_dose = Column(Float, default=0, nullable=False)  # Units (tablets, ml...) per dose
+    afternoon_dose = Column(Float, default=0, nullable=False)
+    night_dose = Column(Float, default=0, nullable=False)
+    meal_timing = Column(String(10), nullable=True)  # before, after
+    starts_at = Column(DateTime, nullable=False)  # UTC
+    ends_at = Column(DateTime, nullable=False)  # UTC, exclusive
+    
+    def __repr__(self):
+        return f"<DoseSchedule(id={self.id}, prescription_id={self.prescription_id}, medicine='{self.medicine_name}')>"
+
+
+class DoseReminder(Base):
+    """
+    Model for the next due dose of one schedule slot (the reminder queue)
+    
+    One row per slot of a schedule (morning, afternoon, night). The reminder
+    engine reads rows whose next_due_at has passed in index order and moves
+    them to the following day, or deletes them after the last dose - so the
+    table holds only upcoming doses and a tick reads only the due ones.
+    """
+    
+    __tablename__ = "dose_reminders"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    schedule_id = Column(Integer, ForeignKey("dose_schedules.id", ondelete="CASCADE"), nullable=False, index=True)
+    slot = Column(String(10), nullable=False)  # morning, afternoon, night
+    next_due_at = Column(DateTime, nullable=False)  # UTC
+    
+    __table_args__ = (
+        # Due doses for all users, oldest first
+        Index("ix_dose_reminders_due", "next_due_at", "id"),
+        # One user's upcoming doses
+        Index("ix_dose_reminders_user_due", "user_id", "next_due_at"),
+    )
+    
+    def __repr__(self):
+        return f"<DoseReminder(schedule_id={self.schedule_id}, slot='{self.slot}', next_due_at={self.next_due_at})>"
+
+
 class MedicalReport(Base):
     """
     Model for storing medical report analysis
@@ -97,37 +229,110 @@ class MedicalReport(Base):
     
     # File information
     original_filename = Column(String(255), nullable=False)
-    file_path = Column(String(500), nullable=False)
+    file_path = Column(String(500), nullable=False, index=True)  # Blob key, looked up by the orphan sweep
     file_type = Column(String(50), nullable=False)
     file_size = Column(Integer, nullable=True)
     
     # Extracted data
-    extracted_text = Column(Text, nullable=True)  # Raw OCR text
-    detected_values = Column(Text, nullable=True)  # JSON of key-value pairs (e.g., {"Hemoglobin": "13.5"})
+    extracted_text = deferred(Column(CompressedText(), nullable=True), group=CONTENT_GROUP, raiseload=True)  # Raw OCR text
+    detected_values = deferred(Column(JSON, nullable=True), group=CONTENT_GROUP, raiseload=True)  # Key-value pairs (e.g., {"Hemoglobin": "13.5"})
     
     # Analysis results
-    abnormalities_detected = Column(Text, nullable=True)  # JSON array of abnormal values
+    abnormalities_detected = deferred(Column(JSON, nullable=True), group=CONTENT_GROUP, raiseload=True)  # Array of abnormal values
     risk_level = Column(String(50), nullable=True)  # low, medium, high
     
     # AI Summary
-    ai_summary = Column(Text, nullable=True)  # Simplified explanation
-    recommendations = Column(Text, nullable=True)  # Health advice
+    ai_summary = deferred(Column(CompressedText(), nullable=True), group=CONTENT_GROUP, raiseload=True)  # Simplified explanation
+    recommendations = deferred(Column(Text, nullable=True), group=CONTENT_GROUP, raiseload=True)  # Health advice
     
     # Processing status
     processing_status = Column(String(50), default="pending")
     error_message = Column(Text, nullable=True)
     
     # Timestamps
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(PaginatedTimestamp, server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Set by the delete endpoint; the row and its file are purged in the background
+    deleted_at = Column(DateTime, nullable=True, index=True)
     
     # Relationship to User
     user = relationship("User", back_populates="medical_reports")
     
+    __table_args__ = (
+        # Keyset pagination for GET /api/reports/list
+        Index("ix_medical_reports_user_created_id", "user_id", "created_at", "id"),
+    )
+    
     def __repr__(self):
         return f"<MedicalReport(id={self.id}, user_id={self.user_id}, type='{self.report_type}')>"
 
 
+class LabObservation(Base):
+    """
+    Model for one lab value of one report (the trend time series)
+    
+    This table stores:
+    - One row per analyte read from a report, in the lexicon's canonical unit
+    - The report's upload time as the observation time
+    
+    Rows are appended when a report is analyzed and only removed with their
+    report. Trend queries read LabTrend instead of scanning this table.
+    """
+    
+    __tablename__ = "lab_observations"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    report_id = Column(Integer, ForeignKey("medical_reports.id", ondelete="CASCADE"), nullable=False, index=True)
+    analyte = Column(String(50), nullable=False)  # reports.lab_lexicon test key, e.g. "hba1c"
+    value = Column(Double, nullable=False)
+    observed_at = Column(DateTime, nullable=False)  # UTC
+    
+    __table_args__ = (
+        # One user's series for one analyte, oldest first
+        Index("ix_lab_observations_user_analyte_time", "user_id", "analyte", "observed_at"),
+    )
+    
+    def __repr__(self):
+        return f"<LabObservation(user_id={self.user_id}, analyte='{self.analyte}', value={self.value})>"
+
+
+class LabTrend(Base):
+    """
+    Model for the running aggregates of one user's analyte series
+    
+    Updated in the same transaction as every LabObservation insert, so a
+    trend is one primary-key read however long the history is. The sums
+    are the least-squares terms over (t, value), t in days since
+    reports.lab_trends.TREND_EPOCH, from which the slope is derived.
+    """
+    
+    __tablename__ = "lab_trends"
+    
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    analyte = Column(String(50), primary_key=True)
+    
+    count = Column(Integer, default=0, nullable=False)
+    first_at = Column(DateTime, nullable=False)
+    latest_value = Column(Double, nullable=False)
+    latest_at = Column(DateTime, nullable=False)
+    previous_value = Column(Double, nullable=True)
+    previous_at = Column(DateTime, nullable=True)
+    min_value = Column(Double, nullable=False)
+    min_at = Column(DateTime, nullable=False)
+    max_value = Column(Double, nullable=False)
+    max_at = Column(DateTime, nullable=False)
+    
+    # Least-squares running sums
+    sum_t = Column(Double, default=0, nullable=False)
+    sum_v = Column(Double, default=0, nullable=False)
+    sum_tt = Column(Double, default=0, nullable=False)
+    sum_tv = Column(Double, default=0, nullable=False)
+    
+    def __repr__(self):
+        return f"<LabTrend(user_id={self.user_id}, analyte='{self.analyte}', count={self.count})>"
+
+
 class SymptomInteraction(Base):
     """
     Model for storing symptom checker interactions
@@ -146,7 +351,7 @@ class SymptomInteraction(Base):
     
     # User input
     symptoms_text = Column(Text, nullable=False)  # Raw user description
-    detected_symptoms = Column(Text, nullable=True)  # JSON array of identified symptoms
+    detected_symptoms = deferred(Column(JSON, nullable=True), group=CONTENT_GROUP, raiseload=True)  # Array of identified symptoms
     
     # Additional context (age, gender, duration, etc.)
     age = Column(Integer, nullable=True)
@@ -155,12 +360,15 @@ class SymptomInteraction(Base):
     severity = Column(String(50), nullable=True)  # mild, moderate, severe
     
     # AI Analysis results
-    possible_conditions = Column(Text, nullable=True)  # JSON array of possible conditions
+    possible_conditions = deferred(Column(JSON, nullable=True), group=CONTENT_GROUP, raiseload=True)  # Array of possible conditions
     confidence_score = Column(Float, nullable=True)  # 0.0 to 1.0
     
-    # Recommendations
-    home_care_advice = Column(Text, nullable=True)  # What user can do at home
-    when_to_see_doctor = Column(Text, nullable=True)  # Warning signs
+    # Recommendations (interned in advice_templates - see utils/advice_templates.py)
+    home_care_advice_id = Column(Integer, ForeignKey("advice_templates.id"), nullable=True)  # What user can do at home
+    when_to_see_doctor_id = Column(Integer, ForeignKey("advice_templates.id"), nullable=True)  # Warning signs
+    # Legacy full-text copies, only set on rows written before interning
+    home_care_advice = deferred(Column(Text, nullable=True), group=CONTENT_GROUP, raiseload=True)
+    when_to_see_doctor = deferred(Column(Text, nullable=True), group=CONTENT_GROUP, raiseload=True)
     urgency_level = Column(String(50), nullable=True)  # routine, urgent, emergency
     
     # Processing status
@@ -168,10 +376,134 @@ class SymptomInteraction(Base):
     error_message = Column(Text, nullable=True)
     
     # Timestamps
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(PaginatedTimestamp, server_default=func.now())
     
     # Relationship to User
     user = relationship("User", back_populates="symptom_interactions")
     
+    __table_args__ = (
+        Index("ix_symptom_interactions_user_created_id", "user_id", "created_at", "id"),
+    )
+    
     def __repr__(self):
         return f"<SymptomInteraction(id={self.id}, user_id={self.user_id}, urgency='{self.urgency_level}')>"
+
+
+class AdviceTemplate(Base):
+    """
+    Model for interned advice texts
+    
+    The symptom checker produces a few hundred distinct advice texts in
+    total, so each is stored once, addressed by its SHA-256, and referenced
+    by ID from symptom_interactions. Rows are immutable.
+    """
+    
+    __tablename__ = "advice_templates"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    content_hash = Column(String(64), unique=True, nullable=False)  # SHA-256 hex of body
+    body = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self):
+        return f"<AdviceTemplate(id={self.id}, hash='{self.content_hash[:12]}')>"
+
+
+class UserStats(Base):
+    """
+    Model for per-user record counts and last activity
+    
+    Maintained in the same transaction as every insert and delete, so list
+    endpoints and the dashboard read an exact total with one primary-key
+    read instead of COUNT(*). The maintenance task periodically recounts
+    them from the tables.
+    """
+    
+    __tablename__ = "user_stats"
+    
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    prescription_count = Column(Integer, default=0, nullable=False)
+    symptom_check_count = Column(Integer, default=0, nullable=False)
+    report_count = Column(Integer, default=0, nullable=False)
+    urgent_check_count = Column(Integer, default=0, nullable=False)  # symptom checks with urgency "urgent"
+    emergency_check_count = Column(Integer, default=0, nullable=False)  # ... and "emergency"
+    
+    # When the user last added each kind of record (UTC; not moved back by deletes)
+    last_prescription_at = Column(DateTime, nullable=True)
+    last_report_at = Column(DateTime, nullable=True)
+    last_symptom_check_at = Column(DateTime, nullable=True)
+    last_activity_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    def __repr__(self):
+        return f"<UserStats(user_id={self.user_id}, prescriptions={self.prescription_count})>"
+
+
+class SearchDocument(Base):
+    """
+    Model for a record in a user's search index
+    
+    One row per indexed prescription or symptom check, holding the
+    document length BM25 normalizes by. A record without a row here has
+    not been indexed yet.
+    """
+    
+    __tablename__ = "search_documents"
+    
+    doc_type = Column(String(20), primary_key=True)  # prescription, symptom
+    doc_id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    length = Column(Float, nullable=False)  # Sum of term weights
+    indexed_at = Column(DateTime, nullable=False)  # UTC
+    
+    def __repr__(self):
+        return f"<SearchDocument(type='{self.doc_type}', id={self.doc_id}, user_id={self.user_id})>"
+
+
+class SearchPosting(Base):
+    """
+    Model for the inverted index: one term of one document
+    
+    The primary key starts with (user_id, term), so a query reads only the
+    postings of its own terms within one user's partition, and a prefix
+    query is a range scan on the same key.
+    """
+    
+    __tablename__ = "search_postings"
+    
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    term = Column(String(64), primary_key=True)
+    doc_type = Column(String(20), primary_key=True)
+    doc_id = Column(Integer, primary_key=True)
+    weight = Column(Float, nullable=False)  # Term frequency, boosted for medicine/symptom names
+    doc_length = Column(Float, nullable=False)  # Copy of SearchDocument.length (documents never change)
+    
+    __table_args__ = (
+        # Removing a document's postings
+        Index("ix_search_postings_doc", "doc_type", "doc_id"),
+    )
+
+
+class RevokedToken(Base):
+    """
+    Model for revoked JWTs
+    
+    This table stores:
+    - Single revoked tokens, identified by their jti claim (logout)
+    - User-wide cut-offs with jti NULL: every token of the user issued
+      before revoked_at is rejected (logout from all devices)
+    
+    Rows are pruned once expires_at passes, because by then every token they
+    could match has expired on its own.
+    """
+    
+    __tablename__ = "revoked_tokens"
+    
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    jti = Column(String(64), unique=True, nullable=True)  # NULL for user-wide revocations
+    revoked_at = Column(PreciseTimestamp, nullable=False)  # UTC, to the microsecond
+    expires_at = Column(DateTime, nullable=False, index=True)  # UTC - safe to delete after this
+    
+    def __repr__(self):
+        return f"<RevokedToken(id={self.id}, user_id={self.user_id}, jti='{self.jti}')>"
@@ -0,0 +1,319 @@
+"""
+Dose Schedules
+
+This module handles:
+- Parsing frequencies ("1-0-1", "BD"), durations ("x 5 days") and meal
+  timing ("after meals") from parsed medicines into structured schedules
+- Writing a prescription's schedules and their reminder rows
+- Working out due times in the reminder time zone
+- Reading a prescription's schedule and a user's upcoming doses
+
+Due times are stored in UTC and computed from local clock times
+(REMINDER_TIMEZONE), so a dose stays at 08:00 local across DST changes.
+"""
+
+import re
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import select, delete, insert
+
+from config import settings
+from models import DoseSchedule, DoseReminder
+
+SLOTS = ("morning", "afternoon", "night")
+
+# Local meal times; doses are due at the meal, or MEAL_OFFSET before/after it
+MEAL_TIMES = {"morning": time(8, 0), "afternoon": time(13, 0), "night": time(20, 0)}
+MEAL_OFFSET = timedelta(minutes=30)
+
+# "1-0-1", "1/2-0-1", "0.5-0-0" (morning-afternoon-night)
+DOSE = r"(\d+(?:\.\d+)?|\d+/\d+|½)"
+FREQUENCY_PATTERN = re.compile(DOSE + r"\s*[-–—]\s*" + DOSE + r"\s*[-–—]\s*" + DOSE)
+ABBREVIATION_PATTERN = re.compile(r"\b(od|qd|bd|bid|tds|tid|hs)\b", re.IGNORECASE)
+ABBREVIATIONS = {
+    "od": (1, 0, 0), "qd": (1, 0, 0),
+    "bd": (1, 0, 1), "bid": (1, 0, 1),
+    "tds": (1, 1, 1), "tid": (1, 1, 1),
+    "hs": (0, 0, 1),
+}
+MEAL_PATTERN = re.compile(r"\b(before|after)\s*(meals?|food|breakfast|lunch|dinner)\b", re.IGNORECASE)
+
+# "x 5days", "for 2 weeks", "1 month"
+DURATION_PATTERN = re.compile(r"\b(\d{1,3})\s*(day|week|month)s?\b", re.IGNORECASE)
+DURATION_UNIT_DAYS = {"day": 1, "week": 7, "month": 30}
+
+
+def _utc_naive(at: datetime) -> datetime:
+    """Timestamps are stored as naive UTC"""
+    if at.tzinfo is not None:
+        at = at.astimezone(timezone.utc).replace(tzinfo=None)
+    return at
+
+
+def duration_days(medicine: Dict[str, Any]) -> Optional[int]:
+    """Days a parsed medicine is prescribed for (None if the prescription does not say)"""
+    match = DURATION_PATTERN.search(medicine.get("instructions") or "")
+    if match is None:
+        return None
+    return int(match.group(1)) * DURATION_UNIT_DAYS[match.group(2).lower()]
+
+
+def _dose_amount(text: str) -> float:
+    if text == "½":
+        return 0.5
+    if "/" in text:
+        numerator, denominator = text.split("/")
+        return int(numerator) / int(denominator) if int(denominator) else 0.0
+    return float(text)
+
+
+@dataclass
+class ParsedSchedule:
+    """Structured form of a medicine's instructions"""
+    doses: Dict[str, float]  # slot -> amount per dose
+    meal_timing: Optional[str]
+    duration_days: Optional[int]
+
+
+def parse_schedule(medicine: Dict[str, Any]) -> Optional[ParsedSchedule]:
+    """
+    Structured schedule of a parsed medicine
+
+    Args:
+        medicine: One entry of Prescription.medicines
+
+    Returns:
+        The schedule, or None when the instructions give no frequency
+    """
+    instructions = medicine.get("instructions") or ""
+    match = FREQUENCY_PATTERN.search(instructions)
+    if match:
+        amounts = tuple(_dose_amount(group) for group in match.groups())
+    else:
+        abbreviation = ABBREVIATION_PATTERN.search(instructions)
+        if abbreviation is None:
+            return None
+        amounts = ABBREVIATIONS[abbreviation.group(1).lower()]
+    if not any(amounts):
+        return None
+
+    meal = MEAL_PATTERN.search(instructions)
+    return ParsedSchedule(
+        doses=dict(zip(SLOTS, map(float, amounts))),
+        meal_timing=meal.group(1).lower() if meal else None,
+        duration_days=duration_days(medicine)
+    )
+
+
+@lru_cache(maxsize=None)
+def reminder_zone() -> ZoneInfo:
+    return ZoneInfo(settings.REMINDER_TIMEZONE)
+
+
+def slot_time(slot: str, meal_timing: Optional[str]) -> time:
+    """Local clock time of a slot's dose"""
+    at = datetime.combine(datetime.min.date(), MEAL_TIMES[slot])
+    if meal_timing == "before":
+        at -= MEAL_OFFSET
+    elif meal_timing == "after":
+        at += MEAL_OFFSET
+    return at.time()
+
+
+def next_occurrence(local_time: time, after: datetime) -> datetime:
+    """
+    First time strictly after a moment that the local clock shows local_time
+
+    Args:
+        local_time: Clock time in REMINDER_TIMEZONE
+        after: Naive UTC moment
+
+    Returns:
+        Naive UTC due time
+    """
+    zone = reminder_zone()
+    local_after = after.replace(tzinfo=timezone.utc).astimezone(zone)
+    day = local_after.date()
+    while True:
+        due = datetime.combine(day, local_time, tzinfo=zone).astimezone(timezone.utc).replace(tzinfo=None)
+        if due > after:
+            return due
+        day += timedelta(days=1)
+
+
+async def remove_dose_schedules(db, prescription_ids: Sequence[int]) -> None:
+    """Drop prescriptions' schedules and pending reminders without committing"""
+    if not prescription_ids:
+        return
+    schedule_ids = select(DoseSchedule.id).where(DoseSchedule.prescription_id.in_(prescription_ids))
+    await db.execute(
+        delete(DoseReminder)
+        .where(DoseReminder.schedule_id.in_(schedule_ids))
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        delete(DoseSchedule)
+        .where(DoseSchedule.prescription_id.in_(prescription_ids))
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def write_dose_schedules(db, user_id: int, prescription_id: int,
+                               medicines: Optional[List[Dict[str, Any]]], prescribed_at: datetime) -> int:
+    """
+    Replace a prescription's schedules and reminders without committing
+
+    Each schedule starts at the upload time and runs for the prescribed
+    duration (MEDICATION_ACTIVE_DAYS when none is given, as in the
+    medication index); its first reminders are the next slot times after
+    the start, or after now for a backfilled prescription.
+
+    Args:
+        db: Async database session
+        user_id: Owner of the prescription
+        prescription_id: Prescription the medicines were read from
+        medicines: Prescription.medicines
+        prescribed_at: Prescription upload time
+
+    Returns:
+        Number of schedules written
+    """
+    await remove_dose_schedules(db, [prescription_id])
+
+    starts_at = _utc_naive(prescribed_at)
+    schedules = []
+    for medicine in medicines or []:
+        if not isinstance(medicine, dict) or not medicine.get("medicine_name"):
+            continue
+        parsed = parse_schedule(medicine)
+        if parsed is None:
+            continue
+        days = parsed.duration_days or settings.MEDICATION_ACTIVE_DAYS
+        schedules.append(DoseSchedule(
+            user_id=user_id,
+            prescription_id=prescription_id,
+            medicine_name=medicine["medicine_name"][:255],
+            morning_dose=parsed.doses["morning"],
+            afternoon_dose=parsed.doses["afternoon"],
+            night_dose=parsed.doses["night"],
+            meal_timing=parsed.meal_timing,
+            starts_at=starts_at,
+            ends_at=starts_at + timedelta(days=days)
+        ))
+    if not schedules:
+        return 0
+
+    db.add_all(schedules)
+    await db.flush()  # Schedule IDs for the reminder rows
+
+    first_after = max(starts_at, datetime.utcnow())
+    reminders = []
+    for schedule in schedules:
+        for slot in SLOTS:
+            if dose_amount(schedule, slot) > 0:
+                due = next_occurrence(slot_time(slot, schedule.meal_timing), first_after)
+                if due < schedule.ends_at:
+                    reminders.append({"user_id": user_id, "schedule_id": schedule.id, "slot": slot, "next_due_at": due})
+    if reminders:
+        await db.execute(insert(DoseReminder), reminders)
+    return len(schedules)
+
+
+def dose_amount(schedule: DoseSchedule, slot: str) -> float:
+    return getattr(schedule, f"{slot}_dose")
+
+
+def schedule_payload(schedule: DoseSchedule, next_due_at: Optional[datetime]) -> dict:
+    """
+    Serialize a schedule
+
+    Returns:
+        Schedule data dictionary (DoseScheduleItem)
+    """
+    return {
+        "id": schedule.id,
+        "medicine_name": schedule.medicine_name,
+        "doses": [
+            {"slot": slot, "amount": dose_amount(schedule, slot),
+             "time": slot_time(slot, schedule.meal_timing).strftime("%H:%M")}
+            for slot in SLOTS if dose_amount(schedule, slot) > 0
+        ],
+        "meal_timing": schedule.meal_timing,
+        "starts_at": schedule.starts_at,
+        "ends_at": schedule.ends_at,
+        "next_due_at": next_due_at,
+    }
+
+
+async def prescription_schedule(db, prescription_id: int) -> List[dict]:
+    """
+    A prescription's schedules with their next due dose
+
+    Args:
+        db: Async database session
+        prescription_id: Prescription to look up
+
+    Returns:
+        Schedule dictionaries (DoseScheduleItem)
+    """
+    schedules = (await db.execute(
+        select(DoseSchedule)
+        .where(DoseSchedule.prescription_id == prescription_id)
+        .order_by(DoseSchedule.id)
+    )).scalars().all()
+    if not schedules:
+        return []
+
+    next_due = {}
+    for schedule_id, due in await db.execute(
+        select(DoseReminder.schedule_id, DoseReminder.next_due_at)
+        .where(DoseReminder.schedule_id.in_([schedule.id for schedule in schedules]))
+    ):
+        next_due[schedule_id] = min(due, next_due.get(schedule_id, due))
+    return [schedule_payload(schedule, next_due.get(schedule.id)) for schedule in schedules]
+
+
+async def upcoming_doses(db, user_id: int, hours: int, now: Optional[datetime] = None) -> List[dict]:
+    """
+    A user's doses due within the next hours, soonest first
+
+    Reads the user's reminder rows due inside the window (one indexed range
+    read) and expands each to its daily occurrences up to the window end.
+
+    Args:
+        db: Async database session
+        user_id: User to look up
+        hours: Window length
+        now: Window start (default now)
+
+    Returns:
+        Dose dictionaries (UpcomingDose)
+    """
+    now = now or datetime.utcnow()
+    window_end = now + timedelta(hours=hours)
+    rows = (await db.execute(
+        select(DoseReminder.slot, DoseReminder.next_due_at, DoseSchedule)
+        .join(DoseSchedule, DoseSchedule.id == DoseReminder.schedule_id)
+        .where(DoseReminder.user_id == user_id, DoseReminder.next_due_at < window_end)
+    )).all()
+
+    doses = []
+    for slot, due, schedule in rows:
+        local_time = slot_time(slot, schedule.meal_timing)
+        while due < window_end and due < schedule.ends_at:
+            doses.append({
+                "schedule_id": schedule.id,
+                "prescription_id": schedule.prescription_id,
+                "medicine_name": schedule.medicine_name,
+                "slot": slot,
+                "amount": dose_amount(schedule, slot),
+                "meal_timing": schedule.meal_timing,
+                "due_at": due,
+            })
+            due = next_occurrence(local_time, due)
+    doses.sort(key=lambda dose: (dose["due_at"], dose["schedule_id"]))
+    return doses
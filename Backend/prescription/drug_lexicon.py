@@ -0,0 +1,190 @@
+"""
+Drug Lexicon
+
+This module handles:
+- The catalogue of recognised drugs (generic key, name, classes, aliases)
+- Mapping brand and generic names, including combination brands, to drug keys
+- Normalizing medicine names parsed from prescriptions
+
+All aliases are compiled into a single regular expression, so a medicine
+name is resolved with one scan instead of one lookup per drug.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+MAX_DRUG_KEY_LENGTH = 64
+
+
+@dataclass(frozen=True)
+class Drug:
+    """A recognised generic drug"""
+    key: str
+    name: str
+    classes: Tuple[str, ...]
+    aliases: Tuple[str, ...]  # generic and brand names, lowercase
+
+
+def D(key: str, name: str, classes=(), aliases=()) -> Drug:
+    return Drug(key, name, tuple(classes), (key.replace("_", " "), *aliases))
+
+
+DRUGS: List[Drug] = [
+    # Pain and fever
+    D("paracetamol", "Paracetamol", ("analgesic",), ("acetaminophen", "crocin", "dolo", "calpol", "tylenol", "pcm")),
+    D("ibuprofen", "Ibuprofen", ("nsaid",), ("brufen", "advil")),
+    D("diclofenac", "Diclofenac", ("nsaid",), ("voveran", "voltaren")),
+    D("aceclofenac", "Aceclofenac", ("nsaid",), ("zerodol", "hifenac")),
+    D("naproxen", "Naproxen", ("nsaid",), ("naprosyn",)),
+    D("aspirin", "Aspirin", ("nsaid", "antiplatelet"), ("ecosprin", "disprin", "acetylsalicylic acid")),
+    D("tramadol", "Tramadol", ("opioid", "serotonergic"), ("ultram", "contramal")),
+
+    # Antibiotics and antifungals
+    D("amoxicillin", "Amoxicillin", ("penicillin",), ("amoxycillin", "mox", "novamox")),
+    D("clavulanate", "Clavulanic acid", (), ("clavulanic acid", "clavulanic", "potassium clavulanate")),
+    D("azithromycin", "Azithromycin", ("macrolide",), ("azithral", "azee", "zithromax")),
+    D("clarithromycin", "Clarithromycin", ("macrolide", "cyp3a4_inhibitor"), ("claribid", "biaxin")),
+    D("ciprofloxacin", "Ciprofloxacin", ("fluoroquinolone",), ("ciplox", "cipro")),
+    D("levofloxacin", "Levofloxacin", ("fluoroquinolone",), ("levoflox", "levaquin")),
+    D("ofloxacin", "Ofloxacin", ("fluoroquinolone",), ("zanocin", "oflox")),
+    D("metronidazole", "Metronidazole", (), ("flagyl", "metrogyl")),
+    D("doxycycline", "Doxycycline", ("tetracycline",), ("doxy", "vibramycin")),
+    D("cefixime", "Cefixime", ("cephalosporin",), ("taxim o", "zifi")),
+    D("cephalexin", "Cephalexin", ("cephalosporin",), ("cefalexin", "sporidex")),
+    D("fluconazole", "Fluconazole", ("azole_antifungal",), ("forcan", "diflucan")),
+
+    # Stomach
+    D("pantoprazole", "Pantoprazole", ("ppi",), ("pan", "pantocid", "protonix")),
+    D("omeprazole", "Omeprazole", ("ppi", "cyp2c19_inhibitor"), ("omez", "prilosec")),
+    D("esomeprazole", "Esomeprazole", ("ppi", "cyp2c19_inhibitor"), ("nexpro", "nexium")),
+    D("rabeprazole", "Rabeprazole", ("ppi",), ("razo", "rablet")),
+    D("ranitidine", "Ranitidine", (), ("rantac", "aciloc", "zantac")),
+    D("domperidone", "Domperidone", ("qt_prolonging",), ("domstal", "motilium")),
+    D("ondansetron", "Ondansetron", ("serotonergic",), ("emeset", "ondem", "zofran")),
+
+    # Heart and blood pressure
+    D("atorvastatin", "Atorvastatin", ("statin", "cyp3a4_statin"), ("atorva", "lipitor", "storvas")),
+    D("simvastatin", "Simvastatin", ("statin", "cyp3a4_statin"), ("zocor", "simvotin")),
+    D("rosuvastatin", "Rosuvastatin", ("statin",), ("rosuvas", "crestor")),
+    D("amlodipine", "Amlodipine", ("calcium_channel_blocker",), ("amlong", "norvasc", "amlopres")),
+    D("losartan", "Losartan", ("arb",), ("losar", "cozaar")),
+    D("telmisartan", "Telmisartan", ("arb",), ("telma", "micardis")),
+    D("enalapril", "Enalapril", ("ace_inhibitor",), ("envas", "vasotec")),
+    D("ramipril", "Ramipril", ("ace_inhibitor",), ("cardace", "altace")),
+    D("lisinopril", "Lisinopril", ("ace_inhibitor",), ("listril", "zestril")),
+    D("metoprolol", "Metoprolol", ("beta_blocker",), ("metolar", "betaloc", "lopressor")),
+    D("atenolol", "Atenolol", ("beta_blocker",), ("aten", "tenormin")),
+    D("spironolactone", "Spironolactone", ("potassium_sparing",), ("aldactone",)),
+    D("furosemide", "Furosemide", ("loop_diuretic",), ("frusemide", "lasix")),
+    D("warfarin", "Warfarin", ("anticoagulant",), ("warf", "coumadin")),
+    D("clopidogrel", "Clopidogrel", ("antiplatelet",), ("clopilet", "plavix", "deplatt")),
+    D("digoxin", "Digoxin", (), ("lanoxin",)),
+    D("amiodarone", "Amiodarone", ("qt_prolonging",), ("cordarone",)),
+    D("isosorbide", "Isosorbide nitrate", ("nitrate",), ("isosorbide mononitrate", "isosorbide dinitrate", "sorbitrate", "monotrate")),
+    D("nitroglycerin", "Nitroglycerin", ("nitrate",), ("glyceryl trinitrate", "gtn", "nitrocontin")),
+    D("sildenafil", "Sildenafil", ("pde5_inhibitor",), ("viagra", "penegra")),
+
+    # Diabetes and thyroid
+    D("metformin", "Metformin", (), ("glycomet", "glucophage")),
+    D("glimepiride", "Glimepiride", ("sulfonylurea",), ("amaryl", "glimisave")),
+    D("gliclazide", "Gliclazide", ("sulfonylurea",), ("diamicron",)),
+    D("insulin", "Insulin", (), ("mixtard", "lantus", "novorapid", "humalog")),
+    D("levothyroxine", "Levothyroxine", (), ("thyroxine", "thyronorm", "eltroxin")),
+
+    # Mind and sleep
+    D("sertraline", "Sertraline", ("ssri", "serotonergic"), ("serta", "zoloft")),
+    D("fluoxetine", "Fluoxetine", ("ssri", "serotonergic"), ("fludac", "prozac")),
+    D("escitalopram", "Escitalopram", ("ssri", "serotonergic"), ("nexito", "lexapro")),
+    D("amitriptyline", "Amitriptyline", ("tricyclic", "serotonergic"), ("tryptomer",)),
+    D("alprazolam", "Alprazolam", ("benzodiazepine",), ("alprax", "xanax")),
+    D("clonazepam", "Clonazepam", ("benzodiazepine",), ("clonotril", "rivotril")),
+
+    # Allergy, airways, steroids
+    D("cetirizine", "Cetirizine", ("antihistamine",), ("cetzine", "zyrtec")),
+    D("levocetirizine", "Levocetirizine", ("antihistamine",), ("levocet", "xyzal")),
+    D("montelukast", "Montelukast", (), ("montair", "singulair")),
+    D("prednisolone", "Prednisolone", ("corticosteroid",), ("wysolone", "omnacortil")),
+
+    # Others
+    D("methotrexate", "Methotrexate", (), ("folitrax", "imutrex")),
+    D("allopurinol", "Allopurinol", (), ("zyloric",)),
+    D("potassium_chloride", "Potassium chloride", ("potassium_supplement",), ("kcl", "potklor")),
+    D("calcium", "Calcium", ("mineral_supplement",), ("calcium carbonate", "shelcal", "calcimax")),
+    D("iron", "Iron", ("mineral_supplement",), ("ferrous sulfate", "ferrous sulphate", "ferrous fumarate", "livogen", "autrin")),
+]
+
+DRUGS_BY_KEY: Dict[str, Drug] = {drug.key: drug for drug in DRUGS}
+
+# Brand names of fixed-dose combinations -> drug keys
+COMBINATIONS: Dict[str, Tuple[str, ...]] = {
+    "augmentin": ("amoxicillin", "clavulanate"),
+    "clavam": ("amoxicillin", "clavulanate"),
+    "moxclav": ("amoxicillin", "clavulanate"),
+    "pan d": ("pantoprazole", "domperidone"),
+    "pan dsr": ("pantoprazole", "domperidone"),
+    "rabeprazole d": ("rabeprazole", "domperidone"),
+    "razo d": ("rabeprazole", "domperidone"),
+    "combiflam": ("ibuprofen", "paracetamol"),
+    "ultracet": ("tramadol", "paracetamol"),
+    "zerodol p": ("aceclofenac", "paracetamol"),
+    "montair lc": ("montelukast", "levocetirizine"),
+    "telma h": ("telmisartan",),
+    "glycomet gp": ("metformin", "glimepiride"),
+}
+
+# Alias -> drug keys. Combination names are matched before their parts
+ALIASES: Dict[str, Tuple[str, ...]] = {
+    **{alias: (drug.key,) for drug in DRUGS for alias in drug.aliases},
+    **COMBINATIONS,
+}
+
+ALIAS_PATTERN = re.compile(
+    r"\b(" + "|".join(re.escape(alias) for alias in sorted(ALIASES, key=len, reverse=True)) + r")\b"
+)
+
+# Strengths, dosage forms and release modifiers that are not part of a name
+NOISE_PATTERN = re.compile(
+    r"\b\d+(\.\d+)?\s*(mg|mcg|g|gm|ml|iu|units?|%)?\b"
+    r"|\b(tab|tablets?|caps?|capsules?|syp|syrup|susp|suspension|inj|injection|drops?|"
+    r"ointment|cream|gel|lotion|sr|er|xr|cr|mr|od|forte|ds|plus)\b"
+)
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """Lowercase words of a medicine name, without strengths and dosage forms"""
+    text = re.sub(r"[^a-z0-9%.+ ]", " ", (name or "").lower())
+    text = NOISE_PATTERN.sub(" ", text.replace("+", " "))
+    return " ".join(re.sub(r"[^a-z0-9 ]", " ", text).split())
+
+
+def resolve_medicine(name: Optional[str]) -> List[str]:
+    """
+    Drug keys of a medicine name as written on a prescription
+
+    "Tab. Augmentin 625mg" -> ["amoxicillin", "clavulanate"]. A name with no
+    recognised drug keeps its normalized form as its key, so the same
+    unknown medicine still links across prescriptions.
+
+    Args:
+        name: Parsed medicine name
+
+    Returns:
+        Drug keys in order of appearance (empty if nothing is left of the name)
+    """
+    normalized = normalize_name(name)
+    if not normalized:
+        return []
+
+    keys = []
+    for match in ALIAS_PATTERN.finditer(normalized):
+        for key in ALIASES[match.group(1)]:
+            if key not in keys:
+                keys.append(key)
+    return keys or [normalized[:MAX_DRUG_KEY_LENGTH]]
+
+
+def drug_name(key: str) -> str:
+    """Display name of a drug key (unknown keys are title-cased)"""
+    drug = DRUGS_BY_KEY.get(key)
+    return drug.name if drug else key.title()
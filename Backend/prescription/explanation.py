@@ -0,0 +1,132 @@
+"""
+Prescription Explanations
+
+This module handles:
+- Rendering the user-friendly explanation from structured medicine data
+- Caching rendered per-medicine sections by content
+
+Explanations are rendered when a prescription is read instead of being
+stored per row. The static safety text is built once at import, and each
+medicine section is cached, so rendering is a handful of lookups and one
+join. Bump EXPLANATION_VERSION whenever the wording changes - no stored
+data needs rewriting.
+"""
+
+from functools import lru_cache
+from typing import List, Optional
+
+EXPLANATION_VERSION = 1
+
+# Rendered per-medicine sections kept in memory (keyed by section content)
+MEDICINE_SECTION_CACHE_SIZE = 4096
+
+_RULE = "=" * 60
+
+SAFETY_NOTICE = (
+    "🚨 **CRITICAL MEDICAL SAFETY NOTICE** 🚨\n\n"
+    "⚠️ This is an AI-powered text extraction tool ONLY. It is NOT a substitute for professional medical advice.\n\n"
+    "✅ **REQUIRED ACTIONS:**\n"
+    "• ✓ ALWAYS verify all information with your original prescription\n"
+    "• ✓ NEVER rely solely on this AI extraction for dosage or timing\n"
+    "• ✓ Consult your doctor or pharmacist if anything is unclear\n"
+    "• ✓ Double-check ALL medicine names and dosages before taking\n\n"
+    f"{_RULE}\n\n"
+)
+
+DETECTION_FAILED = (
+    "❌ **Automatic Detection Failed**\n\n"
+    "We couldn't automatically detect specific medicines from your prescription image.\n"
+    "This could be due to:\n"
+    "• Poor image quality or lighting\n"
+    "• Handwritten prescription (harder to read)\n"
+    "• Image is blurry or at an angle\n\n"
+    "📋 **What to do:**\n"
+    "1. Review the extracted text below carefully\n"
+    "2. Compare it with your original prescription\n"
+    "3. If text is unclear, take a clearer photo and upload again\n"
+    "4. Contact your pharmacist for clarification\n\n"
+)
+
+DETECTED_HEADING = (
+    "📋 **Detected Information (REQUIRES VERIFICATION):**\n\n"
+    "Found {count} medicine(s) - Each MUST be verified:\n\n"
+)
+
+MEDICINE_SECTION = (
+    "{index}. {icon} **{name}**\n"
+    "   • Dosage: {dosage}\n"
+    "   • Instructions: {instructions}\n"
+    "   • Detection Confidence: {confidence_label}\n"
+    "{low_confidence}"
+    "\n"
+)
+
+LOW_CONFIDENCE_WARNING = "   • ⚠️ **LOW CONFIDENCE - MUST VERIFY WITH ORIGINAL**\n"
+
+CONFIDENCE_ICONS = {"high": "🟢", "medium": "🟡"}
+
+SAFETY_REMINDERS = (
+    "\n🔴 **CRITICAL SAFETY REMINDERS:**\n"
+    "• ✓ Take medicines EXACTLY as prescribed by your doctor\n"
+    "• ✓ Complete the FULL course - don't stop early\n"
+    "• ✓ Take at the CORRECT times (morning/evening as prescribed)\n"
+    "• ✓ Report ANY side effects to your doctor immediately\n"
+    "• ✓ Store medicines away from children and pets\n"
+    "• ✓ Check expiry dates before taking\n"
+    "• ✓ Don't share medicines with others\n\n"
+    "☎️ **When to Contact Doctor:**\n"
+    "• Severe side effects or allergic reactions\n"
+    "• Symptoms worsen or don't improve\n"
+    "• Questions about dosage or timing\n"
+    "• Any concerns about the medication\n\n"
+    f"{_RULE}\n"
+    "💊 **Remember**: Your health is important. When in doubt, always consult a healthcare professional!\n"
+)
+
+# Whole explanation when nothing could be detected - identical for every such row
+NO_MEDICINES_EXPLANATION = SAFETY_NOTICE + DETECTION_FAILED
+
+
+@lru_cache(maxsize=MEDICINE_SECTION_CACHE_SIZE)
+def _render_medicine(index: int, name: str, dosage: str, instructions: str, confidence: str) -> str:
+    """Render one medicine section (cached - arguments are the section's whole content)"""
+    return MEDICINE_SECTION.format(
+        index=index,
+        icon=CONFIDENCE_ICONS.get(confidence, "🔴"),
+        name=name,
+        dosage=dosage,
+        instructions=instructions,
+        confidence_label=confidence.upper(),
+        low_confidence=LOW_CONFIDENCE_WARNING if confidence == "low" else "",
+    )
+
+
+def render_explanation(medicines: Optional[List[dict]]) -> Optional[str]:
+    """
+    Render the explanation for a prescription
+
+    Args:
+        medicines: Prescription.medicines (list of parsed medicine dictionaries)
+
+    Returns:
+        User-friendly explanation text with safety disclaimers, or None if the
+        prescription has not been processed
+    """
+    if medicines is None:
+        return None
+
+    if not medicines or (len(medicines) == 1 and 'message' in medicines[0]):
+        return NO_MEDICINES_EXPLANATION
+
+    parts = [SAFETY_NOTICE, DETECTED_HEADING.format(count=len(medicines))]
+    for i, med in enumerate(medicines, 1):
+        parts.append(_render_medicine(
+            i,
+            str(med.get('medicine_name', '❓ Unknown')),
+            str(med.get('dosage', '❓ Not detected')),
+            str(med.get('instructions', 'See original prescription')),
+            str(med.get('confidence', 'low')),
+        ))
+    parts.append(SAFETY_REMINDERS)
+
+    return "".join(parts)
@@ -0,0 +1,248 @@
+"""
+Drug-Drug Interactions
+
+This module handles:
+- The table of known interactions between drugs and drug classes
+- Compiling it once into an interaction graph over integer drug IDs
+- Checking a prescription's drugs against the user's active medications
+
+Every drug's neighbours are stored as a bitset (a Python int with bit j set
+when the drug interacts with drug j). Checking a prescription is one AND of
+each new drug's bitset with the bitset of the active drugs, so the cost
+does not grow with the size of the table.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from prescription.drug_lexicon import DRUGS, drug_name
+
+SEVERITY_RANK = {"minor": 1, "moderate": 2, "major": 3}
+
+
+@dataclass(frozen=True)
+class InteractionRule:
+    """An interaction between two drugs or drug classes ("class:nsaid")"""
+    a: str
+    b: str
+    severity: str  # minor, moderate, major
+    description: str
+
+
+def I(a: str, b: str, severity: str, description: str) -> InteractionRule:
+    return InteractionRule(a, b, severity, description)
+
+
+INTERACTION_RULES: List[InteractionRule] = [
+    # Bleeding
+    I("class:anticoagulant", "class:nsaid", "major",
+      "Taken together these raise the risk of serious bleeding, including stomach bleeding."),
+    I("class:anticoagulant", "class:antiplatelet", "major",
+      "Taken together these raise the risk of serious bleeding."),
+    I("warfarin", "fluconazole", "major",
+      "Fluconazole makes warfarin much stronger; INR needs close monitoring or a dose change."),
+    I("warfarin", "metronidazole", "major",
+      "Metronidazole makes warfarin much stronger; INR needs close monitoring or a dose change."),
+    I("warfarin", "amiodarone", "major",
+      "Amiodarone makes warfarin stronger for weeks; the warfarin dose usually has to be lowered."),
+    I("warfarin", "class:fluoroquinolone", "moderate",
+      "These antibiotics can make warfarin stronger; INR should be checked."),
+    I("warfarin", "class:ssri", "moderate",
+      "This combination raises the risk of bleeding."),
+    I("warfarin", "paracetamol", "minor",
+      "Regular high doses of paracetamol can raise INR; occasional doses are usually fine."),
+    I("class:antiplatelet", "class:nsaid", "moderate",
+      "Taken together these raise the risk of stomach bleeding."),
+    I("class:ssri", "class:nsaid", "moderate",
+      "Taken together these raise the risk of stomach bleeding."),
+    I("class:corticosteroid", "class:nsaid", "moderate",
+      "Taken together these raise the risk of stomach ulcers and bleeding."),
+    I("clopidogrel", "class:cyp2c19_inhibitor", "moderate",
+      "This stomach medicine can make clopidogrel less effective; pantoprazole is usually preferred."),
+
+    # Potassium, kidneys and blood pressure
+    I("class:ace_inhibitor", "class:potassium_sparing", "major",
+      "Taken together these can raise blood potassium to dangerous levels."),
+    I("class:arb", "class:potassium_sparing", "major",
+      "Taken together these can raise blood potassium to dangerous levels."),
+    I("class:potassium_supplement", "class:potassium_sparing", "major",
+      "Taken together these can raise blood potassium to dangerous levels."),
+    I("class:ace_inhibitor", "class:potassium_supplement", "moderate",
+      "This combination can raise blood potassium; levels should be checked."),
+    I("class:arb", "class:potassium_supplement", "moderate",
+      "This combination can raise blood potassium; levels should be checked."),
+    I("class:ace_inhibitor", "class:arb", "major",
+      "Two medicines acting on the same blood pressure system raise the risk of kidney problems and high potassium."),
+    I("class:ace_inhibitor", "class:nsaid", "moderate",
+      "Painkillers of this type can weaken blood pressure control and strain the kidneys."),
+    I("class:arb", "class:nsaid", "moderate",
+      "Painkillers of this type can weaken blood pressure control and strain the kidneys."),
+    I("sildenafil", "class:nitrate", "major",
+      "Taken together these can cause a sudden, dangerous drop in blood pressure."),
+
+    # Heart rhythm and drug levels
+    I("class:cyp3a4_statin", "class:cyp3a4_inhibitor", "major",
+      "This antibiotic raises statin levels and the risk of serious muscle damage."),
+    I("simvastatin", "amiodarone", "moderate",
+      "Amiodarone raises simvastatin levels and the risk of muscle damage; the dose may need limiting."),
+    I("digoxin", "amiodarone", "major",
+      "Amiodarone raises digoxin levels; the digoxin dose usually has to be lowered."),
+    I("digoxin", "clarithromycin", "major",
+      "Clarithromycin raises digoxin levels and the risk of digoxin toxicity."),
+    I("domperidone", "class:macrolide", "major",
+      "Taken together these can cause dangerous heart rhythm changes (QT prolongation)."),
+    I("domperidone", "fluconazole", "major",
+      "Taken together these can cause dangerous heart rhythm changes (QT prolongation)."),
+    I("class:qt_prolonging", "class:qt_prolonging", "major",
+      "Two medicines that affect heart rhythm (QT prolongation) raise the risk of a dangerous arrhythmia."),
+
+    # Nervous system
+    I("tramadol", "class:ssri", "major",
+      "Taken together these can cause serotonin syndrome and lower the seizure threshold."),
+    I("tramadol", "amitriptyline", "major",
+      "Taken together these can cause serotonin syndrome and lower the seizure threshold."),
+    I("class:opioid", "class:benzodiazepine", "major",
+      "Taken together these can cause severe drowsiness and slowed breathing."),
+    I("class:ssri", "ondansetron", "minor",
+      "Both affect serotonin; watch for agitation, sweating or tremor."),
+
+    # Blood sugar
+    I("class:sulfonylurea", "fluconazole", "moderate",
+      "Fluconazole can make this diabetes medicine stronger and cause low blood sugar."),
+
+    # Absorption
+    I("class:fluoroquinolone", "class:mineral_supplement", "moderate",
+      "Calcium and iron stop the antibiotic being absorbed; take them at least 2 hours apart."),
+    I("doxycycline", "class:mineral_supplement", "moderate",
+      "Calcium and iron stop the antibiotic being absorbed; take them at least 2 hours apart."),
+    I("levothyroxine", "class:mineral_supplement", "moderate",
+      "Calcium and iron reduce thyroid medicine absorption; take them at least 4 hours apart."),
+
+    # Other
+    I("methotrexate", "class:nsaid", "major",
+      "These painkillers raise methotrexate levels and the risk of serious side effects."),
+]
+
+
+@dataclass
+class Interaction:
+    """One interacting pair found by a check"""
+    drug: str  # drug key in the checked prescription
+    other_drug: str  # drug key it interacts with
+    severity: str
+    description: str
+    # Prescriptions the other drug is active in (empty when it is in the checked prescription)
+    other_prescription_ids: List[int]
+
+    def payload(self) -> dict:
+        return {
+            "drug": self.drug,
+            "drug_name": drug_name(self.drug),
+            "other_drug": self.other_drug,
+            "other_drug_name": drug_name(self.other_drug),
+            "severity": self.severity,
+            "description": self.description,
+            "other_prescription_ids": self.other_prescription_ids,
+        }
+
+
+class InteractionGraph:
+    """
+    Interaction table compiled to integer drug IDs and adjacency bitsets
+
+    Class rules are expanded to drug pairs at compile time; where several
+    rules cover a pair, the most severe one is kept.
+    """
+
+    def __init__(self, rules: Iterable[InteractionRule]):
+        self.ids: Dict[str, int] = {drug.key: i for i, drug in enumerate(DRUGS)}
+        self.keys: List[str] = [drug.key for drug in DRUGS]
+        self.adjacency: List[int] = [0] * len(self.keys)
+        self.rules: Dict[Tuple[int, int], InteractionRule] = {}
+
+        members: Dict[str, Set[int]] = {}
+        for drug in DRUGS:
+            members[drug.key] = {self.ids[drug.key]}
+            for drug_class in drug.classes:
+                members.setdefault(f"class:{drug_class}", set()).add(self.ids[drug.key])
+
+        for rule in rules:
+            for side in (rule.a, rule.b):
+                if side not in members:
+                    raise ValueError(f"Interaction rule names unknown drug or class: {side}")
+            for i in members[rule.a]:
+                for j in members[rule.b]:
+                    if i != j:
+                        self._add(i, j, rule)
+
+    def _add(self, i: int, j: int, rule: InteractionRule) -> None:
+        pair = (min(i, j), max(i, j))
+        current = self.rules.get(pair)
+        if current is None or SEVERITY_RANK[rule.severity] > SEVERITY_RANK[current.severity]:
+            self.rules[pair] = rule
+        self.adjacency[i] |= 1 << j
+        self.adjacency[j] |= 1 << i
+
+    def mask(self, keys: Iterable[str]) -> int:
+        """Bitset of the known drugs among keys"""
+        bits = 0
+        for key in keys:
+            i = self.ids.get(key)
+            if i is not None:
+                bits |= 1 << i
+        return bits
+
+    def check(self, new_keys: Iterable[str], active: Dict[str, List[int]]) -> List[Interaction]:
+        """
+        Interactions of a prescription's drugs with each other and with active drugs
+
+        Args:
+            new_keys: Drug keys of the prescription being checked
+            active: Drug key -> IDs of the other prescriptions it is active in
+
+        Returns:
+            Interactions, most severe first
+        """
+        new_keys = list(dict.fromkeys(new_keys))
+        new_mask = self.mask(new_keys)
+        # A drug that is both new and active is checked as new
+        active_mask = self.mask(active) & ~new_mask
+
+        found = []
+        seen_mask = 0
+        for key in new_keys:
+            i = self.ids.get(key)
+            if i is None:
+                continue
+            hits = self.adjacency[i] & (active_mask | seen_mask)
+            while hits:
+                low = hits & -hits
+                j = low.bit_length() - 1
+                hits ^= low
+                rule = self.rules[(min(i, j), max(i, j))]
+                other = self.keys[j]
+                found.append(Interaction(
+                    key, other, rule.severity, rule.description,
+                    [] if seen_mask & low else active[other]
+                ))
+            seen_mask |= 1 << i
+
+        found.sort(key=lambda interaction: -SEVERITY_RANK[interaction.severity])
+        return found
+
+
+interaction_graph = InteractionGraph(INTERACTION_RULES)
+
+
+def check_interactions(new_keys: Iterable[str], active: Optional[Dict[str, List[int]]] = None) -> List[dict]:
+    """
+    Check drug keys against active medications
+
+    Args:
+        new_keys: Drug keys of the prescription being checked
+        active: Drug key -> IDs of the other prescriptions it is active in
+
+    Returns:
+        Interaction dictionaries (DrugInteraction), most severe first
+    """
+    return [interaction.payload() for interaction in interaction_graph.check(new_keys, active or {})]
@@ -0,0 +1,279 @@
+"""
+Medication Index
+
+This module handles:
+- Writing a prescription's medicines together with their index rows
+  (normalized drug -> prescription, prescribed and active-until dates)
+  and dose schedules
+- Reading a user's medication history and active medications
+- Checking a prescription for interactions with the user's active medications
+
+Usage (from the Backend directory - indexes prescriptions processed before
+the index or the dose schedules existed; safe to re-run):
+    python -m prescription.medication_index
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import select, delete, insert, exists
+from sqlalchemy.orm import undefer_group
+
+from config import settings
+from models import Prescription, PrescribedMedication, DoseSchedule, CONTENT_GROUP
+from prescription.dose_schedule import duration_days, write_dose_schedules, remove_dose_schedules
+from prescription.drug_lexicon import DRUGS_BY_KEY, resolve_medicine, drug_name
+from prescription.interactions import check_interactions
+
+# Also the length the medicine name index of prescriptions.medicines holds
+MAX_MEDICINE_NAME_LENGTH = 255
+
+
+def _utc_naive(at: datetime) -> datetime:
+    """Timestamps are stored as naive UTC"""
+    if at.tzinfo is not None:
+        at = at.astimezone(timezone.utc).replace(tzinfo=None)
+    return at
+
+
+def medication_rows(user_id: int, prescription_id: int, medicines: Optional[List[Dict[str, Any]]],
+                    prescribed_at: datetime) -> List[Dict[str, Any]]:
+    """
+    Index rows of a prescription's parsed medicines
+
+    Args:
+        user_id: Owner of the prescription
+        prescription_id: Prescription the medicines were read from
+        medicines: Prescription.medicines
+        prescribed_at: Prescription upload time
+
+    Returns:
+        Row dictionaries, one per drug (a combination brand gives several)
+    """
+    prescribed_at = _utc_naive(prescribed_at)
+    rows = {}
+    for medicine in medicines or []:
+        name = medicine.get("medicine_name") if isinstance(medicine, dict) else None
+        if not name:
+            continue
+        days = duration_days(medicine) or settings.MEDICATION_ACTIVE_DAYS
+        for key in resolve_medicine(name):
+            # The same drug twice on one prescription is one row, active for the longer course
+            active_until = prescribed_at + timedelta(days=days)
+            if key in rows and rows[key]["active_until"] >= active_until:
+                continue
+            rows[key] = {
+                "user_id": user_id, "prescription_id": prescription_id, "drug_key": key,
+                "medicine_name": name[:MAX_MEDICINE_NAME_LENGTH],
+                "prescribed_at": prescribed_at, "active_until": active_until,
+            }
+    return list(rows.values())
+
+
+async def remove_prescription_medicines(db, prescription_ids: Sequence[int]) -> None:
+    """Drop prescriptions from the medication index and reminders without committing"""
+    if not prescription_ids:
+        return
+    await db.execute(
+        delete(PrescribedMedication)
+        .where(PrescribedMedication.prescription_id.in_(prescription_ids))
+        .execution_options(synchronize_session=False)
+    )
+    await remove_dose_schedules(db, prescription_ids)
+
+
+def _truncate_names(medicines: Optional[List[Dict[str, Any]]]) -> Optional[List[Dict[str, Any]]]:
+    """Medicines with names cut to the length the medicine name index holds"""
+    if medicines is None:
+        return None
+    truncated = []
+    for medicine in medicines:
+        name = medicine.get("medicine_name") if isinstance(medicine, dict) else None
+        if isinstance(name, str) and len(name) > MAX_MEDICINE_NAME_LENGTH:
+            medicine = {**medicine, "medicine_name": name[:MAX_MEDICINE_NAME_LENGTH]}
+        truncated.append(medicine)
+    return truncated
+
+
+async def set_prescription_medicines(db, prescription: Prescription,
+                                     medicines: Optional[List[Dict[str, Any]]]) -> None:
+    """
+    Write Prescription.medicines, its index rows and dose schedules without committing
+
+    Every write of the medicines goes through here, so the index and the
+    reminders never disagree with the prescription.
+
+    Args:
+        db: Async database session
+        prescription: Prescription with created_at loaded
+        medicines: Parsed medicines
+    """
+    prescription.medicines = _truncate_names(medicines)
+    await index_medicines(db, prescription.user_id, prescription.id, medicines, prescription.created_at)
+
+
+async def index_medicines(db, user_id: int, prescription_id: int,
+                          medicines: Optional[List[Dict[str, Any]]], prescribed_at: datetime) -> None:
+    """Replace a prescription's index rows and dose schedules without committing"""
+    await db.execute(
+        delete(PrescribedMedication)
+        .where(PrescribedMedication.prescription_id == prescription_id)
+        .execution_options(synchronize_session=False)
+    )
+    rows = medication_rows(user_id, prescription_id, medicines, prescribed_at)
+    if rows:
+        await db.execute(insert(PrescribedMedication), rows)
+    await write_dose_schedules(db, user_id, prescription_id, medicines, prescribed_at)
+
+
+async def active_medications(db, user_id: int, exclude_prescription_id: Optional[int] = None,
+                             at: Optional[datetime] = None) -> Dict[str, List[int]]:
+    """
+    A user's medications active at a time (one indexed range read)
+
+    Args:
+        db: Async database session
+        user_id: User to look up
+        exclude_prescription_id: Prescription to leave out (the one being checked)
+        at: Time to check (default now)
+
+    Returns:
+        Drug key -> IDs of the prescriptions it is active in
+    """
+    query = select(PrescribedMedication.drug_key, PrescribedMedication.prescription_id).where(
+        PrescribedMedication.user_id == user_id,
+        PrescribedMedication.active_until > (at or datetime.utcnow())
+    )
+    if exclude_prescription_id is not None:
+        query = query.where(PrescribedMedication.prescription_id != exclude_prescription_id)
+
+    active = {}
+    for key, prescription_id in await db.execute(query):
+        active.setdefault(key, []).append(prescription_id)
+    for ids in active.values():
+        ids.sort()
+    return active
+
+
+async def check_prescription(db, user_id: int, prescription_id: int) -> List[dict]:
+    """
+    Interactions of a prescription's drugs with each other and with the
+    user's other active medications
+
+    Args:
+        db: Async database session
+        user_id: Owner of the prescription
+        prescription_id: Prescription to check (its index rows must be written)
+
+    Returns:
+        Interaction dictionaries (DrugInteraction), most severe first
+    """
+    keys = (await db.execute(
+        select(PrescribedMedication.drug_key)
+        .where(PrescribedMedication.prescription_id == prescription_id)
+        .order_by(PrescribedMedication.id)
+    )).scalars().all()
+    if not keys:
+        return []
+    return check_interactions(keys, await active_medications(db, user_id, exclude_prescription_id=prescription_id))
+
+
+async def medication_history(db, user_id: int, active_only: bool = False) -> List[dict]:
+    """
+    A user's medications grouped by drug, most recently prescribed first
+
+    Args:
+        db: Async database session
+        user_id: User to look up
+        active_only: Only drugs active now
+
+    Returns:
+        Medication dictionaries (MedicationItem)
+    """
+    now = datetime.utcnow()
+    query = select(PrescribedMedication).where(PrescribedMedication.user_id == user_id)
+    if active_only:
+        query = query.where(PrescribedMedication.active_until > now)
+    rows = (await db.execute(
+        query.order_by(PrescribedMedication.prescribed_at.desc(), PrescribedMedication.id.desc())
+    )).scalars().all()
+
+    items = {}
+    for row in rows:
+        item = items.get(row.drug_key)
+        if item is None:
+            drug = DRUGS_BY_KEY.get(row.drug_key)
+            item = items[row.drug_key] = {
+                "drug_key": row.drug_key,
+                "name": drug_name(row.drug_key),
+                "recognized": drug is not None,
+                "drug_classes": list(drug.classes) if drug else [],
+                "active": False,
+                "active_until": row.active_until,
+                "first_prescribed_at": row.prescribed_at,
+                "last_prescribed_at": row.prescribed_at,
+                "prescriptions": [],
+            }
+        item["active"] = item["active"] or row.active_until > now
+        item["active_until"] = max(item["active_until"], row.active_until)
+        item["first_prescribed_at"] = row.prescribed_at
+        item["prescriptions"].append({
+            "prescription_id": row.prescription_id,
+            "medicine_name": row.medicine_name,
+            "prescribed_at": row.prescribed_at,
+            "active_until": row.active_until,
+        })
+    return list(items.values())
+
+
+async def backfill(session_factory, batch_size: int = 200) -> int:
+    """
+    Index processed prescriptions that have no index rows or no dose
+    schedules yet
+
+    Prescriptions with nothing to index are rewritten on every run, which
+    leaves them unchanged.
+
+    Returns:
+        Number of prescriptions indexed
+    """
+    indexed = 0
+    last_id = 0
+    while True:
+        async with session_factory() as db:
+            prescriptions = (await db.execute(
+                select(Prescription)
+                .options(undefer_group(CONTENT_GROUP))
+                .where(
+                    Prescription.id > last_id,
+                    Prescription.processing_status == "completed",
+                    Prescription.deleted_at.is_(None),
+                    ~exists().where(PrescribedMedication.prescription_id == Prescription.id)
+                    | ~exists().where(DoseSchedule.prescription_id == Prescription.id)
+                )
+                .order_by(Prescription.id)
+                .limit(batch_size)
+            )).scalars().all()
+            if not prescriptions:
+                return indexed
+
+            for prescription in prescriptions:
+                await index_medicines(db, prescription.user_id, prescription.id, prescription.medicines,
+                                      prescription.created_at)
+            indexed += len(prescriptions)
+            await db.commit()
+            last_id = prescriptions[-1].id
+
+
+async def _main() -> None:
+    from database import AsyncSessionLocal, dispose_engines
+    try:
+        indexed = await backfill(AsyncSessionLocal)
+        print(f"✓ Medication index and dose schedules written for {indexed} prescription(s)")
+    finally:
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
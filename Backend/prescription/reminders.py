@@ -0,0 +1,218 @@
+"""
+Dose Reminder Engine
+
+This module handles:
+- Finding doses that have come due, for all users, on a fixed tick
+- Moving each reminder row to its next due time, or removing it after the
+  last dose of the course
+- Handing due doses to the registered delivery handlers
+
+A tick reads dose_reminders through its (next_due_at, id) index and stops
+at the first row that is not due yet, so its cost is O(due doses) however
+many doses are scheduled. Rows are claimed with SELECT ... FOR UPDATE SKIP
+LOCKED, so several workers can tick at once without firing a dose twice.
+Delivery happens after the claim commits (at most once per dose), so the
+engine neither starts nor claims anything until a delivery handler is
+registered with add_handler().
+
+Usage (from the Backend directory - one tick, e.g. from cron when the
+in-process engine is disabled with REMINDER_INTERVAL_SECONDS=0):
+    python -m prescription.reminders
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List, Optional
+
+from sqlalchemy import select, update, delete
+
+from config import settings
+from models import DoseReminder, DoseSchedule
+from prescription.dose_schedule import slot_time, next_occurrence, dose_amount
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DueDose:
+    """A dose handed to the delivery handlers"""
+    user_id: int
+    prescription_id: int
+    schedule_id: int
+    medicine_name: str
+    slot: str
+    amount: float
+    meal_timing: Optional[str]
+    due_at: datetime  # UTC
+
+
+DeliveryHandler = Callable[[List[DueDose]], Awaitable[None]]
+
+
+class ReminderEngine:
+    """
+    Fires due doses every REMINDER_INTERVAL_SECONDS
+
+    Doses found more than REMINDER_GRACE_MINUTES late (e.g. after downtime)
+    are moved on without being delivered, so a restart does not send a
+    burst of stale reminders. fired counts doses at least one handler
+    accepted.
+    """
+
+    def __init__(self):
+        self.fired = 0
+        self.skipped_late = 0
+        self.last_tick_due = 0
+        self.last_tick_seconds = 0.0
+        self._handlers: List[DeliveryHandler] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def add_handler(self, handler: DeliveryHandler) -> None:
+        """Register an async callable that receives each batch of due doses"""
+        self._handlers.append(handler)
+
+    @property
+    def has_handlers(self) -> bool:
+        return bool(self._handlers)
+
+    async def _claim_batch(self, session_factory, now: datetime, batch_size: int) -> tuple:
+        """Advance one batch of due reminders; returns (doses to deliver, rows claimed)"""
+        grace = timedelta(minutes=settings.REMINDER_GRACE_MINUTES)
+        async with session_factory() as db:
+            rows = (await db.execute(
+                select(DoseReminder.id, DoseReminder.slot, DoseReminder.next_due_at, DoseSchedule)
+                .join(DoseSchedule, DoseSchedule.id == DoseReminder.schedule_id)
+                .where(DoseReminder.next_due_at <= now)
+                .order_by(DoseReminder.next_due_at, DoseReminder.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True, of=DoseReminder)
+            )).all()
+            if not rows:
+                return [], 0
+
+            doses, advanced, finished = [], [], []
+            for reminder_id, slot, due, schedule in rows:
+                if now - due <= grace:
+                    doses.append(DueDose(
+                        schedule.user_id, schedule.prescription_id, schedule.id, schedule.medicine_name,
+                        slot, dose_amount(schedule, slot), schedule.meal_timing, due
+                    ))
+                else:
+                    self.skipped_late += 1
+
+                next_due = next_occurrence(slot_time(slot, schedule.meal_timing), now)
+                if next_due < schedule.ends_at:
+                    advanced.append({"id": reminder_id, "next_due_at": next_due})
+                else:
+                    finished.append(reminder_id)
+
+            if advanced:
+                await db.execute(update(DoseReminder), advanced)
+            if finished:
+                await db.execute(
+                    delete(DoseReminder)
+                    .where(DoseReminder.id.in_(finished))
+                    .execution_options(synchronize_session=False)
+                )
+            await db.commit()
+        return doses, len(rows)
+
+    async def _deliver(self, doses: List[DueDose]) -> int:
+        """Hand doses to every handler; returns how many were accepted by at least one"""
+        accepted = False
+        for handler in self._handlers:
+            try:
+                await handler(doses)
+                accepted = True
+            except Exception as e:
+                logger.warning("Reminder delivery failed for %d dose(s): %s", len(doses), e)
+        return len(doses) if accepted else 0
+
+    async def tick(self, session_factory, now: Optional[datetime] = None) -> int:
+        """
+        Fire every dose due by now
+
+        Args:
+            session_factory: Async session factory (database.AsyncSessionLocal)
+            now: Naive UTC time to tick at (default now)
+
+        Returns:
+            Number of doses delivered (0 without a delivery handler, in
+            which case nothing is claimed)
+        """
+        if not self._handlers:
+            return 0
+        started = time.perf_counter()
+        now = now or datetime.utcnow()
+        batch_size = settings.REMINDER_BATCH_SIZE
+        delivered = 0
+        while True:
+            doses, claimed = await self._claim_batch(session_factory, now, batch_size)
+            if doses:
+                delivered += await self._deliver(doses)
+            if claimed < batch_size:
+                break
+
+        self.fired += delivered
+        self.last_tick_due = delivered
+        self.last_tick_seconds = time.perf_counter() - started
+        return delivered
+
+    async def _run_forever(self, session_factory, interval: float) -> None:
+        while True:
+            try:
+                delivered = await self.tick(session_factory)
+                if delivered:
+                    logger.info("Reminders: %d dose(s) due", delivered)
+            except Exception as e:
+                logger.warning("Reminder tick failed: %s", e)
+            await asyncio.sleep(interval)
+
+    def start(self, session_factory, interval: float) -> None:
+        """Start the engine on the running event loop (interval 0 or no handler disables it)"""
+        if self._task is not None or interval <= 0:
+            return
+        if not self._handlers:
+            logger.warning("Reminder engine not started: no delivery handler registered")
+            return
+        self._task = asyncio.create_task(self._run_forever(session_factory, interval))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "fired": self.fired,
+            "skipped_late": self.skipped_late,
+            "last_tick_due": self.last_tick_due,
+            "last_tick_seconds": round(self.last_tick_seconds, 4),
+        }
+
+
+reminder_engine = ReminderEngine()
+
+
+async def _main() -> None:
+    from database import AsyncSessionLocal, dispose_engines
+    try:
+        if not reminder_engine.has_handlers:
+            print("No reminder delivery handler registered - nothing claimed")
+            return
+        delivered = await reminder_engine.tick(AsyncSessionLocal)
+        print(f"✓ Reminders: {delivered} dose(s) due, {reminder_engine.skipped_late} skipped as too late")
+    finally:
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
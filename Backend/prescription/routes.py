@@ -4,22 +4,48 @@ Prescription Routes
 Handles prescription upload, OCR processing, and retrieval
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer_group
+from typing import List, Optional
+import logging
 import os
-import json
 from datetime import datetime
-import uuid
 
 from database import get_db
-from models import User, Prescription
+from models import User, Prescription, CONTENT_GROUP
 from schemas import (
     PrescriptionUploadResponse,
     PrescriptionListItem,
-    PrescriptionDetail
+    PrescriptionDetail,
+    PrescriptionPage,
+    InteractionCheck,
+    MedicationList,
+    PrescriptionSchedule,
+    UpcomingDoses,
+    APIResponse,
+    GenericResponse
 )
+from prescription.explanation import render_explanation, EXPLANATION_VERSION
+from prescription.medication_index import (
+    set_prescription_medicines,
+    remove_prescription_medicines,
+    check_prescription,
+    medication_history
+)
+from prescription.dose_schedule import prescription_schedule, upcoming_doses
+from search.indexer import search_indexer
+from search.text_index import DOC_PRESCRIPTION, remove_documents
+from utils.blob_store import blob_store
 from utils.dependencies import get_current_user
+from utils.maintenance import maintenance
+from utils.metrics import PARSE_SECONDS, EXPLAIN_SECONDS
+from utils.logging_setup import fields, phi
+from utils.uploads import save_uploaded_file
+from utils.pagination import after_cursor, next_cursor, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from utils.user_stats import adjust_user_stats, get_user_stats
 from utils.responses import success_response, error_response
 from utils.ocr_processor import (
     extract_text_from_image,
@@ -29,51 +55,10 @@ from utils.ocr_processor import (
 
 router = APIRouter()
 
-# Upload directory configuration
-UPLOAD_DIR = "uploads/prescriptions"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
-# Allowed file types
-ALLOWED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.pdf'}
-MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
+logger = logging.getLogger(__name__)
 
-
-def save_uploaded_file(file: UploadFile) -> tuple:
-    """
-    Save uploaded file to server
-    
-    Args:
-        file: Uploaded file object
-        
-    Returns:
-        Tuple of (file_path, file_size, error_message)
-    """
-    try:
-        # Validate file extension
-        file_ext = os.path.splitext(file.filename)[1].lower()
-        if file_ext not in ALLOWED_EXTENSIONS:
-            return None, 0, f"Invalid file type. Allowed: {', '.join(ALLOWED_EXTENSIONS)}"
-        
-        # Generate unique filename
-        unique_filename = f"{uuid.uuid4()}_{file.filename}"
-        file_path = os.path.join(UPLOAD_DIR, unique_filename)
-        
-        # Save file
-        file_size = 0
-        with open(file_path, "wb") as buffer:
-            content = file.file.read()
-            file_size = len(content)
-            
-            # Check file size
-            if file_size > MAX_FILE_SIZE:
-                return None, 0, f"File too large. Max size: {MAX_FILE_SIZE // (1024*1024)} MB"
-            
-            buffer.write(content)
-        
-        return file_path, file_size, None
-        
-    except Exception as e:
-        return None, 0, f"Failed to save file: {str(e)}"
+# Columns selected for the list view - only what PrescriptionListItem serializes
+LIST_COLUMNS = tuple(getattr(Prescription, name) for name in PrescriptionListItem.__fields__)
 
 
 def process_prescription(file_path: str, file_type: str) -> tuple:
@@ -85,129 +70,65 @@ def process_prescription(file_path: str, file_type: str) -> tuple:
         file_type: File extension (.jpg, .png, .pdf)
         
     Returns:
-        Tuple of (extracted_text, medicines_json, simplified_explanation, error)
+        Tuple of (extracted_text, medicines, error)
     """
     try:
-        print(f"\n🔍 DEBUG: Processing prescription file: {file_path}")
-        print(f"📄 DEBUG: File type: {file_type}")
-        
         # Extract text based on file type
         if file_type in ['.jpg', '.jpeg', '.png']:
-            print("🖼️ DEBUG: Extracting text from image using OCR...")
             extracted_text, success = extract_text_from_image(file_path)
         elif file_type == '.pdf':
-            print("📑 DEBUG: Extracting text from PDF...")
             extracted_text, success = extract_text_from_pdf(file_path)
         else:
-            return None, None, None, "Unsupported file type"
-        
-        print(f"✅ DEBUG: OCR Success: {success}")
-        print(f"📝 DEBUG: Extracted text length: {len(extracted_text) if extracted_text else 0} chars")
-        print(f"📝 DEBUG: First 200 chars: {extracted_text[:200] if extracted_text else 'None'}...")
+            return None, None, "Unsupported file type"
         
         if not success:
-            print(f"❌ DEBUG: OCR failed with error: {extracted_text}")
-            return None, None, None, extracted_text  # Error message
+            # The error message is ours, not prescription text
+            logger.info("Prescription text extraction failed",
+                        extra=fields(file_type=file_type, error=extracted_text))
+            return None, None, extracted_text  # Error message
         
         # Parse medicine information
-        print("💊 DEBUG: Parsing medicine information...")
-        medicines = parse_medicine_info(extracted_text)
-        medicines_json = json.dumps(medicines, indent=2)
+        with PARSE_SECONDS.time():
+            medicines = parse_medicine_info(extracted_text)
         
-        print(f"💊 DEBUG: Detected {len(medicines)} medicine(s)")
-        print(f"💊 DEBUG: Medicines JSON: {medicines_json[:300]}...")
+        logger.info("Prescription processed", extra=fields(
+            file_type=file_type, text_chars=len(extracted_text), medicine_count=len(medicines)
+        ))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Prescription contents", extra=fields(
+                text=phi(extracted_text[:200]), medicines=phi(str(medicines)[:300])
+            ))
         
-        # Generate simplified explanation
-        print("📋 DEBUG: Generating explanation...")
-        explanation = generate_simple_explanation(medicines)
-        
-        print("✅ DEBUG: Processing completed successfully\n")
-        
-        return extracted_text, medicines_json, explanation, None
+        return extracted_text, medicines, None
         
     except Exception as e:
-        return None, None, None, f"Processing failed: {str(e)}"
+        logger.exception("Prescription processing failed", extra=fields(file_type=file_type))
+        return None, None, f"Processing failed: {str(e)}"
 
 
-def generate_simple_explanation(medicines: list) -> str:
+def prescription_payload(schema, prescription: Prescription) -> dict:
     """
-    Generate a simplified explanation of the prescription
+    Serialize a prescription with its explanation rendered from the medicines
     
     Args:
-        medicines: List of medicine dictionaries
+        schema: Response schema (PrescriptionUploadResponse or PrescriptionDetail)
+        prescription: Prescription with its content columns loaded
         
     Returns:
-        User-friendly explanation text with safety disclaimers
+        Response data dictionary
     """
-    explanation = "🚨 **CRITICAL MEDICAL SAFETY NOTICE** 🚨\n\n"
-    explanation += "⚠️ This is an AI-powered text extraction tool ONLY. It is NOT a substitute for professional medical advice.\n\n"
-    explanation += "✅ **REQUIRED ACTIONS:**\n"
-    explanation += "• ✓ ALWAYS verify all information with your original prescription\n"
-    explanation += "• ✓ NEVER rely solely on this AI extraction for dosage or timing\n"
-    explanation += "• ✓ Consult your doctor or pharmacist if anything is unclear\n"
-    explanation += "• ✓ Double-check ALL medicine names and dosages before taking\n\n"
-    explanation += "=" * 60 + "\n\n"
-    
-    if not medicines or (len(medicines) == 1 and 'message' in medicines[0]):
-        explanation += "❌ **Automatic Detection Failed**\n\n"
-        explanation += "We couldn't automatically detect specific medicines from your prescription image.\n"
-        explanation += "This could be due to:\n"
-        explanation += "• Poor image quality or lighting\n"
-        explanation += "• Handwritten prescription (harder to read)\n"
-        explanation += "• Image is blurry or at an angle\n\n"
-        explanation += "📋 **What to do:**\n"
-        explanation += "1. Review the extracted text below carefully\n"
-        explanation += "2. Compare it with your original prescription\n"
-        explanation += "3. If text is unclear, take a clearer photo and upload again\n"
-        explanation += "4. Contact your pharmacist for clarification\n\n"
-        return explanation
-    
-    explanation += "📋 **Detected Information (REQUIRES VERIFICATION):**\n\n"
-    explanation += f"Found {len(medicines)} medicine(s) - Each MUST be verified:\n\n"
-    
-    for i, med in enumerate(medicines, 1):
-        medicine_name = med.get('medicine_name', '❓ Unknown')
-        dosage = med.get('dosage', '❓ Not detected')
-        instructions = med.get('instructions', 'See original prescription')
-        confidence = med.get('confidence', 'low')
-        
-        # Add warning icon based on confidence
-        confidence_icon = "🟢" if confidence == "high" else "🟡" if confidence == "medium" else "🔴"
-        
-        explanation += f"{i}. {confidence_icon} **{medicine_name}**\n"
-        explanation += f"   • Dosage: {dosage}\n"
-        explanation += f"   • Instructions: {instructions}\n"
-        explanation += f"   • Detection Confidence: {confidence.upper()}\n"
-        if confidence == "low":
-            explanation += f"   • ⚠️ **LOW CONFIDENCE - MUST VERIFY WITH ORIGINAL**\n"
-        explanation += "\n"
-    
-    explanation += "\n🔴 **CRITICAL SAFETY REMINDERS:**\n"
-    explanation += "• ✓ Take medicines EXACTLY as prescribed by your doctor\n"
-    explanation += "• ✓ Complete the FULL course - don't stop early\n"
-    explanation += "• ✓ Take at the CORRECT times (morning/evening as prescribed)\n"
-    explanation += "• ✓ Report ANY side effects to your doctor immediately\n"
-    explanation += "• ✓ Store medicines away from children and pets\n"
-    explanation += "• ✓ Check expiry dates before taking\n"
-    explanation += "• ✓ Don't share medicines with others\n\n"
-    
-    explanation += "☎️ **When to Contact Doctor:**\n"
-    explanation += "• Severe side effects or allergic reactions\n"
-    explanation += "• Symptoms worsen or don't improve\n"
-    explanation += "• Questions about dosage or timing\n"
-    explanation += "• Any concerns about the medication\n\n"
-    
-    explanation += "=" * 60 + "\n"
-    explanation += "💊 **Remember**: Your health is important. When in doubt, always consult a healthcare professional!\n"
-    
-    return explanation
+    data = schema.from_orm(prescription).dict()
+    with EXPLAIN_SECONDS.time():
+        data["simplified_explanation"] = render_explanation(prescription.medicines)
+    data["explanation_version"] = EXPLANATION_VERSION
+    return data
 
 
-@router.post("/upload", response_model=dict, status_code=status.HTTP_201_CREATED)
+@router.post("/upload", response_model=APIResponse[PrescriptionUploadResponse], status_code=status.HTTP_201_CREATED)
 async def upload_prescription(
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Upload and process a prescription
@@ -216,8 +137,9 @@ async def upload_prescription(
     1. Validates and saves the uploaded file
     2. Extracts text using OCR (Tesseract)
     3. Identifies medicines and dosages
-    4. Generates user-friendly explanation
-    5. Stores everything in database
+    4. Stores the results in database and the medication index
+    5. Returns a user-friendly explanation (rendered, not stored) and any
+       interactions with the user's active medications
     
     **Accepts:**
     - Images: JPG, PNG
@@ -228,7 +150,7 @@ async def upload_prescription(
     """
     
     # Save uploaded file
-    file_path, file_size, error = save_uploaded_file(file)
+    file_path, file_size, error = await save_uploaded_file(file)
     if error:
         raise HTTPException(status_code=400, detail=error)
     
@@ -242,90 +164,176 @@ async def upload_prescription(
         file_path=file_path,
         file_type=file_ext[1:],  # Remove the dot
         file_size=file_size,
+        # Set explicitly so the (deferred) content columns count as loaded
+        extracted_text=None,
+        medicines=None,
         processing_status="processing"
     )
     
     db.add(prescription)
-    db.commit()
-    db.refresh(prescription)
-    
-    # Process the prescription (OCR)
-    extracted_text, medicines_json, explanation, process_error = process_prescription(
-        file_path, file_ext
-    )
+    await adjust_user_stats(db, current_user.id, prescription_count=1)
+    await db.commit()
+    # Only created_at is generated by the database; a full refresh would leave
+    # the deferred content columns unloaded
+    await db.refresh(prescription, attribute_names=["created_at"])
+    
+    # Process the prescription (OCR) off the event loop - it is CPU-bound.
+    # Remote blob stores hand back a temporary local copy for the OCR step
+    async with blob_store.local_copy(file_path) as local_path:
+        extracted_text, medicines, process_error = await run_in_threadpool(
+            process_prescription, local_path, file_ext
+        )
     
     if process_error:
         # Update record with error
         prescription.processing_status = "failed"
         prescription.error_message = process_error
-        db.commit()
-        db.refresh(prescription)
+        await db.commit()
         
         return success_response(
             message="Prescription uploaded but processing failed",
-            data=PrescriptionUploadResponse.from_orm(prescription).dict()
+            data=prescription_payload(PrescriptionUploadResponse, prescription),
+            status_code=status.HTTP_201_CREATED
         )
     
-    # Update record with processed data
+    # Update record with processed data (medicines together with their
+    # medication index rows)
     prescription.extracted_text = extracted_text
-    prescription.medicines = medicines_json
-    prescription.simplified_explanation = explanation
+    await set_prescription_medicines(db, prescription, medicines)
     prescription.processing_status = "completed"
     
-    db.commit()
-    db.refresh(prescription)
+    await db.commit()
+    search_indexer.enqueue(DOC_PRESCRIPTION, prescription.id)
+    
+    data = prescription_payload(PrescriptionUploadResponse, prescription)
+    data["interactions"] = await check_prescription(db, current_user.id, prescription.id)
     
     return success_response(
         message="Prescription uploaded and processed successfully",
-        data=PrescriptionUploadResponse.from_orm(prescription).dict()
+        data=data,
+        status_code=status.HTTP_201_CREATED
     )
 
 
-@router.get("/list", response_model=dict)
+@router.get("/list", response_model=APIResponse[PrescriptionPage])
 async def get_prescriptions(
-    skip: int = 0,
-    limit: int = 20,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
-    Get list of user's prescriptions
+    Get list of user's prescriptions, newest first
     
     **Query Parameters:**
-    - skip: Number of records to skip (for pagination)
+    - cursor: `next_cursor` from the previous page (omit for the first page)
     - limit: Maximum number of records to return
     
     **Returns:**
     - List of prescription summaries
+    - Total number of prescriptions and the cursor for the next page
     """
     
-    prescriptions = db.query(Prescription)\
-        .filter(Prescription.user_id == current_user.id)\
-        .order_by(Prescription.created_at.desc())\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
+    # Plain column rows: no ORM identities, no TEXT columns read
+    query = select(*LIST_COLUMNS).where(
+        Prescription.user_id == current_user.id,
+        Prescription.deleted_at.is_(None)
+    )
+    cursor_filter = after_cursor(Prescription, cursor)
+    if cursor_filter is not None:
+        query = query.where(cursor_filter)
+    
+    result = await db.execute(
+        query
+        .order_by(Prescription.created_at.desc(), Prescription.id.desc())
+        .limit(limit + 1)
+    )
+    rows = result.all()
     
-    prescription_list = [
-        PrescriptionListItem.from_orm(p).dict() for p in prescriptions
-    ]
+    prescription_list = [row._asdict() for row in rows[:limit]]
+    stats = await get_user_stats(db, current_user.id)
     
     return success_response(
         message=f"Retrieved {len(prescription_list)} prescription(s)",
         data={
             "prescriptions": prescription_list,
-            "total": len(prescription_list),
-            "skip": skip,
-            "limit": limit
+            "total": stats.prescription_count,
+            "limit": limit,
+            "next_cursor": next_cursor(rows, limit)
         }
     )
 
 
-@router.get("/{prescription_id}", response_model=dict)
+@router.get("/medications", response_model=APIResponse[MedicationList])
+async def get_medications(
+    active_only: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get the user's medications across all prescriptions
+    
+    **Query Parameters:**
+    - active_only: Only medications still being taken
+    
+    **Returns:**
+    - One entry per drug (brand names resolved to the generic drug) with
+      the prescriptions it appears in and until when it is active
+    """
+    
+    medications = await medication_history(db, current_user.id, active_only)
+    
+    return success_response(
+        message=f"Retrieved {len(medications)} medication(s)",
+        data={"medications": medications, "total": len(medications)}
+    )
+
+
+@router.get("/doses/upcoming", response_model=APIResponse[UpcomingDoses])
+async def get_upcoming_doses(
+    hours: int = Query(24, ge=1, le=168),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get the user's doses due in the next hours
+    
+    **Query Parameters:**
+    - hours: Window length (default 24, up to a week)
+    
+    **Returns:**
+    - Doses across all prescriptions, soonest first
+    """
+    
+    doses = await upcoming_doses(db, current_user.id, hours)
+    
+    return success_response(
+        message=f"{len(doses)} dose(s) due in the next {hours} hour(s)",
+        data={"doses": doses, "hours": hours}
+    )
+
+
+async def _require_prescription(db: AsyncSession, user_id: int, prescription_id: int) -> None:
+    """404 unless the prescription exists, belongs to the user and is not deleted"""
+    found = await db.scalar(
+        select(Prescription.id).where(
+            Prescription.id == prescription_id,
+            Prescription.user_id == user_id,
+            Prescription.deleted_at.is_(None)
+        )
+    )
+    if found is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Prescription not found"
+        )
+
+
+@router.get("/{prescription_id}", response_model=APIResponse[PrescriptionDetail])
 async def get_prescription_detail(
     prescription_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get detailed information about a specific prescription
@@ -337,12 +345,15 @@ async def get_prescription_detail(
     - Complete prescription details including extracted text and explanations
     """
     
-    prescription = db.query(Prescription)\
-        .filter(
+    prescription = await db.scalar(
+        select(Prescription)
+        .options(undefer_group(CONTENT_GROUP))
+        .where(
             Prescription.id == prescription_id,
-            Prescription.user_id == current_user.id
-        )\
-        .first()
+            Prescription.user_id == current_user.id,
+            Prescription.deleted_at.is_(None)
+        )
+    )
     
     if not prescription:
         raise HTTPException(
@@ -352,15 +363,67 @@ async def get_prescription_detail(
     
     return success_response(
         message="Prescription retrieved successfully",
-        data=PrescriptionDetail.from_orm(prescription).dict()
+        data=prescription_payload(PrescriptionDetail, prescription)
+    )
+
+
+@router.get("/{prescription_id}/interactions", response_model=APIResponse[InteractionCheck])
+async def get_prescription_interactions(
+    prescription_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Check a prescription against the user's active medications
+    
+    **Path Parameters:**
+    - prescription_id: ID of the prescription
+    
+    **Returns:**
+    - Interactions between its drugs and the user's other active
+      medications (and between its own drugs), most severe first
+    """
+    
+    await _require_prescription(db, current_user.id, prescription_id)
+    interactions = await check_prescription(db, current_user.id, prescription_id)
+    
+    return success_response(
+        message=f"Found {len(interactions)} interaction(s)",
+        data={"prescription_id": prescription_id, "interactions": interactions}
+    )
+
+
+@router.get("/{prescription_id}/schedule", response_model=APIResponse[PrescriptionSchedule])
+async def get_prescription_schedule(
+    prescription_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get a prescription's dose schedule
+    
+    **Path Parameters:**
+    - prescription_id: ID of the prescription
+    
+    **Returns:**
+    - One schedule per medicine with a recognised frequency (e.g. 1-0-1,
+      BD): dose times, meal timing, course dates and the next due dose
+    """
+    
+    await _require_prescription(db, current_user.id, prescription_id)
+    schedules = await prescription_schedule(db, prescription_id)
+    
+    return success_response(
+        message=f"Retrieved {len(schedules)} schedule(s)",
+        data={"prescription_id": prescription_id, "schedules": schedules}
     )
 
 
-@router.delete("/{prescription_id}", response_model=dict)
+@router.delete("/{prescription_id}", response_model=GenericResponse)
 async def delete_prescription(
     prescription_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Delete a prescription
@@ -372,29 +435,30 @@ async def delete_prescription(
     - Confirmation message
     """
     
-    prescription = db.query(Prescription)\
-        .filter(
+    # Soft delete: the row and its file are purged by the maintenance task,
+    # so the request never waits on file storage
+    result = await db.execute(
+        update(Prescription)
+        .where(
             Prescription.id == prescription_id,
-            Prescription.user_id == current_user.id
-        )\
-        .first()
+            Prescription.user_id == current_user.id,
+            Prescription.deleted_at.is_(None)
+        )
+        .values(deleted_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
     
-    if not prescription:
+    if result.rowcount == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Prescription not found"
         )
     
-    # Delete file from disk
-    try:
-        if os.path.exists(prescription.file_path):
-            os.remove(prescription.file_path)
-    except Exception as e:
-        print(f"Warning: Could not delete file {prescription.file_path}: {e}")
-    
-    # Delete from database
-    db.delete(prescription)
-    db.commit()
+    await adjust_user_stats(db, current_user.id, prescription_count=-1)
+    await remove_documents(db, DOC_PRESCRIPTION, [prescription_id])
+    await remove_prescription_medicines(db, [prescription_id])
+    await db.commit()
+    maintenance.request_purge()
     
     return success_response(
         message="Prescription deleted successfully",
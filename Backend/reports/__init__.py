@@ -0,0 +1 @@
+# Medical report module
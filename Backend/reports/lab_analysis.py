@@ -0,0 +1,264 @@
+"""
+Lab Result Analysis
+
+This module handles:
+- Reference range lookup by age and sex
+- Flagging every reading of a report in one vectorised NumPy pass
+- Overall risk level, summary and recommendations
+
+The lexicon is flattened into arrays once at import. The bounds for an
+(age, sex) pair are resolved once and cached, so analysing a report is a
+fixed handful of array operations however many analytes it contains.
+"""
+
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from reports.lab_lexicon import LAB_TESTS, LabReading, conversion_factor
+
+# Adult ranges apply when the patient's age is unknown
+DEFAULT_AGE = 30
+
+SEX_CODES = {"any": 0, "male": 1, "female": 2}
+
+TEST_INDEX = {test.key: i for i, test in enumerate(LAB_TESTS)}
+
+
+def _bound(value: Optional[float], unbounded: float) -> float:
+    return unbounded if value is None else float(value)
+
+
+def _range_table():
+    rows = [
+        (i, SEX_CODES[r.sex], r.ages[0], r.ages[1], _bound(r.low, -np.inf), _bound(r.high, np.inf))
+        for i, test in enumerate(LAB_TESTS)
+        for r in test.ranges
+    ]
+    columns = [np.array(column) for column in zip(*rows)]
+    test, sex = (column.astype(np.intp) for column in columns[:2])
+    age_min, age_max, low, high = (column.astype(np.float64) for column in columns[2:])
+    return test, sex, age_min, age_max, low, high
+
+
+# One entry per ReferenceRange; unbounded sides are -inf/+inf
+RANGE_TEST, RANGE_SEX, RANGE_AGE_MIN, RANGE_AGE_MAX, RANGE_LOW, RANGE_HIGH = _range_table()
+
+# Per test; NaN = no critical threshold on that side
+CRITICAL_LOW = np.array([_bound(test.critical_low, np.nan) for test in LAB_TESTS])
+CRITICAL_HIGH = np.array([_bound(test.critical_high, np.nan) for test in LAB_TESTS])
+
+STATUS_CHOICES = ["critical_low", "critical_high", "low", "high", "normal"]
+ABNORMAL_STATUSES = {"critical_low", "critical_high", "low", "high"}
+
+
+@lru_cache(maxsize=1024)
+def reference_bounds(age: int, sex: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Normal interval of every test for one patient profile
+
+    A sex-specific band takes precedence over an "any" band. With sex
+    unknown, the male and female bands are merged into the wider interval.
+
+    Args:
+        age: Age in whole years
+        sex: male, female or any
+
+    Returns:
+        (low, high) arrays indexed like LAB_TESTS; NaN where no band covers the patient
+    """
+    in_age = (RANGE_AGE_MIN <= age) & (age < RANGE_AGE_MAX)
+    low = np.full(len(LAB_TESTS), np.nan)
+    high = np.full(len(LAB_TESTS), np.nan)
+
+    code = SEX_CODES.get(sex, 0)
+    if code:
+        # Generic bands first, then the sex-specific ones overwrite them
+        for mask in (in_age & (RANGE_SEX == 0), in_age & (RANGE_SEX == code)):
+            low[RANGE_TEST[mask]] = RANGE_LOW[mask]
+            high[RANGE_TEST[mask]] = RANGE_HIGH[mask]
+    else:
+        # fmin/fmax skip the NaN fill, so the first band per test seeds the interval
+        np.fmin.at(low, RANGE_TEST[in_age], RANGE_LOW[in_age])
+        np.fmax.at(high, RANGE_TEST[in_age], RANGE_HIGH[in_age])
+
+    low.setflags(write=False)
+    high.setflags(write=False)
+    return low, high
+
+
+def format_range(low: float, high: float, unit: str) -> Optional[str]:
+    """Human-readable reference interval, e.g. "12-15.5 g/dL" or "< 200 mg/dL" """
+    if np.isnan(low):
+        return None
+    if np.isinf(low):
+        return f"< {high:g} {unit}"
+    if np.isinf(high):
+        return f"> {low:g} {unit}"
+    return f"{low:g}-{high:g} {unit}"
+
+
+@dataclass
+class LabAnalysis:
+    """Structured result of analysing one report"""
+    detected_values: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    abnormalities: List[Dict[str, Any]] = field(default_factory=list)
+    risk_level: Optional[str] = None  # low, medium, high (None when nothing was read)
+
+
+def analyze_readings(readings: List[LabReading], age: Optional[int] = None, gender: Optional[str] = None) -> LabAnalysis:
+    """
+    Check every reading against its reference range
+
+    Args:
+        readings: Values extracted from the report
+        age: Patient age in years (adult ranges when unknown)
+        gender: male or female; anything else uses ranges valid for both
+
+    Returns:
+        Detected values keyed by analyte, abnormal values (most severe
+        first) and the overall risk level
+    """
+    if not readings:
+        return LabAnalysis()
+
+    idx = np.fromiter((TEST_INDEX[r.key] for r in readings), dtype=np.intp, count=len(readings))
+    reported = np.fromiter((r.value for r in readings), dtype=np.float64, count=len(readings))
+    factors = np.fromiter(
+        (_bound(conversion_factor(LAB_TESTS[i], r.unit), np.nan) for i, r in zip(idx, readings)),
+        dtype=np.float64, count=len(readings)
+    )
+
+    low_bounds, high_bounds = reference_bounds(int(age) if age else DEFAULT_AGE, gender if gender in SEX_CODES else "any")
+    values = reported * factors  # NaN for units that cannot be converted
+    low = low_bounds[idx]
+    high = high_bounds[idx]
+
+    below = values < low  # NaN compares False: no range or unknown unit is never flagged
+    above = values > high
+    critical_low = values < CRITICAL_LOW[idx]
+    critical_high = values > CRITICAL_HIGH[idx]
+    checked = ~np.isnan(values) & ~np.isnan(low)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        deviation = np.where(below, (low - values) / np.abs(low), np.where(above, (values - high) / np.abs(high), 0.0))
+    deviation = np.nan_to_num(deviation, nan=0.0, posinf=1.0)
+
+    status = np.select([critical_low, critical_high, below, above, checked], STATUS_CHOICES, "unknown")
+
+    abnormal = below | above
+    if (critical_low | critical_high).any() or (deviation >= 0.5).any():
+        risk_level = "high"
+    elif abnormal.sum() >= 3 or (deviation >= 0.2).any():
+        risk_level = "medium"
+    else:
+        risk_level = "low"
+
+    analysis = LabAnalysis(risk_level=risk_level)
+    for n, reading in enumerate(readings):
+        test = LAB_TESTS[idx[n]]
+        converted = not np.isnan(values[n])
+        entry = {
+            "name": test.name,
+            "category": test.category,
+            "value": round(float(values[n]), 2) if converted else reading.value,
+            "unit": test.unit if converted else reading.unit,
+            "reported_value": reading.value,
+            "reported_unit": reading.unit,
+            "reference_range": format_range(low[n], high[n], test.unit),
+            "status": str(status[n]),
+        }
+        analysis.detected_values[test.key] = entry
+
+        if entry["status"] in ABNORMAL_STATUSES:
+            analysis.abnormalities.append({
+                "analyte": test.key,
+                "name": test.name,
+                "category": test.category,
+                "value": entry["value"],
+                "unit": entry["unit"],
+                "status": entry["status"],
+                "reference_range": entry["reference_range"],
+                "deviation_percent": round(float(deviation[n]) * 100, 1),
+            })
+
+    analysis.abnormalities.sort(key=lambda a: (not a["status"].startswith("critical"), -a["deviation_percent"]))
+    return analysis
+
+
+STATUS_LABELS = {
+    "critical_low": "critically low",
+    "critical_high": "critically high",
+    "low": "low",
+    "high": "high",
+}
+
+CATEGORY_ADVICE = {
+    "Blood Cells": "Ask your doctor whether your blood counts need follow-up tests (for example iron, B12 or folate levels).",
+    "Differential Count": "Changes in white cell types often follow infections - ask your doctor whether a repeat count is needed.",
+    "Blood Sugar": "Limit sugary drinks and refined carbohydrates, stay active, and ask your doctor about repeat glucose testing.",
+    "Lipid Profile": "Favour vegetables, whole grains and unsaturated fats, exercise regularly, and review your heart risk with your doctor.",
+    "Kidney Function": "Drink enough water and avoid over-the-counter painkillers (NSAIDs) until you have discussed these results with your doctor.",
+    "Electrolytes": "Electrolyte changes can be caused by medicines, vomiting or diarrhoea - tell your doctor about any of these.",
+    "Liver Function": "Avoid alcohol and unnecessary medicines or supplements until your doctor has reviewed your liver results.",
+    "Thyroid": "Thyroid results are usually confirmed with a repeat test - ask your doctor before starting or changing any treatment.",
+    "Vitamins & Minerals": "Ask your doctor whether diet changes or supplements are right for you - do not start high doses on your own.",
+}
+
+REPORT_DISCLAIMER = (
+    "This is an automated reading of your report, not a diagnosis. Reference ranges differ between "
+    "laboratories - always confirm these results with your doctor."
+)
+
+
+def _describe(item: Dict[str, Any]) -> str:
+    reference = f"; reference {item['reference_range']}" if item.get("reference_range") else ""
+    return f"{item['name']}: {item['value']:g} {item['unit']} ({STATUS_LABELS[item['status']]}{reference})"
+
+
+def render_summary(analysis: LabAnalysis) -> str:
+    """Plain-language summary of the analysis"""
+    if not analysis.detected_values:
+        return (
+            "No lab test values could be read from this report. Upload a clear image or the original PDF, "
+            "or review the extracted text below.\n\n" + REPORT_DISCLAIMER
+        )
+
+    total = len(analysis.detected_values)
+    categories = len({entry["category"] for entry in analysis.detected_values.values()})
+    normal = sum(1 for entry in analysis.detected_values.values() if entry["status"] == "normal")
+
+    lines = [f"Analyzed {total} test result(s) across {categories} categor{'y' if categories == 1 else 'ies'}.", ""]
+    lines.append(f"✅ {normal} within the reference range.")
+    if analysis.abnormalities:
+        lines.append(f"⚠️ {len(analysis.abnormalities)} outside the reference range:")
+        lines.extend(f"• {_describe(item)}" for item in analysis.abnormalities)
+    unchecked = total - normal - len(analysis.abnormalities)
+    if unchecked:
+        lines.append(f"• {unchecked} value(s) could not be checked (unrecognised unit or no range for your profile).")
+    lines.extend(["", REPORT_DISCLAIMER])
+    return "\n".join(lines)
+
+
+def render_recommendations(analysis: LabAnalysis) -> Optional[str]:
+    """Follow-up suggestions, one per line (None when nothing was read)"""
+    if not analysis.detected_values:
+        return None
+
+    critical = [a["name"] for a in analysis.abnormalities if a["status"].startswith("critical")]
+    other = [a["name"] for a in analysis.abnormalities if not a["status"].startswith("critical")]
+
+    lines = []
+    if critical:
+        lines.append(f"Contact your doctor promptly about: {', '.join(critical)}.")
+    if other:
+        lines.append(f"Discuss these results at your next doctor's visit: {', '.join(other)}.")
+    for category in dict.fromkeys(a["category"] for a in analysis.abnormalities):
+        if category in CATEGORY_ADVICE:
+            lines.append(CATEGORY_ADVICE[category])
+    if not analysis.abnormalities:
+        lines.append("All recognised values are within their reference ranges - keep up your routine check-ups.")
+    lines.append("Keep this report to compare with future tests and track changes over time.")
+    return "\n".join(lines)
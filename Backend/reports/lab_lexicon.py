@@ -0,0 +1,367 @@
+"""
+Lab Test Lexicon
+
+This module handles:
+- The catalogue of recognised lab tests (names, aliases, units, reference ranges)
+- Unit normalisation and conversion to each test's canonical unit
+- Extracting analyte/value/unit triples from OCR text
+
+All aliases are compiled into a single regular expression, so extraction is
+one scan over the report text instead of one search per test.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+# Ages are in years; upper bounds are exclusive
+ADULT = (18, 200)
+ANY_AGE = (0, 200)
+
+
+@dataclass(frozen=True)
+class ReferenceRange:
+    """Normal interval for one sex/age band (None = unbounded on that side)"""
+    low: Optional[float]
+    high: Optional[float]
+    sex: str = "any"  # any, male, female
+    ages: Tuple[float, float] = ANY_AGE
+
+
+@dataclass(frozen=True)
+class LabTest:
+    """A recognised analyte"""
+    key: str
+    name: str
+    category: str
+    unit: str  # canonical unit that ranges are expressed in
+    aliases: Tuple[str, ...]
+    ranges: Tuple[ReferenceRange, ...]
+    critical_low: Optional[float] = None
+    critical_high: Optional[float] = None
+    # Normalised unit -> factor converting a value in that unit to the canonical unit
+    conversions: Dict[str, float] = field(default_factory=dict)
+
+
+def R(low, high, sex="any", ages=ANY_AGE) -> ReferenceRange:
+    return ReferenceRange(low, high, sex, ages)
+
+
+COUNT_PER_UL = {
+    "/ul": 1, "cells/ul": 1, "/cumm": 1, "cells/cumm": 1, "/mm3": 1, "cells/mm3": 1,
+    "10^3/ul": 1e3, "thou/ul": 1e3, "k/ul": 1e3, "10^9/l": 1e3, "10^3/cumm": 1e3,
+}
+
+MG_DL_CHOLESTEROL = {"mmol/l": 38.67}
+
+LAB_TESTS: List[LabTest] = [
+    # Blood cells
+    LabTest("hemoglobin", "Hemoglobin", "Blood Cells", "g/dL",
+            ("hemoglobin", "haemoglobin", "hb", "hgb"),
+            (R(11.0, 14.5, ages=(1, 12)), R(13.5, 17.5, "male", (12, 200)), R(12.0, 15.5, "female", (12, 200))),
+            critical_low=7.0, critical_high=20.0, conversions={"g/l": 0.1, "mmol/l": 1.611}),
+    LabTest("hematocrit", "Hematocrit", "Blood Cells", "%",
+            ("hematocrit", "haematocrit", "hct", "pcv", "packed cell volume"),
+            (R(41, 53, "male"), R(36, 46, "female")),
+            critical_low=20, critical_high=60),
+    LabTest("rbc", "RBC Count", "Blood Cells", "million/uL",
+            ("rbc count", "rbc", "red blood cell count", "red cell count", "total rbc count", "erythrocyte count"),
+            (R(4.5, 5.9, "male"), R(4.1, 5.1, "female")),
+            conversions={"10^6/ul": 1, "10^12/l": 1, "mill/cumm": 1, "million/cumm": 1, "millions/cumm": 1,
+                         "mil/ul": 1, "m/ul": 1}),
+    LabTest("wbc", "White Blood Cells", "Blood Cells", "cells/uL",
+            ("wbc count", "wbc", "white blood cell count", "white cell count", "total leucocyte count",
+             "total leukocyte count", "tlc", "total wbc count", "leukocyte count", "leucocyte count"),
+            (R(4000, 11000),),
+            critical_low=2000, critical_high=30000, conversions=COUNT_PER_UL),
+    LabTest("platelets", "Platelets", "Blood Cells", "cells/uL",
+            ("platelet count", "platelets", "plt", "platelet"),
+            (R(150000, 450000),),
+            critical_low=50000, critical_high=1000000,
+            conversions={**COUNT_PER_UL, "lakhs/cumm": 1e5, "lakh/cumm": 1e5, "lakhs/ul": 1e5}),
+    LabTest("mcv", "MCV", "Blood Cells", "fL", ("mcv", "mean corpuscular volume"), (R(80, 100),)),
+    LabTest("mch", "MCH", "Blood Cells", "pg",
+            ("mch", "mean corpuscular hemoglobin", "mean corpuscular haemoglobin"), (R(27, 33),)),
+    LabTest("mchc", "MCHC", "Blood Cells", "g/dL",
+            ("mchc", "mean corpuscular hemoglobin concentration", "mean corpuscular haemoglobin concentration"),
+            (R(32, 36),), conversions={"g/l": 0.1}),
+    LabTest("rdw", "RDW", "Blood Cells", "%", ("rdw", "rdw cv", "red cell distribution width"), (R(11.5, 14.5),)),
+    LabTest("esr", "ESR", "Blood Cells", "mm/hr",
+            ("esr", "erythrocyte sedimentation rate"), (R(0, 15, "male"), R(0, 20, "female"))),
+    LabTest("neutrophils", "Neutrophils", "Differential Count", "%", ("neutrophils", "polymorphs"), (R(40, 75),)),
+    LabTest("lymphocytes", "Lymphocytes", "Differential Count", "%", ("lymphocytes",), (R(20, 45),)),
+    LabTest("monocytes", "Monocytes", "Differential Count", "%", ("monocytes",), (R(2, 10),)),
+    LabTest("eosinophils", "Eosinophils", "Differential Count", "%", ("eosinophils",), (R(1, 6),)),
+    LabTest("basophils", "Basophils", "Differential Count", "%", ("basophils",), (R(0, 2),)),
+
+    # Blood sugar
+    LabTest("glucose_fasting", "Fasting Blood Glucose", "Blood Sugar", "mg/dL",
+            ("fasting blood sugar", "fbs", "fasting blood glucose", "fasting glucose", "fasting plasma glucose",
+             "glucose fasting", "blood sugar fasting", "plasma glucose fasting"),
+            (R(70, 100),), critical_low=54, critical_high=400, conversions={"mmol/l": 18.0}),
+    LabTest("glucose_pp", "Post-Meal Blood Glucose", "Blood Sugar", "mg/dL",
+            ("ppbs", "post prandial blood sugar", "postprandial blood sugar", "post prandial glucose",
+             "postprandial glucose", "glucose pp", "glucose post prandial", "blood sugar pp"),
+            (R(70, 140),), critical_low=54, critical_high=400, conversions={"mmol/l": 18.0}),
+    LabTest("glucose", "Blood Glucose", "Blood Sugar", "mg/dL",
+            ("random blood sugar", "rbs", "random glucose", "blood glucose", "blood sugar", "glucose",
+             "plasma glucose"),
+            (R(70, 140),), critical_low=54, critical_high=400, conversions={"mmol/l": 18.0}),
+    LabTest("hba1c", "HbA1c", "Blood Sugar", "%",
+            ("hba1c", "hb a1c", "glycated hemoglobin", "glycated haemoglobin", "glycosylated hemoglobin",
+             "glycosylated haemoglobin", "hemoglobin a1c", "haemoglobin a1c", "a1c"),
+            (R(4.0, 5.6),)),
+
+    # Lipid profile
+    LabTest("cholesterol_total", "Total Cholesterol", "Lipid Profile", "mg/dL",
+            ("total cholesterol", "cholesterol total", "serum cholesterol", "cholesterol"),
+            (R(None, 200),), conversions=MG_DL_CHOLESTEROL),
+    LabTest("ldl", "LDL Cholesterol", "Lipid Profile", "mg/dL",
+            ("ldl cholesterol", "ldl", "ldl c", "low density lipoprotein"),
+            (R(None, 100),), conversions=MG_DL_CHOLESTEROL),
+    LabTest("hdl", "HDL Cholesterol", "Lipid Profile", "mg/dL",
+            ("hdl cholesterol", "hdl", "hdl c", "high density lipoprotein"),
+            (R(40, None, "male"), R(50, None, "female")), conversions=MG_DL_CHOLESTEROL),
+    LabTest("vldl", "VLDL Cholesterol", "Lipid Profile", "mg/dL",
+            ("vldl cholesterol", "vldl"), (R(5, 40),), conversions=MG_DL_CHOLESTEROL),
+    LabTest("triglycerides", "Triglycerides", "Lipid Profile", "mg/dL",
+            ("triglycerides", "triglyceride", "tg", "serum triglycerides"),
+            (R(None, 150),), critical_high=1000, conversions={"mmol/l": 88.57}),
+
+    # Kidney function
+    LabTest("creatinine", "Creatinine", "Kidney Function", "mg/dL",
+            ("serum creatinine", "creatinine", "s creatinine"),
+            (R(0.3, 0.7, ages=(1, 12)), R(0.74, 1.35, "male", (12, 200)), R(0.59, 1.04, "female", (12, 200))),
+            critical_high=10, conversions={"umol/l": 1 / 88.4}),
+    LabTest("urea", "Blood Urea", "Kidney Function", "mg/dL",
+            ("blood urea", "urea", "serum urea"), (R(15, 40),), conversions={"mmol/l": 6.006}),
+    LabTest("bun", "BUN", "Kidney Function", "mg/dL",
+            ("blood urea nitrogen", "bun", "urea nitrogen"), (R(7, 20),), critical_high=100,
+            conversions={"mmol/l": 2.801}),
+    LabTest("uric_acid", "Uric Acid", "Kidney Function", "mg/dL",
+            ("uric acid", "serum uric acid"), (R(3.4, 7.0, "male"), R(2.4, 6.0, "female")),
+            conversions={"umol/l": 1 / 59.48}),
+    LabTest("egfr", "eGFR", "Kidney Function", "mL/min/1.73m2",
+            ("egfr", "estimated gfr", "estimated glomerular filtration rate"),
+            (R(60, None),), critical_low=15, conversions={"ml/min": 1}),
+    LabTest("sodium", "Sodium", "Electrolytes", "mmol/L",
+            ("sodium", "serum sodium", "na+"), (R(135, 145),), critical_low=120, critical_high=160,
+            conversions={"meq/l": 1}),
+    LabTest("potassium", "Potassium", "Electrolytes", "mmol/L",
+            ("potassium", "serum potassium", "k+"), (R(3.5, 5.1),), critical_low=2.5, critical_high=6.5,
+            conversions={"meq/l": 1}),
+    LabTest("chloride", "Chloride", "Electrolytes", "mmol/L",
+            ("chloride", "serum chloride", "cl-"), (R(98, 107),), conversions={"meq/l": 1}),
+    LabTest("calcium", "Calcium", "Electrolytes", "mg/dL",
+            ("calcium", "serum calcium", "total calcium"), (R(8.5, 10.5),), critical_low=6.0, critical_high=13.0,
+            conversions={"mmol/l": 4.008}),
+
+    # Liver function
+    LabTest("bilirubin_total", "Total Bilirubin", "Liver Function", "mg/dL",
+            ("total bilirubin", "bilirubin total", "serum bilirubin", "bilirubin"),
+            (R(0.1, 1.2),), critical_high=15, conversions={"umol/l": 1 / 17.1}),
+    LabTest("bilirubin_direct", "Direct Bilirubin", "Liver Function", "mg/dL",
+            ("direct bilirubin", "bilirubin direct", "conjugated bilirubin"),
+            (R(0.0, 0.3),), conversions={"umol/l": 1 / 17.1}),
+    LabTest("bilirubin_indirect", "Indirect Bilirubin", "Liver Function", "mg/dL",
+            ("indirect bilirubin", "bilirubin indirect", "unconjugated bilirubin"),
+            (R(0.2, 0.8),), conversions={"umol/l": 1 / 17.1}),
+    LabTest("alt", "ALT (SGPT)", "Liver Function", "U/L",
+            ("alt", "sgpt", "alanine aminotransferase", "alanine transaminase"),
+            (R(7, 56),), conversions={"iu/l": 1}),
+    LabTest("ast", "AST (SGOT)", "Liver Function", "U/L",
+            ("ast", "sgot", "aspartate aminotransferase", "aspartate transaminase"),
+            (R(10, 40),), conversions={"iu/l": 1}),
+    LabTest("alp", "Alkaline Phosphatase", "Liver Function", "U/L",
+            ("alkaline phosphatase", "alp"),
+            (R(100, 390, ages=(1, 18)), R(44, 147, ages=ADULT)), conversions={"iu/l": 1}),
+    LabTest("ggt", "GGT", "Liver Function", "U/L",
+            ("ggt", "gamma gt", "gamma glutamyl transferase", "ggtp"),
+            (R(8, 61, "male"), R(5, 36, "female")), conversions={"iu/l": 1}),
+    LabTest("total_protein", "Total Protein", "Liver Function", "g/dL",
+            ("total protein", "protein total", "serum protein"), (R(6.0, 8.3),), conversions={"g/l": 0.1}),
+    LabTest("albumin", "Albumin", "Liver Function", "g/dL",
+            ("albumin", "serum albumin"), (R(3.5, 5.0),), conversions={"g/l": 0.1}),
+
+    # Thyroid
+    LabTest("tsh", "TSH", "Thyroid", "uIU/mL",
+            ("tsh", "thyroid stimulating hormone", "tsh ultrasensitive"), (R(0.4, 4.0),),
+            conversions={"miu/l": 1, "uiu/ml": 1, "mu/l": 1}),
+    LabTest("t3", "Total T3", "Thyroid", "ng/dL",
+            ("t3", "total t3", "triiodothyronine", "t3 total"), (R(80, 200),), conversions={"nmol/l": 65.1}),
+    LabTest("t4", "Total T4", "Thyroid", "ug/dL",
+            ("t4", "total t4", "thyroxine", "t4 total"), (R(5.0, 12.0),), conversions={"nmol/l": 1 / 12.87}),
+    LabTest("free_t3", "Free T3", "Thyroid", "pg/mL",
+            ("free t3", "ft3"), (R(2.3, 4.2),), conversions={"pmol/l": 0.651}),
+    LabTest("free_t4", "Free T4", "Thyroid", "ng/dL",
+            ("free t4", "ft4"), (R(0.8, 1.8),), conversions={"pmol/l": 1 / 12.87}),
+
+    # Vitamins and minerals
+    LabTest("vitamin_d", "Vitamin D (25-OH)", "Vitamins & Minerals", "ng/mL",
+            ("vitamin d", "vit d", "25 oh vitamin d", "25 hydroxy vitamin d", "vitamin d total"),
+            (R(30, 100),), conversions={"nmol/l": 0.4}),
+    LabTest("vitamin_b12", "Vitamin B12", "Vitamins & Minerals", "pg/mL",
+            ("vitamin b12", "vit b12", "b12", "cobalamin"), (R(200, 900),), conversions={"pmol/l": 1.355}),
+    LabTest("iron", "Serum Iron", "Vitamins & Minerals", "ug/dL",
+            ("serum iron", "iron"), (R(65, 175, "male"), R(50, 170, "female")), conversions={"umol/l": 5.585}),
+    LabTest("ferritin", "Ferritin", "Vitamins & Minerals", "ng/mL",
+            ("ferritin", "serum ferritin"), (R(24, 336, "male"), R(11, 307, "female")), conversions={"ug/l": 1}),
+]
+
+LAB_TESTS_BY_KEY: Dict[str, LabTest] = {test.key: test for test in LAB_TESTS}
+
+# Words between two alias tokens may be joined by spaces, commas, dots, hyphens or brackets
+_ALIAS_SEPARATOR = r"[ \t,.\-()]+"
+
+
+def _alias_lookup_key(alias: str) -> str:
+    """Matched alias text -> ALIAS_TO_KEY key ("RDW-CV" and "rdw cv" are the same alias)"""
+    return " ".join(part for part in re.split(_ALIAS_SEPARATOR, alias.lower()) if part)
+
+
+def _build_alias_index():
+    alias_to_key: Dict[str, str] = {}
+    for test in LAB_TESTS:
+        for alias in test.aliases:
+            if alias_to_key.setdefault(_alias_lookup_key(alias), test.key) != test.key:
+                raise ValueError(f"Lab alias {alias!r} is used by two tests")
+    return alias_to_key
+
+
+def _trie_pattern(aliases) -> str:
+    """
+    Regex alternation for the aliases, factored into a prefix tree
+
+    A flat "a|b|c|..." makes the engine try every alias at every position of
+    the text; the tree shares prefixes, so each position costs one branch
+    per distinct next character. Longer continuations are tried first, so
+    "hemoglobin a1c" still wins over "hemoglobin".
+    """
+    _END = ""
+    tree: Dict[str, dict] = {}
+    for alias in aliases:
+        node = tree
+        for i, word in enumerate(alias.lower().split()):
+            if i:
+                node = node.setdefault(" ", {})
+            for char in word:
+                node = node.setdefault(char, {})
+        node[_END] = {}
+
+    def render(node: dict) -> str:
+        branches = [
+            (_ALIAS_SEPARATOR if unit == " " else re.escape(unit)) + render(child)
+            for unit, child in sorted(node.items())
+            if unit != _END
+        ]
+        if _END in node:
+            branches.append("")
+        if len(branches) == 1:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")"
+
+    return render(tree)
+
+
+ALIAS_TO_KEY = _build_alias_index()
+
+# One pass over the text: alias, an optional short qualifier such as "(Serum)"
+# or ", Fasting", the value, then an optional unit - all on the same line
+LAB_VALUE_PATTERN = re.compile(
+    r"(?<![A-Za-z0-9])(?P<alias>" + _trie_pattern(a for test in LAB_TESTS for a in test.aliases) + r")(?![A-Za-z0-9])"
+    r"(?P<gap>[^\S\n]*(?:[(\[][^\n)\]]{0,30}[)\]])?[^\n\d]{0,25}?)"
+    r"(?P<value>\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?)"
+    r"(?:[^\S\n]*(?P<unit>(?:x\s?)?10\s?\^\s?\d+\s?/\s?[a-zA-Zµμ]+|[a-zA-Zµμ%/][^\s(\[]*))?",
+    re.IGNORECASE,
+)
+
+# Words that change what a number means ("LDL/HDL ratio 2.5", "Absolute neutrophils 4.2",
+# "Urine glucose 30")
+_DISQUALIFYING_GAP = re.compile(r"ratio|/|index", re.IGNORECASE)
+_DISQUALIFYING_PREFIX = re.compile(r"(?:absolute|abs\.?|urine|urinary|ratio|/)\s*$", re.IGNORECASE)
+
+# Abnormal-result flags printed where a unit would be ("13.5 H", "11.2 Low")
+_RESULT_FLAGS = {"h", "l", "high", "low", "*", "hi", "lo", "n", "normal"}
+
+_UNIT_REPLACEMENTS = (
+    ("µ", "u"), ("μ", "u"), ("mcg", "ug"), ("cu.mm", "cumm"), ("cu mm", "cumm"), ("cmm", "cumm"),
+    ("x10", "10"), ("×10", "10"), ("10^3", "10^3"), ("lacs", "lakhs"), ("lac", "lakh"),
+)
+
+
+def normalise_unit(unit: Optional[str]) -> Optional[str]:
+    """Lower-case a unit and smooth over common OCR/lab spelling variants"""
+    if not unit:
+        return None
+    unit = unit.strip().rstrip(".,;:").lower()
+    for old, new in _UNIT_REPLACEMENTS:
+        unit = unit.replace(old, new)
+    unit = "".join(unit.split())
+    if unit.startswith("cumm"):
+        unit = "/" + unit
+    return unit or None
+
+
+def conversion_factor(test: LabTest, unit: Optional[str]) -> Optional[float]:
+    """
+    Factor converting a reported value to the test's canonical unit
+
+    Returns:
+        1.0 for the canonical unit or a missing unit, the conversion factor
+        for a known alternative unit, or None for a unit that cannot be converted
+    """
+    normalised = normalise_unit(unit)
+    if normalised is None or normalised == normalise_unit(test.unit):
+        return 1.0
+    return test.conversions.get(normalised)
+
+
+@dataclass
+class LabReading:
+    """One analyte value found in a report"""
+    key: str
+    value: float  # in the reported unit
+    unit: Optional[str]
+    text: str  # matched source text
+
+
+def extract_lab_values(text: str) -> List[LabReading]:
+    """
+    Find lab test results in OCR text
+
+    Only the first reading of each analyte is kept (reports repeat names in
+    headers and interpretive notes further down).
+
+    Args:
+        text: Extracted report text
+
+    Returns:
+        Readings in the order they appear
+    """
+    readings: Dict[str, LabReading] = {}
+    if not text:
+        return []
+
+    for match in LAB_VALUE_PATTERN.finditer(text):
+        if _DISQUALIFYING_GAP.search(match.group("gap")):
+            continue
+        line_start = text.rfind("\n", 0, match.start()) + 1
+        if _DISQUALIFYING_PREFIX.search(text, line_start, match.start()):
+            continue
+
+        key = ALIAS_TO_KEY[_alias_lookup_key(match.group("alias"))]
+        if key in readings:
+            continue
+
+        unit = match.group("unit")
+        if unit is not None and unit.lower().rstrip(".") in _RESULT_FLAGS:
+            unit = None
+
+        readings[key] = LabReading(
+            key=key,
+            value=float(match.group("value").replace(",", "")),
+            unit=unit,
+            text=match.group(0).strip(),
+        )
+
+    return list(readings.values())
@@ -0,0 +1,339 @@
+"""
+Lab Trends
+
+This module handles:
+- Appending a report's lab values to the per-user time series
+- Maintaining running aggregates (latest, previous, min/max, least-squares
+  sums) in the same transaction
+- Rebuilding aggregates when a report is deleted
+- Turning an aggregate row into a trend (mean, slope per year, direction)
+
+A trend query is one primary-key read of lab_trends, so it costs the same
+for two observations as for twenty years of them.
+
+Usage (from the Backend directory - backfills reports analyzed before the
+time series existed; safe to re-run):
+    python -m reports.lab_trends
+"""
+
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import select, delete, update, insert, case, exists
+from sqlalchemy.exc import IntegrityError
+
+from models import LabObservation, LabTrend, MedicalReport
+from reports.lab_lexicon import LAB_TESTS_BY_KEY
+
+# Origin of the t axis for the least-squares sums. Recent origin keeps t
+# small, so n*sum_tt - sum_t**2 does not lose precision to cancellation.
+TREND_EPOCH = datetime(2020, 1, 1)
+
+DAYS_PER_YEAR = 365.25
+
+# A slope needs observations at least this far apart
+MIN_TREND_SPAN_DAYS = 1.0
+
+# Projected change per year, relative to the mean, below which a series is "stable"
+STABLE_CHANGE_PER_YEAR = 0.05
+
+
+def _utc_naive(at: datetime) -> datetime:
+    """Timestamps are stored as naive UTC"""
+    if at.tzinfo is not None:
+        at = at.astimezone(timezone.utc).replace(tzinfo=None)
+    return at
+
+
+def _days(at: datetime) -> float:
+    return (at - TREND_EPOCH).total_seconds() / 86400
+
+
+def trend_values(detected_values: Optional[Dict[str, Dict[str, Any]]]) -> Dict[str, float]:
+    """
+    Values of an analysis that can join a time series
+
+    Only readings converted to the lexicon's canonical unit are kept, so
+    every point of a series is comparable.
+
+    Args:
+        detected_values: MedicalReport.detected_values
+
+    Returns:
+        Analyte key -> value in the canonical unit
+    """
+    values = {}
+    for key, entry in (detected_values or {}).items():
+        test = LAB_TESTS_BY_KEY.get(key)
+        if test is not None and entry.get("unit") == test.unit and isinstance(entry.get("value"), (int, float)):
+            values[key] = float(entry["value"])
+    return values
+
+
+async def _update_trend(db, user_id: int, analyte: str, value: float, at: datetime) -> int:
+    """Fold one observation into an existing aggregate row; returns rows updated"""
+    t = _days(at)
+    is_latest = LabTrend.latest_at <= at
+    is_min = value < LabTrend.min_value
+    is_max = value > LabTrend.max_value
+
+    # MySQL evaluates SET assignments left to right with already-updated
+    # values, so every *_at / previous_* column is assigned before the column
+    # its condition reads
+    result = await db.execute(
+        update(LabTrend)
+        .where(LabTrend.user_id == user_id, LabTrend.analyte == analyte)
+        .ordered_values(
+            (LabTrend.previous_value, case((is_latest, LabTrend.latest_value), else_=LabTrend.previous_value)),
+            (LabTrend.previous_at, case((is_latest, LabTrend.latest_at), else_=LabTrend.previous_at)),
+            (LabTrend.latest_value, case((is_latest, value), else_=LabTrend.latest_value)),
+            (LabTrend.latest_at, case((is_latest, at), else_=LabTrend.latest_at)),
+            (LabTrend.min_at, case((is_min, at), else_=LabTrend.min_at)),
+            (LabTrend.min_value, case((is_min, value), else_=LabTrend.min_value)),
+            (LabTrend.max_at, case((is_max, at), else_=LabTrend.max_at)),
+            (LabTrend.max_value, case((is_max, value), else_=LabTrend.max_value)),
+            (LabTrend.first_at, case((LabTrend.first_at > at, at), else_=LabTrend.first_at)),
+            (LabTrend.count, LabTrend.count + 1),
+            (LabTrend.sum_t, LabTrend.sum_t + t),
+            (LabTrend.sum_v, LabTrend.sum_v + value),
+            (LabTrend.sum_tt, LabTrend.sum_tt + t * t),
+            (LabTrend.sum_tv, LabTrend.sum_tv + t * value),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+async def _add_to_trend(db, user_id: int, analyte: str, value: float, at: datetime) -> None:
+    """Fold one observation into the aggregate row (created if missing)"""
+    if await _update_trend(db, user_id, analyte, value, at):
+        return
+
+    t = _days(at)
+    try:
+        # Savepoint: two uploads can both introduce the analyte for the user.
+        # Executed now rather than added to the session, so a later update of
+        # the same row in this transaction finds it
+        async with db.begin_nested():
+            await db.execute(insert(LabTrend).values(
+                user_id=user_id, analyte=analyte, count=1, first_at=at,
+                latest_value=value, latest_at=at, previous_value=None, previous_at=None,
+                min_value=value, min_at=at, max_value=value, max_at=at,
+                sum_t=t, sum_v=value, sum_tt=t * t, sum_tv=t * value
+            ))
+    except IntegrityError:
+        # The other upload created the row first; add to it (UPDATE reads
+        # the latest committed version)
+        await _update_trend(db, user_id, analyte, value, at)
+
+
+async def record_observations(db, user_id: int, report_id: int, observed_at: datetime,
+                              detected_values: Optional[Dict[str, Dict[str, Any]]]) -> int:
+    """
+    Append a report's lab values to the user's series without committing
+
+    Call it in the same transaction that stores the analysis.
+
+    Args:
+        db: Async database session
+        user_id: Owner of the report
+        report_id: Report the values were read from
+        observed_at: Observation time (the report's created_at)
+        detected_values: MedicalReport.detected_values
+
+    Returns:
+        Number of observations recorded
+    """
+    values = trend_values(detected_values)
+    if not values:
+        return 0
+
+    at = _utc_naive(observed_at)
+    await db.execute(insert(LabObservation), [
+        {"user_id": user_id, "report_id": report_id, "analyte": analyte, "value": value, "observed_at": at}
+        for analyte, value in values.items()
+    ])
+    for analyte, value in values.items():
+        await _add_to_trend(db, user_id, analyte, value, at)
+    return len(values)
+
+
+async def rebuild_trends(db, user_id: int, analytes: Iterable[str]) -> None:
+    """
+    Recompute aggregate rows from the stored observations without committing
+
+    Min/max and latest cannot be un-folded, so removing observations
+    rebuilds the affected rows from the series (one indexed range read each).
+
+    Args:
+        db: Async database session
+        user_id: User whose trends changed
+        analytes: Analyte keys to rebuild
+    """
+    for analyte in set(analytes):
+        points = (await db.execute(
+            select(LabObservation.value, LabObservation.observed_at)
+            .where(LabObservation.user_id == user_id, LabObservation.analyte == analyte)
+            .order_by(LabObservation.observed_at, LabObservation.id)
+        )).all()
+
+        trend = await db.get(LabTrend, (user_id, analyte))
+        if not points:
+            if trend is not None:
+                await db.delete(trend)
+            continue
+
+        if trend is None:
+            trend = LabTrend(user_id=user_id, analyte=analyte)
+            db.add(trend)
+
+        ts = [_days(point.observed_at) for point in points]
+        lowest = min(points, key=lambda point: point.value)
+        highest = max(points, key=lambda point: point.value)
+        previous = points[-2] if len(points) > 1 else None
+
+        trend.count = len(points)
+        trend.first_at = points[0].observed_at
+        trend.latest_value, trend.latest_at = points[-1].value, points[-1].observed_at
+        trend.previous_value = previous.value if previous else None
+        trend.previous_at = previous.observed_at if previous else None
+        trend.min_value, trend.min_at = lowest.value, lowest.observed_at
+        trend.max_value, trend.max_at = highest.value, highest.observed_at
+        trend.sum_t = sum(ts)
+        trend.sum_v = sum(point.value for point in points)
+        trend.sum_tt = sum(t * t for t in ts)
+        trend.sum_tv = sum(t * point.value for t, point in zip(ts, points))
+
+
+async def remove_report_observations(db, user_id: int, report_id: int) -> None:
+    """
+    Drop a report's observations and rebuild the trends they were in
+
+    Runs when the report is soft-deleted. It must never follow the row's
+    hard delete: the foreign key cascades the observations away with it,
+    and the analytes to rebuild would be lost.
+
+    Args:
+        db: Async database session (caller commits)
+        user_id: Owner of the report
+        report_id: Report being deleted
+    """
+    owned = (LabObservation.report_id == report_id, LabObservation.user_id == user_id)
+    analytes = (await db.execute(
+        select(LabObservation.analyte).where(*owned).distinct()
+    )).scalars().all()
+    if not analytes:
+        return
+
+    await db.execute(
+        delete(LabObservation)
+        .where(*owned)
+        .execution_options(synchronize_session=False)
+    )
+    await rebuild_trends(db, user_id, analytes)
+
+
+def trend_slope(trend: LabTrend) -> Optional[float]:
+    """Least-squares slope in units per year (None below two points or a day of span)"""
+    n = trend.count
+    if n < 2 or _days(trend.latest_at) - _days(trend.first_at) < MIN_TREND_SPAN_DAYS:
+        return None
+    denominator = n * trend.sum_tt - trend.sum_t ** 2
+    if denominator <= 0:
+        return None
+    return (n * trend.sum_tv - trend.sum_t * trend.sum_v) / denominator * DAYS_PER_YEAR
+
+
+def trend_payload(trend: LabTrend) -> Dict[str, Any]:
+    """
+    Serialize an aggregate row as a trend
+
+    Args:
+        trend: LabTrend row
+
+    Returns:
+        Trend data dictionary (LabTrendItem)
+    """
+    test = LAB_TESTS_BY_KEY.get(trend.analyte)
+    mean = trend.sum_v / trend.count
+    slope = trend_slope(trend)
+
+    direction = None
+    if slope is not None:
+        relative = slope / abs(mean) if mean else 0.0
+        if relative > STABLE_CHANGE_PER_YEAR:
+            direction = "rising"
+        elif relative < -STABLE_CHANGE_PER_YEAR:
+            direction = "falling"
+        else:
+            direction = "stable"
+
+    return {
+        "analyte": trend.analyte,
+        "name": test.name if test else trend.analyte,
+        "category": test.category if test else None,
+        "unit": test.unit if test else None,
+        "count": trend.count,
+        "first_at": trend.first_at,
+        "latest_value": trend.latest_value,
+        "latest_at": trend.latest_at,
+        "previous_value": trend.previous_value,
+        "previous_at": trend.previous_at,
+        "change": None if trend.previous_value is None else round(trend.latest_value - trend.previous_value, 4),
+        "min_value": trend.min_value,
+        "min_at": trend.min_at,
+        "max_value": trend.max_value,
+        "max_at": trend.max_at,
+        "mean": round(mean, 4),
+        "slope_per_year": None if slope is None else round(slope, 4),
+        "direction": direction,
+    }
+
+
+async def backfill(session_factory, batch_size: int = 200) -> int:
+    """
+    Record observations for analyzed reports that have none yet
+
+    Reports are replayed in upload order, so the aggregates end up as if
+    they had been recorded at ingestion.
+
+    Returns:
+        Number of reports backfilled
+    """
+    backfilled = 0
+    last_id = 0
+    while True:
+        async with session_factory() as db:
+            reports = (await db.execute(
+                select(MedicalReport.id, MedicalReport.user_id, MedicalReport.created_at, MedicalReport.detected_values)
+                .where(
+                    MedicalReport.id > last_id,
+                    MedicalReport.processing_status == "completed",
+                    MedicalReport.deleted_at.is_(None),
+                    ~exists().where(LabObservation.report_id == MedicalReport.id)
+                )
+                .order_by(MedicalReport.id)
+                .limit(batch_size)
+            )).all()
+            if not reports:
+                return backfilled
+
+            for report in reports:
+                if await record_observations(db, report.user_id, report.id, report.created_at, report.detected_values):
+                    backfilled += 1
+            await db.commit()
+            last_id = reports[-1].id
+
+
+async def _main() -> None:
+    from database import AsyncSessionLocal, dispose_engines
+    try:
+        backfilled = await backfill(AsyncSessionLocal)
+        print(f"✓ Lab trends backfilled from {backfilled} report(s)")
+    finally:
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
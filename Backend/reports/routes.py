@@ -0,0 +1,399 @@
+"""
+Medical Report Routes
+
+Handles lab report upload, OCR, lab value analysis, and retrieval
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer_group
+from typing import Optional
+from datetime import datetime
+import logging
+import os
+
+from database import get_db
+from models import User, MedicalReport, LabObservation, LabTrend, CONTENT_GROUP
+from schemas import (
+    MedicalReportUploadResponse,
+    MedicalReportListItem,
+    MedicalReportDetail,
+    MedicalReportPage,
+    LabTrendList,
+    LabTrendDetail,
+    APIResponse,
+    GenericResponse
+)
+from reports.lab_lexicon import extract_lab_values, LAB_TESTS_BY_KEY
+from reports.lab_analysis import analyze_readings, render_summary, render_recommendations
+from reports.lab_trends import record_observations, remove_report_observations, trend_payload
+from utils.blob_store import blob_store
+from utils.dependencies import get_current_user
+from utils.logging_setup import fields
+from utils.maintenance import maintenance
+from utils.uploads import save_uploaded_file, IMAGE_EXTENSIONS
+from utils.pagination import after_cursor, next_cursor, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from utils.user_stats import adjust_user_stats, get_user_stats
+from utils.responses import success_response
+from utils.ocr_processor import extract_text_from_image, extract_text_from_pdf
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+GENDERS = {'male', 'female', 'other', 'prefer not to say'}
+
+# Columns selected for the list view - only what MedicalReportListItem serializes
+LIST_COLUMNS = tuple(getattr(MedicalReport, name) for name in MedicalReportListItem.__fields__)
+
+DEFAULT_TREND_POINTS = 20
+MAX_TREND_POINTS = 100
+
+
+def process_report(file_path: str, file_type: str, age: Optional[int], gender: Optional[str]) -> tuple:
+    """
+    Run OCR on a report and analyze the lab values it contains
+
+    Args:
+        file_path: Path to a local copy of the file
+        file_type: File extension (.jpg, .png, .pdf)
+        age: Patient age, used to pick reference ranges
+        gender: Patient gender, used to pick reference ranges
+
+    Returns:
+        Tuple of (extracted_text, LabAnalysis, error)
+    """
+    try:
+        if file_type in IMAGE_EXTENSIONS:
+            extracted_text, success = extract_text_from_image(file_path)
+        elif file_type == '.pdf':
+            extracted_text, success = extract_text_from_pdf(file_path)
+        else:
+            return None, None, "Unsupported file type"
+
+        if not success:
+            return None, None, extracted_text  # Error message
+
+        analysis = analyze_readings(extract_lab_values(extracted_text), age, gender)
+        return extracted_text, analysis, None
+
+    except Exception as e:
+        logger.exception("Report processing failed", extra=fields(file_type=file_type))
+        return None, None, f"Processing failed: {str(e)}"
+
+
+@router.post("/upload", response_model=APIResponse[MedicalReportUploadResponse], status_code=status.HTTP_201_CREATED)
+async def upload_report(
+    file: UploadFile = File(...),
+    report_type: str = Form("blood_test", max_length=100),
+    report_title: Optional[str] = Form(None, max_length=255),
+    age: Optional[int] = Form(None, ge=1, le=150),
+    gender: Optional[str] = Form(None),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Upload and analyze a medical report
+
+    **Process:**
+    1. Validates and saves the uploaded file
+    2. Extracts text using OCR (Tesseract) or the PDF text layer
+    3. Finds lab test results (analyte, value, unit)
+    4. Checks each value against reference ranges for the patient's age and gender
+    5. Stores the values, abnormalities, risk level and summary
+    6. Adds the values to the user's lab trends
+
+    **Form fields:**
+    - file: JPG, PNG or PDF
+    - report_type: blood_test, xray, ct_scan, mri, etc.
+    - report_title: Optional title
+    - age, gender: Optional - pick age/sex-specific reference ranges
+
+    **Returns:**
+    - Report record with the analysis
+    """
+
+    if gender is not None:
+        gender = gender.lower()
+        if gender not in GENDERS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Gender must be: male, female, other, or prefer not to say"
+            )
+
+    # Save uploaded file
+    file_path, file_size, error = await save_uploaded_file(file)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+
+    file_ext = os.path.splitext(file.filename)[1].lower()
+
+    report = MedicalReport(
+        user_id=current_user.id,
+        report_type=report_type.strip().lower() or "blood_test",
+        report_title=report_title,
+        original_filename=file.filename,
+        file_path=file_path,
+        file_type=file_ext[1:],
+        file_size=file_size,
+        # Set explicitly so the (deferred) content columns count as loaded
+        extracted_text=None,
+        detected_values=None,
+        abnormalities_detected=None,
+        ai_summary=None,
+        recommendations=None,
+        processing_status="processing"
+    )
+
+    db.add(report)
+    await adjust_user_stats(db, current_user.id, report_count=1)
+    await db.commit()
+    await db.refresh(report, attribute_names=["created_at"])
+
+    # OCR is CPU-bound - run it off the event loop
+    async with blob_store.local_copy(file_path) as local_path:
+        extracted_text, analysis, process_error = await run_in_threadpool(
+            process_report, local_path, file_ext, age, gender
+        )
+
+    if process_error:
+        report.processing_status = "failed"
+        report.error_message = process_error
+        await db.commit()
+
+        return success_response(
+            message="Report uploaded but processing failed",
+            data=MedicalReportUploadResponse.from_orm(report).dict(),
+            status_code=status.HTTP_201_CREATED
+        )
+
+    report.extracted_text = extracted_text
+    report.detected_values = analysis.detected_values
+    report.abnormalities_detected = analysis.abnormalities
+    report.risk_level = analysis.risk_level
+    report.ai_summary = render_summary(analysis)
+    report.recommendations = render_recommendations(analysis)
+    report.processing_status = "completed"
+    # Feed the per-user trends in the same transaction
+    await record_observations(db, current_user.id, report.id, report.created_at, analysis.detected_values)
+
+    await db.commit()
+
+    return success_response(
+        message="Report uploaded and analyzed successfully",
+        data=MedicalReportUploadResponse.from_orm(report).dict(),
+        status_code=status.HTTP_201_CREATED
+    )
+
+
+@router.get("/list", response_model=APIResponse[MedicalReportPage])
+async def get_reports(
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get list of user's medical reports, newest first
+
+    **Query Parameters:**
+    - cursor: `next_cursor` from the previous page (omit for the first page)
+    - limit: Maximum number of records to return
+
+    **Returns:**
+    - List of report summaries
+    - Total number of reports and the cursor for the next page
+    """
+
+    query = select(*LIST_COLUMNS).where(
+        MedicalReport.user_id == current_user.id,
+        MedicalReport.deleted_at.is_(None)
+    )
+    cursor_filter = after_cursor(MedicalReport, cursor)
+    if cursor_filter is not None:
+        query = query.where(cursor_filter)
+
+    result = await db.execute(
+        query
+        .order_by(MedicalReport.created_at.desc(), MedicalReport.id.desc())
+        .limit(limit + 1)
+    )
+    rows = result.all()
+
+    report_list = [row._asdict() for row in rows[:limit]]
+    stats = await get_user_stats(db, current_user.id)
+
+    return success_response(
+        message=f"Retrieved {len(report_list)} report(s)",
+        data={
+            "reports": report_list,
+            "total": stats.report_count,
+            "limit": limit,
+            "next_cursor": next_cursor(rows, limit)
+        }
+    )
+
+
+@router.get("/trends", response_model=APIResponse[LabTrendList])
+async def get_lab_trends(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get the user's trend for every lab test seen in their reports
+
+    **Returns:**
+    - Per test: latest and previous value, min/max, mean, slope per year and direction
+    """
+
+    result = await db.execute(
+        select(LabTrend)
+        .where(LabTrend.user_id == current_user.id)
+        .order_by(LabTrend.analyte)
+    )
+    trends = [trend_payload(trend) for trend in result.scalars()]
+
+    return success_response(
+        message=f"Retrieved {len(trends)} trend(s)",
+        data={"trends": trends}
+    )
+
+
+@router.get("/trends/{analyte}", response_model=APIResponse[LabTrendDetail])
+async def get_lab_trend(
+    analyte: str,
+    points: int = Query(DEFAULT_TREND_POINTS, ge=0, le=MAX_TREND_POINTS),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get the trend of one lab test
+
+    **Path Parameters:**
+    - analyte: Lab test key, e.g. hba1c, hemoglobin, ldl
+
+    **Query Parameters:**
+    - points: Number of most recent observations to include (0 for none)
+
+    **Returns:**
+    - Trend aggregates and the most recent observations, newest first
+    """
+
+    analyte = analyte.lower()
+    if analyte not in LAB_TESTS_BY_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Unknown lab test"
+        )
+
+    trend = await db.get(LabTrend, (current_user.id, analyte))
+    if trend is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No results for this lab test yet"
+        )
+
+    data = trend_payload(trend)
+    data["points"] = []
+    if points:
+        result = await db.execute(
+            select(LabObservation.value, LabObservation.observed_at, LabObservation.report_id)
+            .where(LabObservation.user_id == current_user.id, LabObservation.analyte == analyte)
+            .order_by(LabObservation.observed_at.desc(), LabObservation.id.desc())
+            .limit(points)
+        )
+        data["points"] = [row._asdict() for row in result]
+
+    return success_response(
+        message="Trend retrieved successfully",
+        data=data
+    )
+
+
+@router.get("/{report_id}", response_model=APIResponse[MedicalReportDetail])
+async def get_report_detail(
+    report_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get detailed information about a specific medical report
+
+    **Path Parameters:**
+    - report_id: ID of the report
+
+    **Returns:**
+    - Complete report including extracted text, lab values and abnormalities
+    """
+
+    report = await db.scalar(
+        select(MedicalReport)
+        .options(undefer_group(CONTENT_GROUP))
+        .where(
+            MedicalReport.id == report_id,
+            MedicalReport.user_id == current_user.id,
+            MedicalReport.deleted_at.is_(None)
+        )
+    )
+
+    if not report:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Report not found"
+        )
+
+    return success_response(
+        message="Report retrieved successfully",
+        data=MedicalReportDetail.from_orm(report).dict()
+    )
+
+
+@router.delete("/{report_id}", response_model=GenericResponse)
+async def delete_report(
+    report_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Delete a medical report
+
+    The report leaves the list and the trends at once; the row and its
+    file (unless shared with an identical upload) are purged in the background.
+
+    **Path Parameters:**
+    - report_id: ID of the report to delete
+
+    **Returns:**
+    - Confirmation message
+    """
+
+    # Soft delete: the row and its file are purged by the maintenance task,
+    # so the request never waits on file storage
+    result = await db.execute(
+        update(MedicalReport)
+        .where(
+            MedicalReport.id == report_id,
+            MedicalReport.user_id == current_user.id,
+            MedicalReport.deleted_at.is_(None)
+        )
+        .values(deleted_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+    if result.rowcount == 0:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Report not found"
+        )
+
+    await remove_report_observations(db, current_user.id, report_id)
+    await adjust_user_stats(db, current_user.id, report_count=-1)
+    await db.commit()
+    maintenance.request_purge()
+
+    return success_response(
+        message="Report deleted successfully",
+        data={"id": report_id}
+    )
@@ -3,7 +3,7 @@ Pydantic schemas for request/response validation
 """
 from pydantic import BaseModel, EmailStr, Field, validator
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Generic, TypeVar
 import re
 
 
@@ -64,6 +64,17 @@ class TokenData(BaseModel):
     """Schema for token payload data"""
     user_id: Optional[int] = None
     username: Optional[str] = None
+    jti: Optional[str] = None
+    issued_at: Optional[float] = None  # iat, to the microsecond
+    expires_at: Optional[int] = None
+    
+    class Config:
+        frozen = True  # instances are shared through the verified-token cache
+
+
+class LogoutRequest(BaseModel):
+    """Schema for logout - the refresh token is revoked along with the access token"""
+    refresh_token: Optional[str] = None
 
 
 class DashboardResponse(BaseModel):
@@ -77,6 +88,17 @@ class DashboardResponse(BaseModel):
 # PRESCRIPTION SCHEMAS
 # ==========================================
 
+class DrugInteraction(BaseModel):
+    """An interaction between a prescription's drug and another medication"""
+    drug: str
+    drug_name: str
+    other_drug: str
+    other_drug_name: str
+    severity: str = Field(..., description="minor, moderate or major")
+    description: str
+    other_prescription_ids: List[int] = Field(default_factory=list, description="Prescriptions the other drug is active in (empty when it is on the same prescription)")
+
+
 class PrescriptionUploadResponse(BaseModel):
     """Response after prescription upload"""
     id: int
@@ -84,8 +106,10 @@ class PrescriptionUploadResponse(BaseModel):
     file_type: str
     processing_status: str
     extracted_text: Optional[str] = None
-    medicines: Optional[str] = None
+    medicines: Optional[List[Dict[str, Any]]] = None
     simplified_explanation: Optional[str] = None
+    explanation_version: Optional[int] = None
+    interactions: Optional[List[DrugInteraction]] = None  # With the user's active medications
     created_at: datetime
     
     class Config:
@@ -112,8 +136,9 @@ class PrescriptionDetail(BaseModel):
     file_type: str
     file_size: Optional[int]
     extracted_text: Optional[str]
-    medicines: Optional[str]
-    simplified_explanation: Optional[str]
+    medicines: Optional[List[Dict[str, Any]]]
+    simplified_explanation: Optional[str] = None  # Rendered from medicines
+    explanation_version: Optional[int] = None
     processing_status: str
     error_message: Optional[str]
     created_at: datetime
@@ -123,6 +148,88 @@ class PrescriptionDetail(BaseModel):
         from_attributes = True
 
 
+class PrescriptionPage(BaseModel):
+    """One page of the prescription list"""
+    prescriptions: List[PrescriptionListItem]
+    total: int
+    limit: int
+    next_cursor: Optional[str] = None
+
+
+class InteractionCheck(BaseModel):
+    """Interactions of one prescription with the user's active medications"""
+    prescription_id: int
+    interactions: List[DrugInteraction]
+
+
+class ScheduledDose(BaseModel):
+    """One time of day in a dose schedule"""
+    slot: str = Field(..., description="morning, afternoon or night")
+    amount: float = Field(..., description="Units per dose, e.g. 1 tablet")
+    time: str = Field(..., description="Local clock time, HH:MM")
+
+
+class DoseScheduleItem(BaseModel):
+    """Structured schedule of one prescribed medicine"""
+    id: int
+    medicine_name: str
+    doses: List[ScheduledDose]
+    meal_timing: Optional[str] = Field(None, description="before or after meals")
+    starts_at: datetime
+    ends_at: datetime
+    next_due_at: Optional[datetime] = None  # None once the course is over
+
+
+class PrescriptionSchedule(BaseModel):
+    """A prescription's dose schedules"""
+    prescription_id: int
+    schedules: List[DoseScheduleItem]
+
+
+class UpcomingDose(BaseModel):
+    """A dose due soon"""
+    schedule_id: int
+    prescription_id: int
+    medicine_name: str
+    slot: str
+    amount: float
+    meal_timing: Optional[str] = None
+    due_at: datetime
+
+
+class UpcomingDoses(BaseModel):
+    """A user's doses due within a window, soonest first"""
+    doses: List[UpcomingDose]
+    hours: int
+
+
+class MedicationPrescription(BaseModel):
+    """One prescription of a medication"""
+    prescription_id: int
+    medicine_name: str
+    prescribed_at: datetime
+    active_until: datetime
+
+
+class MedicationItem(BaseModel):
+    """One drug across the user's prescriptions"""
+    drug_key: str
+    name: str
+    recognized: bool = Field(..., description="Whether the drug is in the lexicon (only recognized drugs are checked for interactions)")
+    drug_classes: List[str]
+    active: bool
+    active_until: datetime
+    first_prescribed_at: datetime
+    last_prescribed_at: datetime
+    prescriptions: List[MedicationPrescription]
+
+
+class MedicationList(BaseModel):
+    """A user's medications, most recently prescribed first"""
+    medications: List[MedicationItem]
+    total: int
+
+
 # ==========================================
 # MEDICAL REPORT SCHEMAS
 # ==========================================
@@ -141,8 +248,12 @@ class MedicalReportUploadResponse(BaseModel):
     original_filename: str
     file_type: str
     processing_status: str
+    detected_values: Optional[Dict[str, Any]] = None
+    abnormalities_detected: Optional[List[Any]] = None
     ai_summary: Optional[str] = None
+    recommendations: Optional[str] = None
     risk_level: Optional[str] = None
+    error_message: Optional[str] = None
     created_at: datetime
     
     class Config:
@@ -172,8 +283,8 @@ class MedicalReportDetail(BaseModel):
     file_path: str
     file_type: str
     extracted_text: Optional[str]
-    detected_values: Optional[str]
-    abnormalities_detected: Optional[str]
+    detected_values: Optional[Dict[str, Any]]
+    abnormalities_detected: Optional[List[Any]]
     risk_level: Optional[str]
     ai_summary: Optional[str]
     recommendations: Optional[str]
@@ -184,6 +295,53 @@ class MedicalReportDetail(BaseModel):
         from_attributes = True
 
 
+class MedicalReportPage(BaseModel):
+    """One page of the medical report list"""
+    reports: List[MedicalReportListItem]
+    total: int
+    limit: int
+    next_cursor: Optional[str] = None
+
+
+class LabTrendItem(BaseModel):
+    """Running aggregates of one lab test across a user's reports"""
+    analyte: str
+    name: str
+    category: Optional[str]
+    unit: Optional[str]
+    count: int
+    first_at: datetime
+    latest_value: float
+    latest_at: datetime
+    previous_value: Optional[float]
+    previous_at: Optional[datetime]
+    change: Optional[float] = Field(None, description="Latest minus previous value")
+    min_value: float
+    min_at: datetime
+    max_value: float
+    max_at: datetime
+    mean: float
+    slope_per_year: Optional[float] = Field(None, description="Least-squares slope, units per year")
+    direction: Optional[str] = Field(None, description="rising, falling or stable")
+
+
+class LabTrendList(BaseModel):
+    """All lab trends of a user"""
+    trends: List[LabTrendItem]
+
+
+class LabTrendPoint(BaseModel):
+    """One observation of a lab trend"""
+    value: float
+    observed_at: datetime
+    report_id: int
+
+
+class LabTrendDetail(LabTrendItem):
+    """Lab trend with its most recent observations (newest first)"""
+    points: List[LabTrendPoint] = []
+
+
 # ==========================================
 # SYMPTOM CHECKER SCHEMAS
 # ==========================================
@@ -234,3 +392,73 @@ class SymptomInteractionListItem(BaseModel):
     
     class Config:
         from_attributes = True
+
+
+class SymptomHistoryPage(BaseModel):
+    """One page of symptom check history"""
+    history: List[SymptomInteractionListItem]
+    total: int
+    limit: int
+    next_cursor: Optional[str] = None
+
+
+class SymptomDetail(BaseModel):
+    """Full symptom check as returned by the detail endpoint"""
+    id: int
+    symptoms_text: str
+    detected_symptoms: List[str]
+    possible_conditions: List[Dict[str, Any]]
+    confidence_score: Optional[float] = None
+    home_care_advice: Optional[str] = None
+    when_to_see_doctor: Optional[str] = None
+    urgency_level: Optional[str] = None
+    age: Optional[int] = None
+    gender: Optional[str] = None
+    symptom_duration: Optional[str] = None
+    severity: Optional[str] = None
+    created_at: datetime
+
+
+# ==========================================
+# SEARCH SCHEMAS
+# ==========================================
+
+class SearchResult(BaseModel):
+    """One matching prescription or symptom check"""
+    type: str = Field(..., description="prescription or symptom")
+    id: int
+    title: str
+    snippet: str
+    highlights: List[List[int]] = Field(default_factory=list, description="[start, end) character ranges of matched words in the snippet")
+    score: float
+    created_at: datetime
+
+
+class SearchResults(BaseModel):
+    """Search results, most relevant first"""
+    query: str
+    results: List[SearchResult]
+
+
+# ==========================================
+# RESPONSE ENVELOPES
+# ==========================================
+
+DataT = TypeVar("DataT")
+
+
+class APIResponse(BaseModel, Generic[DataT]):
+    """
+    Standard envelope produced by utils.responses.success_response
+    
+    Routes return the finished response directly, so these models document
+    the payload (OpenAPI) without a second validation/encoding pass.
+    """
+    success: bool = True
+    message: str
+    timestamp: datetime
+    data: Optional[DataT] = None
+
+
+# Envelope for endpoints whose data is a free-form dictionary
+GenericResponse = APIResponse[Dict[str, Any]]
@@ -0,0 +1,174 @@
+"""
+Background Search Indexer
+
+This module handles:
+- Queueing new prescriptions and symptom checks for indexing
+- Indexing them in batches on the event loop, off the request path
+- Catching up on records missing from the index (at startup, after a
+  queue overflow or a failed batch)
+
+Usage (from the Backend directory - indexes every record missing from the
+index, e.g. after upgrading; the running app does the same at startup):
+    python -m search.indexer
+"""
+
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select, exists
+
+from config import settings
+from models import Prescription, SymptomInteraction, SearchDocument
+from search.text_index import DOC_PRESCRIPTION, DOC_SYMPTOM, load_documents, index_documents
+
+logger = logging.getLogger(__name__)
+
+# Document type -> (model, extra conditions for a record to be indexable)
+INDEXED_MODELS = {
+    DOC_PRESCRIPTION: (Prescription, lambda: [Prescription.processing_status == "completed", Prescription.deleted_at.is_(None)]),
+    DOC_SYMPTOM: (SymptomInteraction, lambda: []),
+}
+
+
+async def index_batch(session_factory, items: List[Tuple[str, int]]) -> int:
+    """
+    Index queued records in one transaction
+
+    Args:
+        session_factory: Async session factory
+        items: (doc_type, doc_id) pairs
+
+    Returns:
+        Number of documents indexed
+    """
+    indexed = 0
+    async with session_factory() as db:
+        documents = []
+        for doc_type in INDEXED_MODELS:
+            ids = sorted({doc_id for item_type, doc_id in items if item_type == doc_type})
+            if ids:
+                documents.extend(await load_documents(db, doc_type, ids))
+        indexed = await index_documents(db, documents)
+        await db.commit()
+    return indexed
+
+
+async def index_missing(session_factory, batch_size: int) -> int:
+    """
+    Index every indexable record that has no search_documents row
+
+    Returns:
+        Number of documents indexed
+    """
+    indexed = 0
+    for doc_type, (model, conditions) in INDEXED_MODELS.items():
+        last_id = 0
+        while True:
+            async with session_factory() as db:
+                ids = (await db.execute(
+                    select(model.id)
+                    .where(
+                        model.id > last_id,
+                        *conditions(),
+                        ~exists().where(SearchDocument.doc_type == doc_type, SearchDocument.doc_id == model.id)
+                    )
+                    .order_by(model.id)
+                    .limit(batch_size)
+                )).scalars().all()
+            if not ids:
+                break
+            indexed += await index_batch(session_factory, [(doc_type, doc_id) for doc_id in ids])
+            last_id = ids[-1]
+    return indexed
+
+
+class SearchIndexer:
+    """
+    Indexes records queued by the upload and analyze endpoints
+
+    enqueue() never blocks the request: when the queue is full the record is
+    dropped and the worker runs a catch-up pass (index_missing) once it has
+    drained the queue, so nothing stays unindexed.
+    """
+
+    def __init__(self):
+        self.indexed = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._needs_catch_up = False
+
+    def enqueue(self, doc_type: str, doc_id: int) -> None:
+        """Queue a committed record for indexing (no-op when the indexer is not running)"""
+        if self._queue is None:
+            return
+        try:
+            self._queue.put_nowait((doc_type, doc_id))
+        except asyncio.QueueFull:
+            self._needs_catch_up = True
+
+    async def _catch_up(self, session_factory) -> None:
+        self._needs_catch_up = False
+        try:
+            indexed = await index_missing(session_factory, settings.SEARCH_INDEX_BATCH_SIZE)
+        except Exception as e:
+            logger.warning("Search index catch-up failed: %s", e)
+            return
+        self.indexed += indexed
+        if indexed:
+            logger.info("Search index: indexed %d record(s) missing from the index", indexed)
+
+    async def _run_forever(self, session_factory) -> None:
+        await self._catch_up(session_factory)
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < settings.SEARCH_INDEX_BATCH_SIZE and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            try:
+                self.indexed += await index_batch(session_factory, batch)
+            except Exception as e:
+                logger.warning("Search indexing failed for %d record(s): %s", len(batch), e)
+                self._needs_catch_up = True
+
+            if self._needs_catch_up and self._queue.empty():
+                await self._catch_up(session_factory)
+
+    def start(self, session_factory) -> None:
+        """Start the indexer on the running event loop"""
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=settings.SEARCH_INDEX_QUEUE_SIZE)
+            self._task = asyncio.create_task(self._run_forever(session_factory))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._queue = None
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "indexed": self.indexed,
+        }
+
+
+search_indexer = SearchIndexer()
+
+
+async def _main() -> None:
+    from database import AsyncSessionLocal, dispose_engines
+    try:
+        indexed = await index_missing(AsyncSessionLocal, settings.SEARCH_INDEX_BATCH_SIZE)
+        print(f"✓ Search index: indexed {indexed} record(s)")
+    finally:
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,129 @@
+"""
+Search Routes
+
+Handles full-text search over the user's prescriptions and symptom history
+"""
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer_group
+from typing import Optional
+
+from database import get_db
+from models import User, Prescription, SymptomInteraction, CONTENT_GROUP
+from schemas import SearchResults, APIResponse
+from search.text_index import DOC_PRESCRIPTION, DOC_SYMPTOM, DOC_TYPES, rank, make_snippet, medicine_names
+from utils.dependencies import get_current_user
+from utils.responses import success_response
+
+router = APIRouter()
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 50
+
+# Names shown as a result title
+MAX_TITLE_NAMES = 3
+
+
+async def _load_prescriptions(db, user_id: int, ids) -> dict:
+    result = await db.execute(
+        select(Prescription)
+        .options(undefer_group(CONTENT_GROUP))
+        .where(
+            Prescription.id.in_(ids),
+            Prescription.user_id == user_id,
+            Prescription.deleted_at.is_(None)
+        )
+    )
+    records = {}
+    for row in result.scalars():
+        names = medicine_names(row.medicines)
+        records[row.id] = {
+            "title": ", ".join(names[:MAX_TITLE_NAMES]) or row.original_filename,
+            "text": row.extracted_text,
+            "created_at": row.created_at,
+        }
+    return records
+
+
+async def _load_symptom_checks(db, user_id: int, ids) -> dict:
+    result = await db.execute(
+        select(SymptomInteraction)
+        .options(undefer_group(CONTENT_GROUP))
+        .where(
+            SymptomInteraction.id.in_(ids),
+            SymptomInteraction.user_id == user_id
+        )
+    )
+    records = {}
+    for row in result.scalars():
+        names = row.detected_symptoms or []
+        records[row.id] = {
+            "title": ", ".join(names[:MAX_TITLE_NAMES]) or "Symptom check",
+            "text": row.symptoms_text,
+            "created_at": row.created_at,
+        }
+    return records
+
+
+RECORD_LOADERS = {
+    DOC_PRESCRIPTION: _load_prescriptions,
+    DOC_SYMPTOM: _load_symptom_checks,
+}
+
+
+@router.get("", response_model=APIResponse[SearchResults])
+async def search(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to search for"),
+    type: Optional[str] = Query(None, pattern="^(prescription|symptom)$", description="Only search one record type"),
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Search the user's prescriptions and symptom checks
+
+    Matches words in prescription text, medicine names and symptom
+    descriptions. The last word also matches as a prefix, so results update
+    while typing. Records appear in search moments after they are created.
+
+    **Query Parameters:**
+    - q: Search words
+    - type: prescription or symptom (omit for both)
+    - limit: Maximum number of results
+
+    **Returns:**
+    - Results ranked by relevance (BM25), each with a snippet and the
+      character ranges of matched words in it
+    """
+
+    doc_types = [type] if type else list(DOC_TYPES)
+    hits = await rank(db, current_user.id, q, doc_types, limit)
+
+    records = {}
+    for doc_type, loader in RECORD_LOADERS.items():
+        ids = [hit.doc_id for hit in hits if hit.doc_type == doc_type]
+        if ids:
+            records[doc_type] = await loader(db, current_user.id, ids)
+
+    results = []
+    for hit in hits:
+        record = records.get(hit.doc_type, {}).get(hit.doc_id)
+        if record is None:
+            continue  # Deleted since it was indexed
+        snippet, highlights = make_snippet(record["text"], hit.terms)
+        results.append({
+            "type": hit.doc_type,
+            "id": hit.doc_id,
+            "title": record["title"],
+            "snippet": snippet,
+            "highlights": highlights,
+            "score": round(hit.score, 4),
+            "created_at": record["created_at"],
+        })
+
+    return success_response(
+        message=f"Found {len(results)} result(s)",
+        data={"query": q, "results": results}
+    )
@@ -0,0 +1,316 @@
+"""
+Per-User Full-Text Index
+
+This module handles:
+- Tokenizing prescriptions (OCR text, medicine names) and symptom checks
+- Writing and removing postings in the search_postings table
+- BM25 ranking of one user's records, with prefix matching on the last word
+- Snippets with highlight offsets for the top results
+
+Postings are keyed by (user_id, term, ...), so a query touches only the
+postings of its own terms inside one user's partition - its cost depends
+on how many of the user's records contain the words, not on table size.
+Text is indexed from the decompressed columns, which a database FULLTEXT
+index could not see.
+"""
+
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select, delete, insert, func, or_, and_
+from sqlalchemy.orm import undefer_group
+
+from models import Prescription, SymptomInteraction, SearchDocument, SearchPosting, CONTENT_GROUP
+
+DOC_PRESCRIPTION = "prescription"
+DOC_SYMPTOM = "symptom"
+DOC_TYPES = (DOC_PRESCRIPTION, DOC_SYMPTOM)
+
+# Weight of a word in a medicine or detected-symptom name vs. free text
+NAME_BOOST = 3.0
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 10
+SNIPPET_LENGTH = 160
+SNIPPET_CONTEXT = 50  # Characters kept before the first match
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be been but by for from had has have he her his i if in into is it its me my no not of on
+or our she so than that the their them then there these they this to was we were what when which who will
+with you your
+""".split())
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase words of a text, without stopwords and single characters"""
+    if not text:
+        return []
+    return [
+        token[:MAX_TERM_LENGTH]
+        for token in TOKEN_PATTERN.findall(text.lower())
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+@dataclass
+class IndexableDocument:
+    """Text fields of one record, each with its weight"""
+    doc_type: str
+    doc_id: int
+    user_id: int
+    fields: List[Tuple[Optional[str], float]] = field(default_factory=list)
+
+    def term_weights(self) -> Dict[str, float]:
+        weights = defaultdict(float)
+        for text, boost in self.fields:
+            for term, count in Counter(tokenize(text)).items():
+                weights[term] += count * boost
+        return weights
+
+
+def medicine_names(medicines) -> List[str]:
+    return [m["medicine_name"] for m in medicines or [] if isinstance(m, dict) and m.get("medicine_name")]
+
+
+async def load_documents(db, doc_type: str, ids: Sequence[int]) -> List[IndexableDocument]:
+    """
+    Read the records to index (soft-deleted and unprocessed ones are skipped)
+
+    Args:
+        db: Async database session
+        doc_type: DOC_PRESCRIPTION or DOC_SYMPTOM
+        ids: Record IDs
+
+    Returns:
+        Documents ready for index_documents()
+    """
+    if doc_type == DOC_PRESCRIPTION:
+        rows = (await db.execute(
+            select(Prescription)
+            .options(undefer_group(CONTENT_GROUP))
+            .where(
+                Prescription.id.in_(ids),
+                Prescription.processing_status == "completed",
+                Prescription.deleted_at.is_(None)
+            )
+        )).scalars()
+        return [
+            IndexableDocument(DOC_PRESCRIPTION, row.id, row.user_id, [
+                (row.extracted_text, 1.0),
+                (" ".join(medicine_names(row.medicines)), NAME_BOOST),
+            ])
+            for row in rows
+        ]
+
+    rows = (await db.execute(
+        select(SymptomInteraction)
+        .options(undefer_group(CONTENT_GROUP))
+        .where(SymptomInteraction.id.in_(ids))
+    )).scalars()
+    return [
+        IndexableDocument(DOC_SYMPTOM, row.id, row.user_id, [
+            (row.symptoms_text, 1.0),
+            (" ".join(row.detected_symptoms or []), NAME_BOOST),
+        ])
+        for row in rows
+    ]
+
+
+async def remove_documents(db, doc_type: str, ids: Sequence[int]) -> None:
+    """Drop records from the index without committing"""
+    if not ids:
+        return
+    await db.execute(
+        delete(SearchPosting)
+        .where(SearchPosting.doc_type == doc_type, SearchPosting.doc_id.in_(ids))
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        delete(SearchDocument)
+        .where(SearchDocument.doc_type == doc_type, SearchDocument.doc_id.in_(ids))
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def index_documents(db, documents: Iterable[IndexableDocument]) -> int:
+    """
+    Write (or rewrite) documents' postings without committing
+
+    Args:
+        db: Async database session
+        documents: Documents from load_documents()
+
+    Returns:
+        Number of documents indexed
+    """
+    documents = list(documents)
+    if not documents:
+        return 0
+
+    for doc_type in DOC_TYPES:
+        await remove_documents(db, doc_type, [doc.doc_id for doc in documents if doc.doc_type == doc_type])
+
+    now = datetime.utcnow()
+    document_rows, posting_rows = [], []
+    for doc in documents:
+        weights = doc.term_weights()
+        length = sum(weights.values())
+        document_rows.append({
+            "doc_type": doc.doc_type, "doc_id": doc.doc_id, "user_id": doc.user_id,
+            "length": length, "indexed_at": now,
+        })
+        posting_rows.extend(
+            {"user_id": doc.user_id, "term": term, "doc_type": doc.doc_type, "doc_id": doc.doc_id,
+             "weight": weight, "doc_length": length}
+            for term, weight in weights.items()
+        )
+
+    await db.execute(insert(SearchDocument), document_rows)
+    if posting_rows:
+        await db.execute(insert(SearchPosting), posting_rows)
+    return len(documents)
+
+
+def _prefix_upper_bound(prefix: str) -> str:
+    """Smallest string greater than every string starting with prefix"""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def parse_query(query: str) -> Tuple[List[str], Optional[str]]:
+    """
+    Split a query into exact terms and a prefix
+
+    The last word is matched as a prefix while the user is still typing it
+    (no trailing space), so "parac" finds paracetamol.
+
+    Returns:
+        (exact terms, prefix or None)
+    """
+    terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+    prefix = None
+    if terms and not query[-1:].isspace() and query.lower().rstrip().endswith(terms[-1]):
+        prefix = terms.pop()
+    return terms, prefix
+
+
+@dataclass
+class SearchHit:
+    """A ranked document before its record is loaded"""
+    doc_type: str
+    doc_id: int
+    score: float
+    terms: List[str]
+
+
+async def rank(db, user_id: int, query: str, doc_types: Sequence[str], limit: int) -> List[SearchHit]:
+    """
+    BM25-rank a user's documents for a query
+
+    Args:
+        db: Async database session
+        user_id: User whose records are searched
+        query: Raw query text
+        doc_types: Record types to include
+        limit: Maximum number of hits
+
+    Returns:
+        Hits, best first
+    """
+    terms, prefix = parse_query(query)
+    if not terms and not prefix:
+        return []
+
+    term_filters = []
+    if terms:
+        term_filters.append(SearchPosting.term.in_(terms))
+    if prefix:
+        term_filters.append(and_(SearchPosting.term >= prefix, SearchPosting.term < _prefix_upper_bound(prefix)))
+
+    postings = (await db.execute(
+        select(SearchPosting.term, SearchPosting.doc_type, SearchPosting.doc_id,
+               SearchPosting.weight, SearchPosting.doc_length)
+        .where(
+            SearchPosting.user_id == user_id,
+            SearchPosting.doc_type.in_(doc_types),
+            or_(*term_filters)
+        )
+    )).all()
+    if not postings:
+        return []
+
+    total_docs, average_length = (await db.execute(
+        select(func.count(), func.avg(SearchDocument.length))
+        .where(SearchDocument.user_id == user_id, SearchDocument.doc_type.in_(doc_types))
+    )).one()
+    average_length = float(average_length or 1.0) or 1.0
+
+    document_frequency = Counter(posting.term for posting in postings)
+    scores = defaultdict(float)
+    prefix_scores = defaultdict(float)
+    matched = defaultdict(list)
+    for posting in postings:
+        df = document_frequency[posting.term]
+        idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+        tf = posting.weight
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * posting.doc_length / average_length)
+        contribution = idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        key = (posting.doc_type, posting.doc_id)
+        matched[key].append(posting.term)
+        if posting.term in terms:
+            scores[key] += contribution
+        else:
+            # A prefix counts once per document, through its best completion
+            prefix_scores[key] = max(prefix_scores[key], contribution)
+
+    for key, contribution in prefix_scores.items():
+        scores[key] += contribution
+
+    best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+    return [SearchHit(doc_type, doc_id, score, matched[(doc_type, doc_id)]) for (doc_type, doc_id), score in best]
+
+
+def make_snippet(text: Optional[str], terms: Sequence[str]) -> Tuple[str, List[List[int]]]:
+    """
+    Excerpt of a text around the first matched word
+
+    Args:
+        text: Full text
+        terms: Index terms that matched the document
+
+    Returns:
+        (snippet, [start, end] character ranges of matched words in the snippet)
+    """
+    if not text:
+        return "", []
+
+    pattern = re.compile(
+        r"(?<![a-z0-9])(?:" + "|".join(sorted(map(re.escape, terms), key=len, reverse=True)) + r")(?![a-z0-9])",
+        re.IGNORECASE
+    ) if terms else None
+
+    first = pattern.search(text) if pattern else None
+    start = max(0, first.start() - SNIPPET_CONTEXT) if first else 0
+    if start:
+        space = text.find(" ", start)
+        start = space + 1 if 0 <= space < (first.start() if first else start + 1) else start
+    end = min(len(text), start + SNIPPET_LENGTH)
+    if end < len(text):
+        space = text.rfind(" ", start, end)
+        end = space if space > start else end
+
+    snippet = " ".join(text[start:end].split())
+    snippet = ("…" if start else "") + snippet + ("…" if end < len(text) else "")
+    highlights = [[m.start(), m.end()] for m in pattern.finditer(snippet)] if pattern else []
+    return snippet, highlights
@@ -4,19 +4,29 @@ Symptom Checker Routes
 Handles symptom analysis and health recommendations
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-import json
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer_group
+from typing import List, Optional
 
 from database import get_db
-from models import User, SymptomInteraction
+from models import User, SymptomInteraction, CONTENT_GROUP
+from search.indexer import search_indexer
+from search.text_index import DOC_SYMPTOM, remove_documents
 from schemas import (
     SymptomAnalysisRequest,
     SymptomAnalysisResponse,
-    SymptomInteractionListItem
+    SymptomInteractionListItem,
+    SymptomHistoryPage,
+    SymptomDetail,
+    APIResponse,
+    GenericResponse
 )
+from utils.advice_templates import advice_templates
 from utils.dependencies import get_current_user
+from utils.pagination import after_cursor, next_cursor, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from utils.user_stats import adjust_user_stats, get_user_stats, symptom_check_deltas
 from utils.responses import success_response, error_response
 from utils.symptom_analyzer import (
     detect_symptoms,
@@ -25,15 +35,27 @@ from utils.symptom_analyzer import (
     generate_doctor_advice,
     format_symptom_name
 )
+from utils.symptom_suggest import (
+    symptom_index,
+    DEFAULT_SUGGESTION_LIMIT,
+    MAX_SUGGESTION_LIMIT
+)
 
 router = APIRouter()
 
+# Advice saved when no known symptom is found in the text
+NO_SYMPTOMS_HOME_CARE_ADVICE = "No specific symptoms detected. If you're feeling unwell, please consult a healthcare provider."
+NO_SYMPTOMS_DOCTOR_ADVICE = "Consult a doctor if symptoms develop or worsen."
+
+# Columns selected for the history view - only what SymptomInteractionListItem serializes
+HISTORY_COLUMNS = tuple(getattr(SymptomInteraction, name) for name in SymptomInteractionListItem.__fields__)
+
 
-@router.post("/analyze", response_model=dict, status_code=status.HTTP_201_CREATED)
+@router.post("/analyze", response_model=GenericResponse, status_code=status.HTTP_201_CREATED)
 async def analyze_symptoms_endpoint(
     request: SymptomAnalysisRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Analyze user symptoms and provide health recommendations
@@ -79,12 +101,14 @@ async def analyze_symptoms_endpoint(
             severity=request.severity,
             processing_status="completed",
             urgency_level="routine",
-            home_care_advice="No specific symptoms detected. If you're feeling unwell, please consult a healthcare provider.",
-            when_to_see_doctor="Consult a doctor if symptoms develop or worsen."
+            home_care_advice_id=await advice_templates.intern(db, NO_SYMPTOMS_HOME_CARE_ADVICE),
+            when_to_see_doctor_id=await advice_templates.intern(db, NO_SYMPTOMS_DOCTOR_ADVICE)
         )
         db.add(interaction)
-        db.commit()
-        db.refresh(interaction)
+        await adjust_user_stats(db, current_user.id, **symptom_check_deltas("routine"))
+        await db.commit()
+        await db.refresh(interaction, attribute_names=["created_at"])
+        search_indexer.enqueue(DOC_SYMPTOM, interaction.id)
         
         return success_response(
             message="Analysis completed",
@@ -93,13 +117,16 @@ async def analyze_symptoms_endpoint(
                 "message": "We couldn't detect specific symptoms. Please try describing your symptoms in more detail.",
                 "detected_symptoms": [],
                 "possible_conditions": [],
-                "home_care_advice": interaction.home_care_advice,
-                "when_to_see_doctor": interaction.when_to_see_doctor,
+                "home_care_advice": NO_SYMPTOMS_HOME_CARE_ADVICE,
+                "when_to_see_doctor": NO_SYMPTOMS_DOCTOR_ADVICE,
                 "urgency_level": "routine",
                 "created_at": interaction.created_at
-            }
+            },
+            status_code=status.HTTP_201_CREATED
         )
     
+    symptom_index.record_usage(detected_symptoms_keys)
+    
     # Analyze symptoms
     analysis_result = analyze_symptoms(detected_symptoms_keys, request.age)
     
@@ -136,22 +163,24 @@ async def analyze_symptoms_endpoint(
     interaction = SymptomInteraction(
         user_id=current_user.id,
         symptoms_text=request.symptoms_text,
-        detected_symptoms=json.dumps(detected_symptoms_formatted),
+        detected_symptoms=detected_symptoms_formatted,
         age=request.age,
         gender=request.gender,
         symptom_duration=request.symptom_duration,
         severity=request.severity,
-        possible_conditions=json.dumps(possible_conditions),
+        possible_conditions=possible_conditions,
         confidence_score=analysis_result.get('confidence_score', 0.0),
-        home_care_advice=home_care,
-        when_to_see_doctor=doctor_advice,
+        home_care_advice_id=await advice_templates.intern(db, home_care),
+        when_to_see_doctor_id=await advice_templates.intern(db, doctor_advice),
         urgency_level=analysis_result['urgency_level'],
         processing_status="completed"
     )
     
     db.add(interaction)
-    db.commit()
-    db.refresh(interaction)
+    await adjust_user_stats(db, current_user.id, **symptom_check_deltas(interaction.urgency_level))
+    await db.commit()
+    await db.refresh(interaction, attribute_names=["created_at"])
+    search_indexer.enqueue(DOC_SYMPTOM, interaction.id)
     
     return success_response(
         message="Symptom analysis completed successfully",
@@ -166,60 +195,96 @@ async def analyze_symptoms_endpoint(
             "urgency_level": interaction.urgency_level,
             "created_at": interaction.created_at,
             "disclaimer": "⚠️ This is for informational purposes only. Please consult a healthcare professional for medical advice."
-        }
+        },
+        status_code=status.HTTP_201_CREATED
     )
 
 
-@router.get("/history", response_model=dict)
+@router.get("/suggest", response_model=GenericResponse)
+async def suggest_symptoms(
+    q: str = Query(..., min_length=1, max_length=50, description="Partial symptom text"),
+    limit: int = Query(DEFAULT_SUGGESTION_LIMIT, ge=1, le=MAX_SUGGESTION_LIMIT)
+):
+    """
+    Typeahead suggestions for symptom phrases
+    
+    Served entirely from an in-memory prefix index - no database access and
+    no authentication, so it can be called on every keystroke.
+    
+    **Query Parameters:**
+    - q: What the user has typed so far
+    - limit: Maximum number of suggestions
+    
+    **Returns:**
+    - Matching symptom phrases, most commonly reported first
+    """
+    
+    suggestions = symptom_index.suggest(q, limit)
+    
+    # Short prefixes are shared by most users - let browsers and proxies reuse them longer
+    max_age = 3600 if len(q.strip()) <= 3 else 300
+    
+    return success_response(
+        message=f"Found {len(suggestions)} suggestion(s)",
+        data={
+            "query": q,
+            "suggestions": suggestions
+        },
+        headers={"Cache-Control": f"public, max-age={max_age}"}
+    )
+
+
+@router.get("/history", response_model=APIResponse[SymptomHistoryPage])
 async def get_symptom_history(
-    skip: int = 0,
-    limit: int = 20,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
-    Get user's symptom check history
+    Get user's symptom check history, newest first
     
     **Query Parameters:**
-    - skip: Number of records to skip (for pagination)
+    - cursor: `next_cursor` from the previous page (omit for the first page)
     - limit: Maximum number of records to return
     
     **Returns:**
     - List of previous symptom interactions
+    - Total number of checks and the cursor for the next page
     """
     
-    interactions = db.query(SymptomInteraction)\
-        .filter(SymptomInteraction.user_id == current_user.id)\
-        .order_by(SymptomInteraction.created_at.desc())\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
+    # Plain column rows: no ORM identities, no advice/condition TEXT columns read
+    query = select(*HISTORY_COLUMNS).where(SymptomInteraction.user_id == current_user.id)
+    cursor_filter = after_cursor(SymptomInteraction, cursor)
+    if cursor_filter is not None:
+        query = query.where(cursor_filter)
     
-    history_list = []
-    for interaction in interactions:
-        history_list.append({
-            "id": interaction.id,
-            "symptoms_text": interaction.symptoms_text,
-            "urgency_level": interaction.urgency_level,
-            "created_at": interaction.created_at
-        })
+    result = await db.execute(
+        query
+        .order_by(SymptomInteraction.created_at.desc(), SymptomInteraction.id.desc())
+        .limit(limit + 1)
+    )
+    rows = result.all()
+    
+    history_list = [row._asdict() for row in rows[:limit]]
+    stats = await get_user_stats(db, current_user.id)
     
     return success_response(
         message=f"Retrieved {len(history_list)} symptom check(s)",
         data={
             "history": history_list,
-            "total": len(history_list),
-            "skip": skip,
-            "limit": limit
+            "total": stats.symptom_check_count,
+            "limit": limit,
+            "next_cursor": next_cursor(rows, limit)
         }
     )
 
 
-@router.get("/{interaction_id}", response_model=dict)
+@router.get("/{interaction_id}", response_model=APIResponse[SymptomDetail])
 async def get_symptom_detail(
     interaction_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get detailed information about a specific symptom check
@@ -231,12 +296,14 @@ async def get_symptom_detail(
     - Complete details of the symptom analysis
     """
     
-    interaction = db.query(SymptomInteraction)\
-        .filter(
+    interaction = await db.scalar(
+        select(SymptomInteraction)
+        .options(undefer_group(CONTENT_GROUP))
+        .where(
             SymptomInteraction.id == interaction_id,
             SymptomInteraction.user_id == current_user.id
-        )\
-        .first()
+        )
+    )
     
     if not interaction:
         raise HTTPException(
@@ -244,20 +311,21 @@ async def get_symptom_detail(
             detail="Symptom check not found"
         )
     
-    # Parse JSON fields
-    detected_symptoms = json.loads(interaction.detected_symptoms) if interaction.detected_symptoms else []
-    possible_conditions = json.loads(interaction.possible_conditions) if interaction.possible_conditions else []
+    # Resolve interned advice (rows written before interning carry the text itself)
+    advice = await advice_templates.resolve(
+        db, (interaction.home_care_advice_id, interaction.when_to_see_doctor_id)
+    )
     
     return success_response(
         message="Symptom check retrieved successfully",
         data={
             "id": interaction.id,
             "symptoms_text": interaction.symptoms_text,
-            "detected_symptoms": detected_symptoms,
-            "possible_conditions": possible_conditions,
+            "detected_symptoms": interaction.detected_symptoms or [],
+            "possible_conditions": interaction.possible_conditions or [],
             "confidence_score": interaction.confidence_score,
-            "home_care_advice": interaction.home_care_advice,
-            "when_to_see_doctor": interaction.when_to_see_doctor,
+            "home_care_advice": advice.get(interaction.home_care_advice_id, interaction.home_care_advice),
+            "when_to_see_doctor": advice.get(interaction.when_to_see_doctor_id, interaction.when_to_see_doctor),
             "urgency_level": interaction.urgency_level,
             "age": interaction.age,
             "gender": interaction.gender,
@@ -268,11 +336,11 @@ async def get_symptom_detail(
     )
 
 
-@router.delete("/{interaction_id}", response_model=dict)
+@router.delete("/{interaction_id}", response_model=GenericResponse)
 async def delete_symptom_check(
     interaction_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Delete a symptom check from history
@@ -284,21 +352,30 @@ async def delete_symptom_check(
     - Confirmation message
     """
     
-    interaction = db.query(SymptomInteraction)\
-        .filter(
-            SymptomInteraction.id == interaction_id,
-            SymptomInteraction.user_id == current_user.id
-        )\
-        .first()
+    owned = (
+        SymptomInteraction.id == interaction_id,
+        SymptomInteraction.user_id == current_user.id
+    )
+    # The urgency decides which counters go down
+    urgency_level = await db.scalar(select(SymptomInteraction.urgency_level).where(*owned))
     
-    if not interaction:
+    # Only the request whose DELETE removed the row adjusts the counters;
+    # a concurrent delete of the same check gets a 404
+    result = await db.execute(
+        delete(SymptomInteraction)
+        .where(*owned)
+        .execution_options(synchronize_session=False)
+    )
+    
+    if result.rowcount == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Symptom check not found"
         )
     
-    db.delete(interaction)
-    db.commit()
+    await adjust_user_stats(db, current_user.id, **symptom_check_deltas(urgency_level, -1))
+    await remove_documents(db, DOC_SYMPTOM, [interaction_id])
+    await db.commit()
     
     return success_response(
         message="Symptom check deleted successfully",
@@ -0,0 +1,55 @@
+"""
+Tests for the content-addressed blob store
+"""
+
+import asyncio
+import hashlib
+import os
+
+import pytest
+
+from utils.blob_store import LocalBlobStore, blob_key, is_blob_key
+
+
+def test_key_is_the_sharded_sha256():
+    digest = hashlib.sha256(b"scan").hexdigest()
+    assert blob_key(b"scan") == f"{digest[:2]}/{digest[2:4]}/{digest}"
+    assert is_blob_key(blob_key(b"scan"))
+    assert not is_blob_key("uploads/prescriptions/scan.jpg")
+    assert not is_blob_key(None)
+
+
+def test_identical_content_is_stored_once(tmp_path):
+    store = LocalBlobStore(str(tmp_path))
+
+    async def run():
+        first = await store.put(b"same scan")
+        path = store.path(first.key)
+        os.utime(path, (1_000_000, 1_000_000))
+        second = await store.put(b"same scan")
+        other = await store.put(b"another scan")
+        return first, second, other, os.path.getmtime(path)
+
+    first, second, other, modified = asyncio.run(run())
+    assert first.created and not second.created
+    assert first.key == second.key != other.key
+    assert first.size == len(b"same scan")
+    # A deduplicated put refreshes the blob so the orphan sweep leaves it alone
+    assert modified > 1_000_000
+    assert sorted(blob.key for blob in store.iter_blobs()) == sorted([first.key, other.key])
+
+
+def test_delete_reports_bytes_freed(tmp_path):
+    store = LocalBlobStore(str(tmp_path))
+
+    async def run():
+        info = await store.put(b"12345")
+        return await store.delete(info.key), await store.delete(info.key), await store.exists(info.key)
+
+    assert asyncio.run(run()) == (5, 0, False)
+
+
+def test_paths_outside_the_store_are_rejected(tmp_path):
+    store = LocalBlobStore(str(tmp_path))
+    with pytest.raises(ValueError):
+        store.path("../../etc/passwd")
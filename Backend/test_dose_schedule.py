@@ -0,0 +1,156 @@
+"""
+Tests for dose schedule parsing and the reminder engine
+"""
+
+import asyncio
+from datetime import datetime, time
+
+import pytest
+from sqlalchemy import select
+
+from config import settings
+from database import AsyncSessionLocal
+from models import DoseReminder, DoseSchedule, Prescription
+from prescription.dose_schedule import next_occurrence, parse_schedule, reminder_zone, slot_time, write_dose_schedules
+from prescription.reminders import ReminderEngine
+
+# Far enough ahead that the schedule starts at prescribed_at, not now
+PRESCRIBED_AT = datetime(2030, 1, 1)
+
+
+@pytest.mark.parametrize("instructions, doses, meal_timing, days", [
+    ("1-0-1 x 5 days after food", (1, 0, 1), "after", 5),
+    ("1 – 1 – 1 before meals for 2 weeks", (1, 1, 1), "before", 14),
+    ("1/2-0-½ x 1 month", (0.5, 0, 0.5), None, 30),
+    ("0.5-0-0", (0.5, 0, 0), None, None),
+    ("Tab. BD after breakfast", (1, 0, 1), "after", None),
+    ("HS x 10 days", (0, 0, 1), None, 10),
+])
+def test_parse_schedule(instructions, doses, meal_timing, days):
+    parsed = parse_schedule({"instructions": instructions})
+    assert tuple(parsed.doses[slot] for slot in ("morning", "afternoon", "night")) == doses
+    assert parsed.meal_timing == meal_timing
+    assert parsed.duration_days == days
+
+
+@pytest.mark.parametrize("instructions", ["0-0-0 x 5 days", "as directed", "", None])
+def test_no_frequency_gives_no_schedule(instructions):
+    assert parse_schedule({"instructions": instructions}) is None
+
+
+def test_slot_times_follow_meals():
+    assert slot_time("morning", None) == time(8, 0)
+    assert slot_time("morning", "before") == time(7, 30)
+    assert slot_time("night", "after") == time(20, 30)
+
+
+def test_next_occurrence_keeps_local_time_across_dst(monkeypatch):
+    monkeypatch.setattr(settings, "REMINDER_TIMEZONE", "Europe/London")
+    reminder_zone.cache_clear()
+    try:
+        # British Summer Time starts on 29 March 2026
+        assert next_occurrence(time(8, 0), datetime(2026, 3, 27, 12, 0)) == datetime(2026, 3, 28, 8, 0)
+        assert next_occurrence(time(8, 0), datetime(2026, 3, 28, 12, 0)) == datetime(2026, 3, 29, 7, 0)
+        # Strictly after: a dose due now is next due tomorrow
+        assert next_occurrence(time(8, 0), datetime(2026, 3, 29, 7, 0)) == datetime(2026, 3, 30, 7, 0)
+    finally:
+        reminder_zone.cache_clear()
+
+
+def user_id_of(client, headers):
+    return client.get("/api/auth/me", headers=headers).json()["data"]["id"]
+
+
+async def create_schedule(user_id, instructions):
+    async with AsyncSessionLocal() as db:
+        prescription = Prescription(user_id=user_id, original_filename="rx.jpg", file_path="rx/schedule",
+                                    file_type="jpg")
+        db.add(prescription)
+        await db.flush()
+        medicines = [{"medicine_name": "Tab Dolo 650", "instructions": instructions}]
+        assert await write_dose_schedules(db, user_id, prescription.id, medicines, PRESCRIBED_AT) == 1
+        await db.commit()
+        return (await db.execute(
+            select(DoseSchedule.id).where(DoseSchedule.prescription_id == prescription.id)
+        )).scalar_one()
+
+
+async def reminders_of(schedule_id):
+    async with AsyncSessionLocal() as db:
+        rows = await db.execute(
+            select(DoseReminder.slot, DoseReminder.next_due_at)
+            .where(DoseReminder.schedule_id == schedule_id)
+        )
+        return dict(rows.all())
+
+
+def test_reminders_fire_once_and_advance(client, auth_headers):
+    schedule_id = asyncio.run(create_schedule(user_id_of(client, auth_headers), "1-0-1 x 2 days after food"))
+    assert asyncio.run(reminders_of(schedule_id)) == {
+        "morning": datetime(2030, 1, 1, 8, 30),
+        "night": datetime(2030, 1, 1, 20, 30),
+    }
+
+    delivered = []
+
+    async def collect(doses):
+        delivered.extend(dose for dose in doses if dose.schedule_id == schedule_id)
+
+    engine = ReminderEngine()
+    engine.add_handler(collect)
+    due = datetime(2030, 1, 1, 8, 40)
+    asyncio.run(engine.tick(AsyncSessionLocal, now=due))
+    assert [(dose.slot, dose.amount, dose.due_at) for dose in delivered] == [
+        ("morning", 1.0, datetime(2030, 1, 1, 8, 30))
+    ]
+    assert asyncio.run(reminders_of(schedule_id))["morning"] == datetime(2030, 1, 2, 8, 30)
+
+    # The claim moved the row on, so ticking again does not fire it twice
+    asyncio.run(engine.tick(AsyncSessionLocal, now=due))
+    assert len(delivered) == 1
+
+
+def test_late_doses_are_skipped_and_finished_courses_removed(client, auth_headers):
+    schedule_id = asyncio.run(create_schedule(user_id_of(client, auth_headers), "1-0-1 x 2 days"))
+
+    delivered = []
+
+    async def collect(doses):
+        delivered.extend(dose for dose in doses if dose.schedule_id == schedule_id)
+
+    engine = ReminderEngine()
+    engine.add_handler(collect)
+    # Both doses are hours past the grace period, and the next ones fall
+    # after the course ends on 3 January
+    asyncio.run(engine.tick(AsyncSessionLocal, now=datetime(2030, 1, 2, 23, 0)))
+    assert delivered == []
+    assert engine.skipped_late >= 2
+    assert asyncio.run(reminders_of(schedule_id)) == {}
+
+
+def test_without_a_handler_nothing_is_claimed(client, auth_headers):
+    schedule_id = asyncio.run(create_schedule(user_id_of(client, auth_headers), "1-0-0 x 3 days"))
+    before = asyncio.run(reminders_of(schedule_id))
+
+    engine = ReminderEngine()
+    assert asyncio.run(engine.tick(AsyncSessionLocal, now=datetime(2030, 1, 1, 8, 5))) == 0
+    assert asyncio.run(reminders_of(schedule_id)) == before
+    assert engine.fired == 0
+
+    async def start():
+        engine.start(AsyncSessionLocal, 60)
+        return engine.stats()["running"]
+    assert asyncio.run(start()) is False
+
+
+def test_doses_no_handler_accepted_are_not_counted(client, auth_headers):
+    schedule_id = asyncio.run(create_schedule(user_id_of(client, auth_headers), "0-0-1 x 3 days"))
+
+    async def failing(doses):
+        raise ConnectionError("push service down")
+
+    engine = ReminderEngine()
+    engine.add_handler(failing)
+    assert asyncio.run(engine.tick(AsyncSessionLocal, now=datetime(2030, 1, 1, 20, 5))) == 0
+    assert engine.fired == 0
+    assert asyncio.run(reminders_of(schedule_id))["night"] == datetime(2030, 1, 2, 20, 0)
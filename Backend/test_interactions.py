@@ -0,0 +1,85 @@
+"""
+Tests for drug name resolution and the interaction graph
+"""
+
+import random
+
+import pytest
+
+from prescription.drug_lexicon import DRUGS, DRUGS_BY_KEY, resolve_medicine
+from prescription.interactions import (
+    INTERACTION_RULES, SEVERITY_RANK, I, InteractionGraph, check_interactions, interaction_graph
+)
+
+
+def matches(side, key):
+    return side == key or (side.startswith("class:") and side[6:] in DRUGS_BY_KEY[key].classes)
+
+
+def expected_rule(a, b):
+    """The most severe rule covering a pair, found without the bitsets"""
+    covering = [
+        rule for rule in INTERACTION_RULES
+        if (matches(rule.a, a) and matches(rule.b, b)) or (matches(rule.a, b) and matches(rule.b, a))
+    ]
+    return max(covering, key=lambda rule: SEVERITY_RANK[rule.severity], default=None)
+
+
+@pytest.mark.parametrize("name, keys", [
+    ("Tab. Augmentin 625mg", ["amoxicillin", "clavulanate"]),
+    ("PAN-D Capsule", ["pantoprazole", "domperidone"]),
+    ("Cap. Crocin 500 mg", ["paracetamol"]),
+    ("Tab Neverheardof 10mg", ["neverheardof"]),
+    ("", []),
+])
+def test_medicine_names_resolve_to_drug_keys(name, keys):
+    assert resolve_medicine(name) == keys
+
+
+def test_bitsets_agree_with_the_rules():
+    keys = [drug.key for drug in DRUGS]
+    for i, a in enumerate(keys):
+        for b in keys[i + 1:]:
+            rule = expected_rule(a, b)
+            bit_ab = bool(interaction_graph.adjacency[interaction_graph.ids[a]] >> interaction_graph.ids[b] & 1)
+            bit_ba = bool(interaction_graph.adjacency[interaction_graph.ids[b]] >> interaction_graph.ids[a] & 1)
+            assert bit_ab == bit_ba == (rule is not None), (a, b)
+            if rule is not None:
+                found = interaction_graph.rules[tuple(sorted((interaction_graph.ids[a], interaction_graph.ids[b])))]
+                assert found.severity == rule.severity, (a, b)
+
+
+def test_check_matches_pairwise_lookup():
+    rng = random.Random(3)
+    keys = [drug.key for drug in DRUGS]
+    for _ in range(200):
+        new = rng.sample(keys, rng.randint(1, 4))
+        active = {key: [rng.randint(1, 50)] for key in rng.sample(keys, rng.randint(0, 12))}
+
+        found = {(item.drug, item.other_drug) for item in interaction_graph.check(new, active)}
+        expected = set()
+        for n, key in enumerate(new):
+            for other in new[:n]:
+                if expected_rule(key, other):
+                    expected.add((key, other))
+            for other in active:
+                if other not in new and expected_rule(key, other):
+                    expected.add((key, other))
+        assert found == expected
+
+
+def test_check_reports_sources_and_orders_by_severity():
+    result = check_interactions(["warfarin", "paracetamol", "unknown drug"], {"ibuprofen": [7, 9], "warfarin": [3]})
+
+    assert [(item["drug"], item["other_drug"], item["severity"]) for item in result] == [
+        ("warfarin", "ibuprofen", "major"),
+        ("paracetamol", "warfarin", "minor"),
+    ]
+    assert result[0]["other_prescription_ids"] == [7, 9]
+    assert result[1]["other_prescription_ids"] == []  # both in the checked prescription
+    assert result[0]["drug_name"] == "Warfarin"
+
+
+def test_unknown_rule_names_are_rejected():
+    with pytest.raises(ValueError):
+        InteractionGraph([I("warfarin", "class:no_such_class", "major", "")])
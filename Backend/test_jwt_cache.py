@@ -0,0 +1,52 @@
+"""
+Tests for the verified-token cache in verify_token
+"""
+
+import time
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from auth import jwt_handler
+from auth.jwt_handler import create_access_token, verify_token, verified_tokens
+from auth.revocation import revocation_list
+from utils import cache
+
+INVALID = HTTPException(status_code=401, detail="Could not validate credentials")
+
+
+def no_decode(*args, **kwargs):
+    raise jwt_handler.JWTError("token was decoded again")
+
+
+def test_repeat_verification_is_served_from_the_cache(monkeypatch):
+    token = create_access_token({"user_id": 41, "username": "cached"})
+    first = verify_token(token, INVALID)
+
+    monkeypatch.setattr(jwt_handler.jwt, "decode", no_decode)
+
+    assert verify_token(token, INVALID) is first
+
+
+def test_cached_token_expires_with_its_exp_claim(monkeypatch):
+    token = create_access_token({"user_id": 42, "username": "expiring"}, expires_delta=timedelta(seconds=30))
+    verify_token(token, INVALID)
+    assert len(verified_tokens) >= 1
+
+    later = time.monotonic() + 31
+    monkeypatch.setattr(cache.time, "monotonic", lambda: later)
+    monkeypatch.setattr(jwt_handler.jwt, "decode", no_decode)
+
+    # Evicted at exp, so the token goes back to (failing) verification
+    with pytest.raises(HTTPException):
+        verify_token(token, INVALID)
+
+
+def test_revocation_applies_to_cached_tokens():
+    token = create_access_token({"user_id": 43, "username": "revoked"})
+    token_data = verify_token(token, INVALID)
+
+    revocation_list.add_jti(token_data.jti, token_data.expires_at)
+    with pytest.raises(HTTPException):
+        verify_token(token, INVALID)
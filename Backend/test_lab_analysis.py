@@ -0,0 +1,79 @@
+"""
+Tests for lab value extraction and reference-range flagging
+"""
+
+from reports.lab_analysis import analyze_readings, render_summary
+from reports.lab_lexicon import extract_lab_values
+
+REPORT = """METROPOLIS HEALTHCARE
+Test Name Result Unit Bio. Ref. Interval
+Haemoglobin 10.2 L g/dL 13.0 - 17.0
+Total Leucocyte Count 7,800 /cumm 4000 - 11000
+Platelet Count 1.8 lakhs/cumm 1.5 - 4.1
+Absolute Neutrophils 4.2 10^3/uL
+Glucose, Fasting (Plasma) 126 mg/dL 70 - 100
+LDL/HDL Ratio 2.5
+Urine glucose 30
+Hemoglobin 99 g/dL
+"""
+
+
+def readings_by_key(text):
+    return {reading.key: reading for reading in extract_lab_values(text)}
+
+
+def test_extracts_values_units_and_aliases():
+    readings = readings_by_key(REPORT)
+
+    assert readings["hemoglobin"].value == 10.2
+    assert readings["hemoglobin"].unit is None  # "L" is a result flag, not a unit
+    assert readings["wbc"].value == 7800
+    assert readings["wbc"].unit == "/cumm"
+    assert readings["platelets"].unit == "lakhs/cumm"
+    assert readings["glucose_fasting"].value == 126
+
+
+def test_ignores_ratios_absolute_counts_urine_and_repeats():
+    readings = readings_by_key(REPORT)
+
+    assert "neutrophils" not in readings
+    assert "ldl" not in readings and "hdl" not in readings
+    assert "glucose" not in readings  # only the fasting value, not urine glucose
+    assert readings["hemoglobin"].value == 10.2  # first reading wins
+
+
+def test_values_are_flagged_against_converted_ranges():
+    text = "Hemoglobin 10.2 g/dL\nPlatelet Count 1.8 lakhs/cumm\nFasting Blood Sugar 7.0 mmol/L\nTSH 2.1 uIU/mL"
+    analysis = analyze_readings(extract_lab_values(text), age=40, gender="male")
+    values = analysis.detected_values
+
+    assert values["hemoglobin"]["status"] == "low"
+    assert values["hemoglobin"]["reference_range"] == "13.5-17.5 g/dL"
+    assert values["platelets"]["value"] == 180000 and values["platelets"]["status"] == "normal"
+    assert values["glucose_fasting"]["value"] == 126.0 and values["glucose_fasting"]["status"] == "high"
+    assert [item["analyte"] for item in analysis.abnormalities] == ["glucose_fasting", "hemoglobin"]
+    assert analysis.risk_level == "medium"
+
+
+def test_ranges_depend_on_sex_and_critical_values_are_high_risk():
+    female = analyze_readings(extract_lab_values("Hemoglobin 12.8 g/dL"), age=30, gender="female")
+    male = analyze_readings(extract_lab_values("Hemoglobin 12.8 g/dL"), age=30, gender="male")
+    assert female.detected_values["hemoglobin"]["status"] == "normal"
+    assert male.detected_values["hemoglobin"]["status"] == "low"
+
+    critical = analyze_readings(extract_lab_values("Hemoglobin 6.1 g/dL"), age=30, gender="female")
+    assert critical.detected_values["hemoglobin"]["status"] == "critical_low"
+    assert critical.risk_level == "high"
+
+
+def test_unknown_units_are_not_flagged():
+    analysis = analyze_readings(extract_lab_values("Hemoglobin 130 furlongs"), age=30, gender="male")
+    assert analysis.detected_values["hemoglobin"]["status"] == "unknown"
+    assert analysis.abnormalities == []
+    assert "could not be checked" in render_summary(analysis)
+
+
+def test_nothing_read():
+    analysis = analyze_readings(extract_lab_values("Radiology report: no abnormality detected"))
+    assert analysis.detected_values == {} and analysis.risk_level is None
+    assert render_summary(analysis).startswith("No lab test values could be read")
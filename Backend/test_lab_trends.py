@@ -0,0 +1,144 @@
+"""
+Tests for per-user lab trends
+"""
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from conftest import make_pdf
+from database import AsyncSessionLocal
+from models import LabTrend, MedicalReport
+from reports.lab_lexicon import LAB_TESTS_BY_KEY
+from reports import lab_trends
+from reports.lab_trends import rebuild_trends, record_observations, trend_payload, trend_slope
+
+
+def lab_report(hemoglobin, glucose):
+    return make_pdf(["CITY LAB", f"Hemoglobin {hemoglobin} g/dL", f"Fasting Blood Sugar {glucose} mg/dL"])
+
+
+def upload_report(client, headers, hemoglobin, glucose):
+    response = client.post(
+        "/api/reports/upload",
+        files={"file": ("lab.pdf", lab_report(hemoglobin, glucose), "application/pdf")},
+        headers=headers
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["data"]["id"]
+
+
+def hemoglobin_trend(client, headers):
+    response = client.get("/api/reports/trends/hemoglobin?points=0", headers=headers)
+    return response.json()["data"] if response.status_code == 200 else None
+
+
+def test_delete_report_removes_its_values_from_trends(client, auth_headers):
+    # conftest enforces foreign keys, so the report delete cascades its
+    # observations exactly as on MySQL
+    first = upload_report(client, auth_headers, 12.0, 100)
+    second = upload_report(client, auth_headers, 15.0, 140)
+
+    trend = hemoglobin_trend(client, auth_headers)
+    assert trend["count"] == 2
+    assert trend["latest_value"] == 15.0
+    assert trend["max_value"] == 15.0
+
+    assert client.delete(f"/api/reports/{second}", headers=auth_headers).status_code == 200
+
+    trend = hemoglobin_trend(client, auth_headers)
+    assert trend["count"] == 1
+    assert trend["latest_value"] == 12.0
+    assert trend["min_value"] == trend["max_value"] == 12.0
+    assert trend["previous_value"] is None
+
+    assert client.delete(f"/api/reports/{first}", headers=auth_headers).status_code == 200
+    assert hemoglobin_trend(client, auth_headers) is None
+
+
+def test_deleting_another_users_report_changes_nothing(client, auth_headers):
+    report_id = upload_report(client, auth_headers, 13.0, 90)
+    other = client.post("/api/auth/signup", json={
+        "username": "trend_intruder", "email": "trend_intruder@example.com",
+        "password": "Passw0rd!", "full_name": "Other"
+    })
+    assert other.status_code == 201
+    token = client.post("/api/auth/login", json={
+        "username": "trend_intruder", "password": "Passw0rd!"
+    }).json()["data"]["access_token"]
+
+    response = client.delete(f"/api/reports/{report_id}", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 404
+    assert hemoglobin_trend(client, auth_headers)["count"] == 1
+
+
+def record_series(user_id, analyte, points):
+    """Fold (day offset, value) points into a trend the way uploads do; returns the LabTrend row"""
+    async def run():
+        async with AsyncSessionLocal() as db:
+            start = datetime(2025, 1, 1)
+            for day, value in points:
+                report = MedicalReport(user_id=user_id, report_type="blood_test", original_filename="lab.pdf",
+                                       file_path=f"trend/{uuid.uuid4().hex}", file_type="pdf")
+                db.add(report)
+                await db.flush()
+                await record_observations(db, user_id, report.id, start + timedelta(days=day),
+                                          {analyte: {"value": value, "unit": LAB_TESTS_BY_KEY[analyte].unit}})
+            await db.commit()
+            folded = await db.get(LabTrend, (user_id, analyte))
+            folded_slope, folded_payload = trend_slope(folded), trend_payload(folded)
+
+            await rebuild_trends(db, user_id, [analyte])
+            await db.commit()
+            rebuilt = await db.get(LabTrend, (user_id, analyte), populate_existing=True)
+            return folded_slope, folded_payload, trend_slope(rebuilt)
+    return asyncio.run(run())
+
+
+def user_id_of(client, headers):
+    return client.get("/api/auth/me", headers=headers).json()["data"]["id"]
+
+
+def test_trend_slope_is_the_least_squares_fit(client, auth_headers):
+    points = [(0, 12.0), (30, 12.5), (75, 13.4), (120, 13.1)]
+    folded, payload, rebuilt = record_series(user_id_of(client, auth_headers), "hemoglobin", points)
+
+    days, values = zip(*points)
+    expected = np.polyfit(days, values, 1)[0] * 365.25
+    assert folded == pytest.approx(expected, rel=1e-9)
+    assert rebuilt == pytest.approx(expected, rel=1e-9)
+    assert payload["direction"] == "rising"
+    assert payload["count"] == 4 and payload["latest_value"] == 13.1 and payload["previous_value"] == 13.4
+    assert payload["min_value"] == 12.0 and payload["max_value"] == 13.4
+
+
+def test_flat_series_is_stable_and_short_series_has_no_slope(client, auth_headers):
+    user_id = user_id_of(client, auth_headers)
+
+    _, payload, _ = record_series(user_id, "glucose_fasting", [(0, 90.0), (90, 91.0), (180, 90.0)])
+    assert payload["direction"] == "stable"
+
+    # Two readings on the same day say nothing about a trend
+    slope, payload, _ = record_series(user_id, "tsh", [(0, 2.0), (0.25, 4.0)])
+    assert slope is None and payload["direction"] is None
+
+
+def test_trend_created_concurrently_still_gets_the_value(client, auth_headers, monkeypatch):
+    update_trend = lab_trends._update_trend
+    calls = []
+
+    async def row_created_after_update(db, *args):
+        # The second UPDATE misses the row, as if another upload created it
+        # right after; the INSERT below then conflicts with that row
+        calls.append(args)
+        if len(calls) == 2:
+            return 0
+        return await update_trend(db, *args)
+
+    monkeypatch.setattr(lab_trends, "_update_trend", row_created_after_update)
+    _, payload, _ = record_series(user_id_of(client, auth_headers), "hemoglobin", [(0, 12.0), (30, 13.0)])
+    assert payload["count"] == 2
+    assert payload["latest_value"] == 13.0 and payload["previous_value"] == 12.0
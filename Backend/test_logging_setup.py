@@ -0,0 +1,18 @@
+"""
+Tests for logging configuration
+"""
+
+import logging
+
+from config import settings
+from utils.logging_setup import _configured_level
+
+
+def test_log_level_names_are_case_insensitive(monkeypatch):
+    monkeypatch.setattr(settings, "LOG_LEVEL", " debug ")
+    assert _configured_level() == (logging.DEBUG, True)
+
+
+def test_unknown_log_level_falls_back_to_info(monkeypatch):
+    monkeypatch.setattr(settings, "LOG_LEVEL", "verbose")
+    assert _configured_level() == (logging.INFO, False)
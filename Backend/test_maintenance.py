@@ -0,0 +1,112 @@
+"""
+Tests for the background purge and orphan blob sweep
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import select, update
+
+from conftest import make_pdf
+from database import AsyncSessionLocal
+from models import MedicalReport, Prescription
+from utils.blob_store import blob_store
+from utils.maintenance import MaintenanceReport, collect_orphan_blobs, purge_deleted
+
+GRACE_SECONDS = 3600
+
+
+def age(key, seconds):
+    path = blob_store.path(key)
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def add_prescriptions(user_id, key, deleted):
+    async def run():
+        async with AsyncSessionLocal() as db:
+            rows = [
+                Prescription(user_id=user_id, original_filename="rx.jpg", file_path=key, file_type="jpg",
+                             deleted_at=datetime.utcnow() if is_deleted else None)
+                for is_deleted in deleted
+            ]
+            db.add_all(rows)
+            await db.commit()
+    asyncio.run(run())
+
+
+def test_orphan_sweep_respects_the_grace_period(client, auth_headers):
+    user_id = client.get("/api/auth/me", headers=auth_headers).json()["data"]["id"]
+    old_orphan = asyncio.run(blob_store.put(b"old orphan")).key
+    young_orphan = asyncio.run(blob_store.put(b"young orphan")).key
+    old_referenced = asyncio.run(blob_store.put(b"old referenced")).key
+    add_prescriptions(user_id, old_referenced, [False])
+    age(old_orphan, GRACE_SECONDS + 60)
+    age(old_referenced, GRACE_SECONDS + 60)
+
+    report = MaintenanceReport(started_at=datetime.utcnow())
+    asyncio.run(collect_orphan_blobs(AsyncSessionLocal, 2, GRACE_SECONDS, report))
+
+    assert not asyncio.run(blob_store.exists(old_orphan))
+    assert asyncio.run(blob_store.exists(young_orphan))  # its row may not be committed yet
+    assert asyncio.run(blob_store.exists(old_referenced))
+    assert report.orphan_blobs_removed == 1
+    assert report.bytes_reclaimed == len(b"old orphan")
+
+
+def test_purge_keeps_a_blob_another_row_shares(client, auth_headers):
+    user_id = client.get("/api/auth/me", headers=auth_headers).json()["data"]["id"]
+    shared = asyncio.run(blob_store.put(b"uploaded twice")).key
+    add_prescriptions(user_id, shared, [True, False])
+
+    report = MaintenanceReport(started_at=datetime.utcnow())
+    asyncio.run(purge_deleted(AsyncSessionLocal, 100, report))
+    assert report.prescriptions_purged >= 1
+    assert asyncio.run(blob_store.exists(shared))
+
+    # Once the last row is deleted and purged, the blob goes too
+    async def delete_remaining():
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Prescription).where(Prescription.file_path == shared).values(deleted_at=datetime.utcnow())
+            )
+            await db.commit()
+    asyncio.run(delete_remaining())
+    age(shared, GRACE_SECONDS + 60)
+    asyncio.run(purge_deleted(AsyncSessionLocal, 100, MaintenanceReport(started_at=datetime.utcnow())))
+    assert not asyncio.run(blob_store.exists(shared))
+
+
+def upload_report(client, headers, content):
+    response = client.post(
+        "/api/reports/upload", files={"file": ("lab.pdf", content, "application/pdf")}, headers=headers
+    )
+    assert response.status_code == 201, response.text
+    report_id = response.json()["data"]["id"]
+
+    async def file_path():
+        async with AsyncSessionLocal() as db:
+            return (await db.execute(select(MedicalReport.file_path).where(MedicalReport.id == report_id))).scalar_one()
+    return report_id, asyncio.run(file_path())
+
+
+def test_purge_keeps_a_blob_uploaded_again_after_delete(client, auth_headers):
+    content = make_pdf(["CITY LAB", f"Sample {uuid.uuid4().hex}", "Hemoglobin 13.5 g/dL"])
+    report_id, key = upload_report(client, auth_headers, content)
+    age(key, GRACE_SECONDS + 60)
+    assert client.delete(f"/api/reports/{report_id}", headers=auth_headers).status_code == 200
+
+    # The same file arrives again; its row is not committed when the purge runs
+    asyncio.run(blob_store.put(content))
+    asyncio.run(purge_deleted(AsyncSessionLocal, 100, MaintenanceReport(started_at=datetime.utcnow())))
+    assert asyncio.run(blob_store.exists(key))
+
+    # ...and once it is, the new report reads the same blob
+    new_report_id, new_key = upload_report(client, auth_headers, content)
+    assert new_key == key
+    asyncio.run(purge_deleted(AsyncSessionLocal, 100, MaintenanceReport(started_at=datetime.utcnow())))
+    assert asyncio.run(blob_store.exists(key))
+    assert client.get(f"/api/reports/{new_report_id}", headers=auth_headers).status_code == 200
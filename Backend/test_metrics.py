@@ -0,0 +1,52 @@
+"""
+Tests for the /metrics endpoint
+"""
+
+from prometheus_client.parser import text_string_to_metric_families
+
+from utils.metrics import CallbackCollector, PARSE_SECONDS, OCR_RESULTS, registry
+
+
+def scrape(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=")
+    return {family.name: family for family in text_string_to_metric_families(response.text)}
+
+
+def test_metrics_parse_as_exposition_format(client):
+    PARSE_SECONDS.observe(0.003)
+    OCR_RESULTS.labels("pdf", "success").inc()
+    families = scrape(client)
+
+    stages = families["cura_stage_duration_seconds"]
+    assert stages.type == "histogram"
+    parse = {(sample.name, sample.labels.get("le")): sample.value
+             for sample in stages.samples if sample.labels["stage"] == "parse"}
+    assert parse[("cura_stage_duration_seconds_bucket", "0.0025")] == 0
+    assert parse[("cura_stage_duration_seconds_bucket", "0.005")] >= 1
+    assert parse[("cura_stage_duration_seconds_bucket", "+Inf")] == parse[("cura_stage_duration_seconds_count", None)]
+
+    ocr = families["cura_ocr_results"]
+    assert ocr.type == "counter"
+    assert any(sample.name == "cura_ocr_results_total" and sample.labels == {"source": "pdf", "outcome": "success"}
+               and sample.value >= 1 for sample in ocr.samples)
+
+    # Read from their sources at scrape time
+    assert families["cura_db_pool_connections"].type == "gauge"
+    assert families["cura_log_records_dropped"].type == "counter"
+    assert {sample.labels["queue"] for sample in families["cura_queue_depth"].samples} == {"password_hashing", "search_index"}
+
+
+def test_failing_callback_does_not_hide_other_metrics(client):
+    def broken():
+        raise RuntimeError("source is down")
+
+    collector = CallbackCollector("cura_test_broken", "Always fails", broken)
+    registry.register(collector)
+    try:
+        families = scrape(client)
+    finally:
+        registry.unregister(collector)
+    assert "cura_test_broken" not in families
+    assert "cura_stage_duration_seconds" in families
@@ -0,0 +1,58 @@
+"""
+Tests for keyset pagination cursors
+"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from database import AsyncSessionLocal
+from models import SymptomInteraction
+from utils.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 3, 5, 14, 7, 9)
+    cursor = encode_cursor(created_at, 1234)
+
+    assert "=" not in cursor and "/" not in cursor and "+" not in cursor
+    assert decode_cursor(cursor) == (created_at, 1234)
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor(datetime(2024, 1, 1), 1)[:-3], "W10"])
+def test_malformed_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def test_rows_with_equal_timestamps_are_paged_by_id(client, auth_headers):
+    user_id = client.get("/api/auth/me", headers=auth_headers).json()["data"]["id"]
+    same_second = datetime(2024, 6, 1, 9, 30, 0)
+
+    async def seed():
+        async with AsyncSessionLocal() as db:
+            rows = [
+                SymptomInteraction(user_id=user_id, symptoms_text=f"check {n}", created_at=same_second)
+                for n in range(5)
+            ]
+            rows.append(SymptomInteraction(user_id=user_id, symptoms_text="older", created_at=datetime(2024, 5, 1)))
+            db.add_all(rows)
+            await db.commit()
+            return [row.id for row in rows]
+    ids = asyncio.run(seed())
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/api/symptoms/history", params=params, headers=auth_headers).json()["data"]
+        seen.extend(item["id"] for item in page["history"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    # Newest first, ties broken by id, every row exactly once
+    assert seen == sorted(ids[:5], reverse=True) + [ids[5]]
@@ -0,0 +1,83 @@
+"""
+Tests for medical report upload, soft delete and purge
+"""
+
+import asyncio
+import logging
+import os
+import time
+
+from sqlalchemy import select
+
+from config import settings
+from conftest import make_pdf
+from database import AsyncSessionLocal
+from models import MedicalReport, LabObservation
+from reports import routes as report_routes
+from utils.blob_store import blob_store
+from utils.maintenance import MaintenanceReport, purge_deleted
+
+
+def upload(client, headers, lines):
+    response = client.post(
+        "/api/reports/upload",
+        files={"file": ("lab.pdf", make_pdf(lines), "application/pdf")},
+        headers=headers
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["data"]["id"]
+
+
+def test_deleted_report_is_hidden_then_purged(client, auth_headers):
+    report_id = upload(client, auth_headers, ["LAB", "Hemoglobin 12.5 g/dL", "Purge marker 7c1"])
+
+    async def file_path():
+        async with AsyncSessionLocal() as db:
+            return await db.scalar(select(MedicalReport.file_path).where(MedicalReport.id == report_id))
+    blob_key = asyncio.run(file_path())
+
+    assert client.delete(f"/api/reports/{report_id}", headers=auth_headers).status_code == 200
+
+    # Hidden everywhere at once, and a second delete is a 404
+    assert client.get(f"/api/reports/{report_id}", headers=auth_headers).status_code == 404
+    listed = client.get("/api/reports/list", headers=auth_headers).json()["data"]
+    assert report_id not in [item["id"] for item in listed["reports"]]
+    assert listed["total"] == 0
+    assert client.get("/api/reports/trends/hemoglobin", headers=auth_headers).status_code == 404
+    assert client.delete(f"/api/reports/{report_id}", headers=auth_headers).status_code == 404
+
+    # Older than the grace period, so the purge may release the blob at once
+    then = time.time() - settings.BLOB_GC_GRACE_SECONDS - 60
+    os.utime(blob_store.path(blob_key), (then, then))
+
+    async def purge():
+        report = MaintenanceReport(started_at=None)
+        await purge_deleted(AsyncSessionLocal, 100, report)
+        async with AsyncSessionLocal() as db:
+            row = await db.get(MedicalReport, report_id)
+            observations = (await db.execute(
+                select(LabObservation.id).where(LabObservation.report_id == report_id)
+            )).all()
+        return report, row, observations, await blob_store.exists(blob_key)
+
+    report, row, observations, blob_exists = asyncio.run(purge())
+    assert report.reports_purged >= 1
+    assert row is None
+    assert observations == []
+    assert not blob_exists
+
+
+def test_processing_failure_is_logged(client, auth_headers, monkeypatch, caplog):
+    def broken_analysis(*args):
+        raise ValueError("reference range table missing")
+
+    monkeypatch.setattr(report_routes, "analyze_readings", broken_analysis)
+    with caplog.at_level(logging.ERROR, logger="reports.routes"):
+        report_id = upload(client, auth_headers, ["LAB", "Hemoglobin 12.5 g/dL"])
+
+    record, = [record for record in caplog.records if record.name == "reports.routes"]
+    assert record.getMessage() == "Report processing failed"
+    assert record.exc_info[0] is ValueError
+    assert record.file_type == ".pdf"
+    detail = client.get(f"/api/reports/{report_id}", headers=auth_headers).json()["data"]
+    assert detail["processing_status"] == "failed"
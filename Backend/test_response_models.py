@@ -0,0 +1,136 @@
+"""
+Tests that every route's payload matches its declared response_model
+
+Routes return a finished ORJSONResponse (utils/responses.py), so FastAPI
+never validates them against the model in the decorator. These tests call
+each such route and check the payload against that model instead.
+"""
+
+import uuid
+
+from fastapi.routing import APIRoute
+
+from conftest import make_pdf
+
+PRESCRIPTION_PDF = ["Dr. Sharma Clinic", "Rx", "1. Tab Dolo 650 mg 1-0-1 x 5 days after food",
+                    "2. Cap Amoxicillin 500 mg 1-1-1 x 7 days"]
+REPORT_PDF = ["CITY LAB", "Hemoglobin 12.5 g/dL", "Fasting Blood Sugar 110 mg/dL"]
+
+
+def declared_models(app):
+    """(method, path) -> response_model of every route that declares one"""
+    return {
+        (method, route.path): route.response_model
+        for route in app.routes
+        if isinstance(route, APIRoute) and route.response_model is not None
+        for method in route.methods
+    }
+
+
+def signup(client):
+    username = f"contract_{uuid.uuid4().hex[:12]}"
+    response = client.post("/api/auth/signup", json={
+        "username": username, "email": f"{username}@example.com",
+        "password": "Passw0rd!", "full_name": "Contract Test"
+    })
+    return username, response
+
+
+def requests_to_check(client):
+    """
+    Yield (method, route path, response) for one call of every documented route
+
+    Calls run in order: created records are read, then deleted, and the
+    session is logged out last.
+    """
+    username, response = signup(client)
+    yield "POST", "/api/auth/signup", response
+    response = client.post("/api/auth/login", json={"username": username, "password": "Passw0rd!"})
+    yield "POST", "/api/auth/login", response
+    tokens = response.json()["data"]
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    yield "GET", "/api/auth/me", client.get("/api/auth/me", headers=headers)
+
+    response = client.post(
+        "/api/prescription/upload",
+        files={"file": ("rx.pdf", make_pdf(PRESCRIPTION_PDF), "application/pdf")}, headers=headers
+    )
+    yield "POST", "/api/prescription/upload", response
+    prescription_id = response.json()["data"]["id"]
+
+    response = client.post("/api/symptoms/analyze", json={"symptoms_text": "fever and headache since yesterday"},
+                           headers=headers)
+    yield "POST", "/api/symptoms/analyze", response
+    interaction_id = response.json()["data"]["id"]
+
+    response = client.post(
+        "/api/reports/upload", files={"file": ("lab.pdf", make_pdf(REPORT_PDF), "application/pdf")}, headers=headers
+    )
+    yield "POST", "/api/reports/upload", response
+    report_id = response.json()["data"]["id"]
+
+    for path, url in [
+        ("/api/auth/dashboard", "/api/auth/dashboard"),
+        ("/api/prescription/list", "/api/prescription/list"),
+        ("/api/prescription/medications", "/api/prescription/medications"),
+        ("/api/prescription/doses/upcoming", "/api/prescription/doses/upcoming"),
+        ("/api/prescription/{prescription_id}", f"/api/prescription/{prescription_id}"),
+        ("/api/prescription/{prescription_id}/interactions", f"/api/prescription/{prescription_id}/interactions"),
+        ("/api/prescription/{prescription_id}/schedule", f"/api/prescription/{prescription_id}/schedule"),
+        ("/api/symptoms/suggest", "/api/symptoms/suggest?q=hea"),
+        ("/api/symptoms/history", "/api/symptoms/history"),
+        ("/api/symptoms/{interaction_id}", f"/api/symptoms/{interaction_id}"),
+        ("/api/reports/list", "/api/reports/list"),
+        ("/api/reports/trends", "/api/reports/trends"),
+        ("/api/reports/trends/{analyte}", "/api/reports/trends/hemoglobin"),
+        ("/api/reports/{report_id}", f"/api/reports/{report_id}"),
+        ("/api/search", "/api/search?q=fever"),
+    ]:
+        yield "GET", path, client.get(url, headers=headers)
+
+    for path, url in [
+        ("/api/prescription/{prescription_id}", f"/api/prescription/{prescription_id}"),
+        ("/api/symptoms/{interaction_id}", f"/api/symptoms/{interaction_id}"),
+        ("/api/reports/{report_id}", f"/api/reports/{report_id}"),
+    ]:
+        yield "DELETE", path, client.delete(url, headers=headers)
+
+    response = client.post("/api/auth/refresh", params={"refresh_token": tokens["refresh_token"]})
+    yield "POST", "/api/auth/refresh", response
+    headers = {"Authorization": f"Bearer {response.json()['data']['access_token']}"}
+    yield "POST", "/api/auth/logout", client.post("/api/auth/logout", headers=headers)
+
+    token = client.post("/api/auth/login", json={"username": username, "password": "Passw0rd!"}).json()["data"]
+    yield "POST", "/api/auth/logout-all", client.post(
+        "/api/auth/logout-all", headers={"Authorization": f"Bearer {token['access_token']}"}
+    )
+
+
+def matches(model, payload) -> bool:
+    """
+    Payload validates against model and has no field the model does not
+    declare (a dump that differs from the payload means one was dropped)
+    """
+    return model.model_validate(payload).model_dump(mode="json", exclude_unset=True) == payload
+
+
+def test_payloads_match_declared_response_models(client):
+    models = declared_models(client.app)
+    checked = set()
+    for method, path, response in requests_to_check(client):
+        assert response.status_code < 300, f"{method} {path}: {response.status_code} {response.text}"
+        model = models[(method, path)]
+        assert matches(model, response.json()), f"{method} {path} does not match {model.__name__}"
+        checked.add((method, path))
+
+    assert checked == set(models), f"Routes without a contract check: {sorted(set(models) - checked)}"
+
+
+def test_an_undeclared_field_is_caught(client, auth_headers):
+    model = declared_models(client.app)[("GET", "/api/auth/me")]
+    payload = client.get("/api/auth/me", headers=auth_headers).json()
+    assert matches(model, payload)
+
+    payload["data"]["password_hash"] = "leaked"
+    assert not matches(model, payload)
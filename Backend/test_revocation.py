@@ -0,0 +1,78 @@
+"""
+Tests for token revocation: the jti Bloom filter and logout-everywhere cut-offs
+"""
+
+import asyncio
+import uuid
+
+from auth.revocation import BloomFilter, RevocationList, revocation_list
+from database import AsyncSessionLocal
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(capacity=2000, error_rate=0.01)
+    added = [uuid.uuid4().hex for _ in range(2000)]
+    for jti in added:
+        bloom.add(jti)
+
+    assert all(jti in bloom for jti in added)
+    others = [uuid.uuid4().hex for _ in range(20000)]
+    false_positives = sum(jti in bloom for jti in others)
+    assert false_positives < len(others) * 0.03
+
+
+def test_bloom_filter_accepts_non_hex_ids():
+    bloom = BloomFilter(capacity=10)
+    bloom.add("legacy-token-id")
+    assert "legacy-token-id" in bloom
+
+
+def test_revoked_jti_is_rejected():
+    revocations = RevocationList(capacity=100)
+    revocations.add_jti("ab" * 16, expires_at=2_000_000_000)
+
+    assert revocations.is_revoked(1, "ab" * 16, 1_700_000_000.5)
+    assert not revocations.is_revoked(1, "cd" * 16, 1_700_000_000.5)
+
+
+def test_cutoff_rejects_only_tokens_issued_before_it():
+    revocations = RevocationList(capacity=100)
+    revocations.add_user_cutoff(7, 1_700_000_000.25, expires_at=2_000_000_000)
+
+    assert revocations.is_revoked(7, None, 1_700_000_000.2)
+    assert not revocations.is_revoked(7, None, 1_700_000_000.3)  # same second, issued after
+    assert revocations.is_revoked(7, None, 1_700_000_000)        # whole-second iat of an older token
+    assert revocations.is_revoked(7, None, None)                 # token from before iat existed
+    assert not revocations.is_revoked(8, None, 1_700_000_000.2)  # another user
+
+
+def test_later_cutoff_wins():
+    revocations = RevocationList(capacity=100)
+    revocations.add_user_cutoff(7, 200.0, expires_at=2_000_000_000)
+    revocations.add_user_cutoff(7, 100.0, expires_at=2_000_000_000)
+    assert revocations.is_revoked(7, None, 150.0)
+
+
+def login(client, username):
+    response = client.post("/api/auth/login", json={"username": username, "password": "Passw0rd!"})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['data']['access_token']}"}
+
+
+def test_logging_in_right_after_logout_everywhere_works(client, auth_headers):
+    me = client.get("/api/auth/me", headers=auth_headers).json()["data"]
+    username, user_id = me["username"], me["id"]
+
+    assert client.post("/api/auth/logout-all", headers=auth_headers).status_code == 200
+    fresh = login(client, username)
+
+    assert client.get("/api/auth/me", headers=auth_headers).status_code == 401
+    assert client.get("/api/auth/me", headers=fresh).status_code == 200
+
+    # Another worker loading the cut-off from the database decides the same way
+    synced = RevocationList(capacity=100)
+    asyncio.run(synced.sync(AsyncSessionLocal))
+    cutoff = synced._user_cutoffs[user_id][0]
+    assert cutoff == revocation_list._user_cutoffs[user_id][0]  # microseconds survive the round trip
+    assert not synced.is_revoked(user_id, None, cutoff + 0.001)
+    assert synced.is_revoked(user_id, None, cutoff - 0.001)
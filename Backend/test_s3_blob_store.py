@@ -0,0 +1,87 @@
+"""
+Tests for the S3 blob store, against moto's in-process S3
+"""
+
+import asyncio
+import os
+from datetime import datetime
+
+import pytest
+
+boto3 = pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+import moto.s3.models  # noqa: E402
+from botocore.exceptions import ClientError  # noqa: E402
+
+from utils.blob_store import S3BlobStore, blob_key  # noqa: E402
+
+BUCKET = "cura-blobs"
+
+
+@pytest.fixture
+def store(monkeypatch):
+    for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+        monkeypatch.setenv(name, "testing")
+    with moto.mock_aws():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket=BUCKET)
+        yield S3BlobStore(BUCKET, prefix="/blobs/", region="us-east-1")
+
+
+def object_keys():
+    listing = boto3.client("s3", region_name="us-east-1").list_objects_v2(Bucket=BUCKET)
+    return [item["Key"] for item in listing.get("Contents", [])]
+
+
+def test_identical_content_is_stored_once_and_refreshed(store, monkeypatch):
+    # Objects written now appear to date from 2020
+    monkeypatch.setattr(moto.s3.models, "utcnow", lambda: datetime(2020, 1, 1))
+    first = asyncio.run(store.put(b"same scan"))
+    old = asyncio.run(store.stat(first.key)).modified
+    monkeypatch.undo()
+
+    second = asyncio.run(store.put(b"same scan"))
+    other = asyncio.run(store.put(b"another scan"))
+
+    assert first.created and not second.created and other.created
+    assert first.key == second.key == blob_key(b"same scan")
+    assert sorted(object_keys()) == sorted(f"blobs/{key}" for key in (first.key, other.key))
+    # The copy onto itself moved LastModified, so the orphan sweep leaves it alone
+    assert asyncio.run(store.stat(first.key)).modified > old
+    assert {blob.key: blob.size for blob in store.iter_blobs()} == {
+        first.key: len(b"same scan"), other.key: len(b"another scan")
+    }
+
+
+def test_delete_reports_bytes_freed(store):
+    async def run():
+        info = await store.put(b"12345")
+        return (await store.size(info.key), await store.delete(info.key),
+                await store.delete(info.key), await store.exists(info.key), await store.stat(info.key))
+
+    assert asyncio.run(run()) == (5, 5, 0, False, None)
+
+
+def test_local_copy_is_removed_after_use(store):
+    key = asyncio.run(store.put(b"%PDF scan")).key
+
+    async def read():
+        async with store.local_copy(key) as path:
+            with open(path, "rb") as f:
+                return path, f.read()
+
+    path, content = asyncio.run(read())
+    assert content == b"%PDF scan"
+    assert not os.path.exists(path)
+
+
+def test_local_copy_of_a_missing_blob_leaves_no_file(store, tmp_path, monkeypatch):
+    monkeypatch.setenv("TMPDIR", str(tmp_path))
+    monkeypatch.setattr("tempfile.tempdir", None)
+
+    async def read():
+        async with store.local_copy(blob_key(b"never stored")):
+            pass
+
+    with pytest.raises(ClientError):
+        asyncio.run(read())
+    assert os.listdir(tmp_path) == []
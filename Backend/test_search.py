@@ -0,0 +1,127 @@
+"""
+Tests for per-user full-text search
+"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from database import AsyncSessionLocal
+from models import Prescription
+from search.indexer import index_batch, index_missing
+from search.text_index import DOC_PRESCRIPTION, DOC_TYPES, SNIPPET_CONTEXT, make_snippet, parse_query, rank
+
+
+@pytest.mark.parametrize("query, terms, prefix", [
+    ("parac", [], "parac"),
+    ("fever ", ["fever"], None),
+    ("fever head", ["fever"], "head"),
+    ("fever and", ["fever"], None),      # a stopword is never a prefix
+    ("Fever, Headache", ["fever"], "headache"),
+    ("fever fever", [], "fever"),
+    ("   ", [], None),
+])
+def test_parse_query(query, terms, prefix):
+    assert parse_query(query) == (terms, prefix)
+
+
+def user_id_of(client, headers):
+    return client.get("/api/auth/me", headers=headers).json()["data"]["id"]
+
+
+def add_prescriptions(user_id, records, index=True, **columns):
+    """Completed prescriptions from (extracted text, medicine names) pairs; returns their IDs"""
+    async def run():
+        async with AsyncSessionLocal() as db:
+            values = {"processing_status": "completed", **columns}
+            rows = [
+                Prescription(user_id=user_id, original_filename="rx.jpg", file_path="rx/search", file_type="jpg",
+                             extracted_text=text, medicines=[{"medicine_name": name} for name in names], **values)
+                for text, names in records
+            ]
+            db.add_all(rows)
+            await db.commit()
+            ids = [row.id for row in rows]
+        if index:
+            await index_batch(AsyncSessionLocal, [(DOC_PRESCRIPTION, doc_id) for doc_id in ids])
+        return ids
+    return asyncio.run(run())
+
+
+def ranked(user_id, query):
+    async def run():
+        async with AsyncSessionLocal() as db:
+            return await rank(db, user_id, query, DOC_TYPES, 10)
+    return [(hit.doc_id, hit.terms) for hit in asyncio.run(run())]
+
+
+def test_bm25_ranks_names_above_text_and_rare_words_above_common(client, auth_headers):
+    user_id = user_id_of(client, auth_headers)
+    in_name, in_text, elsewhere = add_prescriptions(user_id, [
+        ("Take twice daily after food for fever", ["Amoxicillin"]),
+        ("Amoxicillin was stopped, take twice daily after food", ["Cetirizine"]),
+        ("Take twice daily after food", ["Pantoprazole"]),
+    ])
+
+    # Same word, but in a medicine name it counts NAME_BOOST times
+    assert [doc_id for doc_id, _ in ranked(user_id, "amoxicillin ")] == [in_name, in_text]
+
+    # "daily" is in every record, "fever" in one: the rare word decides
+    hits = ranked(user_id, "daily fever ")
+    assert hits[0] == (in_name, ["daily", "fever"])
+    assert {doc_id for doc_id, _ in hits[1:]} == {in_text, elsewhere}
+
+
+def test_prefix_matches_completions_once_per_record(client, auth_headers):
+    user_id = user_id_of(client, auth_headers)
+    paracetamol, = add_prescriptions(user_id, [("Paracetamol 650, paracetamol syrup if needed", ["Paracetamol"])])
+
+    assert ranked(user_id, "parac") == [(paracetamol, ["paracetamol"])]
+    assert ranked(user_id, "parac ") == []  # finished word: exact match only
+    assert ranked(user_id, "ibup") == []
+
+
+def test_snippet_highlights_after_leading_ellipsis():
+    text = "Patient was advised rest and plenty of fluids for three days. " * 2 + "Paracetamol 650 mg twice daily."
+    snippet, highlights = make_snippet(text, ["paracetamol", "daily"])
+
+    assert snippet.startswith("…")
+    assert snippet.index("Paracetamol") <= SNIPPET_CONTEXT + 1
+    assert [snippet[start:end] for start, end in highlights] == ["Paracetamol", "daily"]
+
+
+def test_snippet_without_match_starts_at_the_beginning():
+    snippet, highlights = make_snippet("Short note", ["fever"])
+    assert (snippet, highlights) == ("Short note", [])
+
+
+def test_deleted_prescription_leaves_results(client, auth_headers):
+    user_id = user_id_of(client, auth_headers)
+    prescription_id, = add_prescriptions(user_id, [("Azithromycin 500 once daily", ["Azithromycin"])])
+
+    def results():
+        response = client.get("/api/search", params={"q": "azithro"}, headers=auth_headers)
+        assert response.status_code == 200, response.text
+        return [(result["type"], result["id"]) for result in response.json()["data"]["results"]]
+
+    assert results() == [(DOC_PRESCRIPTION, prescription_id)]
+    assert client.delete(f"/api/prescription/{prescription_id}", headers=auth_headers).status_code == 200
+    assert results() == []
+    assert ranked(user_id, "azithro") == []
+
+
+def test_index_missing_picks_up_records_dropped_from_the_queue(client, auth_headers):
+    user_id = user_id_of(client, auth_headers)
+    # Never queued, as when the queue was full at upload time
+    dropped = add_prescriptions(user_id, [("Metformin 500 after dinner", ["Metformin"])] * 2, index=False)
+    # Neither of these is indexable
+    add_prescriptions(user_id, [("Metformin 1000", ["Metformin"])], index=False, processing_status="pending")
+    add_prescriptions(user_id, [("Metformin 250", ["Metformin"])], index=False, deleted_at=datetime.utcnow())
+    assert ranked(user_id, "metformin") == []
+
+    assert asyncio.run(index_missing(AsyncSessionLocal, 1)) >= 2
+    assert sorted(doc_id for doc_id, _ in ranked(user_id, "metformin")) == dropped
+
+    # Indexed records are not picked up again
+    assert asyncio.run(index_missing(AsyncSessionLocal, 100)) == 0
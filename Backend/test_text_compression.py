@@ -0,0 +1,114 @@
+"""
+Tests for compressed text columns
+"""
+
+import asyncio
+import zlib
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.orm import undefer_group
+
+from database import AsyncSessionLocal
+from models import Prescription, CONTENT_GROUP
+from utils.text_compression import (
+    DICTIONARIES, HEADER, MIN_COMPRESS_LENGTH, NO_DICTIONARY,
+    compress_text, decompress_text, is_compressed, train_dictionary
+)
+
+PRESCRIPTION = (
+    "City Care Clinic\nDr. A. Sharma MBBS, MD\nRx\n"
+    "1. Tab. Augmentin 625mg\n   1 - 0 - 1 x 5 days   After food\n"
+    "2. Tab. Dolo 650mg\n   SOS   for fever\nAdv: Drink plenty of fluids\n"
+)
+
+
+@pytest.mark.parametrize("dictionary_id", [NO_DICTIONARY, *sorted(DICTIONARIES)])
+def test_round_trip_with_each_dictionary(dictionary_id):
+    stored = compress_text(PRESCRIPTION * 3, dictionary_id)
+
+    assert is_compressed(stored)
+    assert stored[len(HEADER)] == dictionary_id
+    assert len(stored) < len(PRESCRIPTION * 3)
+    assert decompress_text(stored) == PRESCRIPTION * 3
+
+
+def test_short_values_are_stored_raw():
+    value = "Tab. Dolo 650mg SOS"
+    assert len(value.encode()) < MIN_COMPRESS_LENGTH
+
+    stored = compress_text(value)
+    assert stored == value.encode()
+    assert not is_compressed(stored)
+    assert decompress_text(stored) == value
+
+
+def test_short_value_that_looks_like_a_header_is_framed():
+    value = "\x00CZ not really compressed"
+    stored = compress_text(value)
+
+    assert is_compressed(stored)
+    assert decompress_text(stored) == value
+
+
+def test_non_ascii_text_round_trips():
+    value = "Paracetamol 500 mg – दिन में दो बार – 1 - 0 - 1 ✓ " * 4
+    assert decompress_text(compress_text(value)) == value
+
+
+def test_legacy_plain_text_is_read_as_is():
+    assert decompress_text("stored before compression") == "stored before compression"
+    assert decompress_text(b"stored before compression") == "stored before compression"
+
+
+def test_unknown_dictionary_falls_back_to_plain_zlib():
+    stored = compress_text(PRESCRIPTION, 250)
+    assert stored[len(HEADER)] == NO_DICTIONARY
+    assert decompress_text(stored) == PRESCRIPTION
+
+
+def test_value_from_a_missing_dictionary_is_an_error():
+    stored = HEADER + bytes([250]) + b"payload"
+    with pytest.raises(ValueError):
+        decompress_text(stored)
+
+
+def test_column_is_compressed_in_the_database(client, auth_headers):
+    user_id = client.get("/api/auth/me", headers=auth_headers).json()["data"]["id"]
+
+    async def run():
+        async with AsyncSessionLocal() as db:
+            prescription = Prescription(user_id=user_id, original_filename="rx.jpg", file_path="rx/compressed",
+                                        file_type="jpg", extracted_text=PRESCRIPTION)
+            db.add(prescription)
+            await db.commit()
+            raw = await db.scalar(
+                text("SELECT extracted_text FROM prescriptions WHERE id = :id"), {"id": prescription.id}
+            )
+            db.expunge_all()
+            loaded = await db.scalar(
+                select(Prescription).options(undefer_group(CONTENT_GROUP)).where(Prescription.id == prescription.id)
+            )
+            return raw, loaded.extracted_text
+
+    raw, loaded = asyncio.run(run())
+    assert is_compressed(raw)
+    assert loaded == PRESCRIPTION
+
+
+def test_trained_dictionary_keeps_recurring_lines_and_fragments():
+    samples = [
+        f"CITY LAB\nHemoglobin {13 + n / 10:.1f} g/dL 13.0 - 17.0\nPatient {n}\nEnd of Report"
+        for n in range(20)
+    ]
+    zdict = train_dictionary(samples)
+
+    assert b"CITY LAB\n" in zdict
+    assert b" g/dL " in zdict           # text between the varying numbers
+    assert b"Patient 3" not in zdict    # seen once
+    assert zdict.count(b"End of Report") == 1
+    assert len(train_dictionary(samples, max_size=16)) <= 16
+
+    plain = len(zlib.compress(samples[0].encode()))
+    compressor = zlib.compressobj(6, zdict=zdict)
+    assert len(compressor.compress(samples[0].encode()) + compressor.flush()) < plain
@@ -0,0 +1,84 @@
+"""
+Tests for the in-process TTL/LRU cache and the authenticated user cache
+"""
+
+import asyncio
+import time
+
+from database import AsyncSessionLocal
+from models import User
+from utils import cache
+from utils.cache import TTLCache, MISSING
+from utils.user_cache import user_cache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    entries = TTLCache(maxsize=4, ttl=10)
+    entries.set("a", 1)
+    entries.set("b", 2, ttl=30)
+
+    clock.now += 9.9
+    assert entries.get("a") == 1
+    clock.now += 0.1
+    assert entries.get("a") is MISSING
+    assert entries.get("b") == 2
+    assert entries.stats()["size"] == 1
+
+
+def test_explicit_expiry_is_a_wall_clock_time(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    entries = TTLCache(ttl=0)
+    entries.set("token", "claims", expires_at=time.time() + 60)
+
+    clock.now += 59
+    assert entries.get("token") == "claims"
+    clock.now += 2
+    assert entries.get("token") is MISSING
+
+
+def test_least_recently_used_entry_is_evicted():
+    entries = TTLCache(maxsize=2, ttl=60)
+    entries.set("a", 1)
+    entries.set("b", 2)
+    assert entries.get("a") == 1  # "b" is now the least recently used
+    entries.set("c", 3)
+
+    assert entries.get("b") is MISSING
+    assert entries.get("a") == 1
+    assert entries.get("c") == 3
+    assert len(entries) == 2
+
+
+def test_cached_user_is_invalidated_on_commit_not_flush(client, auth_headers):
+    user_id = client.get("/api/auth/me", headers=auth_headers).json()["data"]["id"]
+
+    async def run():
+        async with AsyncSessionLocal() as db:
+            user = await db.get(User, user_id)
+            await user_cache.set(user)
+
+            user.email = f"rolled_back_{user_id}@example.com"
+            await db.flush()
+            assert await user_cache.get(user_id) is not None
+            await db.rollback()
+            assert await user_cache.get(user_id) is not None
+
+            user = await db.get(User, user_id)
+            user.email = f"changed_{user_id}@example.com"
+            await db.flush()
+            assert await user_cache.get(user_id) is not None
+            await db.commit()
+            assert await user_cache.get(user_id) is None
+
+    asyncio.run(run())
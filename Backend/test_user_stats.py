@@ -0,0 +1,56 @@
+"""
+Tests for per-user record counters
+"""
+
+import asyncio
+
+from sqlalchemy import select
+
+from database import AsyncSessionLocal
+from models import UserStats
+from utils import user_stats
+from utils.user_stats import adjust_user_stats
+
+
+def symptom_total(client, headers):
+    response = client.get("/api/symptoms/history", headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["data"]["total"]
+
+
+def test_deleting_a_symptom_check_adjusts_counts_once(client, auth_headers):
+    response = client.post("/api/symptoms/analyze", json={"symptoms_text": "fever and headache since yesterday"},
+                           headers=auth_headers)
+    assert response.status_code == 201, response.text
+    interaction_id = response.json()["data"]["id"]
+    assert symptom_total(client, auth_headers) == 1
+
+    assert client.delete(f"/api/symptoms/{interaction_id}", headers=auth_headers).status_code == 200
+    assert client.delete(f"/api/symptoms/{interaction_id}", headers=auth_headers).status_code == 404
+    assert symptom_total(client, auth_headers) == 0
+
+
+def test_concurrent_seed_still_applies_the_change(client, auth_headers, monkeypatch):
+    user_id = client.get("/api/auth/me", headers=auth_headers).json()["data"]["id"]
+    update_user_stats = user_stats._update_user_stats
+    calls = []
+
+    async def row_seeded_after_first_update(db, user_id, values):
+        # The first UPDATE misses the row, as if another request seeded it
+        # right after; the seed below then conflicts with that row
+        calls.append(values)
+        if len(calls) == 1:
+            return 0
+        return await update_user_stats(db, user_id, values)
+
+    monkeypatch.setattr(user_stats, "_update_user_stats", row_seeded_after_first_update)
+
+    async def run():
+        async with AsyncSessionLocal() as db:
+            await adjust_user_stats(db, user_id, prescription_count=1)
+            await db.commit()
+        async with AsyncSessionLocal() as db:
+            return await db.scalar(select(UserStats.prescription_count).where(UserStats.user_id == user_id))
+
+    assert asyncio.run(run()) == 1
+    assert len(calls) == 2
@@ -0,0 +1,126 @@
+"""
+Interned Advice Templates
+
+This module handles:
+- Storing each distinct advice text once in advice_templates
+- Resolving template IDs back to text when responses are serialized
+- A process-wide cache of both directions
+
+Templates are immutable and content-addressed, so cached entries never go
+stale and the cache needs no invalidation. There are only a few hundred
+of them, so every one ever seen stays in memory.
+"""
+
+import hashlib
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from models import AdviceTemplate
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 hex digest used as the template's address"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class AdviceTemplateStore:
+    """In-process view of advice_templates"""
+
+    def __init__(self):
+        self._ids_by_hash: Dict[str, int] = {}
+        self._bodies_by_id: Dict[int, str] = {}
+
+    def _remember(self, template_id: int, digest: str, body: str) -> None:
+        self._ids_by_hash[digest] = template_id
+        self._bodies_by_id[template_id] = body
+
+    async def intern(self, db, text: Optional[str]) -> Optional[int]:
+        """
+        Get the template ID for a text, inserting it if new
+
+        Runs inside the caller's transaction; a new template is flushed but
+        not committed.
+
+        Args:
+            db: Async database session
+            text: Advice text (None stays None)
+
+        Returns:
+            Template ID
+
+        Raises:
+            RuntimeError: The insert conflicted but the existing row could not be read
+        """
+        if text is None:
+            return None
+
+        digest = content_hash(text)
+        template_id = self._ids_by_hash.get(digest)
+        if template_id is not None:
+            return template_id
+
+        template_id = await db.scalar(
+            select(AdviceTemplate.id).where(AdviceTemplate.content_hash == digest)
+        )
+        if template_id is None:
+            template = AdviceTemplate(content_hash=digest, body=text)
+            try:
+                # Savepoint: another worker may insert the same text concurrently
+                async with db.begin_nested():
+                    db.add(template)
+            except IntegrityError:
+                # The other transaction committed the row. A plain SELECT would
+                # still read our REPEATABLE READ snapshot; a locking read sees it.
+                template_id = await db.scalar(
+                    select(AdviceTemplate.id)
+                    .where(AdviceTemplate.content_hash == digest)
+                    .with_for_update()
+                )
+                if template_id is None:
+                    raise RuntimeError(f"Advice template {digest} conflicted on insert but was not found")
+                self._remember(template_id, digest, text)
+                return template_id
+            # Not cached yet: the caller's transaction may still roll back.
+            # The next lookup finds the committed row and caches it.
+            return template.id
+
+        self._remember(template_id, digest, text)
+        return template_id
+
+    async def resolve(self, db, template_ids: Iterable[Optional[int]]) -> Dict[int, str]:
+        """
+        Look up the text of several templates
+
+        Cached templates cost nothing; the rest are fetched in one query.
+
+        Args:
+            db: Async database session
+            template_ids: IDs to resolve (None entries are ignored)
+
+        Returns:
+            Dictionary of template ID -> text
+        """
+        wanted = {template_id for template_id in template_ids if template_id is not None}
+        missing = [template_id for template_id in wanted if template_id not in self._bodies_by_id]
+
+        if missing:
+            result = await db.execute(
+                select(AdviceTemplate.id, AdviceTemplate.content_hash, AdviceTemplate.body)
+                .where(AdviceTemplate.id.in_(missing))
+            )
+            for template_id, digest, body in result:
+                self._remember(template_id, digest, body)
+
+        return {
+            template_id: self._bodies_by_id[template_id]
+            for template_id in wanted
+            if template_id in self._bodies_by_id
+        }
+
+    def stats(self) -> dict:
+        return {"templates_cached": len(self._bodies_by_id)}
+
+
+advice_templates = AdviceTemplateStore()
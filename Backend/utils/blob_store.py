@@ -0,0 +1,304 @@
+"""
+Blob Storage for Uploaded Files
+
+This module handles:
+- Content-addressed storage: a blob's key is the SHA-256 of its bytes
+- A local backend sharded into nested directories (ab/cd/<sha256>)
+- An S3-compatible backend (AWS S3, MinIO, or any stand-in via endpoint_url)
+- Deduplication: storing bytes that already exist costs no extra space
+
+Keys look like "ab/cd/abcd1234...". Because identical uploads share a key,
+a blob may only be deleted once no database row references it. Storing
+content that already exists refreshes the blob's modification time, so the
+orphan sweep (utils/maintenance.py) never removes a blob an upload has just
+been handed.
+
+Usage:
+    info = await blob_store.put(content)
+    async with blob_store.local_copy(info.key) as path:
+        ...  # read the file from path
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterator, Optional
+
+from config import settings
+
+BLOB_KEY_PATTERN = re.compile(r"^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}$")
+
+
+@dataclass(frozen=True)
+class BlobInfo:
+    """Result of storing a blob"""
+    key: str
+    size: int
+    created: bool  # False when identical content was already stored
+
+
+@dataclass(frozen=True)
+class BlobStat:
+    """A stored blob, as listed by iter_blobs()"""
+    key: str
+    size: int
+    modified: float  # Unix timestamp of the last write (or dedup refresh)
+
+
+def blob_key(content: bytes) -> str:
+    """Content address for a blob: two shard levels plus the full SHA-256"""
+    digest = hashlib.sha256(content).hexdigest()
+    return f"{digest[:2]}/{digest[2:4]}/{digest}"
+
+
+def is_blob_key(value: Optional[str]) -> bool:
+    """True for blob store keys (as opposed to pre-blob-store file paths)"""
+    return bool(value) and BLOB_KEY_PATTERN.match(value) is not None
+
+
+class LocalBlobStore:
+    """
+    Blobs on a local (or shared network) filesystem
+
+    Writes go to a temporary file in the same root and are moved into place
+    with os.replace, so a reader never sees a partially written blob.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self._tmp_dir = os.path.join(self.root, ".tmp")
+        os.makedirs(self._tmp_dir, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        """Filesystem path of a blob"""
+        if not is_blob_key(key):
+            raise ValueError(f"Invalid blob key: {key!r}")
+        return os.path.join(self.root, *key.split("/"))
+
+    def _put(self, content: bytes) -> BlobInfo:
+        key = blob_key(content)
+        path = self.path(key)
+        if os.path.exists(path):
+            try:
+                os.utime(path)
+                return BlobInfo(key=key, size=len(content), created=False)
+            except FileNotFoundError:
+                pass  # Removed by the orphan sweep in the meantime - write it again
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            # Atomic; a concurrent writer of the same content just replaces identical bytes
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return BlobInfo(key=key, size=len(content), created=True)
+
+    def _delete(self, key: str) -> int:
+        path = self.path(key)
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            return size
+        except FileNotFoundError:
+            return 0
+
+    def _iter_blobs(self) -> Iterator[BlobStat]:
+        for first in sorted(os.listdir(self.root)):
+            first_dir = os.path.join(self.root, first)
+            if len(first) != 2 or not os.path.isdir(first_dir):
+                continue
+            for second in sorted(os.listdir(first_dir)):
+                second_dir = os.path.join(first_dir, second)
+                if not os.path.isdir(second_dir):
+                    continue
+                for name in sorted(os.listdir(second_dir)):
+                    key = f"{first}/{second}/{name}"
+                    if not is_blob_key(key):
+                        continue
+                    try:
+                        stat = os.stat(os.path.join(second_dir, name))
+                    except FileNotFoundError:
+                        continue
+                    yield BlobStat(key=key, size=stat.st_size, modified=stat.st_mtime)
+
+    async def put(self, content: bytes) -> BlobInfo:
+        """Store bytes (no-op if already present)"""
+        return await asyncio.to_thread(self._put, content)
+
+    async def delete(self, key: str) -> int:
+        """Remove a blob; returns bytes freed (0 if it was already gone)"""
+        return await asyncio.to_thread(self._delete, key)
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(os.path.exists, self.path(key))
+
+    async def size(self, key: str) -> Optional[int]:
+        """Stored size in bytes, or None if missing"""
+        try:
+            return await asyncio.to_thread(os.path.getsize, self.path(key))
+        except FileNotFoundError:
+            return None
+
+    def _stat(self, key: str) -> Optional[BlobStat]:
+        try:
+            stat = os.stat(self.path(key))
+        except FileNotFoundError:
+            return None
+        return BlobStat(key=key, size=stat.st_size, modified=stat.st_mtime)
+
+    async def stat(self, key: str) -> Optional[BlobStat]:
+        """Size and modification time of a blob, or None if missing"""
+        return await asyncio.to_thread(self._stat, key)
+
+    def iter_blobs(self) -> Iterator[BlobStat]:
+        """Every stored blob (blocking - run in a thread for large stores)"""
+        return self._iter_blobs()
+
+    @asynccontextmanager
+    async def local_copy(self, key: str) -> AsyncIterator[str]:
+        """Path to a readable copy of the blob (the blob itself for this backend)"""
+        yield self.path(key)
+
+
+class S3BlobStore:
+    """
+    Blobs in an S3-compatible bucket
+
+    Point endpoint_url at MinIO, moto's server or similar to run against a
+    local stand-in instead of AWS.
+    """
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None, region: Optional[str] = None):
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError("BLOB_STORE_BACKEND=s3 requires the 'boto3' package. Run: pip install boto3")
+
+        if not bucket:
+            raise RuntimeError("BLOB_STORE_BACKEND=s3 requires BLOB_STORE_S3_BUCKET")
+
+        # Credentials come from the usual AWS_* environment variables / config files
+        self._client = boto3.client("s3", endpoint_url=endpoint_url or None, region_name=region or None)
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+
+    def _object_key(self, key: str) -> str:
+        if not is_blob_key(key):
+            raise ValueError(f"Invalid blob key: {key!r}")
+        return self.prefix + key
+
+    @staticmethod
+    def _is_not_found(error) -> bool:
+        return error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+    def _stat(self, key: str) -> Optional[BlobStat]:
+        from botocore.exceptions import ClientError
+        try:
+            head = self._client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except ClientError as e:
+            if self._is_not_found(e):
+                return None
+            raise
+        return BlobStat(key=key, size=head["ContentLength"], modified=head["LastModified"].timestamp())
+
+    def _head(self, key: str) -> Optional[int]:
+        stat = self._stat(key)
+        return stat.size if stat is not None else None
+
+    def _put(self, content: bytes) -> BlobInfo:
+        from botocore.exceptions import ClientError
+        key = blob_key(content)
+        if self._head(key) is not None:
+            try:
+                # Server-side copy onto itself: refreshes LastModified without re-uploading
+                self._client.copy_object(
+                    Bucket=self.bucket,
+                    Key=self._object_key(key),
+                    CopySource={"Bucket": self.bucket, "Key": self._object_key(key)},
+                    MetadataDirective="REPLACE",
+                )
+                return BlobInfo(key=key, size=len(content), created=False)
+            except ClientError as e:
+                if not self._is_not_found(e):
+                    raise
+                # Removed by the orphan sweep in the meantime - upload it again
+        # A single PUT is atomic: the object is visible whole or not at all
+        self._client.put_object(Bucket=self.bucket, Key=self._object_key(key), Body=content)
+        return BlobInfo(key=key, size=len(content), created=True)
+
+    def _delete(self, key: str) -> int:
+        size = self._head(key)
+        if size is None:
+            return 0
+        self._client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+        return size
+
+    def _iter_blobs(self) -> Iterator[BlobStat]:
+        paginator = self._client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for item in page.get("Contents", []):
+                key = item["Key"][len(self.prefix):]
+                if is_blob_key(key):
+                    yield BlobStat(key=key, size=item["Size"], modified=item["LastModified"].timestamp())
+
+    def _download(self, key: str, path: str) -> None:
+        self._client.download_file(self.bucket, self._object_key(key), path)
+
+    async def put(self, content: bytes) -> BlobInfo:
+        """Store bytes (no-op if already present)"""
+        return await asyncio.to_thread(self._put, content)
+
+    async def delete(self, key: str) -> int:
+        """Remove a blob; returns bytes freed (0 if it was already gone)"""
+        return await asyncio.to_thread(self._delete, key)
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(self._head, key) is not None
+
+    async def size(self, key: str) -> Optional[int]:
+        """Stored size in bytes, or None if missing"""
+        return await asyncio.to_thread(self._head, key)
+
+    async def stat(self, key: str) -> Optional[BlobStat]:
+        """Size and modification time of a blob, or None if missing"""
+        return await asyncio.to_thread(self._stat, key)
+
+    def iter_blobs(self) -> Iterator[BlobStat]:
+        """Every stored blob (blocking - run in a thread for large stores)"""
+        return self._iter_blobs()
+
+    @asynccontextmanager
+    async def local_copy(self, key: str) -> AsyncIterator[str]:
+        """Download the blob to a temporary file for the duration of the block"""
+        fd, path = tempfile.mkstemp(prefix="cura-blob-")
+        os.close(fd)
+        try:
+            await asyncio.to_thread(self._download, key, path)
+            yield path
+        finally:
+            os.remove(path)
+
+
+def _create_blob_store():
+    if settings.BLOB_STORE_BACKEND == "s3":
+        return S3BlobStore(
+            bucket=settings.BLOB_STORE_S3_BUCKET,
+            prefix=settings.BLOB_STORE_S3_PREFIX,
+            endpoint_url=settings.BLOB_STORE_S3_ENDPOINT_URL,
+            region=settings.BLOB_STORE_S3_REGION,
+        )
+    return LocalBlobStore(settings.BLOB_STORE_ROOT)
+
+
+blob_store = _create_blob_store()
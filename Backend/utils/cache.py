@@ -0,0 +1,103 @@
+"""
+In-Process Caching Utilities
+
+This module handles:
+- A bounded, thread-safe LRU cache with per-entry expiry
+
+Entries expire either after the cache-wide TTL or at an explicit absolute
+time passed to set() (e.g. a token's exp claim), whichever the caller picks.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+# Sentinel so cached None values can be told apart from misses
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Bounded LRU cache with time-based expiry
+
+    Args:
+        maxsize: Maximum number of entries; least recently used are evicted first
+        ttl: Default lifetime of an entry in seconds
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """
+        Look up a live entry
+
+        Returns:
+            Cached value, or `default` if missing or expired
+        """
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+
+            value, expires_at = item
+            if expires_at <= now:
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, expires_at: Optional[float] = None) -> None:
+        """
+        Store an entry
+
+        Args:
+            key: Cache key
+            value: Value to cache
+            ttl: Lifetime in seconds (defaults to the cache TTL)
+            expires_at: Absolute expiry as a Unix timestamp; overrides ttl
+        """
+        if expires_at is not None:
+            # Convert wall-clock expiry onto the monotonic clock used internally
+            deadline = time.monotonic() + (expires_at - time.time())
+        else:
+            deadline = time.monotonic() + (self.ttl if ttl is None else ttl)
+
+        with self._lock:
+            self._data[key] = (value, deadline)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        """Remove an entry if present"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all entries"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size"""
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,176 @@
+"""
+Compressed column maintenance
+
+Usage (from the Backend directory):
+    python -m utils.compress_text_columns report
+    python -m utils.compress_text_columns migrate [--batch-size 500]
+    python -m utils.compress_text_columns train [--sample-rows 2000]
+
+report   Rows, stored vs. original bytes and legacy (uncompressed) rows per column
+migrate  Rewrite legacy rows - and rows using an older dictionary - in the current format
+train    Write a new preset dictionary learned from stored rows
+
+On MySQL, apply migrations/002_compressed_text.sql before migrating.
+"""
+
+import argparse
+import os
+
+from sqlalchemy import select, update, text
+from sqlalchemy.types import NullType
+from sqlalchemy.sql.expression import type_coerce
+
+from config import settings
+from database import SessionLocal, engine
+from models import Prescription, MedicalReport
+from utils.text_compression import (
+    DICTIONARIES,
+    DICTIONARY_DIR,
+    HEADER,
+    MIN_COMPRESS_LENGTH,
+    decompress_text,
+    is_compressed,
+    train_dictionary,
+)
+
+# (model, attribute) pairs stored with CompressedText
+COMPRESSED_COLUMNS = [
+    (Prescription, "extracted_text"),
+    (MedicalReport, "extracted_text"),
+    (MedicalReport, "ai_summary"),
+]
+
+
+def iter_raw_values(db, model, attribute: str, batch_size: int):
+    """
+    Yield (id, raw stored value) in id order, bypassing CompressedText
+
+    Rows are read in keyset batches so large tables never load at once.
+    """
+    column = getattr(model, attribute)
+    raw_column = type_coerce(column, NullType())
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(model.id, raw_column)
+            .where(model.id > last_id, column.is_not(None))
+            .order_by(model.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return
+        for row_id, value in rows:
+            yield row_id, value
+        last_id = rows[-1][0]
+
+
+def _raw_length(value) -> int:
+    return len(value.encode("utf-8")) if isinstance(value, str) else len(value)
+
+
+def _needs_rewrite(value) -> bool:
+    """Legacy plain text worth compressing, or compressed with a non-current dictionary"""
+    if is_compressed(value):
+        return bytes(value)[len(HEADER)] != settings.TEXT_COMPRESSION_DICTIONARY
+    return _raw_length(value) >= MIN_COMPRESS_LENGTH
+
+
+def report(batch_size: int) -> None:
+    """Print storage statistics for every compressed column"""
+    print(f"{'column':<38} {'rows':>7} {'legacy':>7} {'stored KB':>10} {'text KB':>10} {'ratio':>6}")
+    with SessionLocal() as db:
+        for model, attribute in COMPRESSED_COLUMNS:
+            rows = legacy = stored = original = 0
+            for _, value in iter_raw_values(db, model, attribute, batch_size):
+                rows += 1
+                stored += _raw_length(value)
+                if not is_compressed(value):
+                    legacy += 1
+                original += len(decompress_text(value).encode("utf-8"))
+
+            ratio = f"{original / stored:.1f}x" if stored else "-"
+            name = f"{model.__tablename__}.{attribute}"
+            print(f"{name:<38} {rows:>7} {legacy:>7} {stored / 1024:>10.1f} {original / 1024:>10.1f} {ratio:>6}")
+
+        if engine.dialect.name == "mysql":
+            print("\nTable footprint (InnoDB estimates):")
+            for table in sorted({model.__tablename__ for model, _ in COMPRESSED_COLUMNS}):
+                data, index = db.execute(
+                    text(
+                        "SELECT data_length, index_length FROM information_schema.TABLES "
+                        "WHERE table_schema = DATABASE() AND table_name = :table"
+                    ),
+                    {"table": table}
+                ).one()
+                print(f"  {table:<24} data {data / 1024:>10.1f} KB   index {index / 1024:>10.1f} KB")
+
+
+def migrate(batch_size: int) -> None:
+    """Rewrite rows that are not yet in the current compressed format"""
+    with SessionLocal() as db:
+        for model, attribute in COMPRESSED_COLUMNS:
+            rewritten = 0
+            for row_id, value in iter_raw_values(db, model, attribute, batch_size):
+                if not _needs_rewrite(value):
+                    continue
+                # Binding through CompressedText re-encodes the value
+                db.execute(
+                    update(model)
+                    .where(model.id == row_id)
+                    .values({attribute: decompress_text(value)})
+                    .execution_options(synchronize_session=False)
+                )
+                rewritten += 1
+                if rewritten % batch_size == 0:
+                    db.commit()
+            db.commit()
+
+            print(f"✓ {model.__tablename__}.{attribute}: rewrote {rewritten} row(s)")
+
+
+def train(sample_rows: int, batch_size: int) -> None:
+    """Learn a dictionary from stored rows and save it under the next free id"""
+    samples = []
+    with SessionLocal() as db:
+        for model, attribute in COMPRESSED_COLUMNS:
+            for count, (_, value) in enumerate(iter_raw_values(db, model, attribute, batch_size)):
+                if count >= sample_rows:
+                    break
+                samples.append(decompress_text(value))
+
+    if not samples:
+        print("No stored text to learn from")
+        return
+
+    zdict = train_dictionary(samples)
+    dictionary_id = max(DICTIONARIES, default=0) + 1
+    if dictionary_id > 255:
+        raise SystemExit("Dictionary ids are exhausted (max 255)")
+
+    os.makedirs(DICTIONARY_DIR, exist_ok=True)
+    path = os.path.join(DICTIONARY_DIR, f"{dictionary_id}.zdict")
+    with open(path, "wb") as f:
+        f.write(zdict)
+
+    print(f"✓ Wrote {path} ({len(zdict)} bytes from {len(samples)} samples)")
+    print(f"  Commit the file, deploy it everywhere, then set TEXT_COMPRESSION_DICTIONARY={dictionary_id}")
+    print("  and run 'migrate' to re-encode existing rows.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain compressed text columns")
+    parser.add_argument("command", choices=["report", "migrate", "train"])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--sample-rows", type=int, default=2000, help="Rows per column used by 'train'")
+    args = parser.parse_args()
+
+    if args.command == "report":
+        report(args.batch_size)
+    elif args.command == "migrate":
+        migrate(args.batch_size)
+    else:
+        train(args.sample_rows, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
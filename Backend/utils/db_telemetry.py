@@ -0,0 +1,194 @@
+"""
+Database Pool Telemetry
+
+This module handles:
+- Pool event hooks (checkouts, new connections, invalidations)
+- Connection checkout wait time
+- Per-request trace of connection wait vs. query time
+- Session commit time (the db_commit stage metric)
+
+The per-request trace lives in a context variable, so the pool and cursor
+event hooks (which SQLAlchemy runs inside the request's task) can add to it
+without any locking.
+"""
+
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from utils.metrics import DB_COMMIT_SECONDS
+
+
+@dataclass
+class RequestDBTrace:
+    """Database time spent by a single request"""
+    connection_wait_ms: float = 0.0
+    query_ms: float = 0.0
+    query_count: int = 0
+
+    def server_timing(self) -> str:
+        """Format as a Server-Timing header value"""
+        return (
+            f'db-wait;dur={self.connection_wait_ms:.2f}, '
+            f'db-query;dur={self.query_ms:.2f};desc="{self.query_count} queries"'
+        )
+
+
+_current_trace: ContextVar[Optional[RequestDBTrace]] = ContextVar("db_trace", default=None)
+
+
+def start_request_trace() -> RequestDBTrace:
+    """Begin a new trace for the current request"""
+    trace = RequestDBTrace()
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[RequestDBTrace]:
+    """Trace of the request being handled, if any"""
+    return _current_trace.get()
+
+
+class PoolTelemetry:
+    """
+    Process-wide connection pool statistics
+
+    Counters are updated from pool events; gauges (size, in use, overflow)
+    are read from the pool itself when a snapshot is taken.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pool = None
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.soft_invalidations = 0
+        self.checkout_waits = 0
+        self.checkout_wait_total = 0.0
+        self.checkout_wait_max = 0.0
+
+    def attach(self, engine) -> None:
+        """
+        Register pool and cursor event hooks on a (sync) engine
+
+        Args:
+            engine: SQLAlchemy Engine - pass async_engine.sync_engine for async engines
+        """
+        self._pool = engine.pool
+
+        event.listen(engine.pool, "checkout", self._on_checkout)
+        event.listen(engine.pool, "connect", self._on_connect)
+        event.listen(engine.pool, "invalidate", self._on_invalidate)
+        event.listen(engine.pool, "soft_invalidate", self._on_soft_invalidate)
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+    def record_checkout_wait(self, seconds: float) -> None:
+        """Record how long a session waited to get a connection"""
+        with self._lock:
+            self.checkout_waits += 1
+            self.checkout_wait_total += seconds
+            if seconds > self.checkout_wait_max:
+                self.checkout_wait_max = seconds
+
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.connection_wait_ms += seconds * 1000
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def _on_soft_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.soft_invalidations += 1
+
+    def snapshot(self) -> dict:
+        """
+        Current pool state and counters
+
+        Returns:
+            Dictionary of pool gauges and cumulative counters
+        """
+        pool = self._pool
+        with self._lock:
+            stats = {
+                "pool_class": type(pool).__name__ if pool is not None else None,
+                "checkouts": self.checkouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "soft_invalidations": self.soft_invalidations,
+                "checkout_wait_avg_ms": round(
+                    self.checkout_wait_total / self.checkout_waits * 1000, 3
+                ) if self.checkout_waits else 0.0,
+                "checkout_wait_max_ms": round(self.checkout_wait_max * 1000, 3),
+            }
+
+        # Only queue-style pools keep a fixed size; NullPool (SQLite) does not
+        for name, attr in (
+            ("size", "size"),
+            ("in_use", "checkedout"),
+            ("idle", "checkedin"),
+            ("overflow", "overflow"),
+        ):
+            method = getattr(pool, attr, None)
+            stats[name] = method() if method is not None else None
+
+        return stats
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start_time"].pop()
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.query_ms += (time.perf_counter() - started) * 1000
+        trace.query_count += 1
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute - drop its start time
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start_time"):
+        conn.info["query_start_time"].pop()
+
+
+@event.listens_for(Session, "before_commit")
+def _before_commit(session):
+    session.info["commit_start_time"] = time.perf_counter()
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    # Covers the final flush and the database COMMIT
+    started = session.info.pop("commit_start_time", None)
+    if started is not None:
+        DB_COMMIT_SECONDS.observe(time.perf_counter() - started)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    # A commit that failed is not timed
+    session.info.pop("commit_start_time", None)
+
+
+# Telemetry for the async engine used by request handlers
+pool_telemetry = PoolTelemetry()
@@ -3,26 +3,53 @@ Dependency functions for FastAPI routes
 """
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
 
-from database import get_db
+from database import AsyncSessionLocal
 from models import User
+from schemas import TokenData
 from auth.jwt_handler import verify_token
+from utils.user_cache import user_cache
 
 # Security scheme for JWT token
 security = HTTPBearer()
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+async def get_current_token(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> TokenData:
+    """
+    Dependency to get the verified claims of the bearer token
+    
+    Args:
+        credentials: HTTP Bearer token from Authorization header
+        
+    Returns:
+        TokenData for a valid, unrevoked token
+        
+    Raises:
+        HTTPException: If token is invalid, expired or revoked
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    
+    return verify_token(credentials.credentials, credentials_exception)
+
+
+async def get_current_user(
+    token_data: TokenData = Depends(get_current_token)
 ) -> User:
     """
     Dependency to get current authenticated user from JWT token
     
+    Users are served from the principal cache when possible; only a miss
+    opens a session and reads the users table, so cached requests to routes
+    without their own get_db dependency never touch the database.
+    
     Args:
-        credentials: HTTP Bearer token from Authorization header
-        db: Database session
+        token_data: Verified token claims
         
     Returns:
         User object if token is valid
@@ -36,14 +63,17 @@ def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    # Verify token and extract user data
-    token_data = verify_token(credentials.credentials, credentials_exception)
-    
-    # Get user from database
-    user = db.query(User).filter(User.id == token_data.user_id).first()
+    # Get user from cache, falling back to the database
+    user = await user_cache.get(token_data.user_id)
     
     if user is None:
-        raise credentials_exception
+        async with AsyncSessionLocal() as db:
+            user = await db.get(User, token_data.user_id)
+        
+        if user is None:
+            raise credentials_exception
+        
+        await user_cache.set(user)
     
     if not user.is_active:
         raise HTTPException(
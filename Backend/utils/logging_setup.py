@@ -0,0 +1,255 @@
+"""
+Logging
+
+This module handles:
+- Non-blocking log output: the logging call only appends the record to a
+  queue; a listener thread formats it and writes it to stdout
+- One JSON object per line (LOG_FORMAT=text for local development), with
+  the request ID of the request being handled on every record
+- Per-request sampling of DEBUG/INFO records (LOG_SAMPLE_RATE)
+- Redaction of patient data (PHI) unless LOG_PHI is enabled
+
+Patient data never goes into a message string. Extracted text, parsed
+medicines, file names and the like are passed as structured fields wrapped
+in phi(), which are written as "[redacted]" by default:
+
+    logger.debug("Text extracted", extra=fields(chars=len(text), preview=phi(text[:200])))
+
+Messages are formatted in the listener thread, so pass log arguments that are
+not mutated afterwards (numbers, strings, fresh containers).
+"""
+
+import atexit
+import logging
+import queue
+import random
+import re
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional, Tuple
+
+import orjson
+
+from config import settings
+
+REDACTED = "[redacted]"
+
+# (request ID, whether this request's DEBUG/INFO records are kept)
+_request: ContextVar[Tuple[Optional[str], bool]] = ContextVar("log_request", default=(None, True))
+
+# Client-supplied IDs are only reused when they are short and plain
+REQUEST_ID_PATTERN = re.compile(r"[A-Za-z0-9._-]{1,64}")
+
+# Top-level packages of this application; LOG_LEVEL=DEBUG applies to these
+# only, so library debug output (aiosqlite logs every call) stays off
+APP_LOGGERS = ("main", "database", "auth", "prescription", "symptoms", "reports", "search", "utils")
+
+# Attributes every LogRecord has; anything else on a record came from extra=
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+
+class PHI:
+    """A value that is patient data - logged as [redacted] unless LOG_PHI is set"""
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __str__(self) -> str:
+        return str(self.value) if settings.LOG_PHI else REDACTED
+
+    __repr__ = __str__
+
+
+def phi(value: Any) -> PHI:
+    """Mark a log argument or field as patient data"""
+    return PHI(value)
+
+
+def fields(**values: Any) -> Dict[str, Any]:
+    """extra= for structured fields: logger.info("...", extra=fields(count=3))"""
+    return values
+
+
+def start_request(header_value: Optional[str] = None) -> str:
+    """
+    Begin logging for a request: pick its ID and whether it is sampled
+
+    Args:
+        header_value: Incoming X-Request-ID, reused when it is well formed
+
+    Returns:
+        The request ID (sent back as X-Request-ID)
+    """
+    if header_value and REQUEST_ID_PATTERN.fullmatch(header_value):
+        request_id = header_value
+    else:
+        request_id = uuid.uuid4().hex
+    rate = settings.LOG_SAMPLE_RATE
+    _request.set((request_id, rate >= 1.0 or random.random() < rate))
+    return request_id
+
+
+def current_request_id() -> Optional[str]:
+    """ID of the request being handled, if any"""
+    return _request.get()[0]
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Runs in the calling thread: stamps the request ID and drops the
+    DEBUG/INFO records of requests that were not sampled
+
+    Warnings and errors are always kept, as is everything logged outside a
+    request (startup, background jobs).
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        request_id, sampled = _request.get()
+        if not sampled and record.levelno < logging.WARNING:
+            return False
+        record.request_id = request_id
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves all formatting to the listener thread
+
+    The stock handler formats the message in the calling thread; here the
+    caller only appends the record. When the queue is full the record is
+    dropped and counted instead of blocking the request.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _field_value(value: Any) -> Any:
+    if isinstance(value, PHI):
+        return str(value)
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def _record_fields(record: logging.LogRecord) -> Dict[str, Any]:
+    return {
+        key: _field_value(value)
+        for key, value in vars(record).items()
+        if key not in _RECORD_ATTRIBUTES
+    }
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id is not None:
+            entry["request_id"] = request_id
+        entry.update(_record_fields(record))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return orjson.dumps(entry).decode("utf-8")
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local development"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        extra = _record_fields(record)
+        request_id = getattr(record, "request_id", None)
+        if request_id is not None:
+            extra = {"request_id": request_id, **extra}
+        if extra:
+            first, newline, rest = line.partition("\n")
+            line = first + " " + " ".join(f"{key}={value}" for key, value in extra.items()) + newline + rest
+        return line
+
+
+def _configured_level() -> Tuple[int, bool]:
+    """LOG_LEVEL as a number, and whether it was a known level name"""
+    # getLevelName maps names to numbers, but returns "Level FOO" for an
+    # unknown name (getLevelNamesMapping needs Python 3.11)
+    level = logging.getLevelName(settings.LOG_LEVEL.strip().upper())
+    if isinstance(level, int):
+        return level, True
+    return logging.INFO, False
+
+
+_handler: Optional[NonBlockingQueueHandler] = None
+_listener: Optional[QueueListener] = None
+
+
+def configure_logging() -> None:
+    """
+    Route all logging through the queue (idempotent)
+
+    The root logger gets the queue handler (at INFO or above, for libraries)
+    and the application loggers LOG_LEVEL; the listener thread writes to
+    stdout and is stopped (flushing the queue) at exit. An unknown LOG_LEVEL
+    falls back to INFO with a warning.
+    """
+    global _handler, _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(TextFormatter() if settings.LOG_FORMAT == "text" else JsonFormatter())
+
+    log_queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    _handler = NonBlockingQueueHandler(log_queue)
+    _handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_handler)
+    level, known = _configured_level()
+    root.setLevel(max(level, logging.INFO))
+    for name in APP_LOGGERS:
+        logging.getLogger(name).setLevel(level)
+
+    _listener = QueueListener(log_queue, output)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+    if not known:
+        logging.getLogger(__name__).warning("Unknown LOG_LEVEL %r, using INFO", settings.LOG_LEVEL)
+
+
+def shutdown_logging() -> None:
+    """Write out queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def dropped_records() -> int:
+    """Records dropped because the queue was full"""
+    return _handler.dropped if _handler is not None else 0
@@ -0,0 +1,458 @@
+"""
+Background Maintenance
+
+This module handles:
+- Purging soft-deleted prescriptions and medical reports and releasing
+  their stored files
+- Removing orphan blobs that no database row references
+- Retention: expiring old symptom checks and prescriptions
+- Reconciling per-user stats with the tables they count
+- Reporting rows removed and bytes reclaimed per run
+
+Every step works in batches of MAINTENANCE_BATCH_SIZE with one short
+transaction per batch, so a pass never holds locks for long. Steps are safe
+to run from several workers at once: deletes are idempotent, and counters
+are adjusted by the number of rows a statement actually changed.
+
+Usage (from the Backend directory - e.g. from cron when the in-process
+scheduler is disabled with MAINTENANCE_INTERVAL_SECONDS=0):
+    python -m utils.maintenance
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Iterable, List, Optional, Set
+
+from sqlalchemy import select, delete, update
+
+from config import settings
+from models import Prescription, MedicalReport, SymptomInteraction, UserStats
+from prescription.medication_index import remove_prescription_medicines
+from search.text_index import DOC_PRESCRIPTION, DOC_SYMPTOM, remove_documents
+from utils.blob_store import blob_store, is_blob_key
+from utils.user_stats import adjust_user_stats, reconcile_user_stats, symptom_check_deltas, URGENCY_COUNTERS
+
+logger = logging.getLogger(__name__)
+
+# Columns holding blob keys - a blob is an orphan once none of them reference it
+BLOB_REFERENCES = [Prescription.file_path, MedicalReport.file_path]
+
+
+@dataclass
+class MaintenanceReport:
+    """What one maintenance pass did"""
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    prescriptions_purged: int = 0
+    reports_purged: int = 0
+    prescriptions_expired: int = 0
+    symptom_checks_expired: int = 0
+    orphan_blobs_removed: int = 0
+    bytes_reclaimed: int = 0
+    stats_rows_corrected: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def changed_anything(self) -> bool:
+        return any((
+            self.prescriptions_purged, self.reports_purged, self.prescriptions_expired, self.symptom_checks_expired,
+            self.orphan_blobs_removed, self.stats_rows_corrected, self.errors,
+        ))
+
+    def summary(self) -> str:
+        return (
+            f"purged {self.prescriptions_purged} prescription(s) and {self.reports_purged} report(s), "
+            f"expired {self.prescriptions_expired} prescription(s) and {self.symptom_checks_expired} symptom check(s), "
+            f"removed {self.orphan_blobs_removed} orphan blob(s), "
+            f"corrected {self.stats_rows_corrected} user stats row(s), "
+            f"reclaimed {self.bytes_reclaimed / 1024:.1f} KB"
+        )
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+async def referenced_keys(db, keys: List[str]) -> Set[str]:
+    """Subset of keys still referenced by any row (soft-deleted rows included)"""
+    found = set()
+    for column in BLOB_REFERENCES:
+        result = await db.execute(select(column).where(column.in_(keys)).distinct())
+        found.update(result.scalars())
+    return found
+
+
+def _remove_legacy_file(file_path: str) -> int:
+    """Delete a pre-blob-store upload; returns bytes freed"""
+    try:
+        size = os.path.getsize(file_path)
+        os.remove(file_path)
+        return size
+    except FileNotFoundError:
+        return 0
+
+
+async def release_files(db, file_paths: Iterable[str], report: MaintenanceReport) -> None:
+    """
+    Delete stored files whose rows are gone
+
+    A blob shared with another row is kept, as is one modified within
+    BLOB_GC_GRACE_SECONDS: the same file may just have been uploaded again
+    (deduplicated onto this blob) with its row not yet visible here. Kept
+    blobs and failures are left to the orphan sweep, which finds any blob
+    no row references.
+
+    Args:
+        db: Async database session (the rows are already deleted)
+        file_paths: Blob keys, or paths of pre-blob-store uploads
+        report: Report to add reclaimed bytes and errors to
+    """
+    file_paths = set(file_paths)
+    keys = [path for path in file_paths if is_blob_key(path)]
+    shared = await referenced_keys(db, keys) if keys else set()
+    cutoff = time.time() - settings.BLOB_GC_GRACE_SECONDS
+
+    for path in file_paths - shared:
+        try:
+            if is_blob_key(path):
+                stat = await blob_store.stat(path)
+                if stat is not None and stat.modified >= cutoff:
+                    continue
+                report.bytes_reclaimed += await blob_store.delete(path)
+            else:
+                report.bytes_reclaimed += await asyncio.to_thread(_remove_legacy_file, path)
+        except Exception as e:
+            report.errors.append(f"Could not delete file {path}: {e}")
+
+
+async def _purge_deleted(session_factory, model, batch_size: int, report: MaintenanceReport,
+                         before_delete=None) -> int:
+    """
+    Hard-delete a table's soft-deleted rows and release their files
+
+    Args:
+        model: Model with deleted_at and file_path columns
+        before_delete: async (db, ids) run in each batch's transaction
+
+    Returns:
+        Number of rows purged
+    """
+    purged = 0
+    while True:
+        async with session_factory() as db:
+            rows = (await db.execute(
+                select(model.id, model.file_path)
+                .where(model.deleted_at.is_not(None))
+                .order_by(model.id)
+                .limit(batch_size)
+            )).all()
+            if not rows:
+                return purged
+
+            ids = [row.id for row in rows]
+            if before_delete is not None:
+                await before_delete(db, ids)
+            result = await db.execute(
+                delete(model)
+                .where(model.id.in_(ids))
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            purged += result.rowcount
+
+            await release_files(db, (row.file_path for row in rows), report)
+
+        if len(rows) < batch_size:
+            return purged
+
+
+async def purge_deleted_prescriptions(session_factory, batch_size: int, report: MaintenanceReport) -> None:
+    """Hard-delete soft-deleted prescriptions and release their files"""
+    report.prescriptions_purged += await _purge_deleted(
+        session_factory, Prescription, batch_size, report,
+        lambda db, ids: remove_documents(db, DOC_PRESCRIPTION, ids)
+    )
+
+
+async def purge_deleted_reports(session_factory, batch_size: int, report: MaintenanceReport) -> None:
+    """Hard-delete soft-deleted medical reports and release their files"""
+    # Their lab observations were removed (and trends rebuilt) at soft delete
+    report.reports_purged += await _purge_deleted(session_factory, MedicalReport, batch_size, report)
+
+
+async def purge_deleted(session_factory, batch_size: int, report: MaintenanceReport) -> None:
+    """Purge every table with soft-deleted rows"""
+    await purge_deleted_prescriptions(session_factory, batch_size, report)
+    await purge_deleted_reports(session_factory, batch_size, report)
+
+
+async def _expire_oldest(session_factory, model, cutoff: datetime, batch_size: int, expire_rows) -> int:
+    """
+    Walk a table from its oldest row and expire rows created before cutoff
+
+    Rows are read in primary-key order, which follows creation order, so the
+    walk stops at the first batch that reaches a row newer than the cut-off
+    instead of scanning the table.
+
+    Args:
+        expire_rows: async (db, user_id, ids) -> rows expired, run per user
+            in the batch's transaction
+
+    Returns:
+        Number of rows expired
+    """
+    expired_total = 0
+    last_id = 0
+    while True:
+        async with session_factory() as db:
+            rows = (await db.execute(
+                select(model.id, model.user_id, (model.created_at < cutoff).label("expired"))
+                .where(model.id > last_id)
+                .order_by(model.id)
+                .limit(batch_size)
+            )).all()
+            if not rows:
+                return expired_total
+
+            by_user = defaultdict(list)
+            for row in rows:
+                if not row.expired:
+                    break
+                by_user[row.user_id].append(row.id)
+
+            for user_id, ids in by_user.items():
+                expired_total += await expire_rows(db, user_id, ids)
+            await db.commit()
+
+        reached_cutoff = sum(len(ids) for ids in by_user.values()) < len(rows)
+        if reached_cutoff or len(rows) < batch_size:
+            return expired_total
+        last_id = rows[-1].id
+
+
+async def _delete_symptom_checks(db, user_id: int, ids: List[int]) -> int:
+    # One delete per urgency level, so the urgency counters move by the rows
+    # each statement actually removed
+    deleted = 0
+    for level in [*URGENCY_COUNTERS, None]:
+        urgency = (
+            SymptomInteraction.urgency_level == level if level is not None
+            else SymptomInteraction.urgency_level.not_in(URGENCY_COUNTERS) | SymptomInteraction.urgency_level.is_(None)
+        )
+        result = await db.execute(
+            delete(SymptomInteraction)
+            .where(SymptomInteraction.id.in_(ids), urgency)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            await adjust_user_stats(db, user_id, **symptom_check_deltas(level, -result.rowcount))
+            deleted += result.rowcount
+    await remove_documents(db, DOC_SYMPTOM, ids)
+    return deleted
+
+
+async def _soft_delete_prescriptions(db, user_id: int, ids: List[int]) -> int:
+    result = await db.execute(
+        update(Prescription)
+        .where(Prescription.id.in_(ids), Prescription.deleted_at.is_(None))
+        .values(deleted_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        await adjust_user_stats(db, user_id, prescription_count=-result.rowcount)
+        await remove_prescription_medicines(db, ids)
+    return result.rowcount
+
+
+async def apply_retention(session_factory, batch_size: int, report: MaintenanceReport) -> None:
+    """Expire rows older than the configured retention periods"""
+    now = datetime.utcnow()
+    if settings.SYMPTOM_RETENTION_DAYS > 0:
+        report.symptom_checks_expired += await _expire_oldest(
+            session_factory, SymptomInteraction, now - timedelta(days=settings.SYMPTOM_RETENTION_DAYS),
+            batch_size, _delete_symptom_checks
+        )
+    if settings.PRESCRIPTION_RETENTION_DAYS > 0:
+        # Soft-deleted here, then purged (row and file) by the next step
+        report.prescriptions_expired += await _expire_oldest(
+            session_factory, Prescription, now - timedelta(days=settings.PRESCRIPTION_RETENTION_DAYS),
+            batch_size, _soft_delete_prescriptions
+        )
+
+
+async def collect_orphan_blobs(session_factory, batch_size: int, grace_seconds: int, report: MaintenanceReport) -> None:
+    """
+    Remove blobs that no row references
+
+    Blobs modified within the grace period are skipped: an upload stores its
+    blob before its row is committed (and a deduplicated upload refreshes the
+    blob's modification time), so a young unreferenced blob may be in use.
+    """
+    cutoff = time.time() - grace_seconds
+    blobs = blob_store.iter_blobs()
+    while True:
+        batch = await asyncio.to_thread(lambda: list(islice(blobs, batch_size)))
+        if not batch:
+            return
+
+        candidates = {blob.key: blob for blob in batch if blob.modified < cutoff}
+        if not candidates:
+            continue
+        async with session_factory() as db:
+            referenced = await referenced_keys(db, list(candidates))
+
+        for key in candidates.keys() - referenced:
+            try:
+                freed = await blob_store.delete(key)
+            except Exception as e:
+                report.errors.append(f"Could not delete blob {key}: {e}")
+                continue
+            if freed:
+                report.orphan_blobs_removed += 1
+                report.bytes_reclaimed += freed
+
+
+async def reconcile_stats(session_factory, batch_size: int, report: MaintenanceReport) -> None:
+    """Recount user_stats rows from the tables, one batch of users per transaction"""
+    last_user_id = 0
+    while True:
+        async with session_factory() as db:
+            user_ids = (await db.execute(
+                select(UserStats.user_id)
+                .where(UserStats.user_id > last_user_id)
+                .order_by(UserStats.user_id)
+                .limit(batch_size)
+            )).scalars().all()
+            if not user_ids:
+                return
+
+            report.stats_rows_corrected += await reconcile_user_stats(db, user_ids)
+            await db.commit()
+
+        if len(user_ids) < batch_size:
+            return
+        last_user_id = user_ids[-1]
+
+
+class MaintenanceScheduler:
+    """
+    Runs maintenance passes on the event loop
+
+    A full pass (retention, purge, orphan sweep) runs at startup and then
+    every MAINTENANCE_INTERVAL_SECONDS; the stats recount joins the first pass
+    after each STATS_RECONCILE_INTERVAL_SECONDS. request_purge() wakes the
+    task early for a purge-only pass, so deleted prescriptions and reports
+    are cleaned up within moments without the delete request waiting for it.
+    """
+
+    def __init__(self):
+        self.last_report: Optional[MaintenanceReport] = None
+        self._task: Optional[asyncio.Task] = None
+        self._purge_requested: Optional[asyncio.Event] = None
+        self._last_reconcile: Optional[float] = None
+
+    def _reconcile_due(self) -> bool:
+        interval = settings.STATS_RECONCILE_INTERVAL_SECONDS
+        if interval <= 0:
+            return False
+        return self._last_reconcile is None or time.monotonic() - self._last_reconcile >= interval
+
+    async def _run_step(self, report: MaintenanceReport, name: str, step) -> None:
+        try:
+            await step
+        except Exception as e:
+            report.errors.append(f"{name} failed: {e}")
+
+    async def run_once(self, session_factory) -> MaintenanceReport:
+        """
+        Run a full maintenance pass
+
+        Args:
+            session_factory: Async session factory (database.AsyncSessionLocal)
+
+        Returns:
+            Report of rows removed and bytes reclaimed
+        """
+        batch_size = settings.MAINTENANCE_BATCH_SIZE
+        report = MaintenanceReport(started_at=datetime.utcnow())
+        await self._run_step(report, "Retention", apply_retention(session_factory, batch_size, report))
+        await self._run_step(report, "Purge", purge_deleted(session_factory, batch_size, report))
+        await self._run_step(report, "Orphan sweep", collect_orphan_blobs(
+            session_factory, batch_size, settings.BLOB_GC_GRACE_SECONDS, report
+        ))
+        if self._reconcile_due():
+            self._last_reconcile = time.monotonic()
+            await self._run_step(report, "Stats reconcile", reconcile_stats(session_factory, batch_size, report))
+        return self._finish(report)
+
+    async def purge(self, session_factory) -> MaintenanceReport:
+        """Purge soft-deleted prescriptions and reports only"""
+        report = MaintenanceReport(started_at=datetime.utcnow())
+        await self._run_step(report, "Purge", purge_deleted(
+            session_factory, settings.MAINTENANCE_BATCH_SIZE, report
+        ))
+        return self._finish(report)
+
+    def _finish(self, report: MaintenanceReport) -> MaintenanceReport:
+        report.finished_at = datetime.utcnow()
+        self.last_report = report
+        if report.changed_anything:
+            logger.info("Maintenance: %s", report.summary())
+        for error in report.errors:
+            logger.warning("Maintenance: %s", error)
+        return report
+
+    def request_purge(self) -> None:
+        """Ask the running scheduler for a purge pass soon (no-op when it is not running)"""
+        if self._purge_requested is not None:
+            self._purge_requested.set()
+
+    async def _run_forever(self, session_factory, interval: float) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.run_once(session_factory)
+            next_full_pass = loop.time() + interval
+            while (remaining := next_full_pass - loop.time()) > 0:
+                try:
+                    await asyncio.wait_for(self._purge_requested.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                self._purge_requested.clear()
+                await self.purge(session_factory)
+
+    def start(self, session_factory, interval: float) -> None:
+        """Start the scheduler on the running event loop (interval 0 disables it)"""
+        if self._task is None and interval > 0:
+            self._purge_requested = asyncio.Event()
+            self._task = asyncio.create_task(self._run_forever(session_factory, interval))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._purge_requested = None
+
+
+maintenance = MaintenanceScheduler()
+
+
+async def _main() -> None:
+    from database import AsyncSessionLocal, dispose_engines
+    try:
+        report = await maintenance.run_once(AsyncSessionLocal)
+        print(f"✓ Maintenance finished: {report.summary()}")
+    finally:
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
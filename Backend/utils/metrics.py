@@ -0,0 +1,143 @@
+"""
+Metrics
+
+This module handles:
+- Counters and histograms updated on the request path (prometheus_client)
+- Gauges read from their source when /metrics is scraped
+- Rendering everything in the Prometheus text exposition format
+- The per-stage timing histogram (preprocess, Tesseract, parse, explain,
+  DB commit, JWT verify) and the OCR outcome/confidence metrics
+
+Label values of the fixed stages are resolved once at import, so recording
+a stage never looks up labels.
+
+Each worker process keeps its own metrics; with several workers, scrape
+each one or aggregate in Prometheus.
+"""
+
+import logging
+from typing import Callable, Dict, Iterator, Optional, Sequence, Tuple, Union
+
+from prometheus_client import CollectorRegistry, Counter, Histogram, disable_created_metrics, generate_latest
+from prometheus_client import CONTENT_TYPE_LATEST as CONTENT_TYPE
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metric
+from prometheus_client.registry import Collector
+
+logger = logging.getLogger(__name__)
+
+# Seconds, from a cached JWT check (tens of microseconds) to a slow OCR run
+STAGE_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+# OCR confidence percentages; 50 and 70 are the warning thresholds
+CONFIDENCE_BUCKETS = (30, 50, 70, 85, 95, 100)
+
+LabelValues = Tuple[str, ...]
+GaugeValue = Union[float, int, None, Dict[LabelValues, Optional[float]]]
+
+# Only this application's metrics; the process is scraped per worker
+registry = CollectorRegistry()
+
+# No *_created series: one extra gauge per child that nothing here reads
+disable_created_metrics()
+
+
+class CallbackCollector(Collector):
+    """
+    Gauge (or counter kept elsewhere) read from a callback at scrape time
+
+    The callback returns a number, or {label values: number} for labelled
+    metrics. None values are left out (e.g. pool size of an unpooled engine).
+    A callback that fails is logged and skipped, so one broken source does
+    not hide every other metric.
+    """
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], GaugeValue],
+                 labelnames: Sequence[str] = (), family: type = GaugeMetricFamily):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.labelnames = tuple(labelnames)
+        self.family = family
+
+    def _metric(self) -> Metric:
+        return self.family(self.name, self.documentation, labels=self.labelnames)
+
+    def describe(self) -> Iterator[Metric]:
+        # Lets the registry reject duplicate names without calling the callback
+        yield self._metric()
+
+    def collect(self) -> Iterator[Metric]:
+        try:
+            value = self.callback()
+        except Exception:
+            logger.warning("Metric %s unavailable", self.name, exc_info=True)
+            return
+        metric = self._metric()
+        samples = value.items() if isinstance(value, dict) else [((), value)]
+        for values, sample in samples:
+            if sample is not None:
+                metric.add_metric([str(label) for label in values], float(sample))
+        yield metric
+
+
+def callback_gauge(name: str, documentation: str, callback: Callable[[], GaugeValue],
+                   labelnames: Sequence[str] = ()) -> CallbackCollector:
+    """Register a gauge whose value is read from callback on each scrape"""
+    collector = CallbackCollector(name, documentation, callback, labelnames)
+    registry.register(collector)
+    return collector
+
+
+def callback_counter(name: str, documentation: str, callback: Callable[[], GaugeValue],
+                     labelnames: Sequence[str] = ()) -> CallbackCollector:
+    """Register a counter kept elsewhere (name ends in _total), read on each scrape"""
+    collector = CallbackCollector(name, documentation, callback, labelnames, CounterMetricFamily)
+    registry.register(collector)
+    return collector
+
+
+def render_metrics() -> bytes:
+    """All metrics in the Prometheus text format"""
+    return generate_latest(registry)
+
+
+STAGE_SECONDS = Histogram(
+    "cura_stage_duration_seconds",
+    "Time spent in each processing stage",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+    registry=registry
+)
+
+# Resolved once, so timing a stage never looks up labels
+PREPROCESS_SECONDS = STAGE_SECONDS.labels("preprocess")
+TESSERACT_SECONDS = STAGE_SECONDS.labels("tesseract")
+PDF_EXTRACT_SECONDS = STAGE_SECONDS.labels("pdf_extract")
+PARSE_SECONDS = STAGE_SECONDS.labels("parse")
+EXPLAIN_SECONDS = STAGE_SECONDS.labels("explain")
+DB_COMMIT_SECONDS = STAGE_SECONDS.labels("db_commit")
+JWT_VERIFY_SECONDS = STAGE_SECONDS.labels("jwt_verify")
+
+OCR_RESULTS = Counter(
+    "cura_ocr_results_total",
+    "Text extraction attempts by source (image, pdf) and outcome",
+    ["source", "outcome"],
+    registry=registry
+)
+
+OCR_CONFIDENCE = Histogram(
+    "cura_ocr_confidence_percent",
+    "Average Tesseract word confidence of successfully read images",
+    buckets=CONFIDENCE_BUCKETS,
+    registry=registry
+)
+
+JWT_VERIFICATIONS = Counter(
+    "cura_jwt_verifications_total",
+    "Access token checks by result (cached, verified, rejected)",
+    ["result"],
+    registry=registry
+)
@@ -0,0 +1,80 @@
+"""
+Move pre-blob-store uploads into the blob store
+
+Usage (from the Backend directory - old paths are relative to it):
+    python -m utils.migrate_uploads [--batch-size 500] [--keep-files]
+
+Every prescription whose file_path is still a plain path (uploads/prescriptions/
+<uuid>_<name>) is copied into the blob store and its file_path rewritten to the
+blob key. Identical files collapse into one blob. The old file is removed
+afterwards unless --keep-files is given. Rows whose file is missing are
+reported and left untouched.
+"""
+
+import argparse
+import asyncio
+import os
+
+from sqlalchemy import select, update
+
+from database import SessionLocal
+from models import Prescription
+from utils.blob_store import blob_store, is_blob_key
+
+
+def migrate(batch_size: int, keep_files: bool) -> None:
+    """Copy legacy files into the blob store and point their rows at the new keys"""
+    moved = deduplicated = missing = 0
+    last_id = 0
+    with SessionLocal() as db:
+        while True:
+            rows = db.execute(
+                select(Prescription.id, Prescription.file_path)
+                .where(Prescription.id > last_id)
+                .order_by(Prescription.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            for row_id, file_path in rows:
+                if is_blob_key(file_path):
+                    continue
+                if not os.path.exists(file_path):
+                    missing += 1
+                    print(f"  ! prescription {row_id}: {file_path} not found")
+                    continue
+
+                with open(file_path, "rb") as f:
+                    blob = asyncio.run(blob_store.put(f.read()))
+                db.execute(
+                    update(Prescription)
+                    .where(Prescription.id == row_id)
+                    .values(file_path=blob.key)
+                    .execution_options(synchronize_session=False)
+                )
+                db.commit()
+
+                moved += 1
+                if not blob.created:
+                    deduplicated += 1
+                if not keep_files:
+                    os.remove(file_path)
+
+    print(f"✓ Moved {moved} file(s) into the blob store ({deduplicated} duplicate(s) stored once)")
+    if missing:
+        print(f"  {missing} row(s) reference files that no longer exist")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move old uploads into the blob store")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--keep-files", action="store_true", help="Leave the old files in place")
+    args = parser.parse_args()
+
+    migrate(args.batch_size, args.keep_files)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,11 +8,22 @@ This module handles:
 """
 
 import os
+import logging
 import cv2
 import numpy as np
 from typing import Optional, Tuple
 import re
 
+from utils.metrics import (
+    PREPROCESS_SECONDS,
+    TESSERACT_SECONDS,
+    PDF_EXTRACT_SECONDS,
+    OCR_RESULTS,
+    OCR_CONFIDENCE
+)
+
+logger = logging.getLogger(__name__)
+
 # ==============================================================================
 # TESSERACT OCR PATH CONFIGURATION
 # ==============================================================================
@@ -55,7 +66,7 @@ def preprocess_image(image_path: str) -> Optional[np.ndarray]:
         # Read image
         image = cv2.imread(image_path)
         if image is None:
-            print(f"Error: Could not read image from {image_path}")
+            logger.warning("Could not read image for preprocessing")
             return None
         
         # Convert to grayscale
@@ -78,7 +89,7 @@ def preprocess_image(image_path: str) -> Optional[np.ndarray]:
         return processed
         
     except Exception as e:
-        print(f"Error preprocessing image: {str(e)}")
+        logger.exception("Image preprocessing failed")
         return None
 
 
@@ -102,33 +113,41 @@ def extract_text_from_image(image_path: str) -> Tuple[str, bool]:
                 pytesseract.pytesseract.tesseract_cmd = TESSERACT_PATH
                 
         except ImportError:
+            OCR_RESULTS.labels("image", "unavailable").inc()
             return "⚠️ OCR library not installed. Please install pytesseract and Tesseract OCR.", False
         
         # Preprocess the image
-        processed_image = preprocess_image(image_path)
+        with PREPROCESS_SECONDS.time():
+            processed_image = preprocess_image(image_path)
         
         if processed_image is None:
+            OCR_RESULTS.labels("image", "preprocess_failed").inc()
             return "❌ Failed to preprocess image. Please ensure the image is clear and not corrupted.", False
         
-        # Perform OCR with confidence data
-        custom_config = r'--oem 3 --psm 6'  # OCR Engine Mode 3, Page Segmentation Mode 6
-        text = pytesseract.image_to_string(processed_image, config=custom_config)
-        
-        # Get OCR data for confidence checking
-        try:
-            ocr_data = pytesseract.image_to_data(processed_image, output_type=pytesseract.Output.DICT, config=custom_config)
-            confidences = [int(conf) for conf in ocr_data['conf'] if conf != '-1']
-            avg_confidence = sum(confidences) / len(confidences) if confidences else 0
-        except:
-            avg_confidence = 0
+        with TESSERACT_SECONDS.time():
+            # Perform OCR with confidence data
+            custom_config = r'--oem 3 --psm 6'  # OCR Engine Mode 3, Page Segmentation Mode 6
+            text = pytesseract.image_to_string(processed_image, config=custom_config)
+            
+            # Get OCR data for confidence checking
+            try:
+                ocr_data = pytesseract.image_to_data(processed_image, output_type=pytesseract.Output.DICT, config=custom_config)
+                confidences = [int(conf) for conf in ocr_data['conf'] if conf != '-1']
+                avg_confidence = sum(confidences) / len(confidences) if confidences else 0
+            except:
+                avg_confidence = 0
         
         # Clean the extracted text
         text = clean_extracted_text(text)
         
         # Quality checks
         if not text or len(text.strip()) < 10:
+            OCR_RESULTS.labels("image", "no_text").inc()
             return "❌ No readable text found. Please upload a clearer image with better lighting.", False
         
+        OCR_RESULTS.labels("image", "success").inc()
+        OCR_CONFIDENCE.observe(avg_confidence)
+        
         # Add quality warning if confidence is low
         quality_warning = ""
         if avg_confidence < 50:
@@ -139,6 +158,7 @@ def extract_text_from_image(image_path: str) -> Tuple[str, bool]:
         return quality_warning + text, True
         
     except Exception as e:
+        OCR_RESULTS.labels("image", "error").inc()
         return f"OCR extraction failed: {str(e)}", False
 
 
@@ -157,25 +177,30 @@ def extract_text_from_pdf(pdf_path: str) -> Tuple[str, bool]:
         try:
             from PyPDF2 import PdfReader
         except ImportError:
+            OCR_RESULTS.labels("pdf", "unavailable").inc()
             return "PDF library not installed. Please install PyPDF2.", False
         
-        # Read PDF
-        reader = PdfReader(pdf_path)
-        text = ""
-        
-        # Extract text from all pages
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
+        with PDF_EXTRACT_SECONDS.time():
+            # Read PDF
+            reader = PdfReader(pdf_path)
+            text = ""
+            
+            # Extract text from all pages
+            for page in reader.pages:
+                text += page.extract_text() + "\n"
         
         # Clean the extracted text
         text = clean_extracted_text(text)
         
         if not text or len(text.strip()) < 10:
+            OCR_RESULTS.labels("pdf", "no_text").inc()
             return "No readable text found in the PDF", False
         
+        OCR_RESULTS.labels("pdf", "success").inc()
         return text, True
         
     except Exception as e:
+        OCR_RESULTS.labels("pdf", "error").inc()
         return f"PDF extraction failed: {str(e)}", False
 
 
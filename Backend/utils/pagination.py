@@ -0,0 +1,91 @@
+"""
+Keyset Pagination Utilities
+
+This module handles:
+- Opaque cursors encoding a (created_at, id) position
+- Building the "rows after this cursor" filter for newest-first listings
+
+Unlike OFFSET, a keyset query seeks straight to the cursor through the
+(user_id, created_at, id) index, so page 500 costs the same as page 1.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """
+    Encode a row position as an opaque, URL-safe cursor
+    
+    Args:
+        created_at: Timestamp of the last row on the page
+        row_id: ID of the last row on the page
+        
+    Returns:
+        Cursor string to pass back as ?cursor=
+    """
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode a cursor produced by encode_cursor
+    
+    Raises:
+        HTTPException: 400 if the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+
+def after_cursor(model, cursor: Optional[str]):
+    """
+    Filter for rows that come after the cursor in newest-first order
+    
+    Spelled out as OR/AND rather than a row-value comparison so MySQL uses
+    the composite index as a range scan.
+    
+    Args:
+        model: ORM model with created_at and id columns
+        cursor: Cursor from the previous page, or None for the first page
+        
+    Returns:
+        SQL expression, or None when there is no cursor
+    """
+    if not cursor:
+        return None
+    
+    created_at, row_id = decode_cursor(cursor)
+    return or_(
+        model.created_at < created_at,
+        and_(model.created_at == created_at, model.id < row_id)
+    )
+
+
+def next_cursor(rows: list, limit: int) -> Optional[str]:
+    """
+    Cursor for the following page
+    
+    Callers fetch limit + 1 rows; the extra row only signals that another
+    page exists and is dropped by the caller.
+    """
+    if len(rows) <= limit:
+        return None
+    last = rows[limit - 1]
+    return encode_cursor(last.created_at, last.id)
@@ -1,61 +1,71 @@
 """
 Standardized response utilities
+
+Both helpers return a finished ORJSONResponse. FastAPI sends a returned
+Response as-is, so the payload is encoded exactly once by orjson (which
+handles datetimes natively) instead of going through jsonable_encoder and
+the stdlib json module. The route decorator's status_code does not apply
+to a returned Response - pass it here instead.
 """
-from typing import Any, Optional
+from typing import Any, Dict, Optional
 from datetime import datetime
 
+from fastapi.responses import ORJSONResponse
+
 
 def success_response(
     message: str,
     data: Optional[Any] = None,
-    status_code: int = 200
-) -> dict:
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None
+) -> ORJSONResponse:
     """
     Create standardized success response
-    
+
     Args:
         message: Success message
-        data: Response data payload
+        data: Response data payload (dicts, lists, scalars and datetimes)
         status_code: HTTP status code
-        
+        headers: Extra response headers (e.g. Cache-Control)
+
     Returns:
-        Standardized success response dictionary
+        JSON response with the standard success envelope
     """
     response = {
         "success": True,
         "message": message,
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": datetime.utcnow()
     }
-    
+
     if data is not None:
         response["data"] = data
-    
-    return response
+
+    return ORJSONResponse(response, status_code=status_code, headers=headers)
 
 
 def error_response(
     message: str,
     error: Optional[str] = None,
     status_code: int = 400
-) -> dict:
+) -> ORJSONResponse:
     """
     Create standardized error response
-    
+
     Args:
         message: Error message
         error: Detailed error information
         status_code: HTTP status code
-        
+
     Returns:
-        Standardized error response dictionary
+        JSON response with the standard error envelope
     """
     response = {
         "success": False,
         "message": message,
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": datetime.utcnow()
     }
-    
+
     if error is not None:
         response["error"] = error
-    
-    return response
+
+    return ORJSONResponse(response, status_code=status_code)
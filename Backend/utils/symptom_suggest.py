@@ -0,0 +1,135 @@
+"""
+Symptom Autocomplete Utilities
+
+This module handles:
+- Building a prefix index from SYMPTOM_KEYWORDS synonyms
+- Popularity-ranked typeahead suggestions
+- Recording which symptoms users actually report
+
+The index is a sorted array of (phrase, entry) pairs searched with bisect,
+so a lookup is O(log n) plus the size of the matching range. Nothing here
+touches the database.
+"""
+
+import heapq
+import re
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from utils.symptom_analyzer import SYMPTOM_KEYWORDS, CONDITION_DATABASE, format_symptom_name
+
+
+# Upper bound for a prefix range: any phrase starting with the prefix sorts below prefix + this
+_PREFIX_END = "\uffff"
+
+# Suggestions returned when the client does not ask for a specific number
+DEFAULT_SUGGESTION_LIMIT = 8
+MAX_SUGGESTION_LIMIT = 20
+
+
+def _normalize(text: str) -> str:
+    """Lowercase and collapse whitespace so keystrokes map onto indexed phrases"""
+    return re.sub(r'\s+', ' ', text.lower()).strip()
+
+
+def _seed_popularity() -> Counter:
+    """
+    Initial popularity counts
+
+    Every symptom starts at 1 and gains a point for each condition it belongs to,
+    so common cross-condition symptoms (fever, fatigue, headache) rank first
+    until real usage counts take over.
+    """
+    counts = Counter({symptom_key: 1 for symptom_key in SYMPTOM_KEYWORDS})
+    for condition_data in CONDITION_DATABASE.values():
+        for symptom_key in condition_data['symptoms']:
+            if symptom_key in counts:
+                counts[symptom_key] += 1
+    return counts
+
+
+class SymptomSuggestIndex:
+    """
+    Sorted-array prefix index over symptom synonyms
+
+    Each synonym is indexed at the start of every word it contains, so both
+    "che" and "pai" find "chest pain". Entries are stored once; the sorted
+    array only holds (search_key, entry_id) pairs.
+    """
+
+    def __init__(self, keywords: Dict[str, List[str]]):
+        # entry_id -> (phrase, symptom_key, label)
+        self._entries: List[Tuple[str, str, str]] = []
+        keys: List[Tuple[str, int]] = []
+
+        for symptom_key, synonyms in keywords.items():
+            label = format_symptom_name(symptom_key)
+            for synonym in synonyms:
+                phrase = _normalize(synonym)
+                entry_id = len(self._entries)
+                self._entries.append((phrase, symptom_key, label))
+
+                words = phrase.split(' ')
+                for start in range(len(words)):
+                    keys.append((' '.join(words[start:]), entry_id))
+
+        keys.sort()
+        self._keys = [key for key, _ in keys]
+        self._entry_ids = [entry_id for _, entry_id in keys]
+        self.popularity = _seed_popularity()
+
+    def record_usage(self, symptom_keys: List[str]) -> None:
+        """Bump popularity for symptoms that were detected in a real analysis"""
+        for symptom_key in symptom_keys:
+            if symptom_key in self.popularity:
+                self.popularity[symptom_key] += 1
+
+    def suggest(self, query: str, limit: int = DEFAULT_SUGGESTION_LIMIT) -> List[Dict[str, str]]:
+        """
+        Return the most popular synonyms matching a prefix
+
+        Args:
+            query: Partial text typed by the user
+            limit: Maximum number of suggestions
+
+        Returns:
+            List of suggestion dictionaries (text, symptom, label)
+        """
+        prefix = _normalize(query)
+        if not prefix:
+            return []
+
+        lo = bisect_left(self._keys, prefix)
+        hi = bisect_left(self._keys, prefix + _PREFIX_END, lo)
+        if lo == hi:
+            return []
+
+        matching_ids = set(self._entry_ids[lo:hi])
+        popularity = self.popularity
+        entries = self._entries
+
+        # Most popular symptom first, then phrases that start with the prefix, then shortest
+        best = heapq.nsmallest(
+            limit,
+            matching_ids,
+            key=lambda entry_id: (
+                -popularity[entries[entry_id][1]],
+                not entries[entry_id][0].startswith(prefix),
+                len(entries[entry_id][0]),
+                entries[entry_id][0],
+            )
+        )
+
+        return [
+            {
+                "text": entries[entry_id][0],
+                "symptom": entries[entry_id][1],
+                "label": entries[entry_id][2],
+            }
+            for entry_id in best
+        ]
+
+
+# Shared index built once at import time
+symptom_index = SymptomSuggestIndex(SYMPTOM_KEYWORDS)
@@ -0,0 +1,189 @@
+"""
+Compressed Text Columns
+
+This module handles:
+- The CompressedText column type (zlib on write, inflate on load)
+- Versioned preset dictionaries trained on our own prescription/report text
+- Training new dictionaries from stored rows
+
+Stored format:
+    b"\\x00CZ" + <dictionary id byte> + <zlib stream>
+
+Dictionary id 0 means "no dictionary". Values that do not start with the
+header are legacy plain UTF-8 text written before compression existed, and
+are returned unchanged, so a table can be migrated row by row.
+
+Dictionaries are immutable once rows reference them: never edit a
+`.zdict` file, train a new one with the next id instead.
+"""
+
+import os
+import re
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import LargeBinary
+from sqlalchemy.types import TypeDecorator
+
+from config import settings
+
+HEADER = b"\x00CZ"
+NO_DICTIONARY = 0
+COMPRESSION_LEVEL = 6
+# Shorter values gain nothing from compression and are stored as plain text
+MIN_COMPRESS_LENGTH = 64
+# zlib can only reference the last 32 KB of a preset dictionary
+MAX_DICTIONARY_SIZE = 32 * 1024
+# MEDIUMBLOB on MySQL - the TEXT columns this replaces were capped at 64 KB
+MAX_STORED_LENGTH = 2 ** 24 - 1
+
+DICTIONARY_DIR = os.path.join(os.path.dirname(__file__), "compression_dicts")
+
+# OCR lines repeat with different values ("Hemoglobin 13.2 g/dL 13.0 - 17.0"),
+# so the text between numbers is learned as well as whole lines
+FRAGMENT_PATTERN = re.compile(r"[^\d\n]{4,}")
+
+
+def _load_dictionaries() -> Dict[int, bytes]:
+    """Read every <id>.zdict file shipped with the application"""
+    dictionaries = {}
+    if os.path.isdir(DICTIONARY_DIR):
+        for name in os.listdir(DICTIONARY_DIR):
+            stem, ext = os.path.splitext(name)
+            if ext == ".zdict" and stem.isdigit():
+                with open(os.path.join(DICTIONARY_DIR, name), "rb") as f:
+                    dictionaries[int(stem)] = f.read()
+    return dictionaries
+
+
+DICTIONARIES = _load_dictionaries()
+
+
+def compress_text(text: str, dictionary_id: Optional[int] = None) -> bytes:
+    """
+    Encode text for storage
+
+    Args:
+        text: Value to store
+        dictionary_id: Preset dictionary to use (defaults to settings.TEXT_COMPRESSION_DICTIONARY)
+
+    Returns:
+        Framed zlib stream, or plain UTF-8 for short values
+    """
+    raw = text.encode("utf-8")
+    if len(raw) < MIN_COMPRESS_LENGTH and not raw.startswith(b"\x00"):
+        return raw
+
+    if dictionary_id is None:
+        dictionary_id = settings.TEXT_COMPRESSION_DICTIONARY
+    zdict = DICTIONARIES.get(dictionary_id)
+    if zdict is None:
+        dictionary_id = NO_DICTIONARY
+
+    if zdict:
+        compressor = zlib.compressobj(COMPRESSION_LEVEL, zdict=zdict)
+    else:
+        compressor = zlib.compressobj(COMPRESSION_LEVEL)
+    return HEADER + bytes([dictionary_id]) + compressor.compress(raw) + compressor.flush()
+
+
+def decompress_text(value) -> str:
+    """
+    Decode a stored value (compressed or legacy plain text)
+
+    Raises:
+        ValueError: If the value references a dictionary this build does not have
+    """
+    if isinstance(value, str):
+        return value
+    value = bytes(value)
+    if not value.startswith(HEADER):
+        return value.decode("utf-8")
+
+    dictionary_id = value[len(HEADER)]
+    payload = value[len(HEADER) + 1:]
+    if dictionary_id == NO_DICTIONARY:
+        return zlib.decompress(payload).decode("utf-8")
+
+    zdict = DICTIONARIES.get(dictionary_id)
+    if zdict is None:
+        raise ValueError(f"Compressed text uses unknown dictionary {dictionary_id}")
+    decompressor = zlib.decompressobj(zdict=zdict)
+    return (decompressor.decompress(payload) + decompressor.flush()).decode("utf-8")
+
+
+def is_compressed(value) -> bool:
+    """True if a raw stored value uses the compressed format"""
+    return isinstance(value, (bytes, bytearray, memoryview)) and bytes(value[:len(HEADER)]) == HEADER
+
+
+class CompressedText(TypeDecorator):
+    """
+    Text column stored as a compressed blob
+
+    Behaves like Text in Python code. Pair it with deferred() so the blob is
+    only fetched - and inflated - when a detail view actually reads it.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def __init__(self, length: int = MAX_STORED_LENGTH, **kwargs):
+        super().__init__(length=length, **kwargs)
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return compress_text(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return decompress_text(value)
+
+
+def train_dictionary(samples: Iterable[str], max_size: int = MAX_DICTIONARY_SIZE) -> bytes:
+    """
+    Build a preset dictionary from representative values
+
+    Lines that recur across samples (headings, common medicine lines) and
+    the recurring text between numbers in the others (test names, units,
+    "x 5 days") are kept, weighted by how many bytes they would save. A
+    fragment already contained in a chosen entry is skipped. zlib finds
+    matches fastest near the end of the dictionary, so the most valuable
+    entries are placed last.
+
+    Args:
+        samples: Stored texts to learn from
+        max_size: Dictionary size limit in bytes
+
+    Returns:
+        Dictionary bytes to save as the next <id>.zdict
+    """
+    counts = Counter()
+    for sample in samples:
+        # Count each piece once per sample so one long document cannot dominate
+        lines = {line for line in sample.splitlines() if line.strip()}
+        pieces = {line + "\n" for line in lines}
+        for line in lines:
+            pieces.update(fragment for fragment in FRAGMENT_PATTERN.findall(line) if fragment.strip())
+        counts.update(pieces)
+
+    scored = [
+        (count * len(piece.encode("utf-8")), piece)
+        for piece, count in counts.items()
+        if count > 1
+    ]
+    scored.sort(reverse=True)
+
+    chosen = []
+    size = 0
+    for _, piece in scored:
+        encoded = piece.encode("utf-8")
+        if size + len(encoded) > max_size or any(encoded in entry for entry in chosen):
+            continue
+        chosen.append(encoded)
+        size += len(encoded)
+
+    return b"".join(reversed(chosen))
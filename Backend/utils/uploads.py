@@ -0,0 +1,52 @@
+"""
+Upload Utilities
+
+This module handles:
+- Validating uploaded files (type and size)
+- Saving them to the blob store
+
+Shared by the prescription and medical report routers.
+"""
+
+import os
+
+from fastapi import UploadFile
+
+from utils.blob_store import blob_store
+
+# Allowed file types
+ALLOWED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.pdf'}
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
+MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
+
+
+async def save_uploaded_file(file: UploadFile) -> tuple:
+    """
+    Save uploaded file to the blob store
+    
+    Files are stored by content, so uploading the same file again reuses the
+    existing blob instead of writing a second copy.
+    
+    Args:
+        file: Uploaded file object
+        
+    Returns:
+        Tuple of (blob_key, file_size, error_message)
+    """
+    try:
+        # Validate file extension
+        file_ext = os.path.splitext(file.filename)[1].lower()
+        if file_ext not in ALLOWED_EXTENSIONS:
+            return None, 0, f"Invalid file type. Allowed: {', '.join(ALLOWED_EXTENSIONS)}"
+        
+        # Read one byte past the limit so oversized uploads are never buffered whole
+        content = await file.read(MAX_FILE_SIZE + 1)
+        if len(content) > MAX_FILE_SIZE:
+            return None, 0, f"File too large. Max size: {MAX_FILE_SIZE // (1024*1024)} MB"
+        
+        blob = await blob_store.put(content)
+        return blob.key, blob.size, None
+        
+    except Exception as e:
+        return None, 0, f"Failed to save file: {str(e)}"
+
@@ -0,0 +1,153 @@
+"""
+Authenticated User Cache
+
+This module handles:
+- Caching the user columns get_current_user needs, keyed by user ID
+- Invalidation once a transaction that updated or deleted a User row
+  through the ORM commits
+- An optional Redis backend shared by all workers
+
+Password hashes are never cached. Code that changes users with bulk UPDATE
+statements (which bypass ORM events) must call `user_cache.invalidate()`.
+"""
+
+import asyncio
+import json
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from config import settings
+from models import User
+from utils.cache import TTLCache, MISSING
+
+# Columns copied into the cache - enough to rebuild the principal without a query
+CACHED_USER_FIELDS = ("id", "username", "email", "is_active", "created_at", "updated_at")
+
+# Session.info key collecting users written in the transaction
+_CHANGED_KEY = "user_cache_changed"
+
+
+class MemoryUserCacheBackend:
+    """Per-process LRU/TTL cache"""
+
+    def __init__(self, maxsize: int, ttl: int):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, user_id: int) -> Optional[dict]:
+        value = self._cache.get(user_id)
+        return None if value is MISSING else value
+
+    async def set(self, user_id: int, fields: dict) -> None:
+        self._cache.set(user_id, fields)
+
+    async def delete(self, user_id: int) -> None:
+        self._cache.delete(user_id)
+
+    def delete_nowait(self, user_id: int) -> None:
+        self._cache.delete(user_id)
+
+
+class RedisUserCacheBackend:
+    """Shared cache in Redis, so an invalidation is seen by every worker"""
+
+    def __init__(self, redis_url: str, ttl: int):
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError:
+            raise RuntimeError("USER_CACHE_BACKEND=redis requires the 'redis' package. Run: pip install redis")
+
+        self._redis = redis_asyncio.from_url(redis_url)
+        self._ttl = ttl
+        self._pending = set()
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"cura:user:{user_id}"
+
+    async def get(self, user_id: int) -> Optional[dict]:
+        raw = await self._redis.get(self._key(user_id))
+        if raw is None:
+            return None
+        fields = json.loads(raw)
+        for name in ("created_at", "updated_at"):
+            if fields.get(name):
+                fields[name] = datetime.fromisoformat(fields[name])
+        return fields
+
+    async def set(self, user_id: int, fields: dict) -> None:
+        await self._redis.set(self._key(user_id), json.dumps(fields, default=str), ex=self._ttl)
+
+    async def delete(self, user_id: int) -> None:
+        await self._redis.delete(self._key(user_id))
+
+    def delete_nowait(self, user_id: int) -> None:
+        # ORM events are synchronous; schedule the delete on the running loop
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self.delete(user_id))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+
+class UserCache:
+    """
+    Principal cache used by get_current_user
+
+    A hit returns a transient User instance built from cached columns, so the
+    request needs no database round-trip.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    async def get(self, user_id: int) -> Optional[User]:
+        fields = await self.backend.get(user_id)
+        if fields is None:
+            return None
+        return User(**fields)
+
+    async def set(self, user: User) -> None:
+        await self.backend.set(user.id, {name: getattr(user, name) for name in CACHED_USER_FIELDS})
+
+    async def invalidate(self, user_id: int) -> None:
+        await self.backend.delete(user_id)
+
+    def invalidate_nowait(self, user_id: int) -> None:
+        self.backend.delete_nowait(user_id)
+
+
+def _create_backend():
+    if settings.USER_CACHE_BACKEND == "redis":
+        return RedisUserCacheBackend(settings.REDIS_URL, settings.USER_CACHE_TTL_SECONDS)
+    return MemoryUserCacheBackend(settings.USER_CACHE_MAX_ENTRIES, settings.USER_CACHE_TTL_SECONDS)
+
+
+user_cache = UserCache(_create_backend())
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _remember_changed_user(mapper, connection, target):
+    """Note a user row the ORM wrote; its cache entry is dropped at commit"""
+    # Invalidating here (at flush) would let a concurrent request re-cache
+    # the old row before this transaction commits
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_CHANGED_KEY, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_cached_users(session):
+    """Drop the cached principals of users this transaction changed"""
+    for user_id in session.info.pop(_CHANGED_KEY, ()):
+        user_cache.invalidate_nowait(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session):
+    session.info.pop(_CHANGED_KEY, None)
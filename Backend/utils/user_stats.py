@@ -0,0 +1,293 @@
+"""
+Per-User Stats Utilities
+
+This module handles:
+- Adjusting per-user record counts inside the caller's transaction
+- Stamping last-activity times when records are added
+- Reading counts with a single primary-key lookup
+- Serving dashboard counters from an in-process cache
+- Reconciling counters with the tables they count
+
+Rows are created at signup. Users created before the stats table existed
+get their row on first use, seeded from the tables.
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import select, func, update, event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import UserStats, Prescription, SymptomInteraction, MedicalReport
+from utils.cache import TTLCache, MISSING
+
+# Counter column -> table it counts, used to seed and reconcile rows
+COUNTED_TABLES = {
+    "prescription_count": Prescription,
+    "symptom_check_count": SymptomInteraction,
+    "report_count": MedicalReport,
+    "urgent_check_count": SymptomInteraction,
+    "emergency_check_count": SymptomInteraction,
+}
+
+# Symptom-check urgency level -> counter column
+URGENCY_COUNTERS = {
+    "urgent": "urgent_check_count",
+    "emergency": "emergency_check_count",
+}
+
+# Counter column -> timestamp stamped when the counter goes up
+ACTIVITY_COLUMNS = {
+    "prescription_count": "last_prescription_at",
+    "report_count": "last_report_at",
+    "symptom_check_count": "last_symptom_check_at",
+}
+
+# Session.info key collecting users whose counters changed in the transaction
+_CHANGED_KEY = "user_stats_changed"
+
+dashboard_cache = TTLCache(maxsize=settings.DASHBOARD_CACHE_MAX_ENTRIES, ttl=settings.DASHBOARD_CACHE_TTL_SECONDS)
+
+
+def _counted_rows(column: str):
+    """WHERE clause of the rows a counter counts, without the user filter"""
+    model = COUNTED_TABLES[column]
+    conditions = []
+    if "deleted_at" in model.__table__.c:
+        # Soft-deleted rows waiting for the background purge are not counted
+        conditions.append(model.deleted_at.is_(None))
+    for level, counter in URGENCY_COUNTERS.items():
+        if column == counter:
+            conditions.append(SymptomInteraction.urgency_level == level)
+    return model, conditions
+
+
+async def count_user_records(db, user_ids: List[int]) -> Dict[int, dict]:
+    """
+    Count each user's records from the tables (one grouped query per column)
+
+    Args:
+        db: Async database session
+        user_ids: Users to count
+
+    Returns:
+        user_id -> counter and activity column values (missing users get zeros)
+    """
+    stats = {user_id: {column: 0 for column in COUNTED_TABLES} for user_id in user_ids}
+
+    for column in COUNTED_TABLES:
+        model, conditions = _counted_rows(column)
+        result = await db.execute(
+            select(model.user_id, func.count())
+            .where(model.user_id.in_(user_ids), *conditions)
+            .group_by(model.user_id)
+        )
+        for user_id, count in result:
+            stats[user_id][column] = count
+
+    for counter, activity_column in ACTIVITY_COLUMNS.items():
+        model = COUNTED_TABLES[counter]
+        result = await db.execute(
+            select(model.user_id, func.max(model.created_at))
+            .where(model.user_id.in_(user_ids))
+            .group_by(model.user_id)
+        )
+        latest = dict(result.all())
+        for user_id in user_ids:
+            stats[user_id][activity_column] = _utc_naive(latest.get(user_id))
+
+    for values in stats.values():
+        values["last_activity_at"] = _latest(values[column] for column in ACTIVITY_COLUMNS.values())
+    return stats
+
+
+def _utc_naive(at: Optional[datetime]) -> Optional[datetime]:
+    if at is not None and at.tzinfo is not None:
+        at = at.replace(tzinfo=None) - at.utcoffset()
+    return at
+
+
+def _latest(timestamps: Iterable[Optional[datetime]]) -> Optional[datetime]:
+    return max((at for at in timestamps if at is not None), default=None)
+
+
+async def _seed_user_stats(db, user_id: int) -> Optional[UserStats]:
+    """
+    Build a stats row from the current table contents
+
+    Returns:
+        The new row, or None if a concurrent request seeded it first
+    """
+    counts = await count_user_records(db, [user_id])
+    stats = UserStats(user_id=user_id, **counts[user_id])
+    try:
+        # Savepoint: two first requests of a user can both find no row
+        async with db.begin_nested():
+            db.add(stats)
+    except IntegrityError:
+        return None
+    return stats
+
+
+async def _update_user_stats(db, user_id: int, values: dict) -> int:
+    result = await db.execute(
+        update(UserStats)
+        .where(UserStats.user_id == user_id)
+        .values(values)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def symptom_check_deltas(urgency_level: Optional[str], delta: int = 1) -> Dict[str, int]:
+    """
+    Counter deltas for adding (delta=1) or removing (delta=-1) a symptom check
+
+    Usage: adjust_user_stats(db, user.id, **symptom_check_deltas(level))
+    """
+    deltas = {"symptom_check_count": delta}
+    if urgency_level in URGENCY_COUNTERS:
+        deltas[URGENCY_COUNTERS[urgency_level]] = delta
+    return deltas
+
+
+async def adjust_user_stats(db, user_id: int, **deltas: int) -> None:
+    """
+    Add deltas to a user's counters without committing
+
+    Call it in the same transaction as the insert or delete it describes,
+    e.g. adjust_user_stats(db, user.id, prescription_count=1). A positive
+    delta also stamps the matching last-activity time.
+
+    Args:
+        db: Async database session
+        user_id: User whose counters change
+        **deltas: Counter column name -> amount to add
+    """
+    values = {column: getattr(UserStats, column) + delta for column, delta in deltas.items()}
+    now = datetime.utcnow()
+    for column, delta in deltas.items():
+        if delta > 0 and column in ACTIVITY_COLUMNS:
+            values[ACTIVITY_COLUMNS[column]] = now
+            values["last_activity_at"] = now
+
+    if await _update_user_stats(db, user_id, values) == 0:
+        # Seed from the tables - flush first so the change being recorded is counted once
+        await db.flush()
+        if await _seed_user_stats(db, user_id) is None:
+            # The concurrent seed did not see our uncommitted change; apply it
+            # to that row (UPDATE reads the latest committed version)
+            await _update_user_stats(db, user_id, values)
+
+    db.info.setdefault(_CHANGED_KEY, set()).add(user_id)
+
+
+async def get_user_stats(db, user_id: int) -> UserStats:
+    """
+    Read a user's counters
+
+    Args:
+        db: Async database session
+        user_id: User to look up
+
+    Returns:
+        UserStats row (seeded and committed if it did not exist)
+    """
+    stats = await db.get(UserStats, user_id)
+    if stats is None:
+        stats = await _seed_user_stats(db, user_id)
+        if stats is None:
+            # Seeded concurrently: a locking read sees the committed row
+            stats = await db.scalar(
+                select(UserStats).where(UserStats.user_id == user_id).with_for_update()
+            )
+        await db.commit()
+    return stats
+
+
+async def get_dashboard_stats(db, user_id: int) -> dict:
+    """
+    Dashboard counters for a user, cached per worker
+
+    Args:
+        db: Async database session
+        user_id: User to look up
+
+    Returns:
+        Counts and last-activity times
+    """
+    cached = dashboard_cache.get(user_id)
+    if cached is not MISSING:
+        return cached
+
+    stats = await get_user_stats(db, user_id)
+    data = {
+        "prescriptions": stats.prescription_count,
+        "reports": stats.report_count,
+        "symptom_checks": stats.symptom_check_count,
+        "urgent_checks": stats.urgent_check_count,
+        "emergency_checks": stats.emergency_check_count,
+        "last_prescription_at": stats.last_prescription_at,
+        "last_report_at": stats.last_report_at,
+        "last_symptom_check_at": stats.last_symptom_check_at,
+        "last_activity_at": stats.last_activity_at,
+    }
+    dashboard_cache.set(user_id, data)
+    return data
+
+
+async def reconcile_user_stats(db, user_ids: List[int]) -> int:
+    """
+    Recount users' counters from the tables and fix any drift, without committing
+
+    The stats rows are locked first (SELECT ... FOR UPDATE), so a concurrent
+    insert either commits before the recount sees it or waits and applies its
+    delta on top of the corrected value. Missing activity times are filled in;
+    recorded ones are kept, since deletes do not move them back.
+
+    Args:
+        db: Async database session
+        user_ids: Users whose stats rows to check
+
+    Returns:
+        Number of rows corrected
+    """
+    rows = (await db.execute(
+        select(UserStats)
+        .where(UserStats.user_id.in_(user_ids))
+        .with_for_update()
+    )).scalars().all()
+    if not rows:
+        return 0
+
+    actual = await count_user_records(db, [row.user_id for row in rows])
+    corrected = 0
+    for row in rows:
+        counts = actual[row.user_id]
+        changes = {column: counts[column] for column in COUNTED_TABLES if getattr(row, column) != counts[column]}
+        for column in ACTIVITY_COLUMNS.values():
+            if getattr(row, column) is None and counts[column] is not None:
+                changes[column] = counts[column]
+        if changes:
+            changes["last_activity_at"] = _latest(
+                changes.get(column, getattr(row, column)) for column in ACTIVITY_COLUMNS.values()
+            )
+            for column, value in changes.items():
+                setattr(row, column, value)
+            db.info.setdefault(_CHANGED_KEY, set()).add(row.user_id)
+            corrected += 1
+    return corrected
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_dashboards(session):
+    """Drop cached dashboards of users whose counters this transaction changed"""
+    for user_id in session.info.pop(_CHANGED_KEY, ()):
+        dashboard_cache.delete(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_stats(session):
+    session.info.pop(_CHANGED_KEY, None)
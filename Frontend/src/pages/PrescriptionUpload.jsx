@@ -84,10 +84,11 @@ function PrescriptionUpload() {
       // Use the prescriptionService which handles auth automatically
       const data = await prescriptionService.upload(selectedFile)
       
-      // Parse medicines JSON string to array
+      // Medicines arrive as an array (older API versions sent a JSON string)
       let medications = []
       try {
-        medications = JSON.parse(data.data.medicines || '[]')
+        const medicines = data.data.medicines || []
+        medications = typeof medicines === 'string' ? JSON.parse(medicines) : medicines
       } catch (e) {
         console.error('Failed to parse medicines:', e)
         medications = []
@@ -2,8 +2,63 @@ import { useState } from 'react'
 import { useNavigate } from 'react-router-dom'
 import Navbar from '../components/Navbar'
 import Footer from '../components/Footer'
+import { reportService } from '../services/api'
 import './ReportAnalyzer.css'
 
+const OVERALL_STATUS = { high: 'critical', medium: 'attention', low: 'normal' }
+
+// critical_low / critical_high are shown with the critical badge
+const displayStatus = (status) => status.startsWith('critical') ? 'critical' : status
+
+const formatValue = (item) => `${item.value} ${item.unit || ''}`.trim()
+
+// Map the /reports/upload response onto the shape the result view renders
+const toAnalyzerResult = (report) => {
+  const detected = Object.values(report.detected_values || {})
+  const abnormalities = report.abnormalities_detected || []
+  const summaryLines = (report.ai_summary || '').split('\n').filter(Boolean)
+
+  const categories = []
+  detected.forEach((item) => {
+    let category = categories.find((c) => c.name === item.category)
+    if (!category) {
+      category = { name: item.category, metrics: [] }
+      categories.push(category)
+    }
+    category.metrics.push({ parameter: item.name, value: formatValue(item), status: displayStatus(item.status) })
+  })
+
+  const findings = abnormalities.length ? abnormalities : detected
+  const abnormalCategories = [...new Set(abnormalities.map((a) => a.category))]
+
+  return {
+    reportType: report.report_title || 'Lab Report',
+    date: new Date(report.created_at).toLocaleDateString(),
+    summary: summaryLines[0] || 'No lab values could be read from this report.',
+    overallStatus: OVERALL_STATUS[report.risk_level] || 'attention',
+    keyFindings: findings.map((item) => ({
+      name: item.name,
+      value: formatValue(item),
+      normalRange: item.reference_range || 'n/a',
+      status: displayStatus(item.status),
+      description: item.deviation_percent
+        ? `${item.deviation_percent}% outside the reference range.`
+        : 'Within the reference range.'
+    })),
+    detailedAnalysis: { categories },
+    recommendations: abnormalCategories.map((category) => {
+      const items = abnormalities.filter((a) => a.category === category)
+      return {
+        priority: items.some((a) => a.status.startsWith('critical')) ? 'high' : 'medium',
+        title: category,
+        description: items.map((a) => `${a.name}: ${formatValue(a)} (${a.status.replace('_', ' ')})`).join(', ')
+      }
+    }),
+    insights: summaryLines.slice(1, -1),
+    nextSteps: (report.recommendations || '').split('\n').filter(Boolean)
+  }
+}
+
 function ReportAnalyzer() {
   const navigate = useNavigate()
   const [selectedFile, setSelectedFile] = useState(null)
@@ -80,128 +135,18 @@ function ReportAnalyzer() {
     setError('')
 
     try {
-      const formData = new FormData()
-      formData.append('file', selectedFile)
-
-      // TODO: Replace with actual API endpoint
-      // const response = await fetch('/api/report/analyze', {
-      //   method: 'POST',
-      //   body: formData
-      // })
-      // const data = await response.json()
-
-      // Simulated processing
-      await new Promise(resolve => setTimeout(resolve, 3000))
-
-      // Enhanced mock result with comprehensive analysis
-      const mockResult = {
-        reportType: 'Complete Blood Count (CBC)',
-        date: new Date().toLocaleDateString(),
-        summary: 'Your blood test results show mostly normal values with a few parameters requiring attention.',
-        overallStatus: 'attention', // can be: normal, attention, critical
-        
-        keyFindings: [
-          { 
-            name: 'Hemoglobin', 
-            value: '11.2 g/dL', 
-            normalRange: '12.0-16.0 g/dL',
-            status: 'low',
-            description: 'Your hemoglobin is slightly below normal range, which may indicate mild anemia.'
-          },
-          { 
-            name: 'White Blood Cells', 
-            value: '7,500 cells/μL', 
-            normalRange: '4,000-11,000 cells/μL',
-            status: 'normal',
-            description: 'WBC count is within normal range, indicating healthy immune function.'
-          },
-          { 
-            name: 'Platelets', 
-            value: '225,000 cells/μL', 
-            normalRange: '150,000-450,000 cells/μL',
-            status: 'normal',
-            description: 'Platelet count is normal, showing good blood clotting ability.'
-          },
-          { 
-            name: 'Blood Glucose', 
-            value: '115 mg/dL', 
-            normalRange: '70-100 mg/dL',
-            status: 'attention',
-            description: 'Slightly elevated fasting glucose. May indicate prediabetes - lifestyle modifications recommended.'
-          }
-        ],
-
-        detailedAnalysis: {
-          categories: [
-            {
-              name: 'Blood Cells',
-              metrics: [
-                { parameter: 'RBC Count', value: '4.2 million/μL', status: 'normal' },
-                { parameter: 'Hematocrit', value: '38%', status: 'low' },
-                { parameter: 'MCV', value: '88 fL', status: 'normal' },
-                { parameter: 'MCH', value: '30 pg', status: 'normal' }
-              ]
-            },
-            {
-              name: 'Liver Function',
-              metrics: [
-                { parameter: 'ALT', value: '28 U/L', status: 'normal' },
-                { parameter: 'AST', value: '32 U/L', status: 'normal' },
-                { parameter: 'Bilirubin', value: '0.8 mg/dL', status: 'normal' }
-              ]
-            },
-            {
-              name: 'Kidney Function',
-              metrics: [
-                { parameter: 'Creatinine', value: '0.9 mg/dL', status: 'normal' },
-                { parameter: 'BUN', value: '18 mg/dL', status: 'normal' },
-                { parameter: 'eGFR', value: '95 mL/min', status: 'normal' }
-              ]
-            }
-          ]
-        },
-
-        recommendations: [
-          {
-            priority: 'high',
-            title: 'Increase Iron Intake',
-            description: 'Include iron-rich foods like spinach, red meat, and fortified cereals to address low hemoglobin levels.'
-          },
-          {
-            priority: 'medium',
-            title: 'Monitor Blood Glucose',
-            description: 'Check fasting glucose regularly and consider reducing sugar intake. Consult with a nutritionist.'
-          },
-          {
-            priority: 'low',
-            title: 'Stay Hydrated',
-            description: 'Maintain adequate hydration for optimal blood volume and organ function.'
-          },
-          {
-            priority: 'medium',
-            title: 'Follow-up Test',
-            description: 'Recheck CBC in 6-8 weeks to monitor hemoglobin levels after dietary changes.'
-          }
-        ],
-
-        insights: [
-          'Your immune system appears healthy based on normal WBC count',
-          'Kidney and liver function tests are all within normal ranges',
-          'Consider vitamin B12 and folate supplementation if hemoglobin doesn\'t improve',
-          'Regular exercise can help improve glucose metabolism'
-        ],
-
-        nextSteps: [
-          'Schedule a follow-up with your primary care physician',
-          'Start tracking your iron and sugar intake',
-          'Retest in 6-8 weeks to monitor progress',
-          'Consider consulting a hematologist if anemia persists'
-        ]
+      const response = await reportService.upload(selectedFile)
+      const report = response.data
+
+      if (report.processing_status === 'failed') {
+        setError(report.error_message || 'Could not read this report. Please try a clearer image.')
+        return
       }
 
-      setResult(mockResult)
+      setResult(toAnalyzerResult(report))
     } catch (err) {
-      setError('Failed to analyze report. Please try again.')
+      const errorMsg = err.response?.data?.detail || 'Failed to analyze report. Please try again.'
+      setError(errorMsg)
     } finally {
       setIsProcessing(false)
     }
@@ -141,8 +141,11 @@ export const prescriptionService = {
     return response.data
   },
 
-  getList: async (skip = 0, limit = 20) => {
-    const response = await api.get(`/prescription/list?skip=${skip}&limit=${limit}`)
+  // Pass data.next_cursor from the previous page to get the next one
+  getList: async (cursor = null, limit = 20) => {
+    const params = { limit }
+    if (cursor) params.cursor = cursor
+    const response = await api.get('/prescription/list', { params })
     return response.data
   },
 
@@ -154,6 +157,30 @@ export const prescriptionService = {
   delete: async (id) => {
     const response = await api.delete(`/prescription/${id}`)
     return response.data
+  },
+
+  // Drugs across all prescriptions (brands resolved to generics)
+  getMedications: async (activeOnly = false) => {
+    const response = await api.get('/prescription/medications', { params: { active_only: activeOnly } })
+    return response.data
+  },
+
+  // Interactions of one prescription with the user's active medications
+  getInteractions: async (id) => {
+    const response = await api.get(`/prescription/${id}/interactions`)
+    return response.data
+  },
+
+  // Dose times per medicine (parsed from e.g. 1-0-1, BD, after meals)
+  getSchedule: async (id) => {
+    const response = await api.get(`/prescription/${id}/schedule`)
+    return response.data
+  },
+
+  // Doses due across all prescriptions in the next `hours`
+  getUpcomingDoses: async (hours = 24) => {
+    const response = await api.get('/prescription/doses/upcoming', { params: { hours } })
+    return response.data
   }
 }
 
@@ -164,8 +191,15 @@ export const symptomService = {
     return response.data
   },
 
-  getHistory: async (skip = 0, limit = 20) => {
-    const response = await api.get(`/symptoms/history?skip=${skip}&limit=${limit}`)
+  suggest: async (query, limit = 8) => {
+    const response = await api.get(`/symptoms/suggest?q=${encodeURIComponent(query)}&limit=${limit}`)
+    return response.data
+  },
+
+  getHistory: async (cursor = null, limit = 20) => {
+    const params = { limit }
+    if (cursor) params.cursor = cursor
+    const response = await api.get('/symptoms/history', { params })
     return response.data
   },
 
@@ -180,4 +214,62 @@ export const symptomService = {
   }
 }
 
+// Medical Report Service
+export const reportService = {
+  // options: { reportType, reportTitle, age, gender } - age/gender pick the reference ranges
+  upload: async (file, options = {}) => {
+    const formData = new FormData()
+    formData.append('file', file)
+    if (options.reportType) formData.append('report_type', options.reportType)
+    if (options.reportTitle) formData.append('report_title', options.reportTitle)
+    if (options.age) formData.append('age', options.age)
+    if (options.gender) formData.append('gender', options.gender)
+
+    const response = await api.post('/reports/upload', formData, {
+      headers: {
+        'Content-Type': 'multipart/form-data',
+      },
+    })
+    return response.data
+  },
+
+  getList: async (cursor = null, limit = 20) => {
+    const params = { limit }
+    if (cursor) params.cursor = cursor
+    const response = await api.get('/reports/list', { params })
+    return response.data
+  },
+
+  getDetail: async (id) => {
+    const response = await api.get(`/reports/${id}`)
+    return response.data
+  },
+
+  delete: async (id) => {
+    const response = await api.delete(`/reports/${id}`)
+    return response.data
+  },
+
+  // Latest/min/max, mean and slope per year for every lab test the user has results for
+  getTrends: async () => {
+    const response = await api.get('/reports/trends')
+    return response.data
+  },
+
+  // One lab test (e.g. 'hba1c') with its most recent observations
+  getTrend: async (analyte, points = 20) => {
+    const response = await api.get(`/reports/trends/${analyte}`, { params: { points } })
+    return response.data
+  }
+}
+
+// Search API calls
+export const searchService = {
+  // type: 'prescription' | 'symptom' | undefined (both). The last word matches as a prefix
+  search: async (q, type, limit = 20) => {
+    const response = await api.get('/search', { params: { q, type, limit } })
+    return response.data
+  }
+}
+
 export default api